@@ -4,14 +4,16 @@ BCode Pro - Backend API Server
 Building Code Compliance and Layout Generation System with User Authentication
 """
 
-from flask import Flask, request, jsonify, send_from_directory, send_file, session, redirect, url_for
+from flask import Flask, Response, request, jsonify, send_file, session, redirect, url_for, abort
 from flask_cors import CORS
+import hmac
 import json
-import sqlite3
 import os
+import re
 from datetime import datetime
 import logging
 import sys
+import time
 from functools import wraps
 
 # Initialize Flask app
@@ -30,6 +32,73 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from enhanced_logic_engine import EnhancedBuildingCodeEngine
 from user_auth_system import UserAuthSystem, PRICING_PLANS
+from connection_manager import get_connection_manager, connection_metrics
+from response_cache import ResponseCache
+from static_assets import StaticAssetPipeline
+from compression import ResponseCompressor
+from migrations import migrate
+from idempotency import IdempotencyStore, idempotent
+from clause_search import ClauseSearch, DEFAULT_LIMIT
+from change_feed import DEFAULT_PAGE_SIZE, changes_since
+from jurisdiction_comparison import JurisdictionComparison
+from building_analysis import BuildingAnalysis
+from response_projection import parse_fields, parse_flag, project, top_level_fields, wanted
+from content_cache import DEFAULT_CACHE_DIR, ContentCache, content_key
+from dxf_export import DXF_FORMAT_VERSION, iter_dxf, normalize_rooms
+from pdf_reports import ReportService
+from layout_sessions import LayoutSessionStore, SessionConflict
+from compact_layout import CompactLayout
+from layout_renderer import (DEFAULT_WIDTH, MAX_WIDTH, RENDER_FORMAT_VERSION, STYLES, RenderUnavailable,
+                             png_available, render)
+
+# Precompiled bodies for static / slowly changing endpoints
+response_cache = ResponseCache()
+
+# Replays duplicate analysis submissions (retries, double-clicks) per user
+idempotency_store = IdempotencyStore()
+
+# gzip/brotli for large dynamic responses when no proxy compresses for us
+compressor = ResponseCompressor(app)
+
+# Generated CAD files by layout content hash, shared by all workers through the filesystem
+export_cache = ContentCache()
+
+# Rendered layout images (and the layouts they came from) by content key; kept apart from the
+# CAD exports so large DXF files never evict list thumbnails
+render_cache = ContentCache(os.environ.get('RENDER_CACHE_DIR', os.path.join(DEFAULT_CACHE_DIR, 'renders')))
+CONTENT_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+IMAGE_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+# Server-side layouts being edited interactively; snapshots are shared so any worker can take an edit
+layout_sessions = LayoutSessionStore()
+
+# /api/health bodies are rebuilt at most once per window
+HEALTH_CACHE_SECONDS = int(os.environ.get('HEALTH_CACHE_SECONDS', '10'))
+if HEALTH_CACHE_SECONDS < 1:
+    raise ValueError(f'HEALTH_CACHE_SECONDS must be at least 1 (got {HEALTH_CACHE_SECONDS})')
+
+# /api/pricing version: the plans' content hash, computed once; call reload_pricing() after editing them
+pricing_version = content_key(PRICING_PLANS)
+
+def reload_pricing():
+    """Re-version the pricing plans so the next /api/pricing re-serializes them"""
+    global pricing_version
+    pricing_version = content_key(PRICING_PLANS)
+    response_cache.invalidate('pricing')
+
+# Operational metrics are internal: served only with METRICS_TOKEN as a bearer token
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+def internal_only(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not METRICS_TOKEN:
+            abort(404)
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            return jsonify({'success': False, 'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
 
 # Authentication decorator
 def login_required(f):
@@ -71,126 +140,52 @@ def subscription_required(analysis_type='standard'):
 class BuildingCodeAPI:
     def __init__(self, db_path="database/building_codes.db"):
         self.db_path = db_path
-        # Remove shared connection - use per-request connections
+        # Pooled readers + single writer shared with the enhanced engine
+        self.db = get_connection_manager(db_path)
         
         # Initialize enhanced logic engine
         self.enhanced_engine = EnhancedBuildingCodeEngine(db_path)
         
+        # Full-text search over clause text (index maintained by migration 5 triggers)
+        self.clause_search = ClauseSearch(db_path)
+        
+        # Side-by-side runs of the fixture calculation and workflow across jurisdictions
+        self.comparison = JurisdictionComparison(self.enhanced_engine, self.get_fixture_requirements)
+        
+        # Floors of washrooms in one pass with shared code lookups
+        self.building_analysis = BuildingAnalysis(
+            self.enhanced_engine, self.fixture_codes, self.get_fixture_requirements, self.generate_layout
+        )
+        
+        # PDF compliance reports, built in the background and cached by content key
+        self.reports = ReportService(
+            self.enhanced_engine,
+            ContentCache(os.environ.get('REPORT_CACHE_DIR', os.path.join(DEFAULT_CACHE_DIR, 'reports')))
+        )
+        
         self.init_database()
     
     def init_database(self):
-        """Initialize database with enhanced schema and data"""
+        """Bring the database schema and seed data up to date (no-op when current)"""
         try:
-            # Use temporary connection for initialization only
-            connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            connection.row_factory = sqlite3.Row
-            
-            # Initialize enhanced database
-            self.enhanced_engine.initialize_enhanced_database()
-            
-            # Ensure database directory exists
-            os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-            
-            cursor = connection.cursor()
-            
-            # Create tables if they don't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS building_codes (
-                    id INTEGER PRIMARY KEY,
-                    jurisdiction TEXT NOT NULL,
-                    building_type TEXT NOT NULL,
-                    occupancy_range TEXT NOT NULL,
-                    water_closets_male INTEGER,
-                    water_closets_female INTEGER,
-                    urinals INTEGER,
-                    lavatories INTEGER,
-                    accessible_stalls INTEGER,
-                    code_reference TEXT,
-                    accessibility_level TEXT DEFAULT 'basic'
-                )
-            ''')
-            
-            # Insert sample data if table is empty
-            cursor.execute('SELECT COUNT(*) FROM building_codes')
-            if cursor.fetchone()[0] == 0:
-                self.populate_sample_data(cursor)
-            
-            connection.commit()
-            connection.close()  # Close initialization connection
-            logger.info("Database initialized successfully")
+            applied = migrate(self.db_path)
+            logger.info(f"Database ready ({len(applied)} migration(s) applied)")
             
         except Exception as e:
             logger.error(f"Database initialization failed: {e}")
     
-    def populate_sample_data(self, cursor):
-        """Populate database with sample building code data"""
-        sample_data = [
-            # NBC - Office Buildings
-            ('NBC', 'office', '1-15', 1, 1, 1, 1, 1, 'NBC 3.7.4.2', 'basic'),
-            ('NBC', 'office', '16-35', 1, 2, 1, 2, 1, 'NBC 3.7.4.2', 'basic'),
-            ('NBC', 'office', '36-55', 2, 2, 1, 2, 1, 'NBC 3.7.4.2', 'basic'),
-            ('NBC', 'office', '56-80', 2, 3, 2, 3, 1, 'NBC 3.7.4.2', 'basic'),
-            ('NBC', 'office', '81-110', 3, 3, 2, 4, 2, 'NBC 3.7.4.2', 'basic'),
-            
-            # Alberta - Office Buildings (Different requirements)
-            ('Alberta', 'office', '1-15', 1, 1, 1, 1, 1, 'Alberta Building Code 3.7.4.2', 'basic'),
-            ('Alberta', 'office', '16-35', 1, 2, 1, 2, 1, 'Alberta Building Code 3.7.4.2', 'basic'),
-            ('Alberta', 'office', '36-55', 2, 3, 1, 3, 1, 'Alberta Building Code 3.7.4.2', 'basic'),
-            ('Alberta', 'office', '56-80', 3, 3, 2, 3, 2, 'Alberta Building Code 3.7.4.2', 'basic'),
-            ('Alberta', 'office', '81-110', 3, 4, 2, 4, 2, 'Alberta Building Code 3.7.4.2', 'basic'),
-            
-            # Ontario - Office Buildings
-            ('Ontario', 'office', '1-15', 1, 1, 1, 1, 1, 'OBC 3.7.4.2', 'basic'),
-            ('Ontario', 'office', '16-35', 1, 2, 1, 2, 1, 'OBC 3.7.4.2', 'basic'),
-            
-            # BC - Office Buildings
-            ('BC', 'office', '1-15', 1, 1, 1, 1, 1, 'BCBC 3.7.4.2', 'basic'),
-            ('BC', 'office', '16-35', 1, 2, 1, 2, 1, 'BCBC 3.7.4.2', 'basic'),
-            
-            # School Buildings
-            ('NBC', 'school', '1-15', 1, 1, 0, 1, 1, 'NBC 3.7.4.3', 'enhanced'),
-            ('NBC', 'school', '16-30', 1, 2, 1, 2, 1, 'NBC 3.7.4.3', 'enhanced'),
-            ('NBC', 'school', '31-50', 2, 2, 1, 3, 1, 'NBC 3.7.4.3', 'enhanced'),
-            
-            # Assembly Buildings
-            ('NBC', 'assembly', '1-50', 2, 2, 1, 2, 1, 'NBC 3.7.4.4', 'basic'),
-            ('NBC', 'assembly', '51-100', 3, 3, 2, 3, 2, 'NBC 3.7.4.4', 'basic'),
-            ('NBC', 'assembly', '101-200', 4, 4, 2, 4, 2, 'NBC 3.7.4.4', 'basic'),
-            
-            # Retail Buildings
-            ('NBC', 'retail', '1-25', 1, 1, 1, 1, 1, 'NBC 3.7.4.5', 'basic'),
-            ('NBC', 'retail', '26-50', 1, 2, 1, 2, 1, 'NBC 3.7.4.5', 'basic'),
-            ('NBC', 'retail', '51-100', 2, 3, 1, 3, 1, 'NBC 3.7.4.5', 'basic'),
-            
-            # Industrial Buildings
-            ('NBC', 'industrial', '1-20', 1, 1, 1, 1, 1, 'NBC 3.7.4.6', 'basic'),
-            ('NBC', 'industrial', '21-40', 1, 2, 1, 2, 1, 'NBC 3.7.4.6', 'basic'),
-            ('NBC', 'industrial', '41-75', 2, 2, 2, 3, 1, 'NBC 3.7.4.6', 'basic'),
-        ]
-        
-        cursor.executemany('''
-            INSERT INTO building_codes 
-            (jurisdiction, building_type, occupancy_range, water_closets_male, 
-             water_closets_female, urinals, lavatories, accessible_stalls, 
-             code_reference, accessibility_level)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_data)
+    def fixture_codes(self, building_type, jurisdiction, accessibility_level='basic'):
+        """Fixture requirement rows for one code context (through the engine's storage adapter)"""
+        with self.enhanced_engine.repository.session() as code_data:
+            return code_data.fixture_requirements(jurisdiction, building_type, accessibility_level)
     
-    def get_fixture_requirements(self, occupancy_load, building_type, jurisdiction, accessibility_level='basic'):
-        """Calculate fixture requirements based on occupancy and building type"""
+    def get_fixture_requirements(self, occupancy_load, building_type, jurisdiction, accessibility_level='basic',
+                                 codes=None):
+        """Calculate fixture requirements based on occupancy and building type (codes: prefetched rows)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Find matching code requirements
-            cursor.execute('''
-                SELECT * FROM building_codes 
-                WHERE jurisdiction = ? AND building_type = ? AND accessibility_level = ?
-                ORDER BY CAST(SUBSTR(occupancy_range, 1, INSTR(occupancy_range, '-')-1) AS INTEGER)
-            ''', (jurisdiction, building_type, accessibility_level))
-            
-            codes = cursor.fetchall()
-            conn.close()
+            if codes is None:
+                codes = self.fixture_codes(building_type, jurisdiction, accessibility_level)
             
             if not codes:
                 # Fallback to basic requirements
@@ -199,7 +194,7 @@ class BuildingCodeAPI:
             # Find appropriate range
             selected_code = None
             for code in codes:
-                range_parts = code[3].split('-')  # occupancy_range
+                range_parts = code['occupancy_range'].split('-')
                 min_occ = int(range_parts[0])
                 max_occ = int(range_parts[1]) if len(range_parts) > 1 else float('inf')
                 
@@ -217,14 +212,14 @@ class BuildingCodeAPI:
             
             # Calculate fixtures
             fixtures = {
-                'water_closets_male': max(1, int(selected_code[4] * scale_factor)),
-                'water_closets_female': max(1, int(selected_code[5] * scale_factor)),
-                'urinals': max(0, int(selected_code[6] * scale_factor)),
-                'lavatories': max(1, int(selected_code[7] * scale_factor)),
-                'accessible_stalls': max(1, int(selected_code[8] * scale_factor)),
+                'water_closets_male': max(1, int(selected_code['water_closets_male'] * scale_factor)),
+                'water_closets_female': max(1, int(selected_code['water_closets_female'] * scale_factor)),
+                'urinals': max(0, int(selected_code['urinals'] * scale_factor)),
+                'lavatories': max(1, int(selected_code['lavatories'] * scale_factor)),
+                'accessible_stalls': max(1, int(selected_code['accessible_stalls'] * scale_factor)),
                 'total_fixtures': 0,
                 'calculation_basis': f"{jurisdiction} {building_type} occupancy {occupancy_load}",
-                'code_references': [selected_code[9]]
+                'code_references': [selected_code['code_reference']]
             }
             
             fixtures['total_fixtures'] = (
@@ -257,89 +252,48 @@ class BuildingCodeAPI:
         }
     
     def generate_layout(self, fixtures, room_dimensions, accessibility_level='basic'):
-        """Generate 2D layout with fixture positions"""
+        """Generate 2D layout with fixture positions (a CompactLayout; to_dicts() for element dicts)"""
         length = room_dimensions['length']
         width = room_dimensions['width']
         
-        layout_elements = []
+        layout = CompactLayout()
         
         # Calculate spacing
         total_fixtures = fixtures['total_fixtures']
         spacing = min(length, width) / (total_fixtures + 1)
-        
-        # Position fixtures
-        x_pos = 1.0
-        y_pos = 1.0
+        water_closet_clearance = 0.6 if accessibility_level == 'basic' else 1.5
         
         # Male water closets
+        x_pos = 1.0
         for i in range(fixtures['water_closets_male']):
-            layout_elements.append({
-                'type': 'water_closet_male',
-                'x': x_pos,
-                'y': y_pos,
-                'width': 0.8,
-                'height': 1.2,
-                'clearance': 0.6 if accessibility_level == 'basic' else 1.5
-            })
+            layout.append('water_closet_male', x_pos, 1.0, 0.8, 1.2, water_closet_clearance)
             x_pos += spacing
         
         # Female water closets
-        y_pos = width - 2.0
         x_pos = 1.0
         for i in range(fixtures['water_closets_female']):
-            layout_elements.append({
-                'type': 'water_closet_female',
-                'x': x_pos,
-                'y': y_pos,
-                'width': 0.8,
-                'height': 1.2,
-                'clearance': 0.6 if accessibility_level == 'basic' else 1.5
-            })
+            layout.append('water_closet_female', x_pos, width - 2.0, 0.8, 1.2, water_closet_clearance)
             x_pos += spacing
         
         # Urinals
-        x_pos = length - 1.5
         y_pos = 1.0
         for i in range(fixtures['urinals']):
-            layout_elements.append({
-                'type': 'urinal',
-                'x': x_pos,
-                'y': y_pos,
-                'width': 0.6,
-                'height': 0.8,
-                'clearance': 0.6
-            })
+            layout.append('urinal', length - 1.5, y_pos, 0.6, 0.8, 0.6)
             y_pos += 1.0
         
         # Lavatories
         x_pos = 2.0
-        y_pos = width / 2
         for i in range(fixtures['lavatories']):
-            layout_elements.append({
-                'type': 'lavatory',
-                'x': x_pos,
-                'y': y_pos,
-                'width': 0.6,
-                'height': 0.5,
-                'clearance': 0.8
-            })
+            layout.append('lavatory', x_pos, width / 2, 0.6, 0.5, 0.8)
             x_pos += 1.2
         
         # Accessible stalls
-        x_pos = 0.5
         y_pos = 0.5
         for i in range(fixtures['accessible_stalls']):
-            layout_elements.append({
-                'type': 'accessible_stall',
-                'x': x_pos,
-                'y': y_pos,
-                'width': 1.5,
-                'height': 2.0,
-                'clearance': 1.5
-            })
+            layout.append('accessible_stall', 0.5, y_pos, 1.5, 2.0, 1.5)
             y_pos += 3.0
         
-        return layout_elements
+        return layout
     
     def generate_compliance_checklist(self, building_type, jurisdiction, accessibility_level):
         """Generate compliance checklist"""
@@ -490,10 +444,12 @@ def get_user_profile():
 @app.route('/api/pricing', methods=['GET'])
 def get_pricing():
     """Get pricing plans"""
-    return jsonify({
-        'success': True,
-        'plans': PRICING_PLANS
-    })
+    return response_cache.respond(
+        'pricing',
+        pricing_version,
+        lambda: {'success': True, 'plans': PRICING_PLANS},
+        cache_control='public, max-age=300'
+    )
 
 @app.route('/api/create-checkout-session', methods=['POST'])
 @login_required
@@ -511,18 +467,68 @@ def create_checkout_session():
         logger.error(f"Checkout error: {e}")
         return jsonify({'success': False, 'error': 'Failed to create checkout session'}), 500
 
+# Plans that include "Usage analytics & reporting"
+ANALYTICS_PLANS = ('firm', 'team', 'enterprise')
+
+@app.route('/api/analytics/usage', methods=['GET'])
+@login_required
+def usage_analytics():
+    """Usage analytics dashboard data - served from rollups only"""
+    try:
+        user_id = session['user_id']
+        subscription = auth_system.get_user_subscription(user_id)
+        
+        if subscription['plan_type'] not in ANALYTICS_PLANS:
+            return jsonify({
+                'success': False,
+                'error': 'Usage analytics requires a Firm, Team or Enterprise subscription',
+                'upgrade_required': True
+            }), 402
+        
+        scope = request.args.get('scope', 'user')
+        granularity = request.args.get('granularity', 'day')
+        periods = request.args.get('periods', 30, type=int)
+        
+        result = auth_system.get_usage_analytics(user_id, scope, granularity, periods)
+        return jsonify(result), (200 if result['success'] else 400)
+        
+    except Exception as e:
+        logger.error(f"Usage analytics error: {e}")
+        return jsonify({'success': False, 'error': 'Failed to load usage analytics'}), 500
+
 # Enhanced API Routes with Authentication
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    return response_cache.respond(
+        'health',
+        int(time.time() // HEALTH_CACHE_SECONDS),
+        lambda: {
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'version': '2.0.0',
+            'service': 'BCode Pro API',
+            'description': 'Professional Building Code Analysis & CAD Integration',
+            'website': 'bcodepro.com',
+            'features': ['user_auth', 'subscriptions', 'enhanced_analysis']
+        }
+    )
+
+@app.route('/api/metrics', methods=['GET'])
+@internal_only
+def metrics():
+    """Operational metrics for this worker process"""
     return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'version': '2.0.0',
-        'service': 'BCode Pro API',
-        'description': 'Professional Building Code Analysis & CAD Integration',
-        'website': 'bcodepro.com',
-        'features': ['user_auth', 'subscriptions', 'enhanced_analysis']
+        'success': True,
+        'pid': os.getpid(),
+        'database_pools': connection_metrics(),
+        'response_cache': response_cache.metrics(),
+        'compression': compressor.metrics(),
+        'idempotency': idempotency_store.metrics(),
+        'export_cache': export_cache.metrics(),
+        'render_cache': render_cache.metrics(),
+        'pdf_reports': api.reports.metrics(),
+        'layout_sessions': layout_sessions.metrics()
     })
 
 @app.route('/api/calculate-fixtures', methods=['POST'])
@@ -558,7 +564,66 @@ def calculate_fixtures():
             'error': str(e)
         }), 500
 
+@app.route('/api/clauses/search', methods=['GET'])
+@login_required
+def search_clauses():
+    """Ranked full-text clause search: ?q=&jurisdiction=&version=&limit=&cursor="""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+        result = api.clause_search.search(
+            request.args.get('q', ''),
+            jurisdiction=request.args.get('jurisdiction'),
+            code_version=request.args.get('version'),
+            limit=limit,
+            cursor=request.args.get('cursor')
+        )
+        return jsonify(dict(result, success=True))
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in search_clauses: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/code-changes', methods=['GET'])
+@login_required
+def code_changes():
+    """Change feed for cache/snapshot invalidation: ?since=&entity=&limit="""
+    try:
+        result = changes_since(
+            api.db_path,
+            int(request.args.get('since', 0)),
+            request.args.getlist('entity'),
+            int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        )
+        return jsonify(dict(result, success=True))
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in code_changes: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def projection_options(data):
+    """fields= / compact= from the query string, falling back to the JSON body"""
+    fields = parse_fields(request.args.get('fields') or (data or {}).get('fields'))
+    compact = parse_flag(request.args.get('compact', (data or {}).get('compact')))
+    return fields, compact
+
 @app.route('/api/complete-analysis', methods=['POST'])
+@idempotent(idempotency_store)
 @subscription_required('standard')
 def complete_analysis():
     """Complete washroom design analysis - requires subscription"""
@@ -588,29 +653,43 @@ def complete_analysis():
         accessibility_level = data.get('accessibility_level', 'basic')
         room_dimensions = data.get('room_dimensions', {'length': 10, 'width': 8, 'height': 3})
         
+        # Only build the sections the client asked for
+        fields, compact = projection_options(data)
+        requested = top_level_fields(fields)
+        need_fixtures = wanted(requested, 'fixture_requirements', 'layout_elements', 'recommendations')
+        need_checklist = wanted(requested, 'compliance_checklist', 'compliance_score', 'recommendations')
+        
         # Calculate fixtures
         fixtures = api.get_fixture_requirements(
             occupancy_load, building_type, jurisdiction, accessibility_level
-        )
+        ) if need_fixtures else None
         
-        # Generate layout
-        layout_elements = api.generate_layout(fixtures, room_dimensions, accessibility_level)
+        # Generate layout; compact reports carry it as columns instead of one object per fixture
+        layout_elements = None
+        if wanted(requested, 'layout_elements'):
+            layout = api.generate_layout(fixtures, room_dimensions, accessibility_level)
+            layout_elements = layout.to_columnar() if compact else layout.to_dicts()
         
         # Generate compliance checklist
-        checklist = api.generate_compliance_checklist(building_type, jurisdiction, accessibility_level)
+        checklist = api.generate_compliance_checklist(
+            building_type, jurisdiction, accessibility_level
+        ) if need_checklist else None
         
         # Calculate compliance score
-        compliant_items = sum(1 for item in checklist if item['status'] == 'compliant')
-        compliance_score = (compliant_items / len(checklist)) * 100
+        compliance_score = None
+        if checklist is not None:
+            compliant_items = sum(1 for item in checklist if item['status'] == 'compliant')
+            compliance_score = (compliant_items / len(checklist)) * 100
         
         # Generate recommendations
         recommendations = []
-        if accessibility_level == 'basic':
-            recommendations.append("Consider enhanced accessibility features for better compliance")
-        if compliance_score < 90:
-            recommendations.append("Review ventilation and privacy requirements")
-        if fixtures['total_fixtures'] > 10:
-            recommendations.append("Consider separate male/female washroom areas")
+        if wanted(requested, 'recommendations'):
+            if accessibility_level == 'basic':
+                recommendations.append("Consider enhanced accessibility features for better compliance")
+            if compliance_score < 90:
+                recommendations.append("Review ventilation and privacy requirements")
+            if fixtures['total_fixtures'] > 10:
+                recommendations.append("Consider separate male/female washroom areas")
         
         # Record usage
         user_id = session['user_id']
@@ -639,6 +718,11 @@ def complete_analysis():
             'watermarked': watermarked,
             'user_plan': subscription['plan_type']
         }
+        report = project(report, fields)
+        if compact:
+            # The client already has its own inputs
+            report.pop('project_parameters', None)
+            report['compact'] = True
         
         return jsonify({
             'success': True,
@@ -653,6 +737,7 @@ def complete_analysis():
         }), 500
 
 @app.route('/api/enhanced-analysis', methods=['POST'])
+@idempotent(idempotency_store)
 @subscription_required('enhanced')
 def enhanced_analysis():
     """Enhanced 7-step analysis - requires professional subscription"""
@@ -670,8 +755,9 @@ def enhanced_analysis():
                 'upgrade_required': True
             }), 402
         
-        # Use enhanced engine
-        result = api.enhanced_engine.process_enhanced_workflow(data)
+        # Use enhanced engine, computing only the requested sections
+        fields, compact = projection_options(data)
+        result = api.enhanced_engine.process_enhanced_workflow(data, fields=fields, compact=compact)
         
         # Record usage
         project_name = data.get('project_name', f'Enhanced_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
@@ -686,54 +772,453 @@ def enhanced_analysis():
             'error': str(e)
         }), 500
 
-# Frontend Routes
+@app.route('/api/compare-jurisdictions', methods=['POST'])
+@idempotent(idempotency_store)
+@subscription_required('enhanced')
+def compare_jurisdictions():
+    """Fixture counts, rules, assemblies and clauses for one project across jurisdictions"""
+    try:
+        data = request.get_json() or {}
+        
+        user_id = session['user_id']
+        subscription = auth_system.get_user_subscription(user_id)
+        if subscription['plan_type'] == 'free':
+            return jsonify({
+                'success': False,
+                'error': 'Jurisdiction comparison requires Professional subscription',
+                'upgrade_required': True
+            }), 402
+        
+        comparison = api.comparison.compare(
+            data, data.get('jurisdictions'), include_details=parse_flag(data.get('include_details'))
+        )
+        
+        project_name = data.get('project_name', f'Comparison_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
+        auth_system.record_project_usage(user_id, project_name, 'enhanced')
+        
+        return jsonify({
+            'success': True,
+            'comparison': comparison
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in compare_jurisdictions: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/building-analysis', methods=['POST'])
+@idempotent(idempotency_store)
+@subscription_required('enhanced')
+def building_analysis():
+    """Fixtures, layouts and building-level checks for every washroom on every floor"""
+    try:
+        data = request.get_json() or {}
+        
+        user_id = session['user_id']
+        subscription = auth_system.get_user_subscription(user_id)
+        if subscription['plan_type'] == 'free':
+            return jsonify({
+                'success': False,
+                'error': 'Building analysis requires Professional subscription',
+                'upgrade_required': True
+            }), 402
+        
+        _, compact = projection_options(data)
+        analysis = api.building_analysis.analyze(data, include_layouts=parse_flag(data.get('include_layouts', True)),
+                                                 columnar=compact)
+        
+        project_name = data.get('project_name', f'Building_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
+        auth_system.record_project_usage(user_id, project_name, 'enhanced')
+        
+        return jsonify({
+            'success': True,
+            'analysis': analysis
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in building_analysis: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/layout-sessions', methods=['POST'])
+@login_required
+def create_layout_session():
+    """Start editing a generated layout; returns the session id and every current issue"""
+    try:
+        data = request.get_json() or {}
+        layout_session = layout_sessions.create(
+            session['user_id'],
+            data.get('room_dimensions'),
+            data.get('layout_elements', []),
+            data.get('accessibility_level', 'basic')
+        )
+        
+        _, compact = projection_options(data)
+        return jsonify({
+            'success': True,
+            'layout_session': layout_session.state(columnar=compact)
+        }), 201
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in create_layout_session: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def layout_session_expired():
+    return jsonify({
+        'success': False,
+        'error': 'Layout session expired; start a new one'
+    }), 404
+
+@app.route('/api/layout-sessions/<session_id>', methods=['GET'])
+@login_required
+def get_layout_session(session_id):
+    """Full state of a layout session, e.g. after a version conflict"""
+    layout_session = layout_sessions.get(session_id, session['user_id'])
+    if layout_session is None:
+        return layout_session_expired()
+    _, compact = projection_options(None)
+    with layout_session.lock:
+        state = layout_session.state(columnar=compact)
+    return jsonify({
+        'success': True,
+        'layout_session': state
+    })
+
+@app.route('/api/layout-sessions/<session_id>', methods=['DELETE'])
+@login_required
+def delete_layout_session(session_id):
+    layout_session = layout_sessions.get(session_id, session['user_id'])
+    if layout_session is None:
+        return layout_session_expired()
+    layout_sessions.delete(layout_session)
+    return jsonify({'success': True})
+
+@app.route('/api/layout-sessions/<session_id>/edits', methods=['POST'])
+@login_required
+def edit_layout_session(session_id):
+    """Apply move/rotate/add/remove operations; returns only the elements and issues that changed"""
+    layout_session = layout_sessions.get(session_id, session['user_id'])
+    if layout_session is None:
+        return layout_session_expired()
+    try:
+        data = request.get_json() or {}
+        version = data.get('version')
+        if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+            raise ValueError('version must be an integer')
+        result = layout_sessions.edit(layout_session, data.get('operations'), version)
+        
+        return jsonify(dict(result, success=True))
+        
+    except SessionConflict as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'version': layout_session.version
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in edit_layout_session: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/export/dxf', methods=['POST'])
+@login_required
+def export_dxf():
+    """Layered DXF of one or more generated layouts, streamed and cached by content hash"""
+    try:
+        data = request.get_json() or {}
+        rooms = normalize_rooms(data)
+        title = str(data.get('project_name') or 'Washroom Layout')
+        
+        # Free trial exports carry a watermark, so the plan is part of the content
+        subscription = auth_system.get_user_subscription(session['user_id'])
+        watermarked = subscription['plan_type'] == 'free'
+        
+        key = content_key('dxf', DXF_FORMAT_VERSION, rooms, title, watermarked)
+        filename = ''.join(c if c.isalnum() or c in '-_' else '_' for c in title)[:80] + '.dxf'
+        headers = {'ETag': f'"{key}"', 'Cache-Control': 'private, max-age=86400'}
+        if request.if_none_match.contains(key):
+            return Response(status=304, headers=headers)
+        
+        cached = export_cache.get(key, '.dxf')
+        if cached:
+            response = send_file(cached, mimetype='application/dxf', as_attachment=True,
+                                 download_name=filename, conditional=False, etag=False)
+            response.headers.update(headers)
+            response.headers['X-Export-Cache'] = 'hit'
+            return response
+        
+        headers.update({'Content-Disposition': f'attachment; filename="{filename}"', 'X-Export-Cache': 'miss'})
+        return Response(export_cache.stream(key, '.dxf', iter_dxf(rooms, title, watermarked)),
+                        mimetype='application/dxf', headers=headers)
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in export_dxf: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/render/layout', methods=['POST'])
+@login_required
+def render_layout():
+    """Register a layout for rendering; returns content-addressed image URLs"""
+    try:
+        data = request.get_json() or {}
+        style = data.get('style', 'plan')
+        if style not in STYLES:
+            raise ValueError(f'Unknown style: {style}. Use one of {", ".join(STYLES)}')
+        width = data.get('width', DEFAULT_WIDTH)
+        if isinstance(width, bool) or not isinstance(width, int) or not 64 <= width <= MAX_WIDTH:
+            raise ValueError(f'width must be an integer between 64 and {MAX_WIDTH}')
+        
+        subscription = auth_system.get_user_subscription(session['user_id'])
+        layout = {
+            'rooms': normalize_rooms(data),
+            'title': str(data.get('project_name') or 'Washroom Layout'),
+            'style': style,
+            'width': width,
+            'watermark': subscription['plan_type'] == 'free'
+        }
+        key = content_key('render', RENDER_FORMAT_VERSION, layout)
+        if not render_cache.get(key, '.layout.json'):
+            render_cache.put(key, '.layout.json', json.dumps(layout).encode('utf-8'))
+        
+        image_format = 'png' if png_available() else 'svg'
+        return jsonify({
+            'success': True,
+            'render_key': key,
+            'svg_url': url_for('rendered_layout', key=key, image_format='svg'),
+            'png_url': url_for('rendered_layout', key=key, image_format='png') if png_available() else None,
+            'thumbnail_url': url_for('rendered_layout', key=key, image_format=image_format, size='thumb')
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in render_layout: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/render/<key>.<image_format>', methods=['GET'])
+@login_required
+def rendered_layout(key, image_format):
+    """Rendered layout or thumbnail; cached on disk and immutable, so browsers revalidate by ETag"""
+    if not CONTENT_KEY_PATTERN.match(key) or image_format not in IMAGE_TYPES:
+        abort(404)
+    thumbnail = request.args.get('size') == 'thumb'
+    suffix = f'{".thumb" if thumbnail else ""}.{image_format}'
+    if request.if_none_match.contains(f'{key}{suffix}'):
+        # Content-addressed: a matching ETag is still current, no need to touch the disk
+        return Response(status=304, headers={'ETag': f'"{key}{suffix}"'})
+    
+    try:
+        path = render_cache.get(key, suffix)
+        if path is None:
+            source = render_cache.get(key, '.layout.json')
+            if source is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Render expired; post the layout again'
+                }), 404
+            with open(source, 'rb') as f:
+                layout = json.load(f)
+            path = render_cache.put(key, suffix, render(layout, image_format, thumbnail))
+        
+        response = send_file(path, mimetype=IMAGE_TYPES[image_format], etag=f'{key}{suffix}',
+                             conditional=True, max_age=31536000)
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+        
+    except RenderUnavailable as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 501
+    except Exception as e:
+        logger.error(f"Error in rendered_layout: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def report_job(job):
+    """Job state plus the URLs the client polls and downloads from"""
+    job = dict(job, status_url=url_for('compliance_report_status', report_id=job['report_id']))
+    if job['status'] == 'done':
+        job['download_url'] = url_for('compliance_report_file', report_id=job['report_id'])
+    return job
+
+def report_plan_required():
+    """402 response for free accounts, which can neither request nor fetch PDF reports"""
+    subscription = auth_system.get_user_subscription(session['user_id'])
+    if subscription['plan_type'] == 'free':
+        return jsonify({
+            'success': False,
+            'error': 'PDF compliance reports require Professional subscription',
+            'upgrade_required': True
+        }), 402
+    return None
+
+@app.route('/api/reports/compliance', methods=['POST'])
+@subscription_required('enhanced')
+def compliance_report():
+    """Queue a PDF compliance report; repeat requests get the finished file's handle immediately"""
+    try:
+        data = request.get_json() or {}
+        
+        denied = report_plan_required()
+        if denied:
+            return denied
+        
+        if not data.get('occupancy_load') or not data.get('building_type') or not data.get('jurisdiction'):
+            return jsonify({
+                'success': False,
+                'error': 'Missing required parameters: occupancy_load, building_type, jurisdiction'
+            }), 400
+        
+        title = str(data.get('project_name') or f"{data['building_type'].title()} washroom - {data['jurisdiction']}")
+        job = api.reports.submit(data, title)
+        return jsonify({
+            'success': True,
+            'report': report_job(job)
+        }), 200 if job['status'] == 'done' else 202
+        
+    except Exception as e:
+        logger.error(f"Error in compliance_report: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/reports/<report_id>', methods=['GET'])
+@login_required
+def compliance_report_status(report_id):
+    """queued / running / done / failed"""
+    denied = report_plan_required()
+    if denied:
+        return denied
+    job = api.reports.status(report_id) if CONTENT_KEY_PATTERN.match(report_id) else None
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown report'
+        }), 404
+    return jsonify({
+        'success': True,
+        'report': report_job(job)
+    })
+
+@app.route('/api/reports/<report_id>.pdf', methods=['GET'])
+@login_required
+def compliance_report_file(report_id):
+    """The finished PDF, served from the report cache"""
+    denied = report_plan_required()
+    if denied:
+        return denied
+    path = api.reports.path(report_id) if CONTENT_KEY_PATTERN.match(report_id) else None
+    if path is None:
+        return jsonify({
+            'success': False,
+            'error': 'Report not ready'
+        }), 404
+    return send_file(path, mimetype='application/pdf', as_attachment=True,
+                     download_name=f'compliance_report_{report_id[:12]}.pdf', etag=report_id, conditional=True)
+
+# Frontend Routes - served from the in-memory asset pipeline
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+static_assets = StaticAssetPipeline(FRONTEND_DIR, auto_reload=os.environ.get('FLASK_ENV') == 'development')
+
+def serve_asset(name):
+    """Serve a frontend file from memory, 404 if it does not exist"""
+    response = static_assets.serve(name)
+    if response is None:
+        abort(404)
+    return response
+
 @app.route('/')
 def index():
     """Serve main application"""
-    return send_from_directory('../frontend', 'index.html')
+    return serve_asset('index.html')
 
 @app.route('/pricing')
 def pricing_page():
     """Serve pricing page"""
-    return send_from_directory('../frontend', 'pricing.html')
+    return serve_asset('pricing.html')
 
 @app.route('/register')
 def register_page():
     """Serve registration page"""
-    return send_from_directory('../frontend', 'register.html')
+    return serve_asset('register.html')
 
 @app.route('/login')
 def login_page():
     """Serve login page"""
-    return send_from_directory('../frontend', 'login.html')
+    return serve_asset('login.html')
 
 @app.route('/dashboard')
 @login_required
 def dashboard():
     """Serve user dashboard"""
-    return send_from_directory('../frontend', 'dashboard.html')
+    return serve_asset('dashboard.html')
 
 @app.route('/styles.css')
 def serve_css():
-    """Serve CSS with proper MIME type"""
-    return send_from_directory('../frontend', 'styles.css', mimetype='text/css')
+    """Serve CSS (unfingerprinted name, revalidated via ETag)"""
+    return serve_asset('styles.css')
 
 @app.route('/script.js')
 def serve_js():
-    """Serve JavaScript with proper MIME type"""
-    return send_from_directory('../frontend', 'script.js', mimetype='application/javascript')
+    """Serve JavaScript (unfingerprinted name, revalidated via ETag)"""
+    return serve_asset('script.js')
 
 @app.route('/frontend/<path:filename>')
 def serve_frontend(filename):
-    """Serve frontend files with proper MIME types"""
-    import mimetypes
-    mimetype, _ = mimetypes.guess_type(filename)
-    return send_from_directory('../frontend', filename, mimetype=mimetype)
+    """Serve frontend files - fingerprinted names are cached as immutable"""
+    return serve_asset(filename)
 
 @app.route('/frontend/')
 def frontend_index():
     """Serve frontend index"""
-    return send_from_directory('../frontend', 'index.html')
+    return serve_asset('index.html')
 
 if __name__ == '__main__':
     # Ensure database directory exists
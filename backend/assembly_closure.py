@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Assembly -> component closure
+An assembly's component_ids may name other assemblies as well as components. The closure table
+(assembly_component_closure) stores, for every assembly, each transitive member once: leaf
+components and the nested assemblies they came through, in depth-first order. Step 3 then needs
+one lookup per distinct assembly instead of re-reading and re-parsing the nested rows.
+The table is derived data: rebuild_closure() re-derives it at migration and after imports.
+
+Usage:
+    python backend/assembly_closure.py rebuild [--db PATH]
+    python backend/assembly_closure.py show ACCESSIBLE_STALL [--db PATH]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from change_feed import current_revision
+from connection_manager import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+
+class Closure(NamedTuple):
+    """Transitive members of one assembly"""
+    components: Tuple[str, ...]
+    nested_assemblies: Tuple[str, ...]
+
+
+def parse_members(component_ids: Optional[str], assembly_code: str = '') -> List[str]:
+    try:
+        members = json.loads(component_ids or '[]')
+    except json.JSONDecodeError:
+        logger.warning(f"⚠️ Invalid component_ids JSON in assembly {assembly_code}")
+        return []
+    return [member for member in members if isinstance(member, str)] if isinstance(members, list) else []
+
+
+def resolve_closures(assemblies: Dict[str, List[str]]) -> Dict[str, Closure]:
+    """
+    {assembly_code: direct members} -> {assembly_code: Closure}.
+    A member that is itself an assembly code is expanded. Members come out in depth-first order,
+    each once; a cycle is reported and cut where it closes.
+    """
+    closures: Dict[str, Closure] = {}
+
+    def resolve(code: str) -> Closure:
+        components: Dict[str, None] = {}
+        nested: Dict[str, None] = {}
+        seen, stack = {code}, [code]
+
+        def walk(parent: str):
+            for member in assemblies.get(parent, ()):
+                if member not in assemblies:
+                    components.setdefault(member)
+                elif member in stack:
+                    logger.warning(f"⚠️ Assembly cycle {' -> '.join(stack + [member])} ignored")
+                elif member not in seen:
+                    seen.add(member)
+                    nested.setdefault(member)
+                    known = closures.get(member)
+                    if known is not None:
+                        # Reachability does not depend on the path, so a resolved closure can be reused
+                        components.update(dict.fromkeys(known.components))
+                        nested.update(dict.fromkeys(known.nested_assemblies))
+                        seen.update(known.nested_assemblies)
+                    else:
+                        stack.append(member)
+                        walk(member)
+                        stack.pop()
+
+        walk(code)
+        nested.pop(code, None)  # reached back through a cycle
+        return Closure(tuple(components), tuple(nested))
+
+    for code in assemblies:
+        closures[code] = resolve(code)
+    return closures
+
+
+def closure_rows(closures: Dict[str, Closure]) -> Iterable[Tuple[str, str, str, int]]:
+    for code, closure in closures.items():
+        members = [(member, 'component') for member in closure.components] + \
+                  [(member, 'assembly') for member in closure.nested_assemblies]
+        for position, (member, member_type) in enumerate(members):
+            yield code, member, member_type, position
+
+
+def rebuild_closure(cursor: sqlite3.Cursor) -> int:
+    """Re-derive assembly_component_closure from component_assembly; returns the row count"""
+    assemblies = {code: parse_members(component_ids, code) for code, component_ids in
+                  cursor.execute('SELECT assembly_code, component_ids FROM component_assembly ORDER BY id')}
+    rows = list(closure_rows(resolve_closures(assemblies)))
+    cursor.execute('DELETE FROM assembly_component_closure')
+    cursor.executemany('''
+        INSERT INTO assembly_component_closure (assembly_code, member_code, member_type, position)
+        VALUES (?, ?, ?, ?)
+    ''', rows)
+    return len(rows)
+
+
+def closures_from_rows(rows: Iterable[Tuple[str, str, str]]) -> Dict[str, Closure]:
+    """(assembly_code, member_code, member_type) rows in position order -> closures"""
+    members: Dict[str, Tuple[List[str], List[str]]] = {}
+    for code, member, member_type in rows:
+        components, nested = members.setdefault(code, ([], []))
+        (components if member_type == 'component' else nested).append(member)
+    return {code: Closure(tuple(components), tuple(nested)) for code, (components, nested) in members.items()}
+
+
+class AssemblyClosureMap:
+    """
+    Assembly rows and their closures in memory, shared by all requests.
+    Reloaded in two queries when the change-log revision moves (assembly edits are logged).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revision = None
+        self._assemblies: Dict[str, Dict[str, Any]] = {}
+        self._closures: Dict[str, Closure] = {}
+        self.loads = 0
+
+    def snapshot(self, connection: sqlite3.Connection) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Closure]]:
+        """(assembly rows by code, closures by code) as of the current revision"""
+        revision = current_revision(connection)
+        with self._lock:
+            if revision == self._revision:
+                return self._assemblies, self._closures
+        assemblies = {row['assembly_code']: dict(row)
+                      for row in connection.execute('SELECT * FROM component_assembly ORDER BY id')}
+        closures = closures_from_rows(connection.execute('''
+            SELECT assembly_code, member_code, member_type FROM assembly_component_closure
+            ORDER BY assembly_code, position
+        '''))
+        with self._lock:
+            self._revision, self._assemblies, self._closures = revision, assemblies, closures
+            self.loads += 1
+        return assemblies, closures
+
+    def get(self, connection: sqlite3.Connection, assembly_code: str) -> Optional[Closure]:
+        return self.snapshot(connection)[1].get(assembly_code)
+
+    def metrics(self):
+        with self._lock:
+            return {'assemblies': len(self._assemblies), 'loads': self.loads, 'revision': self._revision}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Assembly -> component closure')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('rebuild', help='Re-derive the closure table')
+    show = subcommands.add_parser('show', help='Transitive members of one assembly')
+    show.add_argument('assembly_code')
+    args = parser.parse_args(argv)
+
+    from migrations import migrate
+    migrate(args.db)
+    manager = get_connection_manager(args.db)
+    if args.command == 'rebuild':
+        with manager.writer() as connection:
+            count = rebuild_closure(connection.cursor())
+        print(f"✅ {count} closure rows")
+        return 0
+
+    with manager.reader() as connection:
+        closure = AssemblyClosureMap().get(connection, args.assembly_code)
+    if closure is None:
+        print(f"❌ Unknown assembly: {args.assembly_code}")
+        return 1
+    print(json.dumps(closure._asdict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Whole-building washroom analysis
+A building is floors of washrooms, each serving its share of the occupant load. One pass
+computes fixtures and a layout per washroom, per-floor and building totals, and the
+building-level checks. Everything that depends only on the code context is looked up once:
+the fixture requirement rows per accessibility level, and the matched rules and clauses for
+the building. Floors are laid out on the shared worker pool, and identical washrooms (the
+typical stacked floor) share one layout computation.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from compact_layout import CompactLayout
+from jurisdiction_comparison import get_executor
+
+logger = logging.getLogger(__name__)
+
+MAX_FLOORS = 200
+MAX_WASHROOMS = 1000
+
+FIXTURE_FIELDS = ('water_closets_male', 'water_closets_female', 'urinals', 'lavatories', 'accessible_stalls',
+                  'total_fixtures')
+
+# Universal washrooms required by the number of water closets in the building, per jurisdiction:
+# rows of (up to this many water closets, universal washrooms), then one more per `step`.
+# Only the National Building Code table is encoded; provincial and other codes get a 'review'
+# check rather than NBC numbers presented as theirs.
+UNIVERSAL_WASHROOM_TABLES = {
+    'NBC': {'reference': 'NBC Table 3.8.2.3.A', 'rows': ((0, 0), (20, 1), (40, 2), (60, 3)), 'step': 40}
+}
+
+
+def universal_washrooms_required(water_closets: int, jurisdiction: str = 'NBC') -> Optional[int]:
+    """Universal washrooms the jurisdiction's table requires; None when it has no table here"""
+    table = UNIVERSAL_WASHROOM_TABLES.get(jurisdiction)
+    if table is None:
+        return None
+    rows = table['rows']
+    index = bisect.bisect_left([bound for bound, _ in rows], water_closets)
+    if index < len(rows):
+        return rows[index][1]
+    bound, required = rows[-1]
+    return required + -(-(water_closets - bound) // table['step'])
+
+
+def _positive_number(value: Any, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f'{name} must be a positive number')
+    return float(value)
+
+
+def _split(total: int, count: int) -> List[int]:
+    """Equal integer shares; the remainder goes to the first ones"""
+    share, remainder = divmod(total, count)
+    return [share + (1 if index < remainder else 0) for index in range(count)]
+
+
+def parse_floors(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    floors: [{name, occupancy_load?, washrooms: [{name, room_dimensions, occupancy_load?,
+    occupancy_share?, accessibility_level?, universal?}]}] -> validated floors.
+    A washroom's load is its occupancy_load, else occupancy_share of the floor load, else an
+    equal split of what the floor has left. Raises ValueError on malformed input.
+    """
+    floors = data.get('floors')
+    if not isinstance(floors, list) or not floors:
+        raise ValueError('floors must be a non-empty list')
+    if len(floors) > MAX_FLOORS:
+        raise ValueError(f'At most {MAX_FLOORS} floors per building')
+    default_level = data.get('accessibility_level', 'basic')
+
+    parsed, washroom_count = [], 0
+    for floor_index, floor in enumerate(floors):
+        where = f'floors[{floor_index}]'
+        washrooms = floor.get('washrooms') if isinstance(floor, dict) else None
+        if not isinstance(washrooms, list) or not washrooms:
+            raise ValueError(f'{where}.washrooms must be a non-empty list')
+        washroom_count += len(washrooms)
+        if washroom_count > MAX_WASHROOMS:
+            raise ValueError(f'At most {MAX_WASHROOMS} washrooms per building')
+        floor_load = floor.get('occupancy_load')
+        if floor_load is not None:
+            floor_load = int(_positive_number(floor_load, f'{where}.occupancy_load'))
+
+        rooms, unassigned = [], []
+        for index, washroom in enumerate(washrooms):
+            name = f'{where}.washrooms[{index}]'
+            if not isinstance(washroom, dict):
+                raise ValueError(f'{name} must be an object')
+            dimensions = washroom.get('room_dimensions') or {}
+            room = {
+                'name': str(washroom.get('name') or f'Washroom {floor_index + 1}.{index + 1}'),
+                'room_dimensions': {
+                    'length': _positive_number(dimensions.get('length'), f'{name}.room_dimensions.length'),
+                    'width': _positive_number(dimensions.get('width'), f'{name}.room_dimensions.width')
+                },
+                'accessibility_level': washroom.get('accessibility_level', default_level),
+                'universal': bool(washroom.get('universal', False)),
+                'occupancy_load': None
+            }
+            if washroom.get('occupancy_load') is not None:
+                room['occupancy_load'] = int(_positive_number(washroom['occupancy_load'], f'{name}.occupancy_load'))
+            elif washroom.get('occupancy_share') is not None:
+                if floor_load is None:
+                    raise ValueError(f'{name}.occupancy_share needs {where}.occupancy_load')
+                share = _positive_number(washroom['occupancy_share'], f'{name}.occupancy_share')
+                room['occupancy_load'] = max(1, round(floor_load * share))
+            else:
+                unassigned.append(room)
+            rooms.append(room)
+
+        if unassigned:
+            if floor_load is None:
+                raise ValueError(f'{where}: give occupancy_load for the floor or for each washroom')
+            remaining = floor_load - sum(room['occupancy_load'] for room in rooms if room['occupancy_load'])
+            if remaining < len(unassigned):
+                raise ValueError(f'{where}: the floor occupancy_load is already allocated')
+            for room, load in zip(unassigned, _split(remaining, len(unassigned))):
+                room['occupancy_load'] = load
+
+        parsed.append({'name': str(floor.get('name') or f'Floor {floor_index + 1}'),
+                       'occupancy_load': floor_load or sum(room['occupancy_load'] for room in rooms),
+                       'washrooms': rooms})
+    return parsed
+
+
+def _add(totals: Dict[str, int], fixtures: Dict[str, Any]):
+    for field in FIXTURE_FIELDS:
+        totals[field] = totals.get(field, 0) + fixtures.get(field, 0)
+
+
+class BuildingAnalysis:
+    """
+    analyze(data) -> per-washroom, per-floor and building results with building checks.
+    `fixture_codes(building_type, jurisdiction, accessibility_level)` fetches the requirement rows,
+    `fixture_calculator(occupancy_load, building_type, jurisdiction, accessibility_level, codes=rows)`
+    turns them into counts and `layout_generator(fixtures, room_dimensions, accessibility_level)`
+    places fixtures in a CompactLayout (BuildingCodeAPI methods in the app).
+    """
+
+    def __init__(self, engine, fixture_codes: Callable[..., List[Any]],
+                 fixture_calculator: Callable[..., Dict[str, Any]],
+                 layout_generator: Callable[..., CompactLayout], executor=None):
+        self.engine = engine
+        self.fixture_codes = fixture_codes
+        self.fixture_calculator = fixture_calculator
+        self.layout_generator = layout_generator
+        self.executor = executor
+
+    def _code_context(self, data: Dict[str, Any], total_occupants: int) -> Dict[str, Any]:
+        """Rules and clauses for the building as a whole, matched once"""
+        engine = self.engine
+        normalized = engine.process_user_inputs(dict(data, occupancy_load=total_occupants))
+        rules = engine.match_context_logic_rules(normalized)
+        expansion = engine.expand_component_assemblies(rules)
+        clauses = engine.collect_building_code_clauses(expansion, rules, normalized['jurisdiction'],
+                                                       normalized['as_of'])
+        return {
+            'as_of': normalized['as_of'],
+            'rules': [match['rule']['rule_code'] for match in rules],
+            'assemblies': [assembly['assembly_code'] for assembly in expansion['required_assemblies']],
+            'clauses': [{
+                'clause_code': clause['clause_code'],
+                'clause_number': clause['clause_number'],
+                'title': clause['clause_title'],
+                'enforcement_level': clause['enforcement_level']
+            } for clause in sorted(clauses['clauses'], key=lambda c: c['clause_code'])]
+        }
+
+    def analyze(self, data: Dict[str, Any], include_layouts: bool = True, columnar: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        if not data.get('building_type') or not data.get('jurisdiction'):
+            raise ValueError('Missing required parameters: building_type, jurisdiction')
+        building_type, jurisdiction = data['building_type'], data['jurisdiction']
+        floors = parse_floors(data)
+        total_occupants = sum(floor['occupancy_load'] for floor in floors)
+
+        # One fixture-table lookup per accessibility level, shared by every washroom
+        levels = {room['accessibility_level'] for floor in floors for room in floor['washrooms']}
+        levels.add(data.get('accessibility_level', 'basic'))
+        codes = {level: self.fixture_codes(building_type, jurisdiction, level) for level in levels}
+
+        # Identical washrooms (same load, level and size) share one calculation and layout
+        lock = threading.Lock()
+        memo: Dict[Tuple, Dict[str, Any]] = {}
+        hits = {'fixtures': 0, 'layouts': 0}
+
+        def washroom(room: Dict[str, Any]) -> Dict[str, Any]:
+            level = room['accessibility_level']
+            dimensions = room['room_dimensions']
+            key = (room['occupancy_load'], level, dimensions['length'], dimensions['width'])
+            with lock:
+                known = memo.get(key)
+                if known is not None:
+                    hits['fixtures'] += 1
+                    hits['layouts'] += include_layouts
+            if known is None:
+                fixtures = self.fixture_calculator(room['occupancy_load'], building_type, jurisdiction, level,
+                                                   codes=codes[level])
+                known = {'fixture_requirements': fixtures}
+                if include_layouts:
+                    layout = self.layout_generator(fixtures, dimensions, level)
+                    known['layout_elements'] = layout.to_columnar() if columnar else layout.to_dicts()
+                with lock:
+                    memo.setdefault(key, known)
+            return dict(room, **known)
+
+        def floor_result(floor: Dict[str, Any]) -> Dict[str, Any]:
+            rooms = [washroom(room) for room in floor['washrooms']]
+            totals: Dict[str, int] = {}
+            for room in rooms:
+                _add(totals, room['fixture_requirements'])
+            return {'name': floor['name'], 'occupancy_load': floor['occupancy_load'], 'washrooms': rooms,
+                    'totals': totals, 'universal_washrooms': sum(room['universal'] for room in rooms)}
+
+        executor = self.executor or get_executor()
+        futures = [executor.submit(floor_result, floor) for floor in floors]
+        context = self._code_context(data, total_occupants)
+        floor_results = [future.result() for future in futures]
+
+        totals: Dict[str, int] = {}
+        for floor in floor_results:
+            _add(totals, floor['totals'])
+        building_level = data.get('accessibility_level', 'basic')
+        required = self.fixture_calculator(total_occupants, building_type, jurisdiction, building_level,
+                                           codes=codes[building_level])
+
+        return {
+            'building': {
+                'building_type': building_type,
+                'jurisdiction': jurisdiction,
+                'accessibility_level': building_level,
+                'as_of': context['as_of'],
+                'total_occupants': total_occupants,
+                'floors': len(floor_results),
+                'washrooms': sum(len(floor['washrooms']) for floor in floor_results)
+            },
+            'floors': floor_results,
+            'totals': totals,
+            'building_requirement': required,
+            'checks': self.building_checks(floor_results, totals, required, jurisdiction),
+            'rules': context['rules'],
+            'assemblies': context['assemblies'],
+            'clauses': context['clauses'],
+            'timing': {
+                'total_ms': round((time.perf_counter() - started) * 1000, 3),
+                'fixture_lookups': len(codes),
+                'shared_washroom_hits': hits
+            }
+        }
+
+    @staticmethod
+    def building_checks(floors: List[Dict[str, Any]], totals: Dict[str, int],
+                        required: Dict[str, Any], jurisdiction: str = 'NBC') -> List[Dict[str, Any]]:
+        """Checks that only make sense for the building as a whole, from the floor aggregates"""
+        shortfalls = {field: required[field] - totals.get(field, 0) for field in FIXTURE_FIELDS
+                      if field != 'total_fixtures' and required.get(field, 0) > totals.get(field, 0)}
+        water_closets = totals.get('water_closets_male', 0) + totals.get('water_closets_female', 0)
+        universal_required = universal_washrooms_required(water_closets, jurisdiction)
+        universal_provided = sum(floor['universal_washrooms'] for floor in floors)
+        universal = {
+            'check': 'universal_washrooms',
+            'jurisdiction': jurisdiction,
+            'required': universal_required,
+            'provided': universal_provided,
+            'floors_without': [floor['name'] for floor in floors if not floor['universal_washrooms']]
+        }
+        if universal_required is None:
+            universal.update(reference=None, status='review',
+                             description=f'No universal washroom table for {jurisdiction}: '
+                                         f'{universal_provided} provided, verify against the local code')
+        else:
+            universal.update(reference=UNIVERSAL_WASHROOM_TABLES[jurisdiction]['reference'],
+                             status='compliant' if universal_provided >= universal_required else 'non_compliant',
+                             description=f'{water_closets} water closets in the building require '
+                                         f'{universal_required} universal washroom(s)')
+        return [
+            {
+                'check': 'fixture_totals',
+                'reference': ', '.join(required.get('code_references', [])),
+                'status': 'compliant' if not shortfalls else 'non_compliant',
+                'description': 'Washroom fixtures together meet the whole-building requirement',
+                'shortfalls': shortfalls
+            },
+            universal
+        ]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Content hashes and the code change feed
+Clauses, rules and assemblies carry a content_hash of their content columns. Triggers
+(migration 8) append every insert, hash change and delete to change_log under a monotonically
+increasing revision, so caches and snapshots can invalidate only what changed since the
+revision they were built from. The code pack (code_pack.py) records the revision it was
+compiled at; workers stop serving it once the log moves past that revision, and
+`code_pack.py status` lists the changed codes.
+
+Usage:
+    python backend/change_feed.py changes [--since N] [--entity clause] [--db PATH]
+    python backend/change_feed.py rehash [--db PATH]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from connection_manager import get_connection_manager
+
+# table -> (entity name, key column, content columns covered by the hash)
+TRACKED_TABLES = {
+    'building_code_clause': ('clause', 'clause_code', (
+        'clause_code', 'clause_number', 'jurisdiction', 'code_version', 'document_title', 'clause_title',
+        'clause_text_en', 'clause_text_fr', 'page_number', 'section_reference', 'source_url',
+        'applies_to_building_types', 'applies_to_occupancy_types', 'applies_to_components',
+        'related_clause_ids', 'supersedes_clause_ids', 'exception_clause_ids',
+        'is_mandatory', 'enforcement_level'
+    )),
+    'context_logic_rule': ('rule', 'rule_code', (
+        'rule_code', 'rule_name', 'rule_category', 'trigger_condition', 'priority',
+        'required_component_ids', 'required_assembly_ids', 'required_clause_ids', 'jurisdiction',
+        'effective_date', 'superseded_by', 'rule_explanation', 'code_reference'
+    )),
+    'component_assembly': ('assembly', 'assembly_code', (
+        'assembly_code', 'name', 'description', 'component_ids', 'relationship_rules', 'total_footprint',
+        'circulation_space', 'applicable_building_types', 'occupancy_requirements'
+    ))
+}
+
+ENTITY_TABLES = {entity: table for table, (entity, _, _) in TRACKED_TABLES.items()}
+
+# Logged entities: the hashed tables plus code editions (adoption-date changes, see code_editions.py)
+LOGGED_ENTITIES = sorted(set(ENTITY_TABLES) | {'edition'})
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def content_hash(table: str, row: Mapping[str, Any]) -> str:
+    """sha256 of the content columns as canonical JSON; missing columns hash as null"""
+    columns = TRACKED_TABLES[table][2]
+    values = [row[column] if column in row.keys() else None for column in columns]
+    # SQLite hands booleans back as 0/1
+    values = [int(value) if isinstance(value, bool) else value for value in values]
+    encoded = json.dumps(values, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def change_log_triggers(table: str) -> List[str]:
+    """INSERT / hash-changing UPDATE / DELETE triggers appending to change_log"""
+    entity, key, _ = TRACKED_TABLES[table]
+    jurisdiction = 'jurisdiction' if table != 'component_assembly' else 'NULL'
+    new_jurisdiction = f'new.{jurisdiction}' if jurisdiction != 'NULL' else 'NULL'
+    old_jurisdiction = f'old.{jurisdiction}' if jurisdiction != 'NULL' else 'NULL'
+    insert = 'INSERT INTO change_log (entity, entity_code, operation, jurisdiction, content_hash)'
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_log_insert AFTER INSERT ON {table} BEGIN
+            {insert} VALUES ('{entity}', new.{key}, 'insert', {new_jurisdiction}, new.content_hash);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE OF content_hash ON {table}
+        WHEN old.content_hash IS NOT new.content_hash BEGIN
+            {insert} VALUES ('{entity}', new.{key}, 'update', {new_jurisdiction}, new.content_hash);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table} BEGIN
+            {insert} VALUES ('{entity}', old.{key}, 'delete', {old_jurisdiction}, NULL);
+        END'''
+    ]
+
+
+def hash_rows(cursor: sqlite3.Cursor, table: str) -> int:
+    """Recompute content_hash for every row; rows whose hash changes are logged by the triggers"""
+    cursor.row_factory = sqlite3.Row
+    updates = []
+    for row in cursor.execute(f'SELECT * FROM {table}').fetchall():
+        digest = content_hash(table, row)
+        if digest != row['content_hash']:
+            updates.append((digest, row['id']))
+    cursor.executemany(f'UPDATE {table} SET content_hash = ? WHERE id = ?', updates)
+    return len(updates)
+
+
+def current_revision(connection: sqlite3.Connection) -> int:
+    return connection.execute('SELECT COALESCE(MAX(revision), 0) FROM change_log').fetchone()[0]
+
+
+def changes_since(db_path: str, revision: int = 0, entities: Optional[Iterable[str]] = None,
+                  limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Changes after `revision`, oldest first. Resume from the returned `revision`
+    (the last one in this page, or the input when nothing changed).
+    """
+    limit = max(1, min(int(limit), 10000))
+    query = 'SELECT * FROM change_log WHERE revision > ? AND revision <= ?'
+    params: List[Any] = [int(revision)]
+    entities = [entity for entity in (entities or []) if entity]
+    if entities:
+        unknown = set(entities) - set(LOGGED_ENTITIES)
+        if unknown:
+            raise ValueError(f'Unknown entity: {", ".join(sorted(unknown))}')
+        query += f' AND entity IN ({",".join("?" * len(entities))})'
+        params.extend(entities)
+    query += ' ORDER BY revision LIMIT ?'
+
+    with get_connection_manager(db_path).reader() as connection:
+        # Bound the scan by the revision read first: a change committed in between is left
+        # for the next call instead of being skipped
+        latest = current_revision(connection)
+        params.insert(1, latest)
+        rows = connection.execute(query, params + [limit + 1]).fetchall()
+
+    changes = [dict(row) for row in rows[:limit]]
+    has_more = len(rows) > limit
+    return {
+        'since': int(revision),
+        'revision': changes[-1]['revision'] if has_more else max(int(revision), latest),
+        'latest_revision': latest,
+        'changes': changes,
+        'has_more': has_more
+    }
+
+
+class ChangeFeed:
+    """
+    Cursor over change_log for one consumer (cache, snapshot, index).
+    poll() returns what changed since the last poll and advances the cursor.
+    """
+
+    def __init__(self, db_path: str, since: Optional[int] = None, entities: Optional[Iterable[str]] = None):
+        self.db_path = db_path
+        self.entities = list(entities or [])
+        if since is None:
+            with get_connection_manager(db_path).reader() as connection:
+                since = current_revision(connection)
+        self.revision = since
+
+    def poll(self, limit: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
+        changes: List[Dict[str, Any]] = []
+        while True:
+            page = changes_since(self.db_path, self.revision, self.entities, limit)
+            changes.extend(page['changes'])
+            self.revision = page['revision']
+            if not page['has_more']:
+                return changes
+
+    def changed_keys(self, changes: List[Dict[str, Any]]) -> Dict[str, set]:
+        """{'clause': {'NBC_3.7.2.1', ...}, 'rule': {...}} for selective invalidation"""
+        keys: Dict[str, set] = {}
+        for change in changes:
+            keys.setdefault(change['entity'], set()).add(change['entity_code'])
+        return keys
+
+
+def rehash(db_path: str) -> Dict[str, Any]:
+    """Re-sync hashes after out-of-band SQL edits; changed rows enter the change log"""
+    updated = {}
+    with get_connection_manager(db_path).writer() as connection:
+        cursor = connection.cursor()
+        for table in TRACKED_TABLES:
+            updated[table] = hash_rows(cursor, table)
+        revision = current_revision(connection)
+    return {'updated': updated, 'revision': revision}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Building code change feed')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    changes_parser = subcommands.add_parser('changes', help='List changes after a revision')
+    changes_parser.add_argument('--since', type=int, default=0)
+    changes_parser.add_argument('--entity', action='append', choices=LOGGED_ENTITIES)
+    changes_parser.add_argument('--limit', type=int, default=DEFAULT_PAGE_SIZE)
+    subcommands.add_parser('rehash', help='Recompute content hashes (logs rows edited outside the importer)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'changes':
+        result = changes_since(args.db, args.since, args.entity, args.limit)
+    else:
+        result = rehash(args.db)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
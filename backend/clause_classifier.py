@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Clause classification
+Assigns each clause a checklist category and a verification method from the keyword table in
+database/clause_keywords.json. Results are stored on building_code_clause when clauses are
+imported (migration 6 backfills existing rows), so checklists never rescan clause text.
+
+Usage:
+    python backend/clause_classifier.py reclassify [--db PATH] [--all]
+    python backend/clause_classifier.py status [--db PATH]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from connection_manager import get_connection_manager
+
+DEFAULT_KEYWORDS_PATH = os.path.join(ROOT_DIR, 'database', 'clause_keywords.json')
+KEYWORDS_PATH = os.environ.get('CLAUSE_KEYWORDS_PATH', DEFAULT_KEYWORDS_PATH)
+
+BATCH_SIZE = 1000
+
+
+class KeywordMatcher:
+    """
+    Ordered keyword rules compiled into one alternation regex.
+    A single pass collects every keyword present; the earliest rule with a hit wins,
+    which is the same answer as testing the rules one by one with substring checks.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default: str):
+        self.default = default
+        self.values = [rule['value'] for rule in rules]
+        self.rank: Dict[str, int] = {}
+        for index, rule in enumerate(rules):
+            for keyword in rule['keywords']:
+                self.rank.setdefault(keyword.lower(), index)
+        # Zero-width lookaheads report overlapping hits; at each position the longest keyword
+        # is reported, so it also carries the best rank of any keyword that is its prefix
+        self.keywords = sorted(self.rank, key=len, reverse=True)
+        self.group_rank = [min(rank for keyword, rank in self.rank.items() if longer.startswith(keyword))
+                           for longer in self.keywords]
+        self.pattern = re.compile('|'.join(f'(?=({re.escape(k)}))' for k in self.keywords)) \
+            if self.keywords else None
+
+    def match(self, text: Optional[str]) -> str:
+        if not text or self.pattern is None:
+            return self.default
+        best = None
+        for found in self.pattern.finditer(text.lower()):
+            index = self.group_rank[found.lastindex - 1]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return self.values[best] if best is not None else self.default
+
+
+class ClauseClassifier:
+    """Category and verification method for a clause row"""
+
+    def __init__(self, table: Dict[str, Any]):
+        self.table = table
+        self.category_field = table['category']['field']
+        self.verification_field = table['verification_method']['field']
+        self.categories = KeywordMatcher(table['category']['rules'], table['category']['default'])
+        self.verification = KeywordMatcher(table['verification_method']['rules'],
+                                           table['verification_method']['default'])
+        # Stored next to each classification so rule changes can be detected
+        self.version = hashlib.sha256(json.dumps(table, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'ClauseClassifier':
+        with open(path or KEYWORDS_PATH, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def category(self, clause: Dict[str, Any]) -> str:
+        return self.categories.match(clause.get(self.category_field))
+
+    def verification_method(self, clause: Dict[str, Any]) -> str:
+        return self.verification.match(clause.get(self.verification_field))
+
+    def classify(self, clause: Dict[str, Any]) -> Tuple[str, str]:
+        return self.category(clause), self.verification_method(clause)
+
+
+_default_classifier: Optional[ClauseClassifier] = None
+
+
+def get_classifier() -> ClauseClassifier:
+    """Process-wide classifier for the configured keyword table"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ClauseClassifier.load()
+    return _default_classifier
+
+
+def classify_rows(cursor: sqlite3.Cursor, classifier: Optional[ClauseClassifier] = None,
+                  only_stale: bool = True) -> int:
+    """
+    Store category / verification method for clauses in the current transaction.
+    only_stale skips rows already classified with this keyword table.
+    """
+    classifier = classifier or get_classifier()
+    query = f'SELECT id, {classifier.category_field}, {classifier.verification_field} FROM building_code_clause'
+    params: Tuple[Any, ...] = ()
+    if only_stale:
+        query += ' WHERE classification_version IS NOT ? OR clause_category IS NULL'
+        params = (classifier.version,)
+    rows = cursor.execute(query, params).fetchall()
+
+    updates = []
+    for row_id, category_text, verification_text in rows:
+        updates.append((classifier.categories.match(category_text),
+                        classifier.verification.match(verification_text),
+                        classifier.version, row_id))
+    for start in range(0, len(updates), BATCH_SIZE):
+        cursor.executemany('''
+            UPDATE building_code_clause
+            SET clause_category = ?, verification_method = ?, classification_version = ?
+            WHERE id = ?
+        ''', updates[start:start + BATCH_SIZE])
+    return len(updates)
+
+
+def reclassify(db_path: str, reclassify_all: bool = False,
+               classifier: Optional[ClauseClassifier] = None) -> Dict[str, Any]:
+    """Bulk reclassification after the keyword table changes"""
+    classifier = classifier or get_classifier()
+    started = time.perf_counter()
+    with get_connection_manager(db_path).writer() as connection:
+        updated = classify_rows(connection.cursor(), classifier, only_stale=not reclassify_all)
+    return {'updated': updated, 'classifier_version': classifier.version,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+
+def status(db_path: str, classifier: Optional[ClauseClassifier] = None) -> Dict[str, Any]:
+    classifier = classifier or get_classifier()
+    with get_connection_manager(db_path).reader() as connection:
+        categories = {row[0]: row[1] for row in connection.execute(
+            'SELECT clause_category, COUNT(*) FROM building_code_clause GROUP BY clause_category')}
+        stale = connection.execute(
+            'SELECT COUNT(*) FROM building_code_clause WHERE classification_version IS NOT ?',
+            (classifier.version,)).fetchone()[0]
+    return {'classifier_version': classifier.version, 'categories': categories, 'stale': stale}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Building code clause classification')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    reclassify_parser = subcommands.add_parser('reclassify', help='Store classifications for stale clauses')
+    reclassify_parser.add_argument('--all', action='store_true', help='reclassify every clause')
+    subcommands.add_parser('status', help='Category counts and stale classifications')
+    args = parser.parse_args(argv)
+
+    if args.command == 'reclassify':
+        result = reclassify(args.db, reclassify_all=args.all)
+    else:
+        result = status(args.db)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
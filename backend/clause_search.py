@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Full-text clause search
+bm25-ranked FTS5 queries over clause titles and English/French text, with highlighted
+snippets and keyset pagination. The index is maintained by triggers (migration 5).
+
+Usage:
+    python backend/clause_search.py search "grab bars" [--jurisdiction NBC] [--db PATH]
+    python backend/clause_search.py rebuild [--db PATH]
+"""
+
+import argparse
+import base64
+import binascii
+import html
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from connection_manager import get_connection_manager
+
+FTS_TABLE = 'building_code_clause_fts'
+
+# bm25 column weights: clause_title, clause_text_en, clause_text_fr
+COLUMN_WEIGHTS = (10.0, 1.0, 1.0)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SNIPPET_TOKENS = 24
+
+# Control characters mark matches until the text has been HTML-escaped
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(text: str) -> str:
+    """
+    Turn user input into a safe FTS5 expression: every word must match (implicit AND),
+    "quoted phrases" match in order and a trailing * makes a word a prefix search.
+    FTS5 operators and column filters in the input are treated as plain text.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(text or ''):
+        if phrase:
+            tokens = _WORD.findall(phrase)
+            if tokens:
+                terms.append('"' + ' '.join(tokens) + '"')
+            continue
+        tokens = _WORD.findall(word)
+        if not tokens:
+            continue
+        prefix = word.endswith('*')
+        for i, token in enumerate(tokens):
+            last = i == len(tokens) - 1
+            terms.append(f'"{token}"' + ('*' if prefix and last else ''))
+    if not terms:
+        raise ValueError('Search query must contain at least one word')
+    return ' '.join(terms)
+
+
+def encode_cursor(score: float, row_id: int) -> str:
+    payload = json.dumps([score, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(score), int(row_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid search cursor')
+
+
+def _marked(text: Optional[str]) -> Optional[str]:
+    """HTML-escape FTS output, then turn the match markers into <mark> tags"""
+    if text is None:
+        return None
+    return html.escape(text).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+class ClauseSearch:
+    """Clause search over one building codes database (pooled read-only connections)"""
+
+    def __init__(self, db_path: str = "database/building_codes.db"):
+        self.db_path = db_path
+        self.db = get_connection_manager(db_path)
+
+    def search(self, query: str, jurisdiction: Optional[str] = None, code_version: Optional[str] = None,
+               limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of results, best match first. Pass the returned next_cursor to continue;
+        pages stay stable while the index is unchanged. Raises ValueError for bad input.
+        """
+        started = time.perf_counter()
+        match = build_match_query(query)
+        limit = max(1, min(int(limit), MAX_LIMIT))
+
+        filters, params = [], [match]
+        if jurisdiction:
+            filters.append('c.jurisdiction = ?')
+            params.append(jurisdiction)
+        if code_version:
+            filters.append('c.code_version = ?')
+            params.append(code_version)
+        if cursor:
+            after_score, after_id = decode_cursor(cursor)
+            filters.append('(score > ? OR (score = ? AND c.id > ?))')
+            params.extend([after_score, after_score, after_id])
+
+        where = ''.join(f' AND {condition}' for condition in filters)
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+
+        with self.db.reader() as connection:
+            try:
+                # Rank first; snippets are only built for the rows on this page
+                rows = connection.execute(f'''
+                    SELECT c.id, c.clause_code, c.clause_number, c.jurisdiction, c.code_version,
+                           c.clause_title, c.page_number, c.enforcement_level,
+                           bm25({FTS_TABLE}, {weights}) AS score
+                    FROM {FTS_TABLE} JOIN building_code_clause c ON c.id = {FTS_TABLE}.rowid
+                    WHERE {FTS_TABLE} MATCH ?{where}
+                    ORDER BY score, c.id
+                    LIMIT ?
+                ''', params + [limit + 1]).fetchall()
+
+                page = rows[:limit]
+                snippets = {}
+                if page:
+                    placeholders = ','.join('?' * len(page))
+                    for row in connection.execute(f'''
+                        SELECT rowid,
+                               highlight({FTS_TABLE}, 0, ?, ?),
+                               snippet({FTS_TABLE}, 1, ?, ?, '…', ?),
+                               snippet({FTS_TABLE}, 2, ?, ?, '…', ?)
+                        FROM {FTS_TABLE}
+                        WHERE {FTS_TABLE} MATCH ? AND rowid IN ({placeholders})
+                    ''', [_OPEN, _CLOSE] + [_OPEN, _CLOSE, SNIPPET_TOKENS] * 2 + [match] + [row['id'] for row in page]):
+                        # English text unless only the French text matched
+                        english, french = row[2], row[3]
+                        snippet = french if french and _OPEN in french and _OPEN not in (english or '') else english
+                        snippets[row[0]] = (row[1], snippet)
+            except sqlite3.OperationalError as e:
+                raise ValueError(f'Invalid search query: {e}')
+
+        results: List[Dict[str, Any]] = []
+        for row in page:
+            title, snippet = snippets.get(row['id'], (row['clause_title'], None))
+            results.append({
+                'clause_code': row['clause_code'],
+                'clause_number': row['clause_number'],
+                'jurisdiction': row['jurisdiction'],
+                'code_version': row['code_version'],
+                'clause_title': row['clause_title'],
+                'title_highlighted': _marked(title),
+                'snippet': _marked(snippet),
+                'page_number': row['page_number'],
+                'enforcement_level': row['enforcement_level'],
+                'score': round(-row['score'], 6)  # bm25() is lower-is-better
+            })
+
+        has_more = len(rows) > limit
+        return {
+            'query': query,
+            'match': match,
+            'results': results,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(page[-1]['score'], page[-1]['id']) if has_more else None,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Rebuild and optimize the index, e.g. after bulk INSERT OR REPLACE loads"""
+        started = time.perf_counter()
+        with self.db.writer() as connection:
+            connection.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+            connection.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            indexed = connection.execute('SELECT COUNT(*) FROM building_code_clause').fetchone()[0]
+        return {'indexed_clauses': indexed, 'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Building code clause full-text search')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    search_parser = subcommands.add_parser('search', help='Run a search and print the first page')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--jurisdiction')
+    search_parser.add_argument('--version')
+    search_parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+
+    subcommands.add_parser('rebuild', help='Rebuild the full-text index from the clause table')
+    args = parser.parse_args(argv)
+
+    searcher = ClauseSearch(args.db)
+    if args.command == 'search':
+        result = searcher.search(args.query, args.jurisdiction, args.version, args.limit)
+    else:
+        result = searcher.rebuild()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
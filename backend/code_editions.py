@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Code editions and as-of-date resolution
+Rules and clauses carry a precomputed validity interval [valid_from, valid_to) so "what was in
+force on date D" is an indexed range lookup:
+  - rules: from effective_date until the effective_date of the rule in superseded_by
+  - clauses: the interval of their edition (code_edition: jurisdiction + code_version), cut short
+    by a later clause that lists them in supersedes_clause_ids
+Unknown starts are stored as OPEN_START and open ends as OPEN_END, so both bounds stay indexable.
+Intervals are derived data: refresh_validity() re-derives them after imports and edition edits.
+
+Usage:
+    python backend/code_editions.py list    [--db PATH]
+    python backend/code_editions.py set     NBC 2020 2022-03-28 [--db PATH]
+    python backend/code_editions.py refresh [--db PATH]
+    python backend/code_editions.py rules   NBC --as-of 2019-06-01 [--db PATH]
+"""
+
+import argparse
+import bisect
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from change_feed import current_revision
+from connection_manager import get_connection_manager
+
+OPEN_START = '0000-01-01'
+OPEN_END = '9999-12-31'
+
+DEFAULT_MAX_SNAPSHOTS = 32
+
+_YEAR_EDITION = re.compile(r'^(\d{4})$')
+
+
+def normalize_as_of(value: Any) -> Optional[str]:
+    """date / 'YYYY-MM-DD' / None -> ISO date string; ValueError on anything else"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    try:
+        return date.fromisoformat(str(value).strip()[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f'Invalid as-of date {value!r}; expected YYYY-MM-DD')
+
+
+def default_edition_date(code_version: str) -> Optional[str]:
+    """'2020' -> '2020-01-01' until a real adoption date is set; 'current' etc. -> None"""
+    match = _YEAR_EDITION.match(code_version or '')
+    return f'{match.group(1)}-01-01' if match else None
+
+
+def register_editions(cursor: sqlite3.Cursor) -> int:
+    """Add code_edition rows for editions clauses mention but the table does not know yet"""
+    pairs = cursor.execute('''
+        SELECT DISTINCT c.jurisdiction, c.code_version FROM building_code_clause c
+        WHERE NOT EXISTS (SELECT 1 FROM code_edition e
+                          WHERE e.jurisdiction = c.jurisdiction AND e.code_version = c.code_version)
+    ''').fetchall()
+    cursor.executemany('INSERT INTO code_edition (jurisdiction, code_version, effective_date) VALUES (?, ?, ?)',
+                       [(jurisdiction, version, default_edition_date(version)) for jurisdiction, version in pairs])
+    return len(pairs)
+
+
+def refresh_validity(cursor: sqlite3.Cursor) -> Dict[str, int]:
+    """Re-derive valid_from / valid_to for every rule and clause; only rows whose interval moved are written"""
+    registered = register_editions(cursor)
+
+    # Rules: superseded with no dated successor -> empty interval (never in force)
+    cursor.execute(f'''
+        UPDATE context_logic_rule SET valid_from = v.valid_from, valid_to = v.valid_to
+        FROM (
+            SELECT r.id, COALESCE(r.effective_date, '{OPEN_START}') AS valid_from,
+                   CASE WHEN r.superseded_by IS NULL THEN '{OPEN_END}'
+                        ELSE COALESCE(successor.effective_date, r.effective_date, '{OPEN_START}') END AS valid_to
+            FROM context_logic_rule r
+            LEFT JOIN context_logic_rule successor ON successor.id = r.superseded_by
+        ) v
+        WHERE v.id = context_logic_rule.id
+        AND (context_logic_rule.valid_from IS NOT v.valid_from OR context_logic_rule.valid_to IS NOT v.valid_to)
+    ''')
+    rules = cursor.rowcount
+
+    # Clauses: an edition runs until the next dated edition of the same jurisdiction...
+    cursor.execute('DROP TABLE IF EXISTS temp._clause_validity')
+    cursor.execute('DROP TABLE IF EXISTS temp._clause_superseded')
+    cursor.execute(f'''
+        CREATE TEMP TABLE _clause_validity AS
+        SELECT c.id, c.clause_code, c.supersedes_clause_ids,
+               COALESCE(e.effective_date, '{OPEN_START}') AS valid_from,
+               CASE WHEN e.effective_date IS NULL THEN '{OPEN_END}' ELSE COALESCE((
+                   SELECT MIN(later.effective_date) FROM code_edition later
+                   WHERE later.jurisdiction = e.jurisdiction AND later.effective_date > e.effective_date
+               ), '{OPEN_END}') END AS valid_to
+        FROM building_code_clause c
+        LEFT JOIN code_edition e ON e.jurisdiction = c.jurisdiction AND e.code_version = c.code_version
+    ''')
+    # ...or until a later clause that lists it in supersedes_clause_ids takes effect
+    cursor.execute('''
+        CREATE TEMP TABLE _clause_superseded AS
+        SELECT superseded.value AS clause_code, newer.valid_from
+        FROM _clause_validity newer,
+             json_each(CASE WHEN json_valid(newer.supersedes_clause_ids)
+                            THEN newer.supersedes_clause_ids ELSE '[]' END) superseded
+    ''')
+    cursor.execute('CREATE INDEX temp._clause_superseded_code ON _clause_superseded(clause_code, valid_from)')
+    cursor.execute('''
+        UPDATE _clause_validity SET valid_to = MIN(valid_to, (
+            SELECT MIN(s.valid_from) FROM _clause_superseded s
+            WHERE s.clause_code = _clause_validity.clause_code AND s.valid_from > _clause_validity.valid_from
+        ))
+        WHERE EXISTS (SELECT 1 FROM _clause_superseded s
+                      WHERE s.clause_code = _clause_validity.clause_code AND s.valid_from > _clause_validity.valid_from)
+    ''')
+    cursor.execute('''
+        UPDATE building_code_clause SET valid_from = v.valid_from, valid_to = v.valid_to
+        FROM _clause_validity v
+        WHERE v.id = building_code_clause.id
+        AND (building_code_clause.valid_from IS NOT v.valid_from OR building_code_clause.valid_to IS NOT v.valid_to)
+    ''')
+    clauses = cursor.rowcount
+    cursor.execute('DROP TABLE temp._clause_validity')
+    cursor.execute('DROP TABLE temp._clause_superseded')
+    return {'editions_registered': registered, 'rules': rules, 'clauses': clauses}
+
+
+def edition_log_triggers() -> List[str]:
+    """Adoption-date edits move intervals without touching any row hash; log them for cache consumers"""
+    insert = 'INSERT INTO change_log (entity, entity_code, operation, jurisdiction)'
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS code_edition_log_insert AFTER INSERT ON code_edition BEGIN
+            {insert} VALUES ('edition', new.jurisdiction || ':' || new.code_version, 'insert', new.jurisdiction);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS code_edition_log_update AFTER UPDATE OF effective_date ON code_edition
+        WHEN old.effective_date IS NOT new.effective_date BEGIN
+            {insert} VALUES ('edition', new.jurisdiction || ':' || new.code_version, 'update', new.jurisdiction);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS code_edition_log_delete AFTER DELETE ON code_edition BEGIN
+            {insert} VALUES ('edition', old.jurisdiction || ':' || old.code_version, 'delete', old.jurisdiction);
+        END'''
+    ]
+
+
+def list_editions(db_path: str) -> List[Dict[str, Any]]:
+    with get_connection_manager(db_path).reader() as connection:
+        rows = connection.execute('''
+            SELECT e.*, (SELECT COUNT(*) FROM building_code_clause c
+                         WHERE c.jurisdiction = e.jurisdiction AND c.code_version = e.code_version) AS clauses
+            FROM code_edition e ORDER BY e.jurisdiction, e.effective_date
+        ''').fetchall()
+    return [dict(row) for row in rows]
+
+
+def set_edition(db_path: str, jurisdiction: str, code_version: str, effective_date: Optional[str]) -> Dict[str, Any]:
+    """Record an edition's adoption date and re-derive the intervals it bounds"""
+    effective_date = normalize_as_of(effective_date)
+    with get_connection_manager(db_path).writer() as connection:
+        connection.execute('''
+            INSERT INTO code_edition (jurisdiction, code_version, effective_date) VALUES (?, ?, ?)
+            ON CONFLICT(jurisdiction, code_version) DO UPDATE SET effective_date = excluded.effective_date
+        ''', (jurisdiction, code_version, effective_date))
+        result = refresh_validity(connection.cursor())
+    return dict(result, jurisdiction=jurisdiction, code_version=code_version, effective_date=effective_date)
+
+
+def refresh(db_path: str) -> Dict[str, int]:
+    with get_connection_manager(db_path).writer() as connection:
+        return refresh_validity(connection.cursor())
+
+
+class RuleSnapshots:
+    """
+    Rules in force per (jurisdiction, edition epoch), highest priority first.
+    An epoch is the span between two consecutive validity boundaries, so every date inside it
+    resolves to the same rule set and shares one snapshot. Snapshots are LRU-bounded and dropped
+    wholesale when the change-log revision moves.
+    """
+
+    def __init__(self, max_snapshots: int = DEFAULT_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._revision = None
+        self._boundaries: Dict[str, List[str]] = {}
+        self._snapshots: 'OrderedDict[Tuple[str, str], List[Dict[str, Any]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self, connection: sqlite3.Connection):
+        revision = current_revision(connection)
+        if revision != self._revision:
+            self._revision = revision
+            self._boundaries.clear()
+            self._snapshots.clear()
+
+    def _epoch(self, connection: sqlite3.Connection, jurisdiction: str, as_of: str) -> str:
+        boundaries = self._boundaries.get(jurisdiction)
+        if boundaries is None:
+            rows = connection.execute('''
+                SELECT valid_from FROM context_logic_rule WHERE jurisdiction IN (?, 'ALL')
+                UNION SELECT valid_to FROM context_logic_rule WHERE jurisdiction IN (?, 'ALL')
+            ''', (jurisdiction, jurisdiction)).fetchall()
+            boundaries = sorted({OPEN_START} | {row[0] for row in rows})
+            self._boundaries[jurisdiction] = boundaries
+        return boundaries[max(0, bisect.bisect_right(boundaries, as_of) - 1)]
+
+    def rules(self, connection: sqlite3.Connection, jurisdiction: str,
+              as_of: Optional[str] = None) -> List[Dict[str, Any]]:
+        as_of = as_of or date.today().isoformat()
+        with self._lock:
+            self._sync(connection)
+            key = (jurisdiction, self._epoch(connection, jurisdiction, as_of))
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                self.hits += 1
+                return snapshot
+
+        # Any date in the epoch gives the same answer; query with the epoch start
+        rows = connection.execute('''
+            SELECT * FROM context_logic_rule
+            WHERE jurisdiction IN (?, 'ALL') AND valid_from <= ? AND valid_to > ?
+            ORDER BY priority DESC, id
+        ''', (jurisdiction, key[1], key[1])).fetchall()
+        snapshot = [dict(row) for row in rows]
+
+        with self._lock:
+            self.misses += 1
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'snapshots': len(self._snapshots), 'hits': self.hits, 'misses': self.misses,
+                    'revision': self._revision}
+
+
+def in_force(record: Any, as_of: str) -> bool:
+    """Validity check for rows that did not come from an as-of query (code pack records)"""
+    if 'valid_from' not in record.keys():
+        return True
+    return (record['valid_from'] or OPEN_START) <= as_of < (record['valid_to'] or OPEN_END)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Code editions and as-of-date resolution')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    subcommands.add_parser('list', help='Known editions and their adoption dates')
+    set_parser = subcommands.add_parser('set', help="Set an edition's adoption date")
+    set_parser.add_argument('jurisdiction')
+    set_parser.add_argument('code_version')
+    set_parser.add_argument('effective_date', nargs='?', help='YYYY-MM-DD; omit to clear')
+    subcommands.add_parser('refresh', help='Re-derive validity intervals (after direct SQL edits)')
+    rules_parser = subcommands.add_parser('rules', help='Rules in force on a date')
+    rules_parser.add_argument('jurisdiction')
+    rules_parser.add_argument('--as-of', default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        result = list_editions(args.db)
+    elif args.command == 'set':
+        result = set_edition(args.db, args.jurisdiction, args.code_version, args.effective_date)
+    elif args.command == 'refresh':
+        result = refresh(args.db)
+    else:
+        with get_connection_manager(args.db).reader() as connection:
+            rules = RuleSnapshots().rules(connection, args.jurisdiction, normalize_as_of(args.as_of))
+        result = [{key: rule[key] for key in ('rule_code', 'jurisdiction', 'valid_from', 'valid_to')}
+                  for rule in rules]
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Bulk clause importer
+Streams code sources (CSV, JSON documents, JSON Lines) row by row, validates each row and
+upserts clauses, rules and assemblies in executemany batches inside large transactions.
+Each batch is merged with the stored rows and compared by content hash, so unchanged rows are
+never rewritten and only real changes reach change_log, the FTS index and the classifications.
+
+Usage:
+    python backend/code_importer.py "building code related to public washroom.csv"
+    python backend/code_importer.py EXACT_TEXT_SAMPLE_DATA.json SAMPLE_CODE_IMPORT_DATA.json
+    python backend/code_importer.py ontario_2024.jsonl --jurisdiction Ontario --version 2024 --strict
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from assembly_closure import rebuild_closure
+from change_feed import TRACKED_TABLES, content_hash, current_revision
+from clause_classifier import ClauseClassifier, get_classifier
+from code_editions import refresh_validity
+from connection_manager import get_connection_manager
+from migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_COMMIT_EVERY = 100000
+MAX_REPORTED_ERRORS = 100
+
+# Columns written per table besides the hashed content columns
+EXTRA_COLUMNS = {
+    'building_code_clause': ('last_updated', 'verified_by', 'clause_category', 'verification_method',
+                             'classification_version'),
+    'context_logic_rule': (),
+    'component_assembly': ()
+}
+
+# Schema defaults for columns a source may leave out of a new row
+NEW_ROW_DEFAULTS = {
+    'building_code_clause': {'is_mandatory': 1},
+    'context_logic_rule': {'priority': 50},
+    'component_assembly': {}
+}
+
+
+def write_columns(table: str) -> Tuple[str, ...]:
+    return TRACKED_TABLES[table][2] + EXTRA_COLUMNS[table] + ('content_hash',)
+
+
+def upsert_sql(table: str) -> str:
+    key = TRACKED_TABLES[table][1]
+    columns = write_columns(table)
+    return f'''
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT({key}) DO UPDATE SET
+        {', '.join(f'{column} = excluded.{column}' for column in columns if column != key)}
+    '''
+
+
+JURISDICTION_ALIASES = {
+    'NBC': 'NBC', 'AB': 'Alberta', 'ALBERTA': 'Alberta', 'ON': 'Ontario', 'ONTARIO': 'Ontario',
+    'BC': 'BC', 'BRITISH COLUMBIA': 'BC', 'IBC': 'IBC'
+}
+
+ENFORCEMENT_LEVELS = ('critical', 'important', 'recommended')
+
+# Chinese-header CSV (規範來源 / 主要要求 / 原文摘錄): source -> (jurisdiction, document, enforcement)
+CSV_HEADER_ALIASES = {'規範來源': 'source', '主要要求': 'clause_title', '原文摘錄': 'clause_text_en'}
+CSV_SOURCES = {
+    '安大略省建築規範': ('Ontario', 'Ontario Building Code', 'important'),
+    '多倫多市規範': ('Ontario', 'Toronto Municipal Code', 'important'),
+    '不列顛哥倫比亞省建築規範': ('BC', 'British Columbia Building Code', 'important'),
+    '溫哥華市設計指南': ('BC', 'City of Vancouver Public Washroom Design Guidelines', 'recommended'),
+    '艾伯塔省建築規範': ('Alberta', 'Alberta Building Code', 'important'),
+    '艾伯塔省通用衛生間設計指南': ('Alberta', 'Alberta Universal Washroom Design Guide', 'recommended'),
+    '卡爾加里大學設計標準': ('Alberta', 'University of Calgary Design Standards', 'recommended'),
+}
+
+# "...text.[1] [https://example.org/page]" -> citation stripped, URL kept
+_CITATION = re.compile(r'\s*(?:\[\d+\]\s*)?\[(https?://[^\]\s]+)\]\s*$')
+_SENTENCE_NUMBER = re.compile(r'^\s*(\(\d+[a-z]?\))')
+_PAGE_NUMBER = re.compile(r'^\d+(-\d+)?$')
+_CODE_UNSAFE = re.compile(r'[^A-Za-z0-9.\-]+')
+
+
+class RowValidationError(ValueError):
+    """A source row that cannot be imported; carries where it came from"""
+
+    def __init__(self, location: str, message: str):
+        super().__init__(f'{location}: {message}')
+        self.location = location
+        self.message = message
+
+
+# =====================================================
+# Normalization
+# =====================================================
+
+def normalize_jurisdiction(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    value = str(value).strip()
+    return JURISDICTION_ALIASES.get(value.upper(), value)
+
+
+def clause_code_for(jurisdiction: str, identifier: str) -> str:
+    """'NBC' + 'Table 3.7.2.1' -> 'NBC_Table_3.7.2.1' (same shape as the hand-written codes)"""
+    return f'{jurisdiction}_{_CODE_UNSAFE.sub("_", identifier.strip()).strip("_")}'
+
+
+def split_citation(text: str) -> Tuple[str, Optional[str]]:
+    if not text.rstrip().endswith(']'):
+        return text.strip(), None
+    match = _CITATION.search(text, max(0, len(text) - 512))
+    if not match:
+        return text.strip(), None
+    return text[:match.start()].strip(), match.group(1)
+
+
+def normalize_record(location: str, record: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """One clause in section or column shape -> building_code_clause values (None = keep stored)"""
+    jurisdiction = normalize_jurisdiction(record.get('jurisdiction') or defaults.get('jurisdiction'))
+    version = str(record.get('code_version') or record.get('version') or defaults.get('version') or '').strip()
+    identifier = str(record.get('identifier') or record.get('clause_number') or '').strip()
+    text_en = record.get('clause_text_en') or record.get('exact_text_en') or record.get('content')
+    text_fr = record.get('clause_text_fr') or record.get('exact_text_fr')
+
+    if not jurisdiction:
+        raise RowValidationError(location, 'missing jurisdiction')
+    if not version:
+        raise RowValidationError(location, 'missing code version')
+    if not isinstance(text_en, str) or not text_en.strip():
+        raise RowValidationError(location, 'missing clause text')
+
+    text_en, url = split_citation(text_en)
+    clause_code = str(record.get('clause_code') or '').strip()
+    if not clause_code:
+        if not identifier:
+            raise RowValidationError(location, 'missing clause identifier')
+        clause_code = clause_code_for(jurisdiction, identifier)
+
+    building_types = record.get('building_types', record.get('applies_to_building_types'))
+    if isinstance(building_types, str):
+        try:
+            building_types = json.loads(building_types)
+        except json.JSONDecodeError:
+            building_types = [part.strip() for part in building_types.split(',') if part.strip()]
+    if building_types is not None and (not isinstance(building_types, list)
+                                       or not all(isinstance(t, str) for t in building_types)):
+        raise RowValidationError(location, 'building_types must be a list of strings')
+
+    page_number = record.get('page_number')
+    if page_number in ('', None):
+        page_number = None
+    elif isinstance(page_number, int) or _PAGE_NUMBER.match(str(page_number)):
+        # Chapter-page numbering ('29-3') is kept as written
+        page_number = int(page_number) if str(page_number).isdigit() else str(page_number)
+    else:
+        raise RowValidationError(location, f'invalid page_number {page_number!r}')
+
+    enforcement = record.get('enforcement_level') or defaults.get('enforcement_level')
+    if enforcement is not None and enforcement not in ENFORCEMENT_LEVELS:
+        raise RowValidationError(location, f'unknown enforcement_level {enforcement!r}')
+
+    legal_status = record.get('legal_status')
+    is_mandatory = record.get('is_mandatory', defaults.get('is_mandatory'))
+    if legal_status is not None:
+        is_mandatory = legal_status == 'active'
+    elif isinstance(is_mandatory, str):
+        is_mandatory = is_mandatory.strip().lower() in ('1', 'true', 'yes') if is_mandatory.strip() else None
+
+    clause = {
+        'clause_code': clause_code,
+        'clause_number': identifier or record.get('clause_number') or '-',
+        'jurisdiction': jurisdiction,
+        'code_version': version,
+        'document_title': record.get('source_document') or record.get('document_title') or defaults.get('document_title'),
+        'clause_title': (record.get('clause_title') or record.get('title') or '').strip() or None,
+        'clause_text_en': text_en,
+        'clause_text_fr': text_fr,
+        'page_number': page_number,
+        'section_reference': record.get('section_reference') or record.get('amendment_to'),
+        'source_url': record.get('official_url') or record.get('source_url') or url,
+        'applies_to_building_types': json.dumps(building_types) if building_types is not None else None,
+        'is_mandatory': None if is_mandatory is None else bool(is_mandatory),
+        'enforcement_level': enforcement,
+        'last_updated': record.get('last_updated') or defaults.get('last_updated'),
+        'verified_by': record.get('verified_by') or defaults.get('verified_by')
+    }
+    return clause
+
+
+def _json_list(location: str, record: Dict[str, Any], name: str, required: bool = False) -> Optional[str]:
+    value = record.get(name)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            raise RowValidationError(location, f'{name} is not valid JSON')
+    if value is None:
+        if required:
+            raise RowValidationError(location, f'missing {name}')
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise RowValidationError(location, f'{name} must be a list of strings')
+    return json.dumps(value)
+
+
+def _json_object(location: str, record: Dict[str, Any], name: str, required: bool = False) -> Optional[str]:
+    value = record.get(name)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            raise RowValidationError(location, f'{name} is not valid JSON')
+    if value is None:
+        if required:
+            raise RowValidationError(location, f'missing {name}')
+        return None
+    if not isinstance(value, (dict, list)):
+        raise RowValidationError(location, f'{name} must be a JSON object')
+    return json.dumps(value, sort_keys=True)
+
+
+def _text(location: str, record: Dict[str, Any], name: str, required: bool = False) -> Optional[str]:
+    value = record.get(name)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise RowValidationError(location, f'missing {name}')
+        return None
+    return str(value).strip()
+
+
+def normalize_rule(location: str, record: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """context_logic_rule in schema shape; JSON columns may be given as objects or strings"""
+    jurisdiction = normalize_jurisdiction(record.get('jurisdiction') or defaults.get('jurisdiction'))
+    if not jurisdiction:
+        raise RowValidationError(location, 'missing jurisdiction')
+    priority = record.get('priority')
+    if priority is not None:
+        try:
+            priority = int(priority)
+        except (TypeError, ValueError):
+            raise RowValidationError(location, f'invalid priority {priority!r}')
+    return {
+        'rule_code': _text(location, record, 'rule_code', required=True),
+        'rule_name': _text(location, record, 'rule_name', required=True),
+        'rule_category': _text(location, record, 'rule_category'),
+        'trigger_condition': _json_object(location, record, 'trigger_condition', required=True),
+        'priority': priority,
+        'required_component_ids': _json_list(location, record, 'required_component_ids'),
+        'required_assembly_ids': _json_list(location, record, 'required_assembly_ids'),
+        'required_clause_ids': _json_list(location, record, 'required_clause_ids'),
+        'jurisdiction': jurisdiction,
+        'effective_date': _text(location, record, 'effective_date'),
+        'rule_explanation': _text(location, record, 'rule_explanation'),
+        'code_reference': _text(location, record, 'code_reference')
+    }
+
+
+def normalize_assembly(location: str, record: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """component_assembly in schema shape"""
+    return {
+        'assembly_code': _text(location, record, 'assembly_code', required=True),
+        'name': _text(location, record, 'name', required=True),
+        'description': _text(location, record, 'description'),
+        'component_ids': _json_list(location, record, 'component_ids', required=True),
+        'relationship_rules': _json_object(location, record, 'relationship_rules'),
+        'total_footprint': _json_object(location, record, 'total_footprint'),
+        'circulation_space': _json_object(location, record, 'circulation_space'),
+        'applicable_building_types': _json_list(location, record, 'applicable_building_types'),
+        'occupancy_requirements': _json_object(location, record, 'occupancy_requirements')
+    }
+
+
+# record 'entity' -> (table, normalizer)
+ENTITY_NORMALIZERS = {
+    'clause': ('building_code_clause', normalize_record),
+    'rule': ('context_logic_rule', normalize_rule),
+    'assembly': ('component_assembly', normalize_assembly)
+}
+
+# Schema-shaped lists a JSON dataset may carry next to its sections
+DATASET_ENTITY_KEYS = {'sections': 'clause', 'context_logic_rules': 'rule', 'component_assemblies': 'assembly'}
+
+
+# =====================================================
+# Readers: each yields (location, record, defaults)
+# =====================================================
+
+def read_csv(path: str, defaults: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """Schema-named columns, or the 規範來源/主要要求/原文摘錄 export"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        fields = [CSV_HEADER_ALIASES.get((name or '').strip(), (name or '').strip()) for name in reader.fieldnames or []]
+        reader.fieldnames = fields
+        for line, row in enumerate(reader, start=2):
+            location = f'{os.path.basename(path)}:{line}'
+            row = {key: value for key, value in row.items() if key}
+            row_defaults = defaults
+            source = (row.pop('source', None) or '').strip()
+            if source:
+                if source not in CSV_SOURCES:
+                    yield location, {'_error': f'unknown source {source!r}'}, defaults
+                    continue
+                jurisdiction, document, enforcement = CSV_SOURCES[source]
+                row_defaults = dict(defaults, jurisdiction=jurisdiction, document_title=document,
+                                    enforcement_level=enforcement, is_mandatory=enforcement != 'recommended',
+                                    version=defaults.get('version') or 'current')
+                if not row.get('clause_number'):
+                    number = _SENTENCE_NUMBER.match(row.get('clause_text_en') or '')
+                    row['clause_number'] = number.group(1) if number else '-'
+                if not row.get('clause_code'):
+                    # Titles are unique per source and survive text corrections
+                    key = hashlib.sha1(f"{source}\n{row.get('clause_title', '')}".encode('utf-8')).hexdigest()
+                    row['clause_code'] = f'{jurisdiction}_SRC_{key[:10].upper()}'
+            yield location, row, row_defaults
+
+
+def dataset_defaults(dataset: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    verification = dataset.get('verification') or {}
+    return dict(
+        defaults,
+        jurisdiction=dataset.get('jurisdiction') or defaults.get('jurisdiction'),
+        version=dataset.get('version') or defaults.get('version'),
+        verified_by=verification.get('verified_by') or defaults.get('verified_by'),
+        last_updated=verification.get('extraction_date') or dataset.get('import_date') or defaults.get('last_updated')
+    )
+
+
+def read_json(path: str, defaults: Dict[str, Any],
+              skipped: Dict[str, int]) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Code datasets ({'jurisdiction', 'version', 'sections': [...]}, optionally with schema-shaped
+    'context_logic_rules' and 'component_assemblies'): a single dataset, a list, or a mapping of
+    named datasets. Formula rules and overrides have no table here and are counted.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+
+    if isinstance(document, dict) and ('sections' in document or 'jurisdiction' in document):
+        datasets = [(os.path.basename(path), document)]
+    elif isinstance(document, dict):
+        datasets = [(f'{os.path.basename(path)}#{name}', value) for name, value in document.items()]
+    elif isinstance(document, list):
+        datasets = [(f'{os.path.basename(path)}[{i}]', value) for i, value in enumerate(document)]
+    else:
+        raise ValueError(f'{path}: expected a JSON object or array')
+
+    for name, dataset in datasets:
+        if not isinstance(dataset, dict):
+            yield name, {'_error': 'dataset must be an object'}, defaults
+            continue
+        for key in ('rules', 'jurisdiction_overrides'):
+            if dataset.get(key):
+                skipped[key] = skipped.get(key, 0) + len(dataset[key])
+        merged = dataset_defaults(dataset, defaults)
+        for key, entity in DATASET_ENTITY_KEYS.items():
+            for i, item in enumerate(dataset.get(key) or []):
+                record = dict(item, entity=entity) if isinstance(item, dict) else {'_error': 'not an object'}
+                yield f'{name}/{key}/{i}', record, merged
+
+
+def read_jsonl(path: str, defaults: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """One object per line ("entity": clause | rule | assembly, default clause): the streaming format"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            location = f'{os.path.basename(path)}:{line_number}'
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield location, {'_error': f'invalid JSON ({e.msg})'}, defaults
+                continue
+            yield location, record if isinstance(record, dict) else {'_error': 'not an object'}, defaults
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.json':
+        return 'json'
+    raise ValueError(f'Cannot tell the format of {path}; pass --format')
+
+
+# =====================================================
+# Importer
+# =====================================================
+
+class ClauseImporter:
+    """Validating, batched, hash-compared loader for one database"""
+
+    def __init__(self, db_path: str = "database/building_codes.db", batch_size: int = DEFAULT_BATCH_SIZE,
+                 commit_every: int = DEFAULT_COMMIT_EVERY, classifier: Optional[ClauseClassifier] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.commit_every = max(self.batch_size, commit_every)
+        self.classifier = classifier or get_classifier()
+        self.progress = progress
+        migrate(db_path)
+        self.db = get_connection_manager(db_path)
+
+    def records(self, path: str, fmt: Optional[str], defaults: Dict[str, Any], skipped: Dict[str, int]):
+        fmt = fmt or detect_format(path)
+        if fmt == 'csv':
+            return read_csv(path, defaults)
+        if fmt == 'json':
+            return read_json(path, defaults, skipped)
+        if fmt == 'jsonl':
+            return read_jsonl(path, defaults)
+        raise ValueError(f'Unsupported format {fmt!r}')
+
+    def _flush(self, connection, table: str, buffer: List[Dict[str, Any]], report: Dict[str, Any],
+               started: float):
+        """Merge one batch with the stored rows and write only those whose content hash changed"""
+        key = TRACKED_TABLES[table][1]
+        codes = list({row[key] for row in buffer})
+        existing: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(codes), 500):
+            chunk = codes[i:i + 500]
+            for row in connection.execute(f'SELECT * FROM {table} WHERE {key} IN ({",".join("?" * len(chunk))})',
+                                          chunk):
+                existing[row[key]] = dict(row)
+
+        columns = write_columns(table)
+        writes = []
+        for row in buffer:
+            stored = existing.get(row[key])
+            merged = dict(stored) if stored else dict(NEW_ROW_DEFAULTS[table])
+            merged.update((column, value) for column, value in row.items() if value is not None)
+            if table == 'building_code_clause':
+                merged['clause_category'], merged['verification_method'] = self.classifier.classify(merged)
+                merged['classification_version'] = self.classifier.version
+            merged['content_hash'] = content_hash(table, merged)
+            if stored and stored.get('content_hash') == merged['content_hash']:
+                report['unchanged'] += 1
+                continue
+            report['updated' if stored else 'inserted'] += 1
+            # A later duplicate in the same batch compares against this version
+            existing[row[key]] = merged
+            writes.append(tuple(merged.get(column) for column in columns))
+
+        if writes:
+            connection.executemany(upsert_sql(table), writes)
+        report['imported'] += len(buffer)
+        if self.progress:
+            self.progress(dict(report, elapsed_s=time.perf_counter() - started))
+
+    def import_file(self, path: str, fmt: Optional[str] = None, jurisdiction: Optional[str] = None,
+                    version: Optional[str] = None, dry_run: bool = False, strict: bool = False) -> Dict[str, Any]:
+        """
+        Import one source file. Invalid rows are reported and skipped (strict=True raises
+        RowValidationError instead, rolling back the open transaction). Rows whose merged
+        content hash matches the stored one are counted as unchanged and not written.
+        """
+        started = time.perf_counter()
+        defaults = {'jurisdiction': jurisdiction, 'version': version, 'last_updated': date.today().isoformat()}
+        report = {'file': path, 'read': 0, 'imported': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+                  'rejected': 0, 'errors': [], 'skipped': {}, 'transactions': 0, 'dry_run': dry_run}
+
+        def valid_rows():
+            for location, record, row_defaults in self.records(path, fmt, defaults, report['skipped']):
+                report['read'] += 1
+                try:
+                    if '_error' in record:
+                        raise RowValidationError(location, record['_error'])
+                    entity = record.get('entity') or 'clause'
+                    if entity not in ENTITY_NORMALIZERS:
+                        raise RowValidationError(location, f'unknown entity {entity!r}')
+                    table, normalize = ENTITY_NORMALIZERS[entity]
+                    yield table, normalize(location, record, row_defaults)
+                except RowValidationError as e:
+                    if strict:
+                        raise
+                    report['rejected'] += 1
+                    if len(report['errors']) < MAX_REPORTED_ERRORS:
+                        report['errors'].append(str(e))
+
+        if dry_run:
+            for _ in valid_rows():
+                report['imported'] += 1
+        else:
+            rows = valid_rows()
+            buffers: Dict[str, List[Dict[str, Any]]] = {table: [] for table in TRACKED_TABLES}
+            exhausted = False
+            while not exhausted:
+                # Commit every commit_every rows so a huge file never holds one giant transaction
+                with self.db.writer() as connection:
+                    report['transactions'] += 1
+                    in_transaction = 0
+                    for table, row in rows:
+                        buffer = buffers[table]
+                        buffer.append(row)
+                        if len(buffer) >= self.batch_size:
+                            self._flush(connection, table, buffer, report, started)
+                            in_transaction += len(buffer)
+                            buffer.clear()
+                            if in_transaction >= self.commit_every:
+                                break
+                    else:
+                        exhausted = True
+                        for table, buffer in buffers.items():
+                            if buffer:
+                                self._flush(connection, table, buffer, report, started)
+                                buffer.clear()
+                        if report['inserted'] or report['updated']:
+                            # New editions, effective dates and supersessions move validity intervals;
+                            # assembly edits move the component closure
+                            refresh_validity(connection.cursor())
+                            rebuild_closure(connection.cursor())
+                    report['revision'] = current_revision(connection)
+
+        elapsed = time.perf_counter() - started
+        report['duration_ms'] = round(elapsed * 1000, 3)
+        report['rows_per_second'] = round(report['imported'] / elapsed) if elapsed > 0 else None
+        logger.info(f"📥 {path}: {report['imported']} rows read ({report['inserted']} new, {report['updated']} "
+                    f"changed, {report['unchanged']} unchanged), {report['rejected']} rejected "
+                    f"({report['duration_ms']} ms)")
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import building code clauses from CSV / JSON / JSON Lines')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    parser.add_argument('--format', choices=('csv', 'json', 'jsonl'), help='default: from the file extension')
+    parser.add_argument('--jurisdiction', help='for rows that do not name one')
+    parser.add_argument('--version', help='code edition for rows that do not name one')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY)
+    parser.add_argument('--dry-run', action='store_true', help='validate only')
+    parser.add_argument('--strict', action='store_true', help='abort on the first invalid row')
+    args = parser.parse_args(argv)
+
+    def progress(report):
+        rate = report['imported'] / report['elapsed_s'] if report['elapsed_s'] else 0
+        print(f"   {report['imported']:>9} rows  {rate:>9.0f} rows/s  {report['rejected']} rejected",
+              file=sys.stderr)
+
+    importer = ClauseImporter(args.db, args.batch_size, args.commit_every, progress=progress)
+    reports = []
+    for path in args.files:
+        try:
+            reports.append(importer.import_file(path, args.format, args.jurisdiction, args.version,
+                                                dry_run=args.dry_run, strict=args.strict))
+        except RowValidationError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+    print(json.dumps(reports, indent=2, ensure_ascii=False))
+    return 0 if all(report['rejected'] == 0 for report in reports) else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Read-only binary "code pack" of the building code tables
+Compiled from building_codes.db and mmap'ed by every worker, so the OS shares one copy of the
+rules, clauses, assemblies and components instead of each process holding its own.
+
+Layout (little-endian, all offsets absolute except string refs):
+    header | table directory | per table: columns, fixed-width records, sorted indexes | string table
+
+The header records the change_log revision the pack was compiled at; workers read SQLite instead
+of a pack whose revision no longer matches the database, until it is recompiled.
+
+Usage:
+    python backend/code_pack.py compile [--db PATH] [--output PATH]
+    python backend/code_pack.py info    [--pack PATH]
+    python backend/code_pack.py status  [--pack PATH] [--db PATH]   (exit 1: recompile needed)
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from change_feed import ChangeFeed
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database')
+DEFAULT_DB_PATH = os.path.join(DATABASE_DIR, 'building_codes.db')
+DEFAULT_PACK_PATH = os.path.join(DATABASE_DIR, 'building_codes.codepack')
+
+MAGIC = b'CPAK'
+FORMAT_VERSION = 2
+
+# magic, format version, table count, source schema version, reserved, source change_log revision,
+# string table offset, size
+HEADER = struct.Struct('<4sHHIIQQQ')
+# name ref (offset, length), column count, row count, index count, record width,
+# columns offset, records offset, indexes offset
+TABLE = struct.Struct('<IIIIIIQQQ')
+# name ref (offset, length), type
+COLUMN = struct.Struct('<IIB3x')
+# column number, entry count, entries offset
+INDEX = struct.Struct('<IIQ')
+# key ref (offset, length), row number
+INDEX_ENTRY = struct.Struct('<III')
+
+CELL_SIZE = 8
+INT_CELL = struct.Struct('<q')
+FLOAT_CELL = struct.Struct('<d')
+STRING_CELL = struct.Struct('<II')
+TYPE_INT, TYPE_FLOAT, TYPE_TEXT = 0, 1, 2
+
+# Tables the engine reads, their row order and the columns it looks rows up by
+PACK_TABLES = {
+    'context_logic_rule': {'order_by': 'priority DESC, id', 'indexes': ('rule_code', 'jurisdiction')},
+    'component_assembly': {'order_by': 'id', 'indexes': ('assembly_code',)},
+    'component': {'order_by': 'id', 'indexes': ('component_code',)},
+    'building_code_clause': {'order_by': 'id', 'indexes': ('clause_code', 'jurisdiction')},
+    'assembly_component_closure': {'order_by': 'assembly_code, position', 'indexes': ('assembly_code',)}
+}
+
+# Derived table: case-folded component code -> building_code_clause row number (-1: no clauses)
+COMPONENT_INDEX = 'component_clause'
+
+
+class CodePackError(Exception):
+    """Pack file is missing, truncated or from an incompatible format version"""
+    pass
+
+
+# =====================================================
+# Compiler
+# =====================================================
+
+class StringTableBuilder:
+    """Interned UTF-8 blob: repeated values (jurisdictions, JSON arrays) are stored once"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets: Dict[bytes, int] = {}
+
+    def add(self, value: str) -> Tuple[int, int]:
+        encoded = value.encode('utf-8')
+        offset = self.offsets.get(encoded)
+        if offset is None:
+            offset = self.offsets[encoded] = len(self.data)
+            self.data += encoded
+        return offset, len(encoded)
+
+
+def fold(value: str) -> bytes:
+    """ASCII-only case folding, the comparison SQLite's LIKE makes"""
+    return value.encode('utf-8').lower()
+
+
+def source_revision(connection: sqlite3.Connection) -> int:
+    """change_log revision of the source database (0 before the change log exists)"""
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_log'").fetchone() is None:
+        return 0
+    return connection.execute('SELECT COALESCE(MAX(revision), 0) FROM change_log').fetchone()[0]
+
+
+def column_type(values: List[Any]) -> int:
+    """Narrowest cell type that holds every non-NULL value in the column"""
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, int) for value in present):
+        return TYPE_INT
+    if present and all(isinstance(value, (int, float)) for value in present):
+        return TYPE_FLOAT
+    return TYPE_TEXT
+
+
+def compile_code_pack(db_path: str = DEFAULT_DB_PATH, output: str = DEFAULT_PACK_PATH) -> Dict[str, Any]:
+    """
+    Compile the pack and publish it atomically: written beside the output, fsynced,
+    then os.replace()d so running workers either see the old file or the new one.
+    """
+    source = sqlite3.connect(f'file:{os.path.abspath(db_path)}?mode=ro', uri=True)
+    try:
+        schema_version = source.execute('PRAGMA user_version').fetchone()[0]
+        revision = source_revision(source)
+        strings = StringTableBuilder()
+        tables = []
+        for name, spec in PACK_TABLES.items():
+            columns = [row[1] for row in source.execute(f'PRAGMA table_info({name})')]
+            rows = source.execute(f'SELECT * FROM {name} ORDER BY {spec["order_by"]}').fetchall()
+            tables.append(_encode_table(name, columns, rows, spec['indexes'], strings))
+            if name == 'building_code_clause':
+                tables.append(_encode_table(COMPONENT_INDEX, ['component_code', 'clause_row'],
+                                            _component_clause_rows(source, columns, rows),
+                                            ('component_code',), strings))
+    finally:
+        source.close()
+
+    directory_end = HEADER.size + TABLE.size * len(tables)
+    body = bytearray()
+    entries = []
+    for table in tables:
+        columns_offset = directory_end + len(body)
+        body += table['columns']
+        records_offset = directory_end + len(body)
+        body += table['records']
+        indexes_offset = directory_end + len(body)
+
+        # Index headers, then each index's sorted entries
+        entry_offsets = []
+        cursor = indexes_offset + INDEX.size * len(table['indexes'])
+        for _, sorted_entries in table['indexes']:
+            entry_offsets.append(cursor)
+            cursor += len(sorted_entries)
+        index_blob = bytearray()
+        for (column_number, sorted_entries), offset in zip(table['indexes'], entry_offsets):
+            index_blob += INDEX.pack(column_number, len(sorted_entries) // INDEX_ENTRY.size, offset)
+        for _, sorted_entries in table['indexes']:
+            index_blob += sorted_entries
+        body += index_blob
+
+        name_offset, name_length = table['name']
+        entries.append(TABLE.pack(name_offset, name_length, table['column_count'], table['row_count'],
+                                  len(table['indexes']), table['record_width'],
+                                  columns_offset, records_offset, indexes_offset))
+
+    strings_offset = directory_end + len(body)
+    blob = (HEADER.pack(MAGIC, FORMAT_VERSION, len(tables), schema_version, 0, revision,
+                        strings_offset, len(strings.data))
+            + b''.join(entries) + bytes(body) + bytes(strings.data))
+
+    output = os.path.abspath(output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temporary = f'{output}.tmp-{os.getpid()}'
+    with open(temporary, 'wb') as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, output)
+
+    report = {
+        'output': output,
+        'size_bytes': len(blob),
+        'string_table_bytes': len(strings.data),
+        'schema_version': schema_version,
+        'revision': revision,
+        'tables': {table['table']: table['row_count'] for table in tables}
+    }
+    logger.info(f"📦 Code pack compiled: {output} ({len(blob)} bytes)")
+    return report
+
+
+def _component_clause_rows(source, columns, rows):
+    """
+    (component code, clause row) for every component code the data names, matched as the
+    repository's applies_to_components LIKE '%code%' does: ASCII case-insensitive substring
+    """
+    applies = columns.index('applies_to_components')
+    texts = [fold(str(row[applies])) if row[applies] is not None else b'' for row in rows]
+    codes = {code for (code,) in source.execute('SELECT component_code FROM component') if code}
+    codes.update(code for (code,) in source.execute(
+        "SELECT member_code FROM assembly_component_closure WHERE member_type = 'component'") if code)
+    for row in rows:
+        try:
+            listed = json.loads(row[applies] or '[]')
+        except (TypeError, ValueError):
+            continue
+        if isinstance(listed, list):
+            codes.update(code for code in listed if isinstance(code, str) and code)
+
+    index = {}
+    for code in codes:
+        needle = fold(code)
+        if needle not in index:
+            index[needle] = [i for i, text in enumerate(texts) if needle in text] or [-1]
+    return [(needle.decode('utf-8'), row_number)
+            for needle, row_numbers in sorted(index.items()) for row_number in row_numbers]
+
+
+def _encode_table(name, columns, rows, index_columns, strings):
+    types = [column_type([row[i] for row in rows]) for i in range(len(columns))]
+    bitmap_size = (len(columns) + 7) // 8
+    record_width = bitmap_size + CELL_SIZE * len(columns)
+
+    column_blob = bytearray()
+    for column, kind in zip(columns, types):
+        column_blob += COLUMN.pack(*strings.add(column), kind)
+
+    records = bytearray()
+    for row in rows:
+        nulls = bytearray(bitmap_size)
+        cells = bytearray()
+        for i, (value, kind) in enumerate(zip(row, types)):
+            if value is None:
+                nulls[i // 8] |= 1 << (i % 8)
+                cells += bytes(CELL_SIZE)
+            elif kind == TYPE_INT:
+                cells += INT_CELL.pack(value)
+            elif kind == TYPE_FLOAT:
+                cells += FLOAT_CELL.pack(float(value))
+            else:
+                cells += STRING_CELL.pack(*strings.add(value if isinstance(value, str) else str(value)))
+        records += nulls + cells
+
+    indexes = []
+    for column in index_columns:
+        column_number = columns.index(column)
+        keyed = []
+        for row_number, row in enumerate(rows):
+            value = row[column_number]
+            if value is not None:
+                keyed.append((str(value).encode('utf-8'), row_number, strings.add(str(value))))
+        keyed.sort(key=lambda item: (item[0], item[1]))
+        entries = bytearray()
+        for _, row_number, (offset, length) in keyed:
+            entries += INDEX_ENTRY.pack(offset, length, row_number)
+        indexes.append((column_number, bytes(entries)))
+
+    return {
+        'table': name,
+        'name': strings.add(name),
+        'column_count': len(columns),
+        'row_count': len(rows),
+        'record_width': record_width,
+        'columns': bytes(column_blob),
+        'records': bytes(records),
+        'indexes': indexes
+    }
+
+
+# =====================================================
+# Reader
+# =====================================================
+
+class PackRecord(Mapping):
+    """
+    One row, decoded lazily from the mapping.
+    Behaves like sqlite3.Row for the engine (record["col"], dict(record)); raw() hands out
+    a zero-copy memoryview of a text cell.
+    """
+
+    __slots__ = ('_table', '_offset')
+
+    def __init__(self, table: 'PackTable', offset: int):
+        self._table = table
+        self._offset = offset
+
+    def _cell(self, column: str):
+        table = self._table
+        try:
+            index = table.column_index[column]
+        except KeyError:
+            raise KeyError(column)
+        offset = self._offset
+        if table.pack.mm[offset + index // 8] & (1 << (index % 8)):
+            return None, None
+        return table.column_types[index], offset + table.bitmap_size + index * CELL_SIZE
+
+    def __getitem__(self, column: str) -> Any:
+        kind, cell = self._cell(column)
+        if kind is None:
+            return None
+        pack = self._table.pack
+        if kind == TYPE_INT:
+            return INT_CELL.unpack_from(pack.mm, cell)[0]
+        if kind == TYPE_FLOAT:
+            return FLOAT_CELL.unpack_from(pack.mm, cell)[0]
+        return str(pack.text(*STRING_CELL.unpack_from(pack.mm, cell)), 'utf-8')
+
+    def raw(self, column: str) -> Optional[memoryview]:
+        """Text cell as a memoryview into the mapping (no copy)"""
+        kind, cell = self._cell(column)
+        if kind != TYPE_TEXT:
+            return None
+        return self._table.pack.text(*STRING_CELL.unpack_from(self._table.pack.mm, cell))
+
+    def contains(self, column: str, needle: str) -> bool:
+        """ASCII case-insensitive substring test on a text cell, as LIKE '%needle%' matches"""
+        raw = self.raw(column)
+        return raw is not None and fold(needle) in raw.tobytes().lower()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.columns)
+
+    def __len__(self) -> int:
+        return len(self._table.columns)
+
+    def keys(self):
+        return list(self._table.columns)
+
+
+class PackTable:
+    """Fixed-width records plus sorted indexes for one table"""
+
+    def __init__(self, pack: 'CodePack', entry: Tuple):
+        (name_offset, name_length, column_count, self.row_count, index_count, self.record_width,
+         columns_offset, self.records_offset, indexes_offset) = entry
+        self.pack = pack
+        self.name = str(pack.text(name_offset, name_length), 'utf-8')
+        self.bitmap_size = (column_count + 7) // 8
+
+        self.columns, self.column_types = [], []
+        for i in range(column_count):
+            offset, length, kind = COLUMN.unpack_from(pack.mm, columns_offset + i * COLUMN.size)
+            self.columns.append(str(pack.text(offset, length), 'utf-8'))
+            self.column_types.append(kind)
+        self.column_index = {column: i for i, column in enumerate(self.columns)}
+
+        self.indexes = {}
+        for i in range(index_count):
+            column_number, count, entries_offset = INDEX.unpack_from(pack.mm, indexes_offset + i * INDEX.size)
+            self.indexes[self.columns[column_number]] = (count, entries_offset)
+        self.lookups = 0
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def row(self, row_number: int) -> PackRecord:
+        return PackRecord(self, self.records_offset + row_number * self.record_width)
+
+    def __iter__(self) -> Iterator[PackRecord]:
+        return (self.row(i) for i in range(self.row_count))
+
+    def _index_key(self, entries_offset: int, position: int) -> bytes:
+        offset, length, _ = INDEX_ENTRY.unpack_from(self.pack.mm, entries_offset + position * INDEX_ENTRY.size)
+        start = self.pack.strings_offset + offset
+        return self.pack.mm[start:start + length]
+
+    def lookup(self, column: str, key: Any) -> List[int]:
+        """Row numbers whose column equals key, in table order (binary search on the index)"""
+        count, entries_offset = self.indexes[column]
+        needle = str(key).encode('utf-8')
+        keys = _IndexKeys(self, entries_offset, count)
+        self.lookups += 1
+        # Both ends of the run by bisection: only O(log n) keys are decoded, however many rows match
+        first = bisect.bisect_left(keys, needle)
+        last = bisect.bisect_right(keys, needle, first)
+        start, end = (entries_offset + position * INDEX_ENTRY.size for position in (first, last))
+        return [row_number for _, _, row_number in INDEX_ENTRY.iter_unpack(self.pack.view[start:end])]
+
+    def row_set(self, column: str, key: Any) -> frozenset:
+        """lookup() as a set, computed once per pack"""
+        return self.pack.memo((self.name, column, key), lambda: frozenset(self.lookup(column, key)))
+
+    def find(self, column: str, key: Any) -> List[PackRecord]:
+        return [self.row(i) for i in self.lookup(column, key)]
+
+    def get(self, column: str, key: Any) -> Optional[PackRecord]:
+        rows = self.lookup(column, key)
+        return self.row(rows[0]) if rows else None
+
+
+class _IndexKeys:
+    """Sequence view over an index's keys for bisect"""
+
+    def __init__(self, table: PackTable, entries_offset: int, count: int):
+        self.table, self.entries_offset, self.count = table, entries_offset, count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        return self.table._index_key(self.entries_offset, position)
+
+
+class CodePack:
+    """A mapped pack file; pages are shared by every process that maps the same file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < HEADER.size:
+                raise CodePackError(f"Code pack too small: {path}")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.view = memoryview(self.mm)
+
+        (magic, version, table_count, self.schema_version, _, self.revision, self.strings_offset,
+         strings_size) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CodePackError(f"Unsupported code pack format in {path}")
+        if self.strings_offset + strings_size > stat.st_size:
+            raise CodePackError(f"Truncated code pack: {path}")
+
+        self._memo: Dict[Any, Any] = {}
+        self.tables: Dict[str, PackTable] = {}
+        for i in range(table_count):
+            table = PackTable(self, TABLE.unpack_from(self.mm, HEADER.size + i * TABLE.size))
+            self.tables[table.name] = table
+
+    def text(self, offset: int, length: int) -> memoryview:
+        start = self.strings_offset + offset
+        return self.view[start:start + length]
+
+    def table(self, name: str) -> PackTable:
+        return self.tables[name]
+
+    def memo(self, key: Any, build: Callable[[], Any]) -> Any:
+        """Value derived from this pack, built on first use (a pack never changes once mapped)"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            return self._memo.setdefault(key, build())
+
+    def component_clause_rows(self, component_id: str) -> Optional[List[int]]:
+        """building_code_clause rows whose applies_to_components matches, or None if not indexed"""
+        index = self.tables.get(COMPONENT_INDEX)
+        if index is None:
+            return None
+        records = index.find('component_code', fold(component_id).decode('utf-8'))
+        if not records:
+            return None
+        return [record['clause_row'] for record in records if record['clause_row'] >= 0]
+
+    def close(self):
+        try:
+            self.view.release()
+            self.mm.close()
+        except BufferError:
+            pass  # records still reference the mapping; it is unmapped when they go away
+
+
+class CodePackHandle:
+    """
+    The current pack for a path.
+    A republished file (new inode/mtime/size) is noticed within check_interval seconds and
+    mapped in with a single reference swap; requests holding the old pack finish on it.
+    With `current_revision` (the database's change_log revision), a pack compiled at another
+    revision is not served: get() returns None, so callers read SQLite until it is recompiled.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0,
+                 current_revision: Optional[Callable[[], int]] = None):
+        self.path = path
+        self.check_interval = check_interval
+        self.current_revision = current_revision
+        self._pack: Optional[CodePack] = None
+        self._serving: Optional[CodePack] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.remaps = 0
+        self.stale = False
+
+    def get(self) -> Optional[CodePack]:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._serving
+
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._serving
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._pack = self._serving = None
+                return None
+
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self._pack is None or self._pack.identity != identity:
+                try:
+                    self._pack = CodePack(self.path)
+                    self.remaps += 1
+                    logger.info(f"📦 Code pack mapped: {self.path} (schema v{self._pack.schema_version}, "
+                                f"revision {self._pack.revision})")
+                except (OSError, CodePackError, struct.error) as e:
+                    logger.error(f"❌ Could not map code pack {self.path}: {e}")
+            self._serving = self._pack if self._pack is not None and self._fresh(self._pack) else None
+            return self._serving
+
+    def _fresh(self, pack: CodePack) -> bool:
+        if self.current_revision is None:
+            return True
+        try:
+            revision = self.current_revision()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Could not read the change_log revision for {self.path}: {e}")
+            return True
+        if revision == pack.revision:
+            self.stale = False
+            return True
+        if not self.stale:
+            logger.warning(f"⚠️ Code pack {self.path} is at revision {pack.revision}, database at {revision}: "
+                           f"reading SQLite until the pack is recompiled")
+        self.stale = True
+        return False
+
+
+def pack_status(pack_path: str = DEFAULT_PACK_PATH, db_path: str = DEFAULT_DB_PATH) -> Dict[str, Any]:
+    """Whether the pack is current, and the codes changed in the database since it was compiled"""
+    pack = CodePack(pack_path)
+    try:
+        feed = ChangeFeed(db_path, since=pack.revision)
+        changed = {entity: sorted(codes) for entity, codes in feed.changed_keys(feed.poll()).items()}
+        return {'pack_revision': pack.revision, 'database_revision': feed.revision,
+                'current': feed.revision == pack.revision, 'changed': changed}
+    finally:
+        pack.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile or inspect the binary code pack')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = subcommands.add_parser('compile', help='Compile building_codes.db into a code pack')
+    compile_parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    compile_parser.add_argument('--output', default=DEFAULT_PACK_PATH)
+
+    info_parser = subcommands.add_parser('info', help='Show the tables in a code pack')
+    info_parser.add_argument('--pack', default=DEFAULT_PACK_PATH)
+
+    status_parser = subcommands.add_parser('status', help='Check the pack against the database change log')
+    status_parser.add_argument('--pack', default=DEFAULT_PACK_PATH)
+    status_parser.add_argument('--db', default=DEFAULT_DB_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compile':
+        report = compile_code_pack(args.db, args.output)
+        print(f"✅ Compiled {report['output']} ({report['size_bytes']} bytes, "
+              f"{report['string_table_bytes']} in strings)")
+        for name, rows in report['tables'].items():
+            print(f"   {name}: {rows} rows")
+    elif args.command == 'status':
+        status = pack_status(args.pack, args.db)
+        if status['current']:
+            print(f"✅ {args.pack} is current (revision {status['pack_revision']})")
+            return 0
+        print(f"⚠️ {args.pack} is at revision {status['pack_revision']}, database at "
+              f"{status['database_revision']}: recompile it")
+        for entity, codes in status['changed'].items():
+            print(f"   {entity}: {', '.join(codes)}")
+        return 1
+    else:
+        pack = CodePack(args.pack)
+        print(f"📦 {args.pack}: format v{FORMAT_VERSION}, schema v{pack.schema_version}, revision {pack.revision}")
+        for name, table in pack.tables.items():
+            print(f"   {name}: {len(table)} rows x {len(table.columns)} columns, "
+                  f"indexes on {', '.join(table.indexes)}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Code data repositories
+The engine reads rules, assemblies, clauses and fixture tables through one session interface, so
+the storage behind it can change without touching engine code:
+  - sqlite:   the migrated building_codes.db (default)
+  - memory:   a snapshot of that database held in dicts, for tests and benchmarks
+  - postgres: the same tables in PostgreSQL behind a connection pool (DATABASE_URL), for
+              deployments that outgrow a single SQLite writer
+SQLite stays the system of record: migrations, imports and edition edits run there, and the
+copy command loads the result into PostgreSQL.
+
+Usage:
+    python backend/code_storage.py copy --dsn postgresql://localhost/bcode [--db PATH]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from assembly_closure import AssemblyClosureMap, Closure, closures_from_rows, parse_members, resolve_closures
+from code_editions import RuleSnapshots
+from connection_manager import get_connection_manager
+from migrations import migrate
+from storage_backends import StorageError, get_postgres_pool, postgres_dsn, storage_backend
+
+# Tables the engine and fixture calculator read
+CODE_TABLES = ('context_logic_rule', 'component_assembly', 'building_code_clause', 'building_codes')
+
+# Derived tables copied along with them (the memory adapter derives its own)
+DERIVED_TABLES = ('assembly_component_closure',)
+
+COPY_BATCH_SIZE = 500
+
+
+def _priority_order(rule: Dict[str, Any]):
+    # Same order as ORDER BY priority DESC: NULLs last, ties in insertion order
+    return (rule.get('priority') is None, -(rule.get('priority') or 0))
+
+
+def _range_start(row: Dict[str, Any]) -> int:
+    start = (row.get('occupancy_range') or '').split('-')[0]
+    return int(start) if start.isdigit() else 0
+
+
+class CodeSession(ABC):
+    """
+    Reads for one workflow step. Rows support row['column'], dict(row) and row.keys().
+    """
+
+    @abstractmethod
+    def rules_for(self, jurisdiction: str, as_of: str) -> List[Any]:
+        """Rules for the jurisdiction and 'ALL' in force on as_of, highest priority first"""
+
+    @abstractmethod
+    def assembly(self, assembly_code: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def assembly_closure(self, assembly_code: str) -> Optional[Closure]:
+        """Transitive components and nested assemblies; None when the closure has no entry"""
+
+    @abstractmethod
+    def clauses_for_component(self, component_id: str, jurisdiction: str, as_of: str) -> List[Any]:
+        """Clauses in force on as_of whose applies_to_components mentions the component"""
+
+    @abstractmethod
+    def clause(self, clause_code: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def fixture_requirements(self, jurisdiction: str, building_type: str,
+                             accessibility_level: str) -> List[Dict[str, Any]]:
+        """building_codes rows for the combination, ordered by the start of the occupancy range"""
+
+
+class CodeRepository(ABC):
+    backend = None
+
+    @abstractmethod
+    def session(self) -> ContextManager[CodeSession]:
+        """Context manager yielding a CodeSession"""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'backend': self.backend}
+
+
+# =====================================================
+# In-memory
+# =====================================================
+
+class InMemoryCodeRepository(CodeRepository, CodeSession):
+    """Code tables as lists of dicts with lookup indexes; the repository is its own session"""
+
+    backend = 'memory'
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.load(tables or {})
+
+    @classmethod
+    def from_sqlite(cls, db_path: str) -> 'InMemoryCodeRepository':
+        """Snapshot of a migrated SQLite code database"""
+        with get_connection_manager(db_path).reader() as connection:
+            return cls({table: [dict(row) for row in connection.execute(f'SELECT * FROM {table} ORDER BY rowid')]
+                        for table in CODE_TABLES})
+
+    def load(self, tables: Dict[str, List[Dict[str, Any]]]):
+        self.tables = {table: [dict(row) for row in tables.get(table, [])] for table in CODE_TABLES}
+        self._rules: Dict[str, List[Dict[str, Any]]] = {}
+        for rule in self.tables['context_logic_rule']:
+            self._rules.setdefault(rule.get('jurisdiction'), []).append(rule)
+        self._assemblies = {row['assembly_code']: row for row in self.tables['component_assembly']}
+        self._closures = resolve_closures({code: parse_members(row.get('component_ids'), code)
+                                           for code, row in self._assemblies.items()})
+        self._clauses = {row['clause_code']: row for row in self.tables['building_code_clause']}
+        self._clauses_by_jurisdiction: Dict[str, List[Dict[str, Any]]] = {}
+        for clause in self.tables['building_code_clause']:
+            self._clauses_by_jurisdiction.setdefault(clause.get('jurisdiction'), []).append(clause)
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    @staticmethod
+    def _in_force(row: Dict[str, Any], as_of: str) -> bool:
+        return (row.get('valid_from') or '') <= as_of < (row.get('valid_to') or '')
+
+    def rules_for(self, jurisdiction, as_of):
+        candidates = self._rules.get(jurisdiction, []) + ([] if jurisdiction == 'ALL' else self._rules.get('ALL', []))
+        candidates.sort(key=lambda rule: rule.get('id') or 0)
+        return sorted((rule for rule in candidates if self._in_force(rule, as_of)), key=_priority_order)
+
+    def assembly(self, assembly_code):
+        return self._assemblies.get(assembly_code)
+
+    def assembly_closure(self, assembly_code):
+        return self._closures.get(assembly_code)
+
+    def clauses_for_component(self, component_id, jurisdiction, as_of):
+        # LIKE '%component%' is case-insensitive for ASCII
+        needle = component_id.lower()
+        return [clause for clause in self._clauses_by_jurisdiction.get(jurisdiction, [])
+                if needle in (clause.get('applies_to_components') or '').lower() and self._in_force(clause, as_of)]
+
+    def clause(self, clause_code):
+        return self._clauses.get(clause_code)
+
+    def fixture_requirements(self, jurisdiction, building_type, accessibility_level):
+        rows = [row for row in self.tables['building_codes']
+                if (row['jurisdiction'], row['building_type'], row['accessibility_level'])
+                == (jurisdiction, building_type, accessibility_level)]
+        return sorted(rows, key=_range_start)
+
+    def metrics(self):
+        return {'backend': self.backend, 'rows': {table: len(rows) for table, rows in self.tables.items()}}
+
+
+# =====================================================
+# SQLite
+# =====================================================
+
+class SQLiteCodeSession(CodeSession):
+    """Reads on one pooled query_only connection"""
+
+    def __init__(self, connection: sqlite3.Connection, snapshots: RuleSnapshots, closures: AssemblyClosureMap):
+        self.connection = connection
+        self.snapshots = snapshots
+        self.closures = closures
+        self._assemblies = None
+
+    def rules_for(self, jurisdiction, as_of):
+        return self.snapshots.rules(self.connection, jurisdiction, as_of)
+
+    def _assembly_snapshot(self):
+        # One revision check per session, then plain dict lookups
+        if self._assemblies is None:
+            self._assemblies = self.closures.snapshot(self.connection)
+        return self._assemblies
+
+    def assembly(self, assembly_code):
+        return self._assembly_snapshot()[0].get(assembly_code)
+
+    def assembly_closure(self, assembly_code):
+        return self._assembly_snapshot()[1].get(assembly_code)
+
+    def clauses_for_component(self, component_id, jurisdiction, as_of):
+        return self.connection.execute("""
+            SELECT bcc.* FROM building_code_clause bcc
+            WHERE bcc.applies_to_components LIKE ?
+            AND bcc.jurisdiction = ?
+            AND bcc.valid_from <= ? AND bcc.valid_to > ?
+        """, (f'%{component_id}%', jurisdiction, as_of, as_of)).fetchall()
+
+    def clause(self, clause_code):
+        return self.connection.execute("""
+            SELECT * FROM building_code_clause WHERE clause_code = ?
+        """, (clause_code,)).fetchone()
+
+    def fixture_requirements(self, jurisdiction, building_type, accessibility_level):
+        rows = self.connection.execute('''
+            SELECT * FROM building_codes
+            WHERE jurisdiction = ? AND building_type = ? AND accessibility_level = ?
+            ORDER BY CAST(SUBSTR(occupancy_range, 1, INSTR(occupancy_range, '-')-1) AS INTEGER)
+        ''', (jurisdiction, building_type, accessibility_level)).fetchall()
+        return [dict(row) for row in rows]
+
+
+class SQLiteCodeRepository(CodeRepository):
+    backend = 'sqlite'
+
+    def __init__(self, db_path: str = "database/building_codes.db"):
+        self.db_path = db_path
+        self.db = get_connection_manager(db_path)
+        # Rules in force per jurisdiction and edition, and the assembly closure, shared by all requests
+        self.rule_snapshots = RuleSnapshots()
+        self.assembly_closures = AssemblyClosureMap()
+
+    @contextmanager
+    def session(self):
+        with self.db.reader() as connection:
+            yield SQLiteCodeSession(connection, self.rule_snapshots, self.assembly_closures)
+
+    def metrics(self):
+        return {'backend': self.backend, 'rule_snapshots': self.rule_snapshots.metrics(),
+                'assembly_closures': self.assembly_closures.metrics()}
+
+
+# =====================================================
+# PostgreSQL
+# =====================================================
+
+POSTGRES_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_rule_validity ON context_logic_rule (jurisdiction, valid_from, valid_to)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_assembly_code ON component_assembly (assembly_code)',
+    'CREATE INDEX IF NOT EXISTS idx_assembly_closure ON assembly_component_closure (assembly_code, position)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_clause_code ON building_code_clause (clause_code)',
+    'CREATE INDEX IF NOT EXISTS idx_clause_validity ON building_code_clause (jurisdiction, valid_from, valid_to)',
+    'CREATE INDEX IF NOT EXISTS idx_building_codes_lookup '
+    'ON building_codes (jurisdiction, building_type, accessibility_level)'
+)
+
+
+class PostgresCodeSession(CodeSession):
+    """Reads on one pooled read-only PostgreSQL connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def _all(self, sql: str, params) -> List[Dict[str, Any]]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _one(self, sql: str, params) -> Optional[Dict[str, Any]]:
+        rows = self._all(sql, params)
+        return rows[0] if rows else None
+
+    def rules_for(self, jurisdiction, as_of):
+        return self._all('''
+            SELECT * FROM context_logic_rule
+            WHERE jurisdiction IN (%s, 'ALL') AND valid_from <= %s AND valid_to > %s
+            ORDER BY priority DESC NULLS LAST, id
+        ''', (jurisdiction, as_of, as_of))
+
+    def assembly(self, assembly_code):
+        return self._one('SELECT * FROM component_assembly WHERE assembly_code = %s', (assembly_code,))
+
+    def assembly_closure(self, assembly_code):
+        rows = self._all('''
+            SELECT assembly_code, member_code, member_type FROM assembly_component_closure
+            WHERE assembly_code = %s ORDER BY position
+        ''', (assembly_code,))
+        closures = closures_from_rows((row['assembly_code'], row['member_code'], row['member_type']) for row in rows)
+        return closures.get(assembly_code)
+
+    def clauses_for_component(self, component_id, jurisdiction, as_of):
+        return self._all('''
+            SELECT * FROM building_code_clause
+            WHERE applies_to_components ILIKE %s
+            AND jurisdiction = %s
+            AND valid_from <= %s AND valid_to > %s
+        ''', (f'%{component_id}%', jurisdiction, as_of, as_of))
+
+    def clause(self, clause_code):
+        return self._one('SELECT * FROM building_code_clause WHERE clause_code = %s', (clause_code,))
+
+    def fixture_requirements(self, jurisdiction, building_type, accessibility_level):
+        return self._all('''
+            SELECT * FROM building_codes
+            WHERE jurisdiction = %s AND building_type = %s AND accessibility_level = %s
+            ORDER BY CAST(NULLIF(split_part(occupancy_range, '-', 1), '') AS INTEGER)
+        ''', (jurisdiction, building_type, accessibility_level))
+
+
+class PostgresCodeRepository(CodeRepository):
+    backend = 'postgres'
+
+    def __init__(self, dsn: Optional[str] = None, pool=None):
+        self.db = pool or get_postgres_pool(dsn)
+
+    @contextmanager
+    def session(self):
+        with self.db.reader() as connection:
+            yield PostgresCodeSession(connection)
+
+    def metrics(self):
+        return {'backend': self.backend, 'pool': self.db.metrics()}
+
+
+def _postgres_type(sqlite_type: str) -> str:
+    sqlite_type = (sqlite_type or '').upper()
+    if 'INT' in sqlite_type:
+        return 'BIGINT'
+    if any(kind in sqlite_type for kind in ('REAL', 'FLOA', 'DOUB', 'DECIMAL', 'NUMERIC')):
+        return 'DOUBLE PRECISION'
+    if sqlite_type == 'BOOLEAN':
+        return 'BOOLEAN'
+    return 'TEXT'
+
+
+def copy_to_postgres(db_path: str, dsn: Optional[str] = None, pool=None) -> Dict[str, int]:
+    """Replace the PostgreSQL code tables with the current contents of the SQLite database"""
+    pool = pool or get_postgres_pool(dsn)
+    copied = {}
+    with get_connection_manager(db_path).reader() as source, pool.writer() as target:
+        with target.cursor() as cursor:
+            for table in CODE_TABLES + DERIVED_TABLES:
+                columns = source.execute(f'PRAGMA table_info({table})').fetchall()
+                names = [column['name'] for column in columns]
+                definitions = ', '.join(f"{column['name']} {_postgres_type(column['type'])}" for column in columns)
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                cursor.execute(f'CREATE TABLE {table} ({definitions})')
+
+                insert = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})"
+                booleans = [i for i, column in enumerate(columns) if _postgres_type(column['type']) == 'BOOLEAN']
+                rows = source.execute(f"SELECT {', '.join(names)} FROM {table} ORDER BY rowid")
+                copied[table] = 0
+                while True:
+                    batch = rows.fetchmany(COPY_BATCH_SIZE)
+                    if not batch:
+                        break
+                    values = [tuple(bool(value) if i in booleans and value is not None else value
+                                    for i, value in enumerate(row)) for row in batch]
+                    cursor.executemany(insert, values)
+                    copied[table] += len(values)
+            for statement in POSTGRES_INDEXES:
+                cursor.execute(statement)
+    return copied
+
+
+def create_code_repository(db_path: str = "database/building_codes.db",
+                           backend: Optional[str] = None) -> CodeRepository:
+    """Adapter for the selected backend (db_path is the SQLite database, or the memory snapshot source)"""
+    backend = storage_backend(backend)
+    if backend == 'memory':
+        migrate(db_path)
+        return InMemoryCodeRepository.from_sqlite(db_path)
+    if backend == 'postgres':
+        return PostgresCodeRepository()
+    return SQLiteCodeRepository(db_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Code data storage backends')
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'database', 'building_codes.db'))
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    copy = subcommands.add_parser('copy', help='Load the SQLite code tables into PostgreSQL')
+    copy.add_argument('--dsn', help='PostgreSQL connection string (default: DATABASE_URL)')
+    args = parser.parse_args(argv)
+
+    try:
+        migrate(args.db)
+        copied = copy_to_postgres(args.db, postgres_dsn(args.dsn))
+    except StorageError as e:
+        print(f"❌ {e}")
+        return 1
+    for table, count in copied.items():
+        print(f"✅ {table}: {count} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
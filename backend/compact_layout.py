@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Compact layout container
+Fixture layouts stored as parallel typed arrays (struct of arrays) with an interned fixture-type
+table, instead of one dict per fixture. Rows read as dicts through lazy views, serialize either
+as the classic list of element dicts or as a columnar JSON object, and expose the footprint and
+clearance-zone geometry the layout checks use.
+
+Columnar encoding:
+    {"format": "columnar", "count": 3, "types": ["lavatory", "urinal"], "type": [0, 0, 1],
+     "x": [...], "y": [...], "width": [...], "height": [...], "clearance": [...]}
+plus "rotation": [...] when the layout carries rotations (0 faces +y, 90 -x, 180 -y, 270 +x).
+"""
+
+import math
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+COLUMNAR_FORMAT = 'columnar'
+NUMERIC_COLUMNS = ('x', 'y', 'width', 'height', 'clearance')
+ROTATIONS = (0, 90, 180, 270)
+MAX_TYPES = 65535
+
+Box = Tuple[float, float, float, float]
+
+
+def clearance_box(x0: float, y0: float, x1: float, y1: float, depth: float, rotation: int) -> Box:
+    """Clearance zone of `depth` in front of the footprint, on the side the rotation faces"""
+    if rotation == 0:
+        return x0, y1, x1, y1 + depth
+    if rotation == 90:
+        return x0 - depth, y0, x0, y1
+    if rotation == 180:
+        return x0, y0 - depth, x1, y0
+    return x1, y0, x1 + depth, y1
+
+
+def is_columnar(value: Any) -> bool:
+    return isinstance(value, dict) and value.get('format') == COLUMNAR_FORMAT
+
+
+def _number(value: Any, name: str, minimum: Optional[float] = None) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'{name} must be a number')
+    if minimum is not None and value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return float(value)
+
+
+class ElementView(Mapping):
+    """One row read as an element dict; reads the arrays on access, so it follows later edits"""
+
+    __slots__ = ('_layout', '_index')
+
+    def __init__(self, layout: 'CompactLayout', index: int):
+        self._layout = layout
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        layout = self._layout
+        if key == 'type':
+            return layout.types[layout.type_index[self._index]]
+        if key in NUMERIC_COLUMNS or (key == 'rotation' and layout.rotation is not None):
+            return getattr(layout, key)[self._index]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys())
+
+    def __len__(self) -> int:
+        return len(self._layout.keys())
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class CompactLayout:
+    """Fixtures as typed columns; `with_rotation` adds a rotation column (otherwise every row faces +y)"""
+
+    def __init__(self, with_rotation: bool = False):
+        self.types: List[str] = []
+        self._type_ids: Dict[str, int] = {}
+        self.type_index = array('H')
+        self.x = array('d')
+        self.y = array('d')
+        self.width = array('d')
+        self.height = array('d')
+        self.clearance = array('d')
+        self.rotation: Optional[array] = array('H') if with_rotation else None
+
+    def keys(self) -> Tuple[str, ...]:
+        keys = ('type',) + NUMERIC_COLUMNS
+        return keys + ('rotation',) if self.rotation is not None else keys
+
+    def intern(self, fixture_type: str) -> int:
+        type_id = self._type_ids.get(fixture_type)
+        if type_id is None:
+            if len(self.types) >= MAX_TYPES:
+                raise ValueError(f'At most {MAX_TYPES} fixture types per layout')
+            type_id = self._type_ids[fixture_type] = len(self.types)
+            self.types.append(fixture_type)
+        return type_id
+
+    def append(self, fixture_type: str, x: float, y: float, width: float, height: float,
+               clearance: float = 0.0, rotation: int = 0) -> int:
+        self.type_index.append(self.intern(fixture_type))
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.height.append(height)
+        self.clearance.append(clearance)
+        if self.rotation is not None:
+            self.rotation.append(rotation)
+        return len(self.x) - 1
+
+    def row(self, index: int) -> Tuple:
+        """(type, x, y, width, height, clearance, rotation) of one row"""
+        return (self.types[self.type_index[index]], self.x[index], self.y[index], self.width[index],
+                self.height[index], self.clearance[index],
+                self.rotation[index] if self.rotation is not None else 0)
+
+    def set_row(self, index: int, fixture_type: str, x: float, y: float, width: float, height: float,
+                clearance: float = 0.0, rotation: int = 0):
+        self.type_index[index] = self.intern(fixture_type)
+        self.x[index], self.y[index] = x, y
+        self.width[index], self.height[index], self.clearance[index] = width, height, clearance
+        if self.rotation is not None:
+            self.rotation[index] = rotation
+
+    def swap_remove(self, index: int) -> Optional[int]:
+        """Delete a row by moving the last row into its place; returns the moved row's old index"""
+        last = len(self.x) - 1
+        moved = None
+        if index != last:
+            self.set_row(index, *self.row(last))
+            moved = last
+        for column in (self.type_index, self.x, self.y, self.width, self.height, self.clearance, self.rotation):
+            if column is not None:
+                column.pop()
+        return moved
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, index: int) -> ElementView:
+        if not -len(self.x) <= index < len(self.x):
+            raise IndexError('layout row out of range')
+        return ElementView(self, index % len(self.x))
+
+    def __iter__(self) -> Iterator[ElementView]:
+        return (ElementView(self, index) for index in range(len(self.x)))
+
+    # Geometry
+
+    def footprint(self, index: int) -> Box:
+        x, y, width, height = self.x[index], self.y[index], self.width[index], self.height[index]
+        if self.rotation is not None and self.rotation[index] in (90, 270):
+            width, height = height, width
+        return x, y, x + width, y + height
+
+    def clearance_zone(self, index: int) -> Optional[Box]:
+        depth = self.clearance[index]
+        if depth <= 0:
+            return None
+        return clearance_box(*self.footprint(index), depth,
+                             self.rotation[index] if self.rotation is not None else 0)
+
+    def envelope(self, index: int) -> Box:
+        box, zone = self.footprint(index), self.clearance_zone(index)
+        if zone is None:
+            return box
+        return min(box[0], zone[0]), min(box[1], zone[1]), max(box[2], zone[2]), max(box[3], zone[3])
+
+    # Encodings
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """The classic generate_layout() list of element dicts"""
+        types = self.types
+        columns = [[types[i] for i in self.type_index]] + [getattr(self, name) for name in NUMERIC_COLUMNS]
+        if self.rotation is not None:
+            columns.append(self.rotation)
+        keys = self.keys()
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    def to_columnar(self) -> Dict[str, Any]:
+        encoded = {'format': COLUMNAR_FORMAT, 'count': len(self), 'types': list(self.types),
+                   'type': self.type_index.tolist()}
+        for name in NUMERIC_COLUMNS:
+            encoded[name] = getattr(self, name).tolist()
+        if self.rotation is not None:
+            encoded['rotation'] = self.rotation.tolist()
+        return encoded
+
+    @classmethod
+    def from_columnar(cls, data: Dict[str, Any], name: str = 'layout_elements') -> 'CompactLayout':
+        """Validated layout from the columnar encoding; raises ValueError"""
+        if not is_columnar(data):
+            raise ValueError(f'{name} must use the {COLUMNAR_FORMAT} format')
+        types, type_index = data.get('types'), data.get('type')
+        if not isinstance(types, list) or not all(isinstance(t, str) for t in types):
+            raise ValueError(f'{name}.types must be a list of strings')
+        if len(set(types)) != len(types) or len(types) > MAX_TYPES:
+            raise ValueError(f'{name}.types must be unique (at most {MAX_TYPES})')
+        count = data.get('count', len(type_index) if isinstance(type_index, list) else 0)
+        columns = ['type'] + list(NUMERIC_COLUMNS) + (['rotation'] if 'rotation' in data else [])
+        for column in columns:
+            if not isinstance(data.get(column), list) or len(data[column]) != count:
+                raise ValueError(f'{name}.{column} must be a list of {count} values')
+
+        layout = cls(with_rotation='rotation' in data)
+        for fixture_type in types:
+            layout.intern(fixture_type)
+        for index, type_id in enumerate(type_index):
+            if isinstance(type_id, bool) or not isinstance(type_id, int) or not 0 <= type_id < len(types):
+                raise ValueError(f'{name}.type[{index}] is not an index into {name}.types')
+        layout.type_index = array('H', type_index)
+        for column, minimum in (('x', None), ('y', None), ('width', 0.01), ('height', 0.01), ('clearance', 0)):
+            values = data[column]
+            for index, value in enumerate(values):
+                _number(value, f'{name}.{column}[{index}]', minimum)
+            setattr(layout, column, array('d', values))
+        if layout.rotation is not None:
+            for index, rotation in enumerate(data['rotation']):
+                if isinstance(rotation, bool) or not isinstance(rotation, int) or rotation not in ROTATIONS:
+                    raise ValueError(f'{name}.rotation[{index}] must be one of {ROTATIONS}')
+            layout.rotation = array('H', data['rotation'])
+        return layout
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Response compression middleware
+Compresses large JSON/text responses with brotli or gzip when no proxy does it for us
+(Railway/Heroku run without nginx.conf), and flush-compresses SSE/NDJSON streams per chunk
+"""
+
+import logging
+import os
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from flask import Flask, Response, request
+
+from response_cache import choose_encoding
+
+# Brotli is optional - either binding works, gzip is always available
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'application/x-ndjson', 'application/ndjson', 'image/svg+xml')
+
+# Streamed bodies we compress chunk by chunk; any other streamed response passes through
+STREAMING_TYPES = ('text/event-stream', 'application/x-ndjson', 'application/ndjson')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # level 11 is for precompressed assets, far too slow per request
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli encoder that flushes after every chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 -> gzip container
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress a chunk and flush so the client can decode it immediately"""
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_bytes(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class ResponseCompressor:
+    """
+    after_request hook that compresses eligible responses.
+
+    A response is left alone when it is below min_size, already has a Content-Encoding
+    (precompiled JSON, static assets), is not a text-like type, opts out with
+    Cache-Control: no-transform, or the client accepts neither brotli nor gzip.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, min_size: Optional[int] = None):
+        self.min_size = min_size if min_size is not None else int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._lock = threading.Lock()
+        self._stats = {
+            'compressed_responses': 0, 'streamed_responses': 0,
+            'skipped_small': 0, 'skipped_encoded': 0, 'skipped_type': 0,
+            'bytes_in': 0, 'bytes_out': 0,
+            'by_encoding': {encoding: 0 for encoding in self.encodings}
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.after_request(self.compress_response)
+
+    def _count(self, key: str, bytes_in: int = 0, bytes_out: int = 0, encoding: Optional[str] = None):
+        with self._lock:
+            self._stats[key] += 1
+            self._stats['bytes_in'] += bytes_in
+            self._stats['bytes_out'] += bytes_out
+            if encoding:
+                self._stats['by_encoding'][encoding] += 1
+
+    def compress_response(self, response: Response) -> Response:
+        if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+        if 'Content-Encoding' in response.headers:
+            self._count('skipped_encoded')
+            return response
+        if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES) \
+                or 'no-transform' in response.headers.get('Cache-Control', ''):
+            self._count('skipped_type')
+            return response
+
+        streaming = response.is_streamed
+        if streaming and response.mimetype not in STREAMING_TYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), self.encodings)
+        if encoding is None:
+            return response
+
+        if streaming:
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            self._count('streamed_responses', encoding=encoding)
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            self._count('skipped_small')
+            return response
+
+        compressed = compress_bytes(body, encoding)
+        if len(compressed) >= len(body):
+            self._count('skipped_small')
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag = response.headers.get('ETag')
+        if etag and etag.endswith('"'):
+            # Different bytes need a different strong validator
+            response.headers['ETag'] = f'{etag[:-1]}-{encoding}"'
+        self._count('compressed_responses', len(body), len(compressed), encoding)
+        return response
+
+    def _stream(self, chunks: Iterable[Any], encoding: str) -> Iterator[bytes]:
+        compressor = StreamCompressor(encoding)
+        bytes_in = bytes_out = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = compressor.compress(chunk)
+                bytes_in += len(chunk)
+                bytes_out += len(data)
+                yield data
+            tail = compressor.finish()
+            bytes_out += len(tail)
+            yield tail
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+            with self._lock:
+                self._stats['bytes_in'] += bytes_in
+                self._stats['bytes_out'] += bytes_out
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, by_encoding=dict(self._stats['by_encoding']))
+        stats['compression_ratio'] = round(stats['bytes_in'] / stats['bytes_out'], 2) if stats['bytes_out'] else None
+        stats['min_size'] = self.min_size
+        return stats
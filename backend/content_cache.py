@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Content-addressed file cache for generated downloads
+Files are named by a hash of everything that determines their bytes, so a repeat request is a
+file send and identical content generated by any worker lands on the same name. A miss streams:
+chunks go to the client and into a temporary file at the same time, and the file is published
+with an atomic rename only once the whole body was produced. Oldest files are evicted past the
+size budget.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bcode_exports'))
+DEFAULT_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+
+def content_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts (dict key order does not matter)"""
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ContentCache:
+    """Generated files by content key, shared through the filesystem by every worker"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0, 'abandoned': 0}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f'{key}{suffix}')
+
+    def get(self, key: str, suffix: str) -> Optional[str]:
+        """Path of the cached file, or None (counted as a miss)"""
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)  # recently used files are evicted last
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return path
+
+    def put(self, key: str, suffix: str, data: bytes) -> str:
+        for _ in self.stream(key, suffix, (data,)):
+            pass
+        return self.path(key, suffix)
+
+    def stream(self, key: str, suffix: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Yield chunks while writing them to the cache. If the consumer stops early or generation
+        fails, the partial file is discarded and nothing is published.
+        """
+        descriptor, temporary = tempfile.mkstemp(prefix=f'.{key[:16]}-', suffix='.part', dir=self.directory)
+        published = False
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(temporary, self.path(key, suffix))
+            published = True
+            self._count('stored')
+        finally:
+            if not published:
+                self._count('abandoned')
+                try:
+                    os.remove(temporary)
+                except FileNotFoundError:
+                    pass
+        self.prune()
+
+    def claim(self, key: str, stale_after: float) -> bool:
+        """
+        Take the build marker for key, visible to every worker. False while another holder's
+        marker is younger than stale_after seconds; an older one was left by a worker that died
+        and is taken over.
+        """
+        path = self.path(key, '.lock')
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(path).st_mtime < stale_after:
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # released meanwhile: try again
+        return False
+
+    def release(self, key: str):
+        self.discard(key, '.lock')
+
+    def discard(self, key: str, suffix: str):
+        try:
+            os.remove(self.path(key, suffix))
+        except FileNotFoundError:
+            pass
+
+    def prune(self) -> int:
+        """Remove least recently used files until the cache fits its budget"""
+        entries, total = [], 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith(('.part', '.lock')):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total -= size
+            except FileNotFoundError:
+                pass
+        if removed:
+            self._count('evicted', removed)
+        return removed
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, directory=self.directory, max_bytes=self.max_bytes)
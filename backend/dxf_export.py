@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+DXF export of generated layouts
+Writes ASCII DXF R12 (AC1009), the revision every CAD package still opens, with one layer per
+kind of geometry: room outline, fixtures, clearance zones, labels and the free-tier watermark.
+Accepts generate_layout() elements (/api/complete-analysis, as element dicts or columnar) and
+step-7 positioned assemblies (/api/enhanced-analysis), one room or many; rooms are laid out side
+by side in model space.
+iter_dxf() yields the file entity by entity so a large multi-room export never sits in memory.
+"""
+
+import math
+from typing import Any, Dict, Iterator, List
+
+from compact_layout import ROTATIONS, CompactLayout, clearance_box, is_columnar
+
+# Bump when the output changes so cached files are regenerated
+DXF_FORMAT_VERSION = 1
+
+WATERMARK_TEXT = 'BCode Pro Free Trial - Not for construction'
+
+MAX_ROOMS = 50
+MAX_ELEMENTS_PER_ROOM = 2000
+
+# Gap between rooms of a multi-room export (metres)
+ROOM_SPACING = 2.0
+
+# name -> (ACI colour, linetype)
+LAYERS = {
+    'ROOM': (7, 'CONTINUOUS'),
+    'FIXTURES': (5, 'CONTINUOUS'),
+    'CLEARANCES': (3, 'DASHED'),
+    'LABELS': (2, 'CONTINUOUS'),
+    'WATERMARK': (8, 'CONTINUOUS'),
+}
+
+
+def _number(value: Any, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'{name} must be a number')
+    return float(value)
+
+
+def _positive(value: Any, name: str) -> float:
+    number = _number(value, name)
+    if number <= 0:
+        raise ValueError(f'{name} must be positive')
+    return number
+
+
+def _front_zone(x: float, y: float, width: float, height: float, depth: float, room_width: float):
+    """Clearance rectangle along the fixture edge that faces into the room"""
+    if y + height / 2 <= room_width / 2:
+        return x, y + height, width, depth
+    return x, y - depth, width, depth
+
+
+def _rotated_zone(x: float, y: float, width: float, height: float, depth: float, rotation: int):
+    x0, y0, x1, y1 = clearance_box(x, y, x + width, y + height, depth, rotation)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _elements_room(elements: List[Dict[str, Any]], width: float) -> List[Dict[str, Any]]:
+    """generate_layout() elements -> fixtures with a front clearance zone (or one set by rotation)"""
+    fixtures = []
+    for index, element in enumerate(elements):
+        if not isinstance(element, dict):
+            raise ValueError(f'layout_elements[{index}] must be an object')
+        name = f'layout_elements[{index}]'
+        x, y = _number(element.get('x'), f'{name}.x'), _number(element.get('y'), f'{name}.y')
+        w, h = _positive(element.get('width'), f'{name}.width'), _positive(element.get('height'), f'{name}.height')
+        rotation = element.get('rotation')
+        if rotation is not None and (isinstance(rotation, bool) or rotation not in ROTATIONS):
+            raise ValueError(f'{name}.rotation must be one of {ROTATIONS}')
+        if rotation in (90, 270):
+            w, h = h, w
+        fixture = {'label': str(element.get('type', 'fixture')), 'rect': (x, y, w, h), 'zones': [], 'circles': []}
+        clearance = element.get('clearance')
+        if clearance:
+            depth = _positive(clearance, f'{name}.clearance')
+            fixture['zones'].append(_front_zone(x, y, w, h, depth, width) if rotation is None
+                                    else _rotated_zone(x, y, w, h, depth, rotation))
+        fixtures.append(fixture)
+    return fixtures
+
+
+def _compact_room(layout: CompactLayout, width: float) -> List[Dict[str, Any]]:
+    """Columnar generate_layout() output -> the same fixtures, read straight from the arrays"""
+    fixtures = []
+    types, type_index, rotations = layout.types, layout.type_index, layout.rotation
+    for index in range(len(layout)):
+        x, y, w, h, depth = (layout.x[index], layout.y[index], layout.width[index], layout.height[index],
+                             layout.clearance[index])
+        rotation = rotations[index] if rotations is not None else None
+        if rotation in (90, 270):
+            w, h = h, w
+        fixture = {'label': types[type_index[index]], 'rect': (x, y, w, h), 'zones': [], 'circles': []}
+        if depth > 0:
+            fixture['zones'].append(_front_zone(x, y, w, h, depth, width) if rotation is None
+                                    else _rotated_zone(x, y, w, h, depth, rotation))
+        fixtures.append(fixture)
+    return fixtures
+
+
+def _assemblies_room(assemblies: List[Dict[str, Any]], width: float) -> List[Dict[str, Any]]:
+    """Step-7 positioned assemblies -> fixtures with approach zone and turning circle"""
+    fixtures = []
+    for index, assembly in enumerate(assemblies):
+        position = assembly.get('position') if isinstance(assembly, dict) else None
+        if not isinstance(position, dict):
+            raise ValueError(f'positioned_assemblies[{index}].position must be an object')
+        name = f'positioned_assemblies[{index}]'
+        x, y = _number(position.get('x'), f'{name}.x'), _number(position.get('y'), f'{name}.y')
+        w, h = _positive(position.get('width'), f'{name}.width'), _positive(position.get('height'), f'{name}.height')
+        fixture = {'label': str(assembly.get('assembly_name') or assembly.get('assembly_code') or 'assembly'),
+                   'rect': (x, y, w, h), 'zones': [], 'circles': []}
+        clearances = position.get('clearances') or {}
+        if clearances.get('approach_space'):
+            depth = _positive(clearances['approach_space'], f'{name}.clearances.approach_space')
+            fixture['zones'].append(_front_zone(x, y, w, h, depth, width))
+        if clearances.get('turning_radius'):
+            # The codes give the turning space as a circle diameter (1.5 m)
+            diameter = _positive(clearances['turning_radius'], f'{name}.clearances.turning_radius')
+            _, zone_y, _, zone_depth = _front_zone(x, y, w, h, diameter, width)
+            fixture['circles'].append((x + w / 2, zone_y + zone_depth / 2, diameter / 2))
+        fixtures.append(fixture)
+    return fixtures
+
+
+def normalize_rooms(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Request body -> validated rooms. Accepts {rooms: [...]} or a single room given as
+    layout_elements / layout_design / positioned_assemblies next to room_dimensions.
+    Raises ValueError on malformed input.
+    """
+    rooms = payload.get('rooms')
+    if rooms is None:
+        layout_design = payload.get('layout_design') or {}
+        rooms = [{
+            'name': payload.get('room_name') or 'Washroom',
+            'room_dimensions': payload.get('room_dimensions') or layout_design.get('room_dimensions'),
+            'layout_elements': payload.get('layout_elements'),
+            'positioned_assemblies': payload.get('positioned_assemblies') or layout_design.get('positioned_assemblies')
+        }]
+    if not isinstance(rooms, list) or not rooms:
+        raise ValueError('rooms must be a non-empty list')
+    if len(rooms) > MAX_ROOMS:
+        raise ValueError(f'At most {MAX_ROOMS} rooms per export')
+
+    normalized = []
+    for index, room in enumerate(rooms):
+        if not isinstance(room, dict):
+            raise ValueError(f'rooms[{index}] must be an object')
+        dimensions = room.get('room_dimensions')
+        if not isinstance(dimensions, dict):
+            raise ValueError(f'rooms[{index}].room_dimensions is required')
+        length = _positive(dimensions.get('length'), f'rooms[{index}].room_dimensions.length')
+        width = _positive(dimensions.get('width'), f'rooms[{index}].room_dimensions.width')
+
+        elements, assemblies = room.get('layout_elements'), room.get('positioned_assemblies')
+        if elements is None and assemblies is None:
+            raise ValueError(f'rooms[{index}] needs layout_elements or positioned_assemblies')
+        items = elements if elements is not None else assemblies
+        if is_columnar(items):
+            if isinstance(items.get('type'), list) and len(items['type']) > MAX_ELEMENTS_PER_ROOM:
+                raise ValueError(f'At most {MAX_ELEMENTS_PER_ROOM} layout elements per room')
+            fixtures = _compact_room(CompactLayout.from_columnar(items), width)
+        else:
+            if not isinstance(items, list):
+                raise ValueError(f'rooms[{index}] layout must be a list')
+            if len(items) > MAX_ELEMENTS_PER_ROOM:
+                raise ValueError(f'At most {MAX_ELEMENTS_PER_ROOM} layout elements per room')
+            fixtures = _elements_room(items, width) if elements is not None else _assemblies_room(items, width)
+        normalized.append({'name': str(room.get('name') or f'Room {index + 1}'),
+                           'length': length, 'width': width, 'fixtures': fixtures})
+    return normalized
+
+
+def _value(value: float) -> str:
+    return f'{value:.4f}'.rstrip('0').rstrip('.') or '0'
+
+
+def _polyline(layer: str, x: float, y: float, width: float, height: float) -> str:
+    """Closed rectangle as an R12 POLYLINE / VERTEX / SEQEND sequence"""
+    vertices = ''.join(f'0\nVERTEX\n8\n{layer}\n10\n{_value(vx)}\n20\n{_value(vy)}\n30\n0\n'
+                       for vx, vy in ((x, y), (x + width, y), (x + width, y + height), (x, y + height)))
+    return f'0\nPOLYLINE\n8\n{layer}\n66\n1\n70\n1\n10\n0\n20\n0\n30\n0\n{vertices}0\nSEQEND\n8\n{layer}\n'
+
+
+def _circle(layer: str, x: float, y: float, radius: float) -> str:
+    return f'0\nCIRCLE\n8\n{layer}\n10\n{_value(x)}\n20\n{_value(y)}\n30\n0\n40\n{_value(radius)}\n'
+
+
+def _text(layer: str, x: float, y: float, height: float, text: str, rotation: float = 0.0) -> str:
+    # DXF text is single-line; group codes are line-delimited
+    text = ' '.join(text.split())
+    return (f'0\nTEXT\n8\n{layer}\n10\n{_value(x)}\n20\n{_value(y)}\n30\n0\n40\n{_value(height)}\n'
+            f'1\n{text}\n50\n{_value(rotation)}\n')
+
+
+def _header(rooms: List[Dict[str, Any]]) -> str:
+    extent_x = sum(room['length'] for room in rooms) + ROOM_SPACING * (len(rooms) - 1)
+    extent_y = max(room['width'] for room in rooms)
+    linetypes = ('0\nLTYPE\n2\nCONTINUOUS\n70\n0\n3\nSolid line\n72\n65\n73\n0\n40\n0\n'
+                 '0\nLTYPE\n2\nDASHED\n70\n0\n3\nDashed __ __ __\n72\n65\n73\n2\n40\n0.3\n49\n0.2\n49\n-0.1\n')
+    layers = ''.join(f'0\nLAYER\n2\n{name}\n70\n0\n62\n{colour}\n6\n{linetype}\n'
+                     for name, (colour, linetype) in LAYERS.items())
+    return ('0\nSECTION\n2\nHEADER\n'
+            '9\n$ACADVER\n1\nAC1009\n'
+            '9\n$INSUNITS\n70\n6\n'  # metres
+            f'9\n$EXTMIN\n10\n0\n20\n0\n30\n0\n'
+            f'9\n$EXTMAX\n10\n{_value(extent_x)}\n20\n{_value(extent_y)}\n30\n0\n'
+            '0\nENDSEC\n'
+            '0\nSECTION\n2\nTABLES\n'
+            f'0\nTABLE\n2\nLTYPE\n70\n2\n{linetypes}0\nENDTAB\n'
+            f'0\nTABLE\n2\nLAYER\n70\n{len(LAYERS)}\n{layers}0\nENDTAB\n'
+            '0\nENDSEC\n')
+
+
+def _room_entities(room: Dict[str, Any], origin_x: float, title: str, watermark: bool) -> Iterator[str]:
+    length, width = room['length'], room['width']
+    yield _polyline('ROOM', origin_x, 0.0, length, width)
+    yield _text('LABELS', origin_x, -0.6, 0.3, f'{title} - {room["name"]} ({_value(length)} x {_value(width)} m)')
+    for fixture in room['fixtures']:
+        x, y, w, h = fixture['rect']
+        yield _polyline('FIXTURES', origin_x + x, y, w, h)
+        yield _text('LABELS', origin_x + x, y + h / 2, min(0.15, w / 4), fixture['label'])
+        for zone_x, zone_y, zone_w, zone_h in fixture['zones']:
+            yield _polyline('CLEARANCES', origin_x + zone_x, zone_y, zone_w, zone_h)
+        for cx, cy, radius in fixture['circles']:
+            yield _circle('CLEARANCES', origin_x + cx, cy, radius)
+    if watermark:
+        angle = math.degrees(math.atan2(width, length))
+        height = max(0.2, min(length, width) / 12)
+        yield _text('WATERMARK', origin_x + length * 0.1, width * 0.1, height, WATERMARK_TEXT, angle)
+
+
+def iter_dxf(rooms: List[Dict[str, Any]], title: str = 'Washroom Layout', watermark: bool = False,
+             chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Normalized rooms -> DXF bytes, in chunks of roughly chunk_size"""
+    def entities() -> Iterator[str]:
+        yield _header(rooms)
+        yield '0\nSECTION\n2\nENTITIES\n'
+        origin_x = 0.0
+        for room in rooms:
+            yield from _room_entities(room, origin_x, title, watermark)
+            origin_x += room['length'] + ROOM_SPACING
+        yield '0\nENDSEC\n0\nEOF\n'
+
+    buffer, size = [], 0
+    for entity in entities():
+        buffer.append(entity)
+        size += len(entity)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('ascii', 'replace')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('ascii', 'replace')
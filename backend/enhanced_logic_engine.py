@@ -5,13 +5,23 @@ Implements the 7-step high-accuracy workflow ensuring complete clause coverage w
 """
 
 import json
-import sqlite3
+import os
 import logging
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Set
 from datetime import datetime
 import re
 from contextlib import contextmanager
 
+from connection_manager import get_connection_manager
+from migrations import migrate
+from code_pack import CodePackHandle
+from change_feed import current_revision
+from clause_classifier import get_classifier
+from assembly_closure import Closure, closures_from_rows, parse_members
+from code_editions import in_force, normalize_as_of
+from code_storage import create_code_repository
+from response_projection import compact_workflow, project, public_clause, required_workflow_steps
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,59 +29,135 @@ logger = logging.getLogger(__name__)
 class EnhancedBuildingCodeEngine:
     """
     High-accuracy building code compliance engine with complete traceability
-    FIXED: Thread-safe database connections using per-request connections
+    Thread-safe: reads borrow pooled query_only connections, writes go through the single writer
     """
     
-    def __init__(self, db_path: str = "database/building_codes.db"):
+    def __init__(self, db_path: str = "database/building_codes.db", code_pack_path: Optional[str] = None,
+                 repository=None):
         self.db_path = db_path
         self.validation_log = []
+        self.db = get_connection_manager(db_path)
+        
+        # Optional mmap'ed code pack shared by all workers (see code_pack.py); not served once
+        # the database's change_log revision has moved past the one it was compiled at
+        code_pack_path = code_pack_path or os.environ.get('CODE_PACK_PATH')
+        self.code_pack = (CodePackHandle(code_pack_path, current_revision=self.source_revision)
+                          if code_pack_path else None)
+        
+        # Fallback for clauses without a stored classification
+        self.clause_classifier = get_classifier()
+        
+        # Code data reads go through a storage adapter (STORAGE_BACKEND: sqlite, memory, postgres)
+        self.repository = repository or create_code_repository(db_path)
         
     @contextmanager
     def get_db_connection(self):
         """
-        Thread-safe database connection context manager
-        Creates a new connection for each request/thread
+        Thread-safe read connection context manager
+        Borrows a query_only connection from the shared reader pool
         """
-        connection = None
         try:
-            connection = sqlite3.connect(self.db_path)
-            connection.row_factory = sqlite3.Row
-            yield connection
+            with self.db.reader() as connection:
+                yield connection
         except Exception as e:
-            if connection:
-                connection.rollback()
             logger.error(f"❌ Database connection error: {e}")
             raise e
-        finally:
-            if connection:
-                connection.close()
+    
+    def source_revision(self) -> int:
+        with self.db.reader() as connection:
+            return current_revision(connection)
+    
+    def current_code_pack(self):
+        """The mapped code pack, or None to read from SQLite"""
+        return self.code_pack.get() if self.code_pack is not None else None
+    
+    # Code data access: served from the code pack when one is mapped, else the code repository
+    def fetch_context_rules(self, codes, jurisdiction: str, as_of: Optional[str] = None) -> List[Any]:
+        """Rules for a jurisdiction (and 'ALL') in force on `as_of` (default today), highest priority first"""
+        as_of = as_of or datetime.now().date().isoformat()
+        pack = self.current_code_pack()
+        if pack is not None:
+            rules = pack.table("context_logic_rule")
+            rows = sorted(set(rules.lookup("jurisdiction", jurisdiction)) | set(rules.lookup("jurisdiction", "ALL")))
+            return [rule for rule in (rules.row(i) for i in rows) if in_force(rule, as_of)]
+        
+        return codes.rules_for(jurisdiction, as_of)
+    
+    def fetch_assembly(self, codes, assembly_code: str):
+        pack = self.current_code_pack()
+        if pack is not None:
+            return pack.table("component_assembly").get("assembly_code", assembly_code)
+        
+        return codes.assembly(assembly_code)
+    
+    def fetch_assembly_closure(self, codes, assembly: Any) -> Closure:
+        """Transitive components and nested assemblies of an assembly row"""
+        assembly_code = assembly["assembly_code"]
+        closure = None
+        pack = self.current_code_pack()
+        if pack is not None and "assembly_component_closure" in pack.tables:
+            # Decoded once per pack, as the repository decodes once per revision
+            closures = pack.memo("assembly_closures", lambda: closures_from_rows(
+                (row["assembly_code"], row["member_code"], row["member_type"])
+                for row in pack.table("assembly_component_closure")))
+            closure = closures.get(assembly_code)
+        else:
+            closure = codes.assembly_closure(assembly_code)
+        
+        # Closure not rebuilt since the row was written outside the importer: direct members only
+        return closure or Closure(tuple(parse_members(assembly["component_ids"], assembly_code)), ())
+    
+    def fetch_component_clauses(self, codes, component_id: str, jurisdiction: str,
+                                as_of: Optional[str] = None) -> List[Any]:
+        """Clauses in force on `as_of` (default today) whose applies_to_components mentions the component"""
+        as_of = as_of or datetime.now().date().isoformat()
+        pack = self.current_code_pack()
+        if pack is not None:
+            clauses = pack.table("building_code_clause")
+            rows = pack.component_clause_rows(component_id)
+            if rows is None:
+                # Code not seen at compile time: scan the jurisdiction's clauses
+                candidates = [clause for clause in clauses.find("jurisdiction", jurisdiction)
+                              if clause.contains("applies_to_components", component_id)]
+            else:
+                in_jurisdiction = clauses.row_set("jurisdiction", jurisdiction)
+                candidates = [clauses.row(i) for i in rows if i in in_jurisdiction]
+            return [clause for clause in candidates if in_force(clause, as_of)]
+        
+        return codes.clauses_for_component(component_id, jurisdiction, as_of)
+    
+    def fetch_clause(self, codes, clause_code: str):
+        pack = self.current_code_pack()
+        if pack is not None:
+            return pack.table("building_code_clause").get("clause_code", clause_code)
+        
+        return codes.clause(clause_code)
+    
+    @contextmanager
+    def get_db_writer(self):
+        """Serialized write transaction on the shared writer connection"""
+        with self.db.writer() as connection:
+            yield connection
     
     def initialize_enhanced_database(self):
-        """Initialize the enhanced database with schema and sample data"""
+        """Initialize the enhanced database with schema and sample data (versioned migrations)"""
         try:
-            with self.get_db_connection() as connection:
-                # Execute schema
-                with open('database/enhanced_schema.sql', 'r') as f:
-                    schema_sql = f.read()
-                connection.executescript(schema_sql)
-                
-                # Execute sample data
-                with open('database/sample_data.sql', 'r') as f:
-                    data_sql = f.read()
-                connection.executescript(data_sql)
-                
-                connection.commit()
-                logger.info("✅ Enhanced database initialized successfully")
-                return True
+            migrate(self.db_path)
+            logger.info("✅ Enhanced database initialized successfully")
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Database initialization failed: {e}")
             return False
     
-    def process_complete_workflow(self, user_inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def process_complete_workflow(self, user_inputs: Dict[str, Any],
+                                  steps: Optional[Set[int]] = None) -> Dict[str, Any]:
         """
         Execute the complete 7-step high-accuracy workflow
+        `steps` limits execution to those steps (callers include dependencies, see
+        response_projection.required_workflow_steps); skipped steps are absent from the result
         """
+        steps = set(range(1, 8)) if steps is None else set(steps)
         workflow_results = {
             "workflow_id": f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
             "timestamp": datetime.now().isoformat(),
@@ -83,86 +169,96 @@ class EnhancedBuildingCodeEngine:
         
         try:
             # STEP 1: Enhanced User Input Processing
-            logger.info("🔄 STEP 1: Processing user inputs...")
-            normalized_inputs = self.process_user_inputs(user_inputs)
-            workflow_results["steps"]["step_1"] = {
-                "name": "User Input Processing",
-                "status": "completed",
-                "data": normalized_inputs
-            }
+            if 1 in steps:
+                logger.info("🔄 STEP 1: Processing user inputs...")
+                normalized_inputs = self.process_user_inputs(user_inputs)
+                workflow_results["steps"]["step_1"] = {
+                    "name": "User Input Processing",
+                    "status": "completed",
+                    "data": normalized_inputs
+                }
             
             # STEP 2: Context Logic Rule Matching
-            logger.info("🔄 STEP 2: Matching context logic rules...")
-            applicable_rules = self.match_context_logic_rules(normalized_inputs)
-            workflow_results["steps"]["step_2"] = {
-                "name": "Context Logic Rule Matching",
-                "status": "completed",
-                "data": applicable_rules,
-                "rules_found": len(applicable_rules)
-            }
+            if 2 in steps:
+                logger.info("🔄 STEP 2: Matching context logic rules...")
+                applicable_rules = self.match_context_logic_rules(normalized_inputs)
+                workflow_results["steps"]["step_2"] = {
+                    "name": "Context Logic Rule Matching",
+                    "status": "completed",
+                    "data": applicable_rules,
+                    "rules_found": len(applicable_rules)
+                }
             
             # STEP 3: Component Assembly Expansion
-            logger.info("🔄 STEP 3: Expanding component assemblies...")
-            component_expansion = self.expand_component_assemblies(applicable_rules)
-            workflow_results["steps"]["step_3"] = {
-                "name": "Component Assembly Expansion",
-                "status": "completed",
-                "data": component_expansion
-            }
+            if 3 in steps:
+                logger.info("🔄 STEP 3: Expanding component assemblies...")
+                component_expansion = self.expand_component_assemblies(applicable_rules)
+                workflow_results["steps"]["step_3"] = {
+                    "name": "Component Assembly Expansion",
+                    "status": "completed",
+                    "data": component_expansion
+                }
             
             # STEP 4: Building Code Clause Collection
-            logger.info("🔄 STEP 4: Collecting building code clauses...")
-            clause_collection = self.collect_building_code_clauses(
-                component_expansion, applicable_rules, normalized_inputs["jurisdiction"]
-            )
-            workflow_results["steps"]["step_4"] = {
-                "name": "Building Code Clause Collection",
-                "status": "completed",
-                "data": clause_collection
-            }
+            if 4 in steps:
+                logger.info("🔄 STEP 4: Collecting building code clauses...")
+                clause_collection = self.collect_building_code_clauses(
+                    component_expansion, applicable_rules, normalized_inputs["jurisdiction"],
+                    normalized_inputs["as_of"]
+                )
+                workflow_results["steps"]["step_4"] = {
+                    "name": "Building Code Clause Collection",
+                    "status": "completed",
+                    "data": clause_collection
+                }
             
             # STEP 5: Logic Validation Pass
-            logger.info("🔄 STEP 5: Validating logic completeness...")
-            validation_results = self.validate_logic_completeness(
-                component_expansion, clause_collection, applicable_rules
-            )
-            workflow_results["steps"]["step_5"] = {
-                "name": "Logic Validation Pass",
-                "status": "completed",
-                "data": validation_results
-            }
+            if 5 in steps:
+                logger.info("🔄 STEP 5: Validating logic completeness...")
+                validation_results = self.validate_logic_completeness(
+                    component_expansion, clause_collection, applicable_rules
+                )
+                workflow_results["steps"]["step_5"] = {
+                    "name": "Logic Validation Pass",
+                    "status": "completed",
+                    "data": validation_results
+                }
             
             # STEP 6: Generate Final Compliance Checklist
-            logger.info("🔄 STEP 6: Generating compliance checklist...")
-            compliance_checklist = self.generate_compliance_checklist(
-                clause_collection, component_expansion, validation_results
-            )
-            workflow_results["steps"]["step_6"] = {
-                "name": "Compliance Checklist Generation",
-                "status": "completed",
-                "data": compliance_checklist
-            }
+            if 6 in steps:
+                logger.info("🔄 STEP 6: Generating compliance checklist...")
+                compliance_checklist = self.generate_compliance_checklist(
+                    clause_collection, component_expansion, validation_results
+                )
+                workflow_results["steps"]["step_6"] = {
+                    "name": "Compliance Checklist Generation",
+                    "status": "completed",
+                    "data": compliance_checklist
+                }
             
             # STEP 7: Enhanced 2D Layout Generation
-            logger.info("🔄 STEP 7: Generating 2D layout...")
-            layout_data = self.generate_2d_layout_with_compliance(
-                component_expansion, normalized_inputs["room_dimensions"], clause_collection
-            )
-            workflow_results["steps"]["step_7"] = {
-                "name": "2D Layout Generation",
-                "status": "completed",
-                "data": layout_data
-            }
-            
-            # Compile final results
-            workflow_results["final_results"] = {
-                "compliance_checklist": compliance_checklist,
-                "layout_design": layout_data,
-                "validation_summary": validation_results,
-                "traceability_complete": validation_results.get("is_complete", False)
-            }
+            if 7 in steps:
+                logger.info("🔄 STEP 7: Generating 2D layout...")
+                layout_data = self.generate_2d_layout_with_compliance(
+                    component_expansion, normalized_inputs["room_dimensions"], clause_collection
+                )
+                workflow_results["steps"]["step_7"] = {
+                    "name": "2D Layout Generation",
+                    "status": "completed",
+                    "data": layout_data
+                }
             
-            workflow_results["validation"] = validation_results
+            # Compile final results from whatever was computed
+            final_results = {}
+            if 6 in steps:
+                final_results["compliance_checklist"] = compliance_checklist
+            if 7 in steps:
+                final_results["layout_design"] = layout_data
+            if 5 in steps:
+                final_results["validation_summary"] = validation_results
+                final_results["traceability_complete"] = validation_results.get("is_complete", False)
+                workflow_results["validation"] = validation_results
+            workflow_results["final_results"] = final_results
             
             logger.info("✅ Complete workflow executed successfully")
             return workflow_results
@@ -172,6 +268,26 @@ class EnhancedBuildingCodeEngine:
             workflow_results["error"] = str(e)
             return workflow_results
     
+    def process_enhanced_workflow(self, user_inputs: Dict[str, Any],
+                                  fields: Optional[List[Tuple[str, ...]]] = None,
+                                  compact: bool = False) -> Dict[str, Any]:
+        """
+        Workflow for API responses: runs only the steps the requested fields need,
+        projects the result onto those fields and optionally deduplicates it
+        """
+        workflow_results = self.process_complete_workflow(
+            user_inputs, steps=required_workflow_steps(fields)
+        )
+        response = project(workflow_results, fields)
+        if "error" in workflow_results:
+            response["error"] = workflow_results["error"]
+        
+        if compact:
+            clauses = workflow_results["steps"].get("step_4", {}).get("data", {}).get("clauses", [])
+            response = compact_workflow(response, {clause["clause_code"]: clause for clause in clauses})
+        
+        return response
+    
     def process_user_inputs(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         STEP 1: Enhanced input processing with validation and normalization
@@ -189,7 +305,10 @@ class EnhancedBuildingCodeEngine:
             "jurisdiction": user_data.get("jurisdiction", "NBC"),
             "special_requirements": user_data.get("special_requirements", []),
             "fixture_preferences": user_data.get("fixture_preferences", {}),
-            "building_type": user_data.get("building_type", "office").lower()
+            "building_type": user_data.get("building_type", "office").lower(),
+            # Code in force on the permit date; defaults to today's code
+            "as_of": normalize_as_of(user_data.get("as_of") or user_data.get("permit_date"))
+                     or datetime.now().date().isoformat()
         }
         
         # Calculate derived values
@@ -220,17 +339,11 @@ class EnhancedBuildingCodeEngine:
         """
         applicable_rules = []
         
-        with self.get_db_connection() as connection:
-            cursor = connection.cursor()
-            
-            # Query all rules for the jurisdiction
-            cursor.execute("""
-                SELECT * FROM context_logic_rule 
-                WHERE jurisdiction = ? OR jurisdiction = 'ALL'
-                ORDER BY priority DESC
-            """, (normalized_inputs["jurisdiction"],))
-            
-            all_rules = cursor.fetchall()
+        with self.repository.session() as codes:
+            # Rules for the jurisdiction in force on the analysis date
+            all_rules = self.fetch_context_rules(
+                codes, normalized_inputs["jurisdiction"], normalized_inputs.get("as_of")
+            )
             
             for rule in all_rules:
                 # Parse trigger condition JSON
@@ -316,45 +429,43 @@ class EnhancedBuildingCodeEngine:
     def expand_component_assemblies(self, applicable_rules: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         STEP 3: Expand all required assemblies into individual components
-        Ensures complete component coverage
+        Ensures complete component coverage, including components of nested assemblies
         """
         all_required_components = set()
         all_required_assemblies = []
         assembly_expansion_log = []
         
-        with self.get_db_connection() as connection:
-            cursor = connection.cursor()
-            
-            # Collect all required assemblies
-            for rule_match in applicable_rules:
-                for assembly_id in rule_match["required_assemblies"]:
-                    # Get assembly details
-                    cursor.execute("""
-                        SELECT * FROM component_assembly WHERE assembly_code = ?
-                    """, (assembly_id,))
-                    assembly = cursor.fetchone()
+        # Each distinct assembly is expanded once, however many rules require it
+        requiring_rules: Dict[str, List[str]] = {}
+        for rule_match in applicable_rules:
+            for assembly_id in rule_match["required_assemblies"]:
+                requiring_rules.setdefault(assembly_id, []).append(rule_match["rule"]["rule_name"])
+        
+        with self.repository.session() as codes:
+            for assembly_id, rule_names in requiring_rules.items():
+                # Get assembly details
+                assembly = self.fetch_assembly(codes, assembly_id)
+                
+                if assembly:
+                    all_required_assemblies.append(dict(assembly))
                     
-                    if assembly:
-                        assembly_dict = dict(assembly)
-                        all_required_assemblies.append(assembly_dict)
-                        
-                        # Expand to individual components
-                        component_ids = json.loads(assembly["component_ids"])
-                        for component_id in component_ids:
-                            all_required_components.add(component_id)
-                        
-                        assembly_expansion_log.append({
-                            "assembly": assembly["name"],
-                            "assembly_code": assembly["assembly_code"],
-                            "components": component_ids,
-                            "reason": f"Required by rule: {rule_match['rule']['rule_name']}"
-                        })
-            
-            # Add directly required components
-            for rule_match in applicable_rules:
-                for component_id in rule_match["required_components"]:
-                    all_required_components.add(component_id)
-            
+                    # Expand to individual components (precomputed transitive closure)
+                    closure = self.fetch_assembly_closure(codes, assembly)
+                    all_required_components.update(closure.components)
+                    
+                    assembly_expansion_log.append({
+                        "assembly": assembly["name"],
+                        "assembly_code": assembly["assembly_code"],
+                        "components": list(closure.components),
+                        "nested_assemblies": list(closure.nested_assemblies),
+                        "reason": f"Required by rule: {', '.join(dict.fromkeys(rule_names))}"
+                    })
+        
+        # Add directly required components
+        for rule_match in applicable_rules:
+            for component_id in rule_match["required_components"]:
+                all_required_components.add(component_id)
+        
         return {
             "required_components": list(all_required_components),
             "required_assemblies": all_required_assemblies,
@@ -363,7 +474,7 @@ class EnhancedBuildingCodeEngine:
     
     def collect_building_code_clauses(self, component_expansion: Dict[str, Any], 
                                     applicable_rules: List[Dict[str, Any]], 
-                                    jurisdiction: str) -> Dict[str, Any]:
+                                    jurisdiction: str, as_of: Optional[str] = None) -> Dict[str, Any]:
         """
         STEP 4: Collect all building code clauses related to components and rules
         Ensures complete clause coverage with traceability
@@ -371,9 +482,7 @@ class EnhancedBuildingCodeEngine:
         all_clause_ids = set()
         clause_collection_log = []
         
-        with self.get_db_connection() as connection:
-            cursor = connection.cursor()
-            
+        with self.repository.session() as codes:
             # 1. Clauses directly required by rules
             for rule_match in applicable_rules:
                 for clause_id in rule_match["required_clauses"]:
@@ -387,13 +496,7 @@ class EnhancedBuildingCodeEngine:
             
             # 2. Clauses linked to required components
             for component_id in component_expansion["required_components"]:
-                cursor.execute("""
-                    SELECT bcc.* FROM building_code_clause bcc
-                    WHERE bcc.applies_to_components LIKE ?
-                    AND bcc.jurisdiction = ?
-                """, (f'%{component_id}%', jurisdiction))
-                
-                component_clauses = cursor.fetchall()
+                component_clauses = self.fetch_component_clauses(codes, component_id, jurisdiction, as_of)
                 for clause in component_clauses:
                     all_clause_ids.add(clause["clause_code"])
                     clause_collection_log.append({
@@ -406,12 +509,9 @@ class EnhancedBuildingCodeEngine:
             # 3. Get full clause details
             clause_details = []
             for clause_id in all_clause_ids:
-                cursor.execute("""
-                    SELECT * FROM building_code_clause WHERE clause_code = ?
-                """, (clause_id,))
-                clause = cursor.fetchone()
+                clause = self.fetch_clause(codes, clause_id)
                 if clause:
-                    clause_details.append(dict(clause))
+                    clause_details.append(public_clause(clause))
         
         return {
             "clauses": clause_details,
@@ -576,40 +676,37 @@ class EnhancedBuildingCodeEngine:
         
         x_pos, y_pos = 1.0, 1.0  # Start position
         
-        with self.get_db_connection() as connection:
-            cursor = connection.cursor()
-            
-            for assembly in component_expansion["required_assemblies"]:
-                try:
-                    footprint = json.loads(assembly["total_footprint"])
-                    circulation = json.loads(assembly["circulation_space"])
-                    
-                    position = {
-                        "x": x_pos,
-                        "y": y_pos,
-                        "width": footprint.get("width", 1.2),
-                        "height": footprint.get("depth", 1.8),
-                        "clearances": circulation
-                    }
-                    
-                    positioned_assemblies.append({
-                        "assembly_code": assembly["assembly_code"],
-                        "assembly_name": assembly["name"],
-                        "position": position,
-                        "compliance_status": "compliant"  # Simplified for now
-                    })
-                    
-                    # Update position for next assembly
-                    x_pos += footprint.get("width", 1.2) + circulation.get("approach_space", 0.6)
+        for assembly in component_expansion["required_assemblies"]:
+            try:
+                footprint = json.loads(assembly["total_footprint"])
+                circulation = json.loads(assembly["circulation_space"])
+                
+                position = {
+                    "x": x_pos,
+                    "y": y_pos,
+                    "width": footprint.get("width", 1.2),
+                    "height": footprint.get("depth", 1.8),
+                    "clearances": circulation
+                }
+                
+                positioned_assemblies.append({
+                    "assembly_code": assembly["assembly_code"],
+                    "assembly_name": assembly["name"],
+                    "position": position,
+                    "compliance_status": "compliant"  # Simplified for now
+                })
+                
+                # Update position for next assembly
+                x_pos += footprint.get("width", 1.2) + circulation.get("approach_space", 0.6)
+                
+                # Wrap to next row if needed
+                if x_pos > room_dimensions["length"] - 2.0:
+                    x_pos = 1.0
+                    y_pos += footprint.get("depth", 1.8) + circulation.get("approach_space", 0.6)
                     
-                    # Wrap to next row if needed
-                    if x_pos > room_dimensions["length"] - 2.0:
-                        x_pos = 1.0
-                        y_pos += footprint.get("depth", 1.8) + circulation.get("approach_space", 0.6)
-                        
-                except (json.JSONDecodeError, KeyError) as e:
-                    logger.warning(f"⚠️ Error processing assembly {assembly.get('assembly_code', 'unknown')}: {e}")
-                    continue
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.warning(f"⚠️ Error processing assembly {assembly.get('assembly_code', 'unknown')}: {e}")
+                continue
         
         layout_data = {
             "room_dimensions": room_dimensions,
@@ -624,19 +721,8 @@ class EnhancedBuildingCodeEngine:
     
     # Helper methods
     def determine_clause_category(self, clause: Dict[str, Any]) -> str:
-        """Determine the category of a building code clause"""
-        clause_text = clause.get("clause_title", "").lower()
-        
-        if "water closet" in clause_text or "toilet" in clause_text:
-            return "fixture_count"
-        elif "accessible" in clause_text or "grab bar" in clause_text:
-            return "accessibility"
-        elif "lavatory" in clause_text or "sink" in clause_text:
-            return "plumbing_fixtures"
-        elif "door" in clause_text or "clearance" in clause_text:
-            return "spatial_requirements"
-        else:
-            return "general_requirements"
+        """Category stored at import, classified on the fly for rows that predate it"""
+        return clause.get("clause_category") or self.clause_classifier.category(clause)
     
     def format_category_title(self, category: str) -> str:
         """Format category name for display"""
@@ -661,12 +747,5 @@ class EnhancedBuildingCodeEngine:
         return "Required by building code"
     
     def determine_verification_method(self, clause: Dict[str, Any]) -> str:
-        """Determine how to verify compliance with this clause"""
-        clause_text = clause.get("clause_text_en", "").lower()
-        
-        if "dimension" in clause_text or "clearance" in clause_text:
-            return "measurement"
-        elif "provided" in clause_text or "shall be" in clause_text:
-            return "visual_inspection"
-        else:
-            return "documentation_review" 
\ No newline at end of file
+        """How to verify compliance: stored at import, classified on the fly as a fallback"""
+        return clause.get("verification_method") or self.clause_classifier.verification_method(clause) 
\ No newline at end of file
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Idempotent analysis requests
+Replays the stored response for a repeated Idempotency-Key, or for an identical payload from
+the same user within a short window, without recomputing or recording usage again.
+Concurrent duplicates wait for the in-flight request instead of starting their own.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Response, jsonify, make_response, request, session
+
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+# Headers that describe the stored body; everything else is recomputed per response
+REPLAYED_HEADERS = ('Content-Type', 'Cache-Control', 'ETag')
+
+
+class _Entry:
+    """One request: in flight until `done` is set, then holds the response to replay"""
+
+    __slots__ = ('fingerprint', 'ttl', 'done', 'response', 'expires_at')
+
+    def __init__(self, fingerprint: str, ttl: float):
+        self.fingerprint = fingerprint
+        self.ttl = ttl
+        self.done = threading.Event()
+        self.response: Optional[Tuple[int, Dict[str, str], bytes]] = None
+        self.expires_at = time.monotonic() + ttl
+
+
+class IdempotencyStore:
+    """
+    In-process store keyed by (user, key).
+
+    Content-hash entries live for `window_seconds` (double-clicks and retries); explicit
+    Idempotency-Key entries live for `key_ttl_seconds`. Only 2xx responses are kept, so a
+    failed attempt can be retried with the same key. Each gunicorn worker has its own store.
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None, key_ttl_seconds: Optional[float] = None,
+                 max_entries: int = 10000, wait_timeout: float = 60.0):
+        self.window_seconds = window_seconds if window_seconds is not None else \
+            float(os.environ.get('IDEMPOTENCY_WINDOW_SECONDS', '30'))
+        self.key_ttl_seconds = key_ttl_seconds if key_ttl_seconds is not None else \
+            float(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', '86400'))
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries: 'OrderedDict[Tuple, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'computed': 0, 'replayed': 0, 'waited': 0, 'conflicts': 0}
+        self._purged_at = 0.0
+
+    def _purge(self, now: float):
+        """Drop expired entries (and the oldest, past max_entries); called with the lock held"""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if now - self._purged_at < 1.0:
+            return
+        self._purged_at = now
+        expired = [key for key, entry in self._entries.items()
+                   if entry.done.is_set() and entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def begin(self, key: Tuple, fingerprint: str, ttl: float) -> Tuple[_Entry, bool]:
+        """Existing live entry for key, or a new one owned by the caller (owner=True)"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(key)
+            if entry is not None and (not entry.done.is_set() or entry.expires_at > now):
+                return entry, False
+            entry = _Entry(fingerprint, ttl)
+            self._entries[key] = entry
+            return entry, True
+
+    def complete(self, key: Tuple, entry: _Entry, response: Optional[Response]):
+        """Store a successful response, or forget the attempt; wakes any waiters either way"""
+        with self._lock:
+            if response is not None and 200 <= response.status_code < 300:
+                headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+                entry.response = (response.status_code, headers, response.get_data())
+                # The window runs from when the response became available
+                entry.expires_at = time.monotonic() + entry.ttl
+                self._stats['computed'] += 1
+            elif self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries),
+                        window_seconds=self.window_seconds, key_ttl_seconds=self.key_ttl_seconds)
+
+
+def request_fingerprint() -> str:
+    """sha256 of method, path and the canonical JSON body (key order does not matter)"""
+    payload = request.get_json(silent=True)
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8') \
+        if payload is not None else request.get_data()
+    digest = hashlib.sha256(f'{request.method} {request.full_path}\n'.encode('utf-8'))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def idempotent(store: IdempotencyStore):
+    """
+    Decorator for POST endpoints; apply it outside subscription_required so a duplicate
+    is answered from the store instead of being re-checked against the quota.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = session.get('user_id')
+            if user_id is None:
+                return f(*args, **kwargs)
+
+            fingerprint = request_fingerprint()
+            idempotency_key = request.headers.get('Idempotency-Key', '').strip()
+            if idempotency_key:
+                key, ttl = (user_id, request.path, 'key', idempotency_key), store.key_ttl_seconds
+            else:
+                key, ttl = (user_id, 'hash', fingerprint), store.window_seconds
+
+            while True:
+                entry, owner = store.begin(key, fingerprint, ttl)
+                if owner:
+                    break
+
+                if entry.fingerprint != fingerprint:
+                    store.count('conflicts')
+                    return jsonify({
+                        'success': False,
+                        'error': 'Idempotency-Key was already used with a different request body'
+                    }), 422
+
+                if not entry.done.is_set():
+                    store.count('waited')
+                    if not entry.done.wait(store.wait_timeout):
+                        return jsonify({
+                            'success': False,
+                            'error': 'An identical request is still being processed'
+                        }), 409
+
+                if entry.response is not None:
+                    store.count('replayed')
+                    status, headers, body = entry.response
+                    replay = Response(body, status=status, headers=headers)
+                    replay.headers[REPLAY_HEADER] = 'true'
+                    return replay
+                # The original attempt failed and was forgotten: compute it ourselves
+
+            response = None
+            try:
+                response = make_response(f(*args, **kwargs))
+                return response
+            finally:
+                store.complete(key, entry, response)
+        return decorated_function
+    return decorator
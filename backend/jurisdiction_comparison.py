@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Side-by-side jurisdiction comparison
+Runs the fixture calculation and the 7-step workflow for one project under several
+jurisdictions at once and diffs the results. Input normalization runs once; assembly expansion
+and layout depend only on the matched rules and assemblies, so jurisdictions that resolve to
+the same ones share a single computation. The per-jurisdiction steps run on a shared pool, so
+a four-jurisdiction comparison costs about one workflow of wall time.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JURISDICTIONS = ('NBC', 'Alberta', 'Ontario', 'BC')
+MAX_JURISDICTIONS = 8
+
+FIXTURE_FIELDS = ('water_closets_male', 'water_closets_female', 'urinals', 'lavatories',
+                  'accessible_stalls', 'total_fixtures')
+
+COMPARISON_WORKERS = int(os.environ.get('COMPARISON_WORKERS', '8'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide pool shared by all comparison requests"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=COMPARISON_WORKERS, thread_name_prefix='compare')
+        return _executor
+
+
+def parse_jurisdictions(value: Any) -> List[str]:
+    """['NBC', 'Ontario'] or 'NBC,Ontario' -> de-duplicated list; ValueError when unusable"""
+    if value in (None, '', []):
+        return list(DEFAULT_JURISDICTIONS)
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+        raise ValueError('jurisdictions must be a list of names')
+    jurisdictions = list(dict.fromkeys(item.strip() for item in value if item.strip()))
+    if not jurisdictions:
+        raise ValueError('No jurisdictions given')
+    if len(jurisdictions) > MAX_JURISDICTIONS:
+        raise ValueError(f'At most {MAX_JURISDICTIONS} jurisdictions per comparison')
+    return jurisdictions
+
+
+class _SharedSteps:
+    """Memoizes the jurisdiction-independent steps for one comparison"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._expansions: Dict[Any, Any] = {}
+        self._layouts: Dict[Any, Any] = {}
+        self.hits = {'step_3': 0, 'step_7': 0}
+
+    def _memo(self, store: Dict, step: str, key: Any, build: Callable[[], Any]):
+        # The first thread to ask builds; concurrent askers wait for its result
+        with self._lock:
+            entry = store.get(key)
+            owner = entry is None
+            if owner:
+                entry = store[key] = {'ready': threading.Event()}
+            else:
+                self.hits[step] += 1
+        if owner:
+            try:
+                entry['value'] = build()
+            except Exception as e:
+                entry['error'] = e
+            finally:
+                entry['ready'].set()
+        entry['ready'].wait()
+        if 'error' in entry:
+            raise entry['error']
+        return entry['value']
+
+    def expansion(self, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Step 3 reads only the assemblies and components the matched rules name
+        key = tuple((match['rule']['rule_code'], tuple(match['required_assemblies']),
+                     tuple(match['required_components'])) for match in rules)
+        return self._memo(self._expansions, 'step_3', key,
+                          lambda: self.engine.expand_component_assemblies(rules))
+
+    def layout(self, expansion: Dict[str, Any], room_dimensions: Dict[str, float],
+               clauses: Dict[str, Any]) -> Dict[str, Any]:
+        # Step 7 places assemblies; clauses are not consulted
+        key = tuple(assembly['assembly_code'] for assembly in expansion['required_assemblies'])
+        return self._memo(self._layouts, 'step_7', key,
+                          lambda: self.engine.generate_2d_layout_with_compliance(expansion, room_dimensions, clauses))
+
+
+class JurisdictionComparison:
+    """
+    compare(inputs, jurisdictions) -> per-jurisdiction results plus a structured diff.
+    `fixture_calculator(occupancy_load, building_type, jurisdiction, accessibility_level)` is the
+    fixture-count function (BuildingCodeAPI.get_fixture_requirements in the app).
+    """
+
+    def __init__(self, engine, fixture_calculator: Callable[..., Dict[str, Any]],
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.engine = engine
+        self.fixture_calculator = fixture_calculator
+        self.executor = executor
+
+    def _run_one(self, normalized: Dict[str, Any], inputs: Dict[str, Any], jurisdiction: str,
+                 shared: _SharedSteps, include_details: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        engine = self.engine
+        normalized = dict(normalized, jurisdiction=jurisdiction)
+
+        fixtures = self.fixture_calculator(
+            normalized['total_occupants'], normalized['building_type'], jurisdiction,
+            inputs.get('accessibility_level', 'basic')
+        )
+        rules = engine.match_context_logic_rules(normalized)
+        expansion = shared.expansion(rules)
+        clauses = engine.collect_building_code_clauses(expansion, rules, jurisdiction, normalized['as_of'])
+        validation = engine.validate_logic_completeness(expansion, clauses, rules)
+        checklist = engine.generate_compliance_checklist(clauses, expansion, validation)
+
+        result = {
+            'jurisdiction': jurisdiction,
+            'fixture_requirements': fixtures,
+            'rules': [match['rule']['rule_code'] for match in rules],
+            'assemblies': [assembly['assembly_code'] for assembly in expansion['required_assemblies']],
+            'components': sorted(expansion['required_components']),
+            'clauses': [{
+                'clause_code': clause['clause_code'],
+                'clause_number': clause['clause_number'],
+                'title': clause['clause_title'],
+                'category': engine.determine_clause_category(clause),
+                'enforcement_level': clause['enforcement_level']
+            } for clause in sorted(clauses['clauses'], key=lambda c: c['clause_code'])],
+            'checklist_summary': checklist['project_info'],
+            'is_complete': validation['is_complete']
+        }
+        if include_details:
+            result['compliance_checklist'] = checklist
+            result['layout_design'] = shared.layout(expansion, normalized['room_dimensions'], clauses)
+        result['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def compare(self, inputs: Dict[str, Any], jurisdictions: Any = None,
+                include_details: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        jurisdictions = parse_jurisdictions(jurisdictions)
+
+        # Step 1 is jurisdiction-independent apart from the field itself
+        normalized = self.engine.process_user_inputs(inputs)
+        shared = _SharedSteps(self.engine)
+
+        executor = self.executor or get_executor()
+        futures = {jurisdiction: executor.submit(self._run_one, normalized, inputs, jurisdiction,
+                                                 shared, include_details)
+                   for jurisdiction in jurisdictions}
+        results = {}
+        for jurisdiction, future in futures.items():
+            try:
+                results[jurisdiction] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Comparison failed for {jurisdiction}: {e}")
+                results[jurisdiction] = {'jurisdiction': jurisdiction, 'error': str(e)}
+
+        completed = [results[j] for j in jurisdictions if 'error' not in results[j]]
+        return {
+            'jurisdictions': jurisdictions,
+            'as_of': normalized['as_of'],
+            'project_parameters': {key: normalized[key] for key in
+                                   ('building_type', 'total_occupants', 'accessibility_level', 'room_dimensions')},
+            'results': results,
+            'diff': diff_results(completed),
+            'timing': {
+                'total_ms': round((time.perf_counter() - started) * 1000, 3),
+                'per_jurisdiction_ms': {r['jurisdiction']: r['duration_ms'] for r in completed},
+                'shared_step_hits': dict(shared.hits)
+            }
+        }
+
+
+def _set_diff(results: List[Dict[str, Any]], field: str) -> Dict[str, Any]:
+    """Items every jurisdiction has, and what each has that not all others do"""
+    sets = {r['jurisdiction']: set(r[field]) for r in results}
+    common = set.intersection(*sets.values()) if sets else set()
+    return {
+        'common': sorted(common),
+        'only_in': {j: sorted(items - common) for j, items in sets.items() if items - common}
+    }
+
+
+def diff_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Structured differences between completed per-jurisdiction results"""
+    fixtures = {}
+    for field in FIXTURE_FIELDS:
+        values = {r['jurisdiction']: r['fixture_requirements'].get(field) for r in results}
+        numbers = [v for v in values.values() if isinstance(v, (int, float))]
+        fixtures[field] = {
+            'values': values,
+            'differs': len(set(values.values())) > 1,
+            # The strictest code asks for the most fixtures
+            'strictest': sorted(j for j, v in values.items() if numbers and v == max(numbers))
+        }
+
+    # Clause codes are jurisdiction-prefixed; line up equivalent clauses by their number
+    numbers = {r['jurisdiction']: {c['clause_number'] for c in r['clauses']} for r in results}
+    common_numbers = set.intersection(*numbers.values()) if numbers else set()
+    categories: Dict[str, Dict[str, int]] = {}
+    for r in results:
+        for clause in r['clauses']:
+            counts = categories.setdefault(clause['category'], {})
+            counts[r['jurisdiction']] = counts.get(r['jurisdiction'], 0) + 1
+
+    return {
+        'fixtures': fixtures,
+        'fixtures_differ': [field for field, entry in fixtures.items() if entry['differs']],
+        'rules': _set_diff(results, 'rules'),
+        'assemblies': _set_diff(results, 'assemblies'),
+        'components': _set_diff(results, 'components'),
+        'clauses': {
+            'counts': {r['jurisdiction']: len(r['clauses']) for r in results},
+            'by_category': categories,
+            'common_clause_numbers': sorted(common_numbers),
+            'only_in': {r['jurisdiction']: sorted(c['clause_code'] for c in r['clauses']
+                                                  if c['clause_number'] not in common_numbers)
+                        for r in results}
+        }
+    }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Server-side layout rendering
+Draws the rooms normalized by dxf_export.normalize_rooms() as SVG, the same geometry as the DXF
+export: room outline, fixtures, dashed clearance zones, turning circles, labels and the free-tier
+watermark. PNG output rasterizes the SVG and needs cairosvg (pip install cairosvg); without it
+PNG requests raise RenderUnavailable and SVG keeps working.
+Thumbnails drop labels and titles, which are unreadable at preview size.
+"""
+
+import math
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape, quoteattr
+
+from dxf_export import ROOM_SPACING, WATERMARK_TEXT
+
+try:
+    import cairosvg
+except (ImportError, OSError):  # OSError: the package is installed but libcairo is not
+    cairosvg = None
+
+# Bump when the drawing changes so cached renders are regenerated
+RENDER_FORMAT_VERSION = 1
+
+DEFAULT_WIDTH = 960
+THUMBNAIL_WIDTH = 240
+MAX_WIDTH = 4096
+
+# Drawing margin around the rooms (metres); the bottom margin holds the room titles
+MARGIN = 0.5
+TITLE_MARGIN = 1.0
+
+STYLES = {
+    'plan': {'background': '#ffffff', 'room': '#2c3e50', 'fixture': '#2980b9', 'fixture_fill': '#d6eaf8',
+             'clearance': '#27ae60', 'label': '#34495e', 'watermark': '#95a5a6'},
+    'mono': {'background': '#ffffff', 'room': '#000000', 'fixture': '#000000', 'fixture_fill': 'none',
+             'clearance': '#666666', 'label': '#000000', 'watermark': '#999999'},
+}
+
+
+class RenderUnavailable(RuntimeError):
+    """The requested output format needs a library that is not installed"""
+
+
+def _value(value: float) -> str:
+    return f'{value:.3f}'.rstrip('0').rstrip('.') or '0'
+
+
+def render_svg(rooms: List[Dict[str, Any]], title: str = 'Washroom Layout', style: str = 'plan',
+               watermark: bool = False, width: int = DEFAULT_WIDTH, thumbnail: bool = False) -> str:
+    """Normalized rooms -> SVG document; model y runs up, so it is flipped for SVG"""
+    if style not in STYLES:
+        raise ValueError(f'Unknown style: {style}. Use one of {", ".join(STYLES)}')
+    colours = STYLES[style]
+    extent_x = sum(room['length'] for room in rooms) + ROOM_SPACING * (len(rooms) - 1)
+    extent_y = max(room['width'] for room in rooms)
+    bottom = MARGIN if thumbnail else TITLE_MARGIN
+    view_width, view_height = extent_x + 2 * MARGIN, extent_y + MARGIN + bottom
+    height = max(1, round(width * view_height / view_width))
+    stroke = max(view_width, view_height) / (400 if thumbnail else 800)
+
+    def y(model_y: float) -> float:
+        return MARGIN + extent_y - model_y
+
+    def rect(x, model_y, w, h, colour, fill='none', dashed=False):
+        dash = f' stroke-dasharray="{_value(stroke * 4)} {_value(stroke * 3)}"' if dashed else ''
+        return (f'<rect x="{_value(MARGIN + x)}" y="{_value(y(model_y + h))}" width="{_value(w)}" '
+                f'height="{_value(h)}" fill="{fill}" stroke="{colour}" stroke-width="{_value(stroke)}"{dash}/>')
+
+    def text(x, model_y, size, content, colour):
+        return (f'<text x="{_value(MARGIN + x)}" y="{_value(y(model_y))}" font-size="{_value(size)}" '
+                f'fill="{colour}" font-family="Helvetica, Arial, sans-serif">{escape(content)}</text>')
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {_value(view_width)} {_value(view_height)}">',
+        f'<title>{escape(title)}</title>',
+        f'<rect width="100%" height="100%" fill="{colours["background"]}"/>'
+    ]
+    origin_x = 0.0
+    for room in rooms:
+        parts.append(f'<g data-room={quoteattr(room["name"])}>')
+        parts.append(rect(origin_x, 0.0, room['length'], room['width'], colours['room']))
+        for fixture in room['fixtures']:
+            x, fixture_y, w, h = fixture['rect']
+            for zone_x, zone_y, zone_w, zone_h in fixture['zones']:
+                parts.append(rect(origin_x + zone_x, zone_y, zone_w, zone_h, colours['clearance'], dashed=True))
+            for cx, cy, radius in fixture['circles']:
+                parts.append(f'<circle cx="{_value(MARGIN + origin_x + cx)}" cy="{_value(y(cy))}" '
+                             f'r="{_value(radius)}" fill="none" stroke="{colours["clearance"]}" '
+                             f'stroke-width="{_value(stroke)}" stroke-dasharray="{_value(stroke * 4)} '
+                             f'{_value(stroke * 3)}"/>')
+            parts.append(rect(origin_x + x, fixture_y, w, h, colours['fixture'], colours['fixture_fill']))
+            if not thumbnail:
+                parts.append(text(origin_x + x, fixture_y + h / 2, min(0.15, w / 4),
+                                  fixture['label'].replace('_', ' '), colours['label']))
+        if not thumbnail:
+            parts.append(text(origin_x, -0.6, 0.3, f'{room["name"]} ({_value(room["length"])} x '
+                                                   f'{_value(room["width"])} m)', colours['label']))
+        if watermark:
+            length, room_width = room['length'], room['width']
+            angle = -math.degrees(math.atan2(room_width, length))
+            centre_x, centre_y = MARGIN + origin_x + length / 2, y(room_width / 2)
+            size = max(0.2, min(length, room_width) / 12)
+            parts.append(f'<text x="{_value(centre_x)}" y="{_value(centre_y)}" font-size="{_value(size)}" '
+                         f'fill="{colours["watermark"]}" fill-opacity="0.6" text-anchor="middle" '
+                         f'font-family="Helvetica, Arial, sans-serif" '
+                         f'transform="rotate({_value(angle)} {_value(centre_x)} {_value(centre_y)})">'
+                         f'{escape(WATERMARK_TEXT)}</text>')
+        parts.append('</g>')
+        origin_x += room['length'] + ROOM_SPACING
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def png_available() -> bool:
+    return cairosvg is not None
+
+
+def svg_to_png(svg: str, width: int) -> bytes:
+    if cairosvg is None:
+        raise RenderUnavailable('PNG rendering needs cairosvg (pip install cairosvg)')
+    return cairosvg.svg2png(bytestring=svg.encode('utf-8'), output_width=width)
+
+
+def render(layout: Dict[str, Any], output_format: str = 'svg', thumbnail: bool = False) -> bytes:
+    """
+    Stored render request ({rooms, title, style, watermark}) -> image bytes.
+    output_format is 'svg' or 'png'; thumbnail renders at THUMBNAIL_WIDTH.
+    """
+    if output_format not in ('svg', 'png'):
+        raise ValueError(f'Unknown image format: {output_format}')
+    width = THUMBNAIL_WIDTH if thumbnail else layout.get('width', DEFAULT_WIDTH)
+    svg = render_svg(layout['rooms'], layout['title'], layout['style'], layout['watermark'], width, thumbnail)
+    return svg.encode('utf-8') if output_format == 'svg' else svg_to_png(svg, width)
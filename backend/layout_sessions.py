@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Interactive layout sessions
+A session holds one room's fixtures and their compliance issues on the server. Edits arrive as
+small batches of operations (move, rotate, add, remove); only elements whose footprint or
+clearance zone is near an edited element are re-checked, found through a uniform grid index,
+and only the results that changed are returned.
+
+Per-element checks: footprint inside the room, clearance zone inside the room, no overlapping
+fixtures, no fixture inside another fixture's clearance zone. A fixture's clearance zone lies
+in front of it: rotation 0 faces +y, 90 faces -x, 180 faces -y, 270 faces +x.
+
+Sessions live in the worker that uses them and are snapshotted to a shared directory after each
+edit, so another worker can pick a session up; a client that sends `version` is told about
+conflicting edits instead of overwriting them.
+"""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from compact_layout import ROTATIONS, CompactLayout, is_columnar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_DIR = os.environ.get('LAYOUT_SESSION_DIR', os.path.join(tempfile.gettempdir(), 'bcode_layout_sessions'))
+SESSION_TTL_SECONDS = int(os.environ.get('LAYOUT_SESSION_TTL', '7200'))
+MAX_SESSIONS_IN_MEMORY = 500
+
+# Fully overlapping fixtures are reported pairwise, so the worst case is quadratic in this
+MAX_ELEMENTS = 500
+MAX_OPERATIONS = 100
+
+# Grid cell edge (metres); about one fixture with its clearance. Large rooms get larger cells so
+# the grid never has more than MAX_GRID_CELLS cells a side.
+GRID_CELL = 1.0
+MAX_GRID_CELLS = 64
+# Elements covering more cells than this are kept in one list instead of in every cell
+LARGE_ELEMENT_CELLS = 64
+# Coordinates and sizes beyond this (metres) are rejected outright
+MAX_COORDINATE = 1e6
+EPSILON = 1e-9
+
+Box = Tuple[float, float, float, float]
+
+
+class SessionConflict(Exception):
+    """The client edited an older version of the session"""
+
+
+def _number(value: Any, name: str, minimum: Optional[float] = None) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'{name} must be a number')
+    if abs(value) > MAX_COORDINATE:
+        raise ValueError(f'{name} must be within {MAX_COORDINATE:g} m')
+    if minimum is not None and value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return float(value)
+
+
+def _row(data: Dict[str, Any], room_width: float) -> Tuple:
+    """Validated (type, x, y, width, height, clearance, rotation); without a rotation the fixture
+    faces into the room, like generate_layout()"""
+    if not isinstance(data, dict):
+        raise ValueError('element must be an object')
+    height = _number(data.get('height'), 'height', 0.01)
+    y = _number(data.get('y'), 'y')
+    rotation = data.get('rotation')
+    if rotation is None:
+        rotation = 0 if y + height / 2 <= room_width / 2 else 180
+    if isinstance(rotation, bool) or rotation not in ROTATIONS:
+        raise ValueError(f'rotation must be one of {ROTATIONS}')
+    return (str(data.get('type', 'fixture')), _number(data.get('x'), 'x'), y,
+            _number(data.get('width'), 'width', 0.01), height,
+            _number(data.get('clearance', 0), 'clearance', 0), int(rotation))
+
+
+def overlaps(a: Box, b: Box) -> bool:
+    """Interiors intersect; touching edges are fine"""
+    return a[0] < b[2] - EPSILON and b[0] < a[2] - EPSILON and a[1] < b[3] - EPSILON and b[1] < a[3] - EPSILON
+
+
+def inside(box: Box, length: float, width: float) -> bool:
+    return box[0] >= -EPSILON and box[1] >= -EPSILON and box[2] <= length + EPSILON and box[3] <= width + EPSILON
+
+
+class GridIndex:
+    """
+    Element envelopes bucketed into square cells over the room. Cell ranges are clamped to the
+    room plus one ring of border cells, so an element far outside or far larger than the room
+    costs no more than the room has cells; the clamp is monotone, so boxes that intersect
+    anywhere still share a cell. Elements covering many cells go in a separate set.
+    """
+
+    def __init__(self, length: float, width: float, cell: float = GRID_CELL):
+        self.cell = max(cell, max(length, width) / MAX_GRID_CELLS)
+        self._last_i = math.floor(length / self.cell) + 1
+        self._last_j = math.floor(width / self.cell) + 1
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._large: Set[str] = set()
+        self._boxes: Dict[str, Box] = {}
+
+    def _range(self, box: Box) -> Tuple[int, int, int, int]:
+        cell, last_i, last_j = self.cell, self._last_i, self._last_j
+        return (min(max(math.floor(box[0] / cell), -1), last_i), min(max(math.floor(box[2] / cell), -1), last_i),
+                min(max(math.floor(box[1] / cell), -1), last_j), min(max(math.floor(box[3] / cell), -1), last_j))
+
+    @staticmethod
+    def _size(i0: int, i1: int, j0: int, j1: int) -> int:
+        return (i1 - i0 + 1) * (j1 - j0 + 1)
+
+    @staticmethod
+    def _keys(i0: int, i1: int, j0: int, j1: int) -> Iterable[Tuple[int, int]]:
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                yield i, j
+
+    def insert(self, element_id: str, box: Box):
+        self._boxes[element_id] = box
+        span = self._range(box)
+        if self._size(*span) > LARGE_ELEMENT_CELLS:
+            self._large.add(element_id)
+            return
+        for key in self._keys(*span):
+            self._cells.setdefault(key, set()).add(element_id)
+
+    def remove(self, element_id: str):
+        box = self._boxes.pop(element_id, None)
+        if box is None:
+            return
+        if element_id in self._large:
+            self._large.discard(element_id)
+            return
+        for key in self._keys(*self._range(box)):
+            members = self._cells.get(key)
+            if members is not None:
+                members.discard(element_id)
+                if not members:
+                    del self._cells[key]
+
+    def query(self, box: Box) -> Set[str]:
+        """Ids whose envelope intersects the box"""
+        span = self._range(box)
+        if self._size(*span) > len(self._boxes):
+            found: Iterable[str] = self._boxes
+        else:
+            found = set(self._large)
+            for key in self._keys(*span):
+                found.update(self._cells.get(key, ()))
+        boxes = self._boxes
+        return {element_id for element_id in found if overlaps(boxes[element_id], box)}
+
+
+class LayoutSession:
+    """
+    One room being edited: fixtures in a CompactLayout (with rotations), their ids, their issues
+    and the grid over their envelopes. Rows are not stable (removal swaps the last row in);
+    ids are.
+    """
+
+    def __init__(self, session_id: str, user_id: Any, room_dimensions: Dict[str, Any],
+                 accessibility_level: str = 'basic'):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.length = _number(room_dimensions.get('length'), 'room_dimensions.length', 0.01)
+        self.width = _number(room_dimensions.get('width'), 'room_dimensions.width', 0.01)
+        self.accessibility_level = accessibility_level
+        self.layout = CompactLayout(with_rotation=True)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.issues: Dict[str, List[Dict[str, Any]]] = {}
+        self.grid = GridIndex(self.length, self.width)
+        self.version = 0
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.snapshot_mtime: Optional[int] = None
+
+    # State
+
+    def element(self, element_id: str) -> Dict[str, Any]:
+        return dict(self.layout[self.rows[element_id]], id=element_id)
+
+    @property
+    def elements(self) -> Dict[str, Dict[str, Any]]:
+        return {element_id: self.element(element_id) for element_id in self.ids}
+
+    def _place(self, element_id: str, row: Tuple):
+        self.rows[element_id] = self.layout.append(*row)
+        self.ids.append(element_id)
+        self.grid.insert(element_id, self.layout.envelope(self.rows[element_id]))
+
+    def _replace(self, element_id: str, row: Tuple):
+        index = self.rows[element_id]
+        self.grid.remove(element_id)
+        self.layout.set_row(index, *row)
+        self.grid.insert(element_id, self.layout.envelope(index))
+
+    def _unplace(self, element_id: str):
+        self.grid.remove(element_id)
+        index = self.rows.pop(element_id)
+        if self.layout.swap_remove(index) is not None:
+            self.ids[index] = self.ids[-1]
+            self.rows[self.ids[index]] = index
+        self.ids.pop()
+
+    def _new_id(self) -> str:
+        element_id = f'e{self.next_id}'
+        self.next_id += 1
+        return element_id
+
+    def load(self, elements: Any):
+        """Element dicts (generate_layout() output or earlier session state) or the columnar encoding"""
+        if is_columnar(elements):
+            compact = CompactLayout.from_columnar(elements)
+            elements = [dict(view, id=None) for view in compact]
+        if len(elements) > MAX_ELEMENTS:
+            raise ValueError(f'At most {MAX_ELEMENTS} elements per layout')
+        for index, data in enumerate(elements):
+            try:
+                element_id = str(data['id']) if isinstance(data, dict) and data.get('id') else self._new_id()
+                if element_id in self.rows:
+                    raise ValueError(f'duplicate id {element_id}')
+                self._place(element_id, _row(data, self.width))
+            except ValueError as e:
+                raise ValueError(f'layout_elements[{index}]: {e}')
+        self.next_id = max([self.next_id] + [int(i[1:]) + 1 for i in self.ids if i[1:].isdigit()])
+        self.issues = {element_id: issues for element_id in self.ids if (issues := self.check(element_id))}
+
+    # Checks
+
+    def check(self, element_id: str) -> List[Dict[str, Any]]:
+        """Issues of one fixture, read straight from the layout arrays"""
+        layout = self.layout
+        index = self.rows[element_id]
+        box, zone = layout.footprint(index), layout.clearance_zone(index)
+        issues = []
+        if not inside(box, self.length, self.width):
+            issues.append({'check': 'outside_room', 'message': 'Fixture extends outside the room'})
+        if zone is not None and not inside(zone, self.length, self.width):
+            issues.append({'check': 'clearance_outside_room', 'message': 'Clearance zone extends outside the room'})
+
+        overlapping, obstructing = [], []
+        for other_id in self.grid.query(layout.envelope(index)):
+            if other_id == element_id:
+                continue
+            other = layout.footprint(self.rows[other_id])
+            if overlaps(box, other):
+                overlapping.append(other_id)
+            elif zone is not None and overlaps(zone, other):
+                obstructing.append(other_id)
+        if overlapping:
+            issues.append({'check': 'overlaps_fixture', 'message': 'Fixture overlaps another fixture',
+                           'with': sorted(overlapping)})
+        if obstructing:
+            issues.append({'check': 'clearance_obstructed', 'message': 'Another fixture is in the clearance zone',
+                           'with': sorted(obstructing)})
+        return issues
+
+    # Edits
+
+    def _operation(self, operation: Dict[str, Any], undo: List[Tuple[str, Optional[Tuple]]],
+                   dirty: List[Box]) -> str:
+        if not isinstance(operation, dict):
+            raise ValueError('operation must be an object')
+        kind = operation.get('op')
+        if kind == 'add':
+            if len(self.ids) >= MAX_ELEMENTS:
+                raise ValueError(f'At most {MAX_ELEMENTS} elements per layout')
+            row = _row(operation.get('element'), self.width)
+            element_id = self._new_id()
+            undo.append((element_id, None))
+            self._place(element_id, row)
+            dirty.append(self.layout.envelope(self.rows[element_id]))
+            return element_id
+
+        element_id = operation.get('id')
+        if element_id not in self.rows:
+            raise ValueError(f'Unknown element: {element_id}')
+        index = self.rows[element_id]
+        current = self.layout.row(index)
+        fixture_type, x, y, width, height, clearance, rotation = current
+        if kind == 'remove':
+            changed = None
+        elif kind == 'move':
+            changed = (fixture_type, _number(operation.get('x', x), 'x'), _number(operation.get('y', y), 'y'),
+                       width, height, clearance, rotation)
+        elif kind == 'rotate':
+            rotation = operation.get('rotation')
+            if isinstance(rotation, bool) or rotation not in ROTATIONS:
+                raise ValueError(f'rotation must be one of {ROTATIONS}')
+            changed = (fixture_type, x, y, width, height, clearance, int(rotation))
+        else:
+            raise ValueError(f'Unknown operation: {kind}. Use add, move, rotate or remove')
+
+        undo.append((element_id, current))
+        dirty.append(self.layout.envelope(index))
+        if changed is None:
+            self._unplace(element_id)
+        else:
+            self._replace(element_id, changed)
+            dirty.append(self.layout.envelope(index))
+        return element_id
+
+    def apply(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply a batch of operations atomically and re-check the neighbourhood it touched.
+        Returns the changed elements (None when removed) and the changed issue lists.
+        """
+        started = time.perf_counter()
+        if not isinstance(operations, list) or not operations:
+            raise ValueError('operations must be a non-empty list')
+        if len(operations) > MAX_OPERATIONS:
+            raise ValueError(f'At most {MAX_OPERATIONS} operations per edit')
+
+        undo: List[Tuple[str, Optional[Tuple]]] = []
+        dirty: List[Box] = []
+        next_id = self.next_id
+        try:
+            touched = [self._operation(operation, undo, dirty) for operation in operations]
+        except ValueError:
+            for element_id, previous in reversed(undo):
+                if previous is None:
+                    self._unplace(element_id)
+                elif element_id in self.rows:
+                    self._replace(element_id, previous)
+                else:
+                    self._place(element_id, previous)
+            self.next_id = next_id
+            raise
+
+        # Everything whose envelope meets an old or new envelope of an edited element
+        affected = {element_id for element_id in touched if element_id in self.rows}
+        for box in dirty:
+            affected |= self.grid.query(box)
+        changed_issues: Dict[str, List[Dict[str, Any]]] = {}
+        for element_id in affected:
+            issues = self.check(element_id)
+            if issues != self.issues.get(element_id, []):
+                changed_issues[element_id] = issues
+            if issues:
+                self.issues[element_id] = issues
+            else:
+                self.issues.pop(element_id, None)
+        for element_id in touched:
+            if element_id not in self.rows and self.issues.pop(element_id, None) is not None:
+                changed_issues[element_id] = []
+
+        self.version += 1
+        return {
+            'version': self.version,
+            'elements': {element_id: self.element(element_id) if element_id in self.rows else None
+                         for element_id in dict.fromkeys(touched)},
+            'issues': changed_issues,
+            'summary': self.summary(),
+            'checked': len(affected),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        violations = sum(len(issues) for issues in self.issues.values())
+        return {'elements': len(self.ids), 'violations': violations, 'compliant': violations == 0}
+
+    def state(self, columnar: bool = False) -> Dict[str, Any]:
+        """Full state; `columnar` sends the fixtures as the columnar encoding plus an ids list"""
+        state = {
+            'session_id': self.session_id,
+            'version': self.version,
+            'room_dimensions': {'length': self.length, 'width': self.width},
+            'accessibility_level': self.accessibility_level,
+            'issues': self.issues,
+            'summary': self.summary()
+        }
+        if columnar:
+            state.update(ids=list(self.ids), elements=self.layout.to_columnar())
+        else:
+            state['elements'] = [dict(element, id=element_id) for element_id, element in
+                                 zip(self.ids, self.layout.to_dicts())]
+        return state
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'session_id': self.session_id, 'user_id': self.user_id, 'version': self.version,
+                'next_id': self.next_id, 'room_dimensions': {'length': self.length, 'width': self.width},
+                'accessibility_level': self.accessibility_level, 'ids': self.ids,
+                'layout': self.layout.to_columnar()}
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> 'LayoutSession':
+        session = cls(data['session_id'], data['user_id'], data['room_dimensions'], data['accessibility_level'])
+        session.layout = CompactLayout.from_columnar(data['layout'])
+        session.ids = list(data['ids'])
+        session.rows = {element_id: index for index, element_id in enumerate(session.ids)}
+        if len(session.rows) != len(session.layout) or session.layout.rotation is None:
+            raise ValueError('corrupt layout session snapshot')
+        for element_id, index in session.rows.items():
+            session.grid.insert(element_id, session.layout.envelope(index))
+        session.issues = {element_id: issues for element_id in session.ids if (issues := session.check(element_id))}
+        session.version, session.next_id = data['version'], data['next_id']
+        return session
+
+
+class LayoutSessionStore:
+    """Sessions by id: in memory (LRU) with a JSON snapshot per session in a shared directory"""
+
+    def __init__(self, directory: str = DEFAULT_SESSION_DIR, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 max_in_memory: int = MAX_SESSIONS_IN_MEMORY):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_in_memory = max_in_memory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sessions: 'OrderedDict[str, LayoutSession]' = OrderedDict()
+        self._stats = {'created': 0, 'edits': 0, 'conflicts': 0, 'reloads': 0, 'expired': 0, 'edit_ms_max': 0.0}
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f'{session_id}.json')
+
+    def _persist(self, session: LayoutSession):
+        path = self._path(session.session_id)
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.part'
+        with open(temporary, 'w') as f:
+            json.dump(session.snapshot(), f, separators=(',', ':'))
+        os.replace(temporary, path)
+        session.snapshot_mtime = os.stat(path).st_mtime_ns
+
+    def create(self, user_id: Any, room_dimensions: Dict[str, Any], elements: Any,
+               accessibility_level: str = 'basic') -> LayoutSession:
+        if not isinstance(room_dimensions, dict):
+            raise ValueError('room_dimensions is required')
+        if not isinstance(elements, list) and not is_columnar(elements):
+            raise ValueError('layout_elements must be a list or columnar layout')
+        session = LayoutSession(uuid.uuid4().hex, user_id, room_dimensions, accessibility_level)
+        session.load(elements)
+        self._persist(session)
+        with self._lock:
+            self._remember(session)
+            self._stats['created'] += 1
+        self.expire()
+        return session
+
+    def _remember(self, session: LayoutSession):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_in_memory:
+            self._sessions.popitem(last=False)  # the snapshot stays on disk
+
+    def get(self, session_id: str, user_id: Any) -> Optional[LayoutSession]:
+        """The session if it exists and belongs to the user; reloaded when another worker edited it"""
+        if not session_id.isalnum():
+            return None
+        try:
+            mtime = os.stat(self._path(session_id)).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None or session.snapshot_mtime != mtime:
+            try:
+                with open(self._path(session_id)) as f:
+                    session = LayoutSession.from_snapshot(json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+                return None
+            session.snapshot_mtime = mtime
+            with self._lock:
+                self._remember(session)
+                self._stats['reloads'] += 1
+        if session.user_id != user_id:
+            return None
+        return session
+
+    def edit(self, session: LayoutSession, operations: List[Dict[str, Any]],
+             expected_version: Optional[int] = None) -> Dict[str, Any]:
+        with session.lock:
+            if expected_version is not None and expected_version != session.version:
+                with self._lock:
+                    self._stats['conflicts'] += 1
+                raise SessionConflict(f'Layout is at version {session.version}, edit was made on {expected_version}')
+            result = session.apply(operations)
+            self._persist(session)
+        with self._lock:
+            self._stats['edits'] += 1
+            self._stats['edit_ms_max'] = max(self._stats['edit_ms_max'], result['duration_ms'])
+        return result
+
+    def delete(self, session: LayoutSession):
+        with self._lock:
+            self._sessions.pop(session.session_id, None)
+        try:
+            os.remove(self._path(session.session_id))
+        except FileNotFoundError:
+            pass
+
+    def expire(self) -> int:
+        """Drop sessions idle longer than the TTL (snapshots are shared, so go by file age)"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        if removed:
+            with self._lock:
+                self._stats['expired'] += removed
+        return removed
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, in_memory=len(self._sessions))
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the building codes database
+Each migration runs once, in order, inside the writer's BEGIN IMMEDIATE transaction and is
+recorded in schema_version; PRAGMA user_version gives a fast path when nothing is pending.
+
+Usage:
+    python backend/migrations.py status  [--db PATH]
+    python backend/migrations.py upgrade [--db PATH] [--target N]
+    python backend/migrations.py build   --output PATH
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from connection_manager import SQLiteConnectionManager, get_connection_manager
+from assembly_closure import rebuild_closure
+from change_feed import TRACKED_TABLES, change_log_triggers, hash_rows
+from clause_classifier import classify_rows
+from code_editions import OPEN_END, OPEN_START, edition_log_triggers, refresh_validity
+
+logger = logging.getLogger(__name__)
+
+# SQL sources live next to the database, independent of the working directory
+DATABASE_DIR = os.path.join(ROOT_DIR, 'database')
+DEFAULT_DB_PATH = os.path.join(DATABASE_DIR, 'building_codes.db')
+
+
+class Migration:
+    """One schema change: applied at most once per database"""
+
+    def __init__(self, version: int, name: str, apply: Callable[[sqlite3.Cursor], None]):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Register a migration; versions must be unique and are applied in ascending order"""
+    def register(apply):
+        if any(existing.version == version for existing in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, name, apply))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return apply
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def split_sql(sql: str) -> List[str]:
+    """
+    Split a script into complete statements (triggers included).
+    executescript() would COMMIT first and escape the migration transaction.
+    """
+    statements, buffer = [], ''
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ''
+    remainder = '\n'.join(line for line in buffer.splitlines() if not line.strip().startswith('--')).strip()
+    if remainder:
+        raise ValueError(f"Incomplete SQL statement: {remainder[:80]}")
+    return statements
+
+
+def run_sql_file(cursor: sqlite3.Cursor, filename: str):
+    with open(os.path.join(DATABASE_DIR, filename), 'r', encoding='utf-8') as f:
+        for statement in split_sql(f.read()):
+            cursor.execute(statement)
+
+
+# =====================================================
+# Migrations
+# =====================================================
+
+@migration(1, 'enhanced schema')
+def create_enhanced_schema(cursor):
+    run_sql_file(cursor, 'enhanced_schema.sql')
+
+
+@migration(2, 'fixture requirements table')
+def create_building_codes(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS building_codes (
+            id INTEGER PRIMARY KEY,
+            jurisdiction TEXT NOT NULL,
+            building_type TEXT NOT NULL,
+            occupancy_range TEXT NOT NULL,
+            water_closets_male INTEGER,
+            water_closets_female INTEGER,
+            urinals INTEGER,
+            lavatories INTEGER,
+            accessible_stalls INTEGER,
+            code_reference TEXT,
+            accessibility_level TEXT DEFAULT 'basic'
+        )
+    ''')
+
+
+@migration(3, 'seed enhanced sample data')
+def seed_enhanced_data(cursor):
+    run_sql_file(cursor, 'sample_data.sql')
+
+
+# (jurisdiction, building_type, occupancy_range, wc_male, wc_female, urinals, lavatories,
+#  accessible_stalls, code_reference, accessibility_level)
+FIXTURE_REQUIREMENTS_SEED = [
+    # NBC - Office Buildings
+    ('NBC', 'office', '1-15', 1, 1, 1, 1, 1, 'NBC 3.7.4.2', 'basic'),
+    ('NBC', 'office', '16-35', 1, 2, 1, 2, 1, 'NBC 3.7.4.2', 'basic'),
+    ('NBC', 'office', '36-55', 2, 2, 1, 2, 1, 'NBC 3.7.4.2', 'basic'),
+    ('NBC', 'office', '56-80', 2, 3, 2, 3, 1, 'NBC 3.7.4.2', 'basic'),
+    ('NBC', 'office', '81-110', 3, 3, 2, 4, 2, 'NBC 3.7.4.2', 'basic'),
+
+    # Alberta - Office Buildings (Different requirements)
+    ('Alberta', 'office', '1-15', 1, 1, 1, 1, 1, 'Alberta Building Code 3.7.4.2', 'basic'),
+    ('Alberta', 'office', '16-35', 1, 2, 1, 2, 1, 'Alberta Building Code 3.7.4.2', 'basic'),
+    ('Alberta', 'office', '36-55', 2, 3, 1, 3, 1, 'Alberta Building Code 3.7.4.2', 'basic'),
+    ('Alberta', 'office', '56-80', 3, 3, 2, 3, 2, 'Alberta Building Code 3.7.4.2', 'basic'),
+    ('Alberta', 'office', '81-110', 3, 4, 2, 4, 2, 'Alberta Building Code 3.7.4.2', 'basic'),
+
+    # Ontario - Office Buildings
+    ('Ontario', 'office', '1-15', 1, 1, 1, 1, 1, 'OBC 3.7.4.2', 'basic'),
+    ('Ontario', 'office', '16-35', 1, 2, 1, 2, 1, 'OBC 3.7.4.2', 'basic'),
+
+    # BC - Office Buildings
+    ('BC', 'office', '1-15', 1, 1, 1, 1, 1, 'BCBC 3.7.4.2', 'basic'),
+    ('BC', 'office', '16-35', 1, 2, 1, 2, 1, 'BCBC 3.7.4.2', 'basic'),
+
+    # School Buildings
+    ('NBC', 'school', '1-15', 1, 1, 0, 1, 1, 'NBC 3.7.4.3', 'enhanced'),
+    ('NBC', 'school', '16-30', 1, 2, 1, 2, 1, 'NBC 3.7.4.3', 'enhanced'),
+    ('NBC', 'school', '31-50', 2, 2, 1, 3, 1, 'NBC 3.7.4.3', 'enhanced'),
+
+    # Assembly Buildings
+    ('NBC', 'assembly', '1-50', 2, 2, 1, 2, 1, 'NBC 3.7.4.4', 'basic'),
+    ('NBC', 'assembly', '51-100', 3, 3, 2, 3, 2, 'NBC 3.7.4.4', 'basic'),
+    ('NBC', 'assembly', '101-200', 4, 4, 2, 4, 2, 'NBC 3.7.4.4', 'basic'),
+
+    # Retail Buildings
+    ('NBC', 'retail', '1-25', 1, 1, 1, 1, 1, 'NBC 3.7.4.5', 'basic'),
+    ('NBC', 'retail', '26-50', 1, 2, 1, 2, 1, 'NBC 3.7.4.5', 'basic'),
+    ('NBC', 'retail', '51-100', 2, 3, 1, 3, 1, 'NBC 3.7.4.5', 'basic'),
+
+    # Industrial Buildings
+    ('NBC', 'industrial', '1-20', 1, 1, 1, 1, 1, 'NBC 3.7.4.6', 'basic'),
+    ('NBC', 'industrial', '21-40', 1, 2, 1, 2, 1, 'NBC 3.7.4.6', 'basic'),
+    ('NBC', 'industrial', '41-75', 2, 2, 2, 3, 1, 'NBC 3.7.4.6', 'basic'),
+]
+
+
+@migration(4, 'seed fixture requirements')
+def seed_fixture_requirements(cursor):
+    # Databases created before migrations already carry their rows
+    cursor.execute('SELECT COUNT(*) FROM building_codes')
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('''
+            INSERT INTO building_codes
+            (jurisdiction, building_type, occupancy_range, water_closets_male,
+             water_closets_female, urinals, lavatories, accessible_stalls,
+             code_reference, accessibility_level)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', FIXTURE_REQUIREMENTS_SEED)
+
+
+@migration(5, 'clause full-text index')
+def create_clause_fts(cursor):
+    # External-content FTS5: the index holds tokens only, text is read back from the clause table.
+    # INSERT OR REPLACE skips the delete trigger (recursive_triggers is off); searches join the
+    # clause table so stale entries never surface, and clause_search.py rebuild compacts them.
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS building_code_clause_fts USING fts5(
+            clause_title, clause_text_en, clause_text_fr,
+            content='building_code_clause', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS clause_fts_insert AFTER INSERT ON building_code_clause BEGIN
+            INSERT INTO building_code_clause_fts (rowid, clause_title, clause_text_en, clause_text_fr)
+            VALUES (new.id, new.clause_title, new.clause_text_en, new.clause_text_fr);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS clause_fts_delete AFTER DELETE ON building_code_clause BEGIN
+            INSERT INTO building_code_clause_fts (building_code_clause_fts, rowid, clause_title, clause_text_en, clause_text_fr)
+            VALUES ('delete', old.id, old.clause_title, old.clause_text_en, old.clause_text_fr);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS clause_fts_update
+        AFTER UPDATE OF clause_title, clause_text_en, clause_text_fr ON building_code_clause BEGIN
+            INSERT INTO building_code_clause_fts (building_code_clause_fts, rowid, clause_title, clause_text_en, clause_text_fr)
+            VALUES ('delete', old.id, old.clause_title, old.clause_text_en, old.clause_text_fr);
+            INSERT INTO building_code_clause_fts (rowid, clause_title, clause_text_en, clause_text_fr)
+            VALUES (new.id, new.clause_title, new.clause_text_en, new.clause_text_fr);
+        END
+    ''')
+    cursor.execute("INSERT INTO building_code_clause_fts (building_code_clause_fts) VALUES ('rebuild')")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clause_jurisdiction_version ON building_code_clause(jurisdiction, code_version)')
+
+
+@migration(6, 'stored clause classification')
+def add_clause_classification(cursor):
+    for column in ('clause_category', 'verification_method', 'classification_version'):
+        cursor.execute(f'ALTER TABLE building_code_clause ADD COLUMN {column} TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clause_category ON building_code_clause(clause_category)')
+    classify_rows(cursor, only_stale=False)
+
+
+@migration(7, 'clause source url')
+def add_clause_source_url(cursor):
+    cursor.execute('ALTER TABLE building_code_clause ADD COLUMN source_url TEXT')
+
+
+@migration(8, 'content hashes and change log')
+def add_change_log(cursor):
+    cursor.execute('''
+        CREATE TABLE change_log (
+            revision INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_code TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            jurisdiction TEXT,
+            content_hash TEXT,
+            changed_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_entity ON change_log(entity, revision)')
+    for table in TRACKED_TABLES:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN content_hash TEXT')
+        # Hash existing rows before the triggers exist: the baseline is revision 0, not a flood of updates
+        hash_rows(cursor, table)
+        for statement in change_log_triggers(table):
+            cursor.execute(statement)
+
+
+
+@migration(9, 'code editions and validity intervals')
+def add_validity_intervals(cursor):
+    cursor.execute('''
+        CREATE TABLE code_edition (
+            jurisdiction TEXT NOT NULL,
+            code_version TEXT NOT NULL,
+            effective_date TEXT,
+            PRIMARY KEY (jurisdiction, code_version)
+        )
+    ''')
+    for table in ('context_logic_rule', 'building_code_clause'):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN valid_from TEXT NOT NULL DEFAULT '{OPEN_START}'")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN valid_to TEXT NOT NULL DEFAULT '{OPEN_END}'")
+    # Rules: effective_date is valid_from, so this is the (jurisdiction, effective_date) range index
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rule_validity ON context_logic_rule(jurisdiction, valid_from, valid_to)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clause_validity ON building_code_clause(jurisdiction, valid_from, valid_to)')
+    refresh_validity(cursor)
+    for statement in edition_log_triggers():
+        cursor.execute(statement)
+
+
+@migration(10, 'assembly component closure')
+def add_assembly_closure(cursor):
+    cursor.execute('''
+        CREATE TABLE assembly_component_closure (
+            assembly_code TEXT NOT NULL,
+            member_code TEXT NOT NULL,
+            member_type TEXT NOT NULL,  -- 'component' or 'assembly' (nested)
+            position INTEGER NOT NULL,  -- depth-first order within the assembly
+            PRIMARY KEY (assembly_code, member_code)
+        )
+    ''')
+    rebuild_closure(cursor)
+
+# =====================================================
+# Runner
+# =====================================================
+
+# Databases this process has already seen at the latest version
+_current_databases = set()
+_current_lock = threading.Lock()
+
+
+def init_version_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL,
+            duration_ms REAL
+        )
+    ''')
+
+
+def applied_versions(cursor) -> List[int]:
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'").fetchone():
+        return []
+    return [row[0] for row in cursor.execute('SELECT version FROM schema_version ORDER BY version')]
+
+
+def apply_migrations(manager: SQLiteConnectionManager, target: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Apply pending migrations up to target under one BEGIN IMMEDIATE transaction.
+    Workers racing at boot serialize on the write lock; the loser re-reads the version
+    inside the transaction and finds nothing left to do.
+    """
+    target = latest_version() if target is None else target
+    applied = []
+
+    with manager.writer() as connection:
+        cursor = connection.cursor()
+        if cursor.execute('PRAGMA user_version').fetchone()[0] >= target:
+            return applied
+
+        init_version_table(cursor)
+        done = set(applied_versions(cursor))
+
+        for pending in MIGRATIONS:
+            if pending.version > target or pending.version in done:
+                continue
+            started = time.perf_counter()
+            pending.apply(cursor)
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            cursor.execute(
+                'INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)',
+                (pending.version, pending.name, datetime.now(timezone.utc).isoformat(), duration_ms)
+            )
+            applied.append({'version': pending.version, 'name': pending.name, 'duration_ms': duration_ms})
+            logger.info(f"🧱 Migration {pending.version} applied: {pending.name} ({duration_ms} ms)")
+
+        # Only advance to what is actually recorded, never past a gap
+        version = max(done.union(m['version'] for m in applied), default=0)
+        cursor.execute(f'PRAGMA user_version = {int(version)}')
+
+    return applied
+
+
+def migrate(db_path: str = DEFAULT_DB_PATH, target: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Bring a database up to date; called on every worker boot.
+    Fast path: an in-process set, then one PRAGMA on a pooled reader.
+    """
+    key = os.path.abspath(db_path)
+    target = latest_version() if target is None else target
+    if target == latest_version() and key in _current_databases:
+        return []
+
+    manager = get_connection_manager(db_path)
+    if os.path.exists(db_path):
+        with manager.reader() as connection:
+            current = connection.execute('PRAGMA user_version').fetchone()[0]
+        if current >= target:
+            if target == latest_version():
+                with _current_lock:
+                    _current_databases.add(key)
+            return []
+
+    applied = apply_migrations(manager, target)
+    if target == latest_version():
+        with _current_lock:
+            _current_databases.add(key)
+    return applied
+
+
+def status(db_path: str = DEFAULT_DB_PATH) -> Dict[str, Any]:
+    """Current version plus applied and pending migrations"""
+    applied = []
+    user_version = 0
+    if os.path.exists(db_path):
+        with get_connection_manager(db_path).reader() as connection:
+            cursor = connection.cursor()
+            user_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            applied = applied_versions(cursor)
+
+    return {
+        'database': db_path,
+        'user_version': user_version,
+        'latest_version': latest_version(),
+        'applied': applied,
+        'pending': [{'version': m.version, 'name': m.name} for m in MIGRATIONS if m.version not in applied]
+    }
+
+
+def build_artifact(output: str) -> Dict[str, Any]:
+    """
+    Build a fully migrated, self-contained database file for deployment.
+    Built beside the output and swapped in with os.replace, so readers never see a partial file.
+    """
+    output = os.path.abspath(output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temporary = f'{output}.building-{os.getpid()}'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(temporary + suffix):
+            os.remove(temporary + suffix)
+
+    manager = SQLiteConnectionManager(temporary)
+    try:
+        applied = apply_migrations(manager)
+    finally:
+        manager.close()
+
+    # Fold the WAL back in and compact so the artifact is a single file
+    connection = sqlite3.connect(temporary)
+    try:
+        connection.execute('PRAGMA journal_mode = DELETE')
+        connection.execute('VACUUM')
+    finally:
+        connection.close()
+
+    os.replace(temporary, output)
+    return {'output': output, 'version': latest_version(), 'applied': applied,
+            'size_bytes': os.path.getsize(output)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Building codes database migrations')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    status_parser = subcommands.add_parser('status', help='Show applied and pending migrations')
+    status_parser.add_argument('--db', default=DEFAULT_DB_PATH)
+
+    upgrade_parser = subcommands.add_parser('upgrade', help='Apply pending migrations in place')
+    upgrade_parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    upgrade_parser.add_argument('--target', type=int, default=None)
+
+    build_parser = subcommands.add_parser('build', help='Build a prebuilt database artifact')
+    build_parser.add_argument('--output', required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        report = status(args.db)
+        print(f"📋 {report['database']}: version {report['user_version']} of {report['latest_version']}")
+        for pending in report['pending']:
+            print(f"   ⏳ {pending['version']:>3}  {pending['name']}")
+        if not report['pending']:
+            print("   ✅ Up to date")
+    elif args.command == 'upgrade':
+        applied = apply_migrations(get_connection_manager(args.db), args.target)
+        print(f"✅ Applied {len(applied)} migration(s) to {args.db}")
+    else:
+        report = build_artifact(args.output)
+        print(f"✅ Built {report['output']} at version {report['version']} ({report['size_bytes']} bytes)")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+PDF compliance reports
+Runs the 7-step workflow for a project and typesets the result: project summary, the step-7
+layout drawing and every checklist section with its clause text, paginated on US Letter with
+"Page n of N" footers. The PDF is written directly (standard Helvetica fonts, no embedded
+resources), so there is no rendering dependency.
+
+Building a report takes long enough that it runs on a background pool. A report's id is the
+content key of everything it depends on (inputs, code revision, format version), so the same
+request from anyone, on any worker, maps to one job and one cached file.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from change_feed import current_revision
+from content_cache import ContentCache, content_key
+from dxf_export import ROOM_SPACING, normalize_rooms
+
+logger = logging.getLogger(__name__)
+
+# Bump when the document changes so cached reports are regenerated
+PDF_FORMAT_VERSION = 1
+
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', '2'))
+
+# Finished jobs are forgotten after this long (the file stays in the cache)
+JOB_TTL_SECONDS = 3600
+
+# A build marker older than this was left by a worker that died mid-build
+BUILD_TIMEOUT_SECONDS = 600
+
+# Inputs that change the workflow result
+REPORT_INPUTS = ('building_type', 'occupancy_load', 'jurisdiction', 'accessibility_level', 'room_length',
+                 'room_width', 'room_height', 'permit_date', 'as_of', 'special_requirements')
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, points
+MARGIN = 54
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126, from the standard AFM
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+PRIORITY_COLOURS = {'critical': (0.75, 0.22, 0.17), 'high': (0.83, 0.33, 0.0), 'medium': (0.16, 0.5, 0.73)}
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    width = sum(_HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text)
+    return width * size / 1000 * (1.05 if bold else 1.0)
+
+
+def wrap(text: str, size: float, max_width: float, bold: bool = False) -> List[str]:
+    lines, line = [], ''
+    for word in str(text).split():
+        candidate = f'{line} {word}' if line else word
+        if line and text_width(candidate, size, bold) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    return lines + [line] if line else lines or ['']
+
+
+def _pdf_string(text: str) -> str:
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def _n(value: float) -> str:
+    return f'{value:.2f}'.rstrip('0').rstrip('.') or '0'
+
+
+class _Pages:
+    """Content streams for a flowing document; y runs down from the top margin"""
+
+    def __init__(self, title: str):
+        self.title = title
+        self.pages: List[List[str]] = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops: List[str] = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure(self, height: float):
+        if self.y - height < MARGIN + 20:
+            self.new_page()
+
+    def text(self, x: float, y: float, text: str, size: float = 10, bold: bool = False,
+             colour=(0, 0, 0)):
+        font = 'F2' if bold else 'F1'
+        self.ops.append(f'{_n(colour[0])} {_n(colour[1])} {_n(colour[2])} rg BT /{font} {_n(size)} Tf '
+                        f'{_n(x)} {_n(y)} Td {_pdf_string(text)} Tj ET')
+
+    def paragraph(self, text: str, size: float = 10, bold: bool = False, indent: float = 0,
+                  colour=(0, 0, 0), after: float = 4):
+        leading = size * 1.3
+        for line in wrap(text, size, PAGE_WIDTH - 2 * MARGIN - indent, bold):
+            self.ensure(leading)
+            self.y -= leading
+            self.text(MARGIN + indent, self.y, line, size, bold, colour)
+        self.y -= after
+
+    def rule(self):
+        self.ensure(8)
+        self.y -= 4
+        self.ops.append(f'0.8 0.8 0.8 RG 0.5 w {MARGIN} {_n(self.y)} m {PAGE_WIDTH - MARGIN} {_n(self.y)} l S')
+        self.y -= 4
+
+
+def _draw_layout(pages: _Pages, rooms: List[Dict[str, Any]], height: float = 300):
+    """Step-7 drawing scaled into a box of the given height across the text width"""
+    extent_x = sum(room['length'] for room in rooms) + ROOM_SPACING * (len(rooms) - 1)
+    extent_y = max(room['width'] for room in rooms)
+    box_width = PAGE_WIDTH - 2 * MARGIN
+    scale = min(box_width / extent_x, height / extent_y)
+    pages.ensure(extent_y * scale + 20)
+    top = pages.y - 10
+    base_y = top - extent_y * scale
+
+    def rect(x, y, w, h, stroke, dashed=False):
+        dash = '[3 2] 0 d' if dashed else '[] 0 d'
+        pages.ops.append(f'{stroke} RG 0.8 w {dash} {_n(MARGIN + x * scale)} {_n(base_y + y * scale)} '
+                         f'{_n(w * scale)} {_n(h * scale)} re S')
+
+    origin_x = 0.0
+    for room in rooms:
+        rect(origin_x, 0, room['length'], room['width'], '0.17 0.24 0.31')
+        for fixture in room['fixtures']:
+            for zone in fixture['zones']:
+                rect(origin_x + zone[0], zone[1], zone[2], zone[3], '0.15 0.68 0.38', dashed=True)
+            for cx, cy, radius in fixture['circles']:
+                x, y, r, k = MARGIN + (origin_x + cx) * scale, base_y + cy * scale, radius * scale, 0.5523
+                pages.ops.append(
+                    f'0.15 0.68 0.38 RG [3 2] 0 d {_n(x + r)} {_n(y)} m '
+                    f'{_n(x + r)} {_n(y + k * r)} {_n(x + k * r)} {_n(y + r)} {_n(x)} {_n(y + r)} c '
+                    f'{_n(x - k * r)} {_n(y + r)} {_n(x - r)} {_n(y + k * r)} {_n(x - r)} {_n(y)} c '
+                    f'{_n(x - r)} {_n(y - k * r)} {_n(x - k * r)} {_n(y - r)} {_n(x)} {_n(y - r)} c '
+                    f'{_n(x + k * r)} {_n(y - r)} {_n(x + r)} {_n(y - k * r)} {_n(x + r)} {_n(y)} c S')
+            x, y, w, h = fixture['rect']
+            rect(origin_x + x, y, w, h, '0.16 0.5 0.73')
+            pages.text(MARGIN + (origin_x + x) * scale + 1, base_y + (y + h / 2) * scale, fixture['label'], 6)
+        origin_x += room['length'] + ROOM_SPACING
+    pages.ops.append('[] 0 d')
+    pages.y = base_y - 12
+
+
+def build_compliance_pdf(workflow: Dict[str, Any], title: str) -> bytes:
+    """process_complete_workflow() result -> PDF bytes"""
+    steps = workflow['steps']
+    inputs = steps['step_1']['data']
+    checklist = steps['step_6']['data']
+    summary = checklist['project_info']
+    pages = _Pages(title)
+
+    pages.paragraph(title, 20, bold=True, after=2)
+    pages.paragraph('Building Code Compliance Report', 12, colour=(0.4, 0.4, 0.4), after=8)
+    for label, value in (('Jurisdiction', inputs['jurisdiction']), ('Building type', inputs['building_type']),
+                         ('Occupancy load', inputs['total_occupants']),
+                         ('Accessibility level', inputs['accessibility_level']),
+                         ('Room', f"{inputs['room_dimensions']['length']} x {inputs['room_dimensions']['width']} m"),
+                         ('Code in force on', inputs['as_of'])):
+        pages.paragraph(f'{label}: {value}', 10, after=0)
+    pages.y -= 6
+    pages.paragraph(f"{summary['total_sections']} sections, {summary['total_items']} requirements "
+                    f"({summary['critical_items']} critical), clause coverage {summary['coverage_score']}%",
+                    11, bold=True)
+    for warning in checklist['validation_status'].get('warnings', []):
+        pages.paragraph(f"Warning: {warning['message']}", 9, colour=(0.83, 0.33, 0.0), after=0)
+    pages.rule()
+
+    layout = steps.get('step_7', {}).get('data') or {}
+    if layout.get('positioned_assemblies'):
+        pages.paragraph('Layout', 14, bold=True)
+        _draw_layout(pages, normalize_rooms({'layout_design': layout}))
+        pages.rule()
+
+    for section in checklist['sections']:
+        pages.ensure(60)
+        pages.paragraph(f"{section['title']} ({section['total_items']})", 14, bold=True, after=6)
+        for item in section['items']:
+            pages.ensure(50)
+            colour = PRIORITY_COLOURS.get(item['priority'], (0.3, 0.3, 0.3))
+            pages.paragraph(f"[  ]  {item['code_reference']}  {item['title']}", 11, bold=True, after=1)
+            pages.paragraph(f"Priority: {item['priority']}    Verification: {item['verification_method']}"
+                            f"    Page: {item.get('page_reference') or '-'}", 8, indent=18, colour=colour, after=2)
+            pages.paragraph(item['requirement'], 10, indent=18, after=2)
+            if item.get('affected_components'):
+                pages.paragraph(f"Applies to: {', '.join(item['affected_components'])}", 8, indent=18,
+                                colour=(0.4, 0.4, 0.4), after=0)
+            pages.paragraph(f"Why: {item['why_required']}", 8, indent=18, colour=(0.4, 0.4, 0.4), after=8)
+        pages.rule()
+
+    return _write_pdf(pages)
+
+
+def _write_pdf(pages: _Pages) -> bytes:
+    """Pages -> PDF file: catalog, page tree, two standard fonts, one content stream per page"""
+    count = len(pages.pages)
+    objects = {1: '<< /Type /Catalog /Pages 2 0 R >>',
+               3: '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+               4: '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+               5: f'<< /Title {_pdf_string(pages.title)} /Producer (BCode Pro) >>'}
+    kids = []
+    for index, ops in enumerate(pages.pages):
+        page_id, content_id = 6 + 2 * index, 7 + 2 * index
+        footer = (f'0.5 0.5 0.5 rg BT /F1 8 Tf {MARGIN} 30 Td {_pdf_string(pages.title)} Tj ET '
+                  f'BT /F1 8 Tf {PAGE_WIDTH - MARGIN - 60} 30 Td {_pdf_string(f"Page {index + 1} of {count}")} Tj ET')
+        stream = '\n'.join(ops + [footer]).encode('latin-1')
+        objects[page_id] = (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                            f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>')
+        objects[content_id] = stream
+        kids.append(f'{page_id} 0 R')
+    objects[2] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {count} >>'
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        body = objects[number]
+        if isinstance(body, bytes):
+            out += f'{number} 0 obj\n<< /Length {len(body)} >>\nstream\n'.encode() + body + b'\nendstream\nendobj\n'
+        else:
+            out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    size = max(objects) + 1
+    out += f'xref\n0 {size}\n0000000000 65535 f \n'.encode()
+    for number in range(1, size):
+        out += f'{offsets[number]:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {size} /Root 1 0 R /Info 5 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
+
+
+class ReportService:
+    """
+    submit(inputs, title) -> job; the job id is the report's content key.
+    Jobs run on a private pool. Job state is per process, but the request, a build marker and
+    any failure are stored next to the file in the shared cache: a worker that never saw the
+    job reports it as running while another worker holds the marker, and picks it up otherwise.
+    """
+
+    def __init__(self, engine, cache: ContentCache, workers: int = PDF_WORKERS):
+        self.engine = engine
+        self.cache = cache
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'built': 0, 'failed': 0, 'build_ms_max': 0.0}
+
+    def report_id(self, inputs: Dict[str, Any], title: str) -> str:
+        with self.engine.db.reader() as connection:
+            revision = current_revision(connection)
+        as_of = inputs.get('as_of') or inputs.get('permit_date') or time.strftime('%Y-%m-%d')
+        return content_key('pdf', PDF_FORMAT_VERSION, inputs, title, revision, as_of)
+
+    def submit(self, data: Dict[str, Any], title: str) -> Dict[str, Any]:
+        inputs = {name: data[name] for name in REPORT_INPUTS if data.get(name) is not None}
+        report_id = self.report_id(inputs, title)
+        if self.cache.get(report_id, '.pdf'):
+            with self._lock:
+                self._stats['deduplicated'] += 1
+            return {'report_id': report_id, 'status': 'done'}
+        if self.cache.get(report_id, '.request.json') is None:
+            self.cache.put(report_id, '.request.json', json.dumps({'inputs': inputs, 'title': title}).encode())
+        # Submitting again retries a failed report
+        self.cache.discard(report_id, '.failed.json')
+        return self._start(report_id, {'inputs': inputs, 'title': title})
+
+    def _start(self, report_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(report_id)
+            if job is not None and job['status'] in ('queued', 'running'):
+                self._stats['deduplicated'] += 1
+                return dict(job)
+            if not self.cache.claim(report_id, BUILD_TIMEOUT_SECONDS):
+                # Another worker is building it
+                self._stats['deduplicated'] += 1
+                return {'report_id': report_id, 'status': 'running'}
+            job = self._jobs[report_id] = {'report_id': report_id, 'status': 'queued', 'submitted_at': time.time()}
+            self._stats['submitted'] += 1
+        self._executor.submit(self._build, report_id, request)
+        return dict(job)
+
+    def _build(self, report_id: str, request: Dict[str, Any]):
+        self._update(report_id, status='running')
+        started = time.perf_counter()
+        try:
+            workflow = self.engine.process_complete_workflow(request['inputs'])
+            if 'error' in workflow:
+                raise ValueError(workflow['error'])
+            self.cache.put(report_id, '.pdf', build_compliance_pdf(workflow, request['title']))
+        except Exception as e:
+            logger.error(f"❌ PDF report {report_id[:12]} failed: {e}")
+            self.cache.put(report_id, '.failed.json', json.dumps({'error': str(e)}).encode())
+            self._update(report_id, status='failed', error=str(e), finished_at=time.time())
+            with self._lock:
+                self._stats['failed'] += 1
+            return
+        finally:
+            self.cache.release(report_id)
+        elapsed = (time.perf_counter() - started) * 1000
+        self._update(report_id, status='done', finished_at=time.time(), build_ms=round(elapsed, 1))
+        with self._lock:
+            self._stats['built'] += 1
+            self._stats['build_ms_max'] = max(self._stats['build_ms_max'], round(elapsed, 1))
+
+    def _update(self, report_id: str, **fields):
+        with self._lock:
+            self._jobs.setdefault(report_id, {'report_id': report_id}).update(fields)
+
+    def _expire(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for report_id in [key for key, job in self._jobs.items() if job.get('finished_at', time.time()) < cutoff]:
+            del self._jobs[report_id]
+
+    def status(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Job state, or None when the report is unknown everywhere"""
+        with self._lock:
+            job = self._jobs.get(report_id)
+        if job is not None and job['status'] != 'done':
+            return dict(job)
+        if self.cache.get(report_id, '.pdf'):
+            return dict(job or {'report_id': report_id}, status='done')
+        failed = self.cache.get(report_id, '.failed.json')
+        if failed is not None:
+            with open(failed, 'rb') as f:
+                return dict(job or {'report_id': report_id}, status='failed', error=json.load(f)['error'])
+        source = self.cache.get(report_id, '.request.json')
+        if source is None:
+            return None
+        # Accepted by another worker (or before a restart): running there, or picked up here
+        with open(source, 'rb') as f:
+            return self._start(report_id, json.load(f))
+
+    def path(self, report_id: str) -> Optional[str]:
+        return self.cache.get(report_id, '.pdf')
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+            return dict(self._stats, active=active, workers=self.workers)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Precompiled JSON responses for static or slowly changing endpoints
+Serializes once into bytes with a strong ETag and a gzip variant, answers If-None-Match with 304
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from flask import Response, request
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: qvalue}"""
+    codings = {}
+    for part in (header or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding.strip().lower()] = quality
+    return codings
+
+
+def choose_encoding(header: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """
+    Best content-coding from `available` (in server preference order) that the client accepts.
+    Returns None when the identity representation should be sent.
+    """
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*')
+    best, best_quality = None, 0.0
+
+    for coding in available:
+        quality = codings.get(coding, wildcard if wildcard is not None else 0.0)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+
+    return best
+
+
+# Suffixes appended to an ETag for a content-coded variant of the same entity
+ENCODING_ETAG_SUFFIXES = ('-gzip"', '-br"')
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    """'"abc-gzip"' -> '"abc"'"""
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """
+    If-None-Match uses weak comparison: W/ prefixes are ignored, and so are the
+    encoding suffixes added by the compression middleware
+    """
+    if not if_none_match:
+        return False
+    candidates = {strip_encoding_suffix(tag.strip().replace('W/', '', 1)) for tag in if_none_match.split(',')}
+    if '*' in candidates:
+        return True
+    return any(strip_encoding_suffix(etag) in candidates for etag in etags)
+
+
+class PrecompiledJSON:
+    """A JSON payload serialized once, with its ETag and gzip variant"""
+
+    def __init__(self, payload: Any, version: Hashable):
+        self.version = version
+        self.body = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        # Different bytes need a different strong validator
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+class ResponseCache:
+    """
+    Keyed store of precompiled responses.
+    An entry is rebuilt only when the caller's version for that key changes.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, PrecompiledJSON] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'builds': 0, 'not_modified': 0, 'gzip_responses': 0}
+
+    def get(self, key: str, version: Hashable, build: Callable[[], Any]) -> PrecompiledJSON:
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            self._stats['hits'] += 1
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                entry = PrecompiledJSON(build(), version)
+                self._entries[key] = entry
+                self._stats['builds'] += 1
+            else:
+                self._stats['hits'] += 1
+        return entry
+
+    def respond(self, key: str, version: Hashable, build: Callable[[], Any],
+                cache_control: str = 'no-cache') -> Response:
+        """Serve the cached entry for the current request (304 / gzip / identity)"""
+        entry = self.get(key, version, build)
+        headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+
+        if etag_matches(request.headers.get('If-None-Match'), (entry.etag, entry.gzip_etag)):
+            self._stats['not_modified'] += 1
+            headers['ETag'] = entry.etag
+            return Response(status=304, headers=headers)
+
+        if choose_encoding(request.headers.get('Accept-Encoding'), ('gzip',)) == 'gzip':
+            self._stats['gzip_responses'] += 1
+            headers['ETag'] = entry.gzip_etag
+            headers['Content-Encoding'] = 'gzip'
+            return Response(entry.gzip_body, mimetype='application/json', headers=headers)
+
+        headers['ETag'] = entry.etag
+        return Response(entry.body, mimetype='application/json', headers=headers)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry (or all) so the next request re-serializes"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self._stats, entries=len(self._entries))
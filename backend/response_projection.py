@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Field projection and compact report mode for analysis responses
+Lets API clients ask for only the sections they need and receive shared objects once
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+FieldPath = Tuple[str, ...]
+
+# Workflow step -> steps whose output it consumes
+WORKFLOW_STEP_DEPENDENCIES = {
+    1: (),
+    2: (1,),
+    3: (2,),
+    4: (1, 2, 3),
+    5: (2, 3, 4),
+    6: (3, 4, 5),
+    7: (1, 3, 4)
+}
+
+# Response fields -> steps that produce them (unlisted fields are free)
+WORKFLOW_FIELD_STEPS = {
+    ('final_results',): (5, 6, 7),
+    ('final_results', 'compliance_checklist'): (6,),
+    ('final_results', 'layout_design'): (7,),
+    ('final_results', 'validation_summary'): (5,),
+    ('final_results', 'traceability_complete'): (5,),
+    ('validation',): (5,),
+    ('steps',): tuple(WORKFLOW_STEP_DEPENDENCIES),
+    ('clauses',): (4,)
+}
+
+# Clause columns returned to clients; ids, hashes, validity bounds, provenance and
+# classifier bookkeeping stay internal
+PUBLIC_CLAUSE_FIELDS = (
+    'clause_code', 'clause_number', 'jurisdiction', 'code_version', 'document_title', 'clause_title',
+    'clause_text_en', 'clause_text_fr', 'page_number', 'section_reference', 'table_reference',
+    'figure_reference', 'applies_to_building_types', 'applies_to_occupancy_types', 'applies_to_components',
+    'related_clause_ids', 'supersedes_clause_ids', 'exception_clause_ids', 'is_mandatory',
+    'enforcement_level', 'last_updated', 'clause_category', 'verification_method'
+)
+
+# Checklist item keys that only repeat the clause they point at
+CLAUSE_DERIVED_ITEM_KEYS = ('clause_number', 'title', 'requirement', 'code_reference', 'page_reference', 'priority')
+# Per-clause item keys that compact mode moves onto the clause in the top-level table
+CLAUSE_ITEM_KEYS = ('why_required', 'verification_method')
+
+# Row bookkeeping left out of the compact rule and assembly tables
+INTERNAL_ROW_FIELDS = ('id', 'created_at', 'content_hash', 'valid_from', 'valid_to')
+# Rule columns that every match already carries as parsed lists
+RULE_MATCH_COLUMNS = ('required_component_ids', 'required_assembly_ids', 'required_clause_ids')
+
+
+def public_clause(clause: Any) -> Dict[str, Any]:
+    """A clause row (sqlite3.Row, dict or code pack record) reduced to PUBLIC_CLAUSE_FIELDS"""
+    columns = set(clause.keys())
+    return {field: clause[field] for field in PUBLIC_CLAUSE_FIELDS if field in columns}
+
+
+def parse_fields(value: Optional[Any]) -> Optional[List[FieldPath]]:
+    """'steps.step_6,validation' -> [('steps', 'step_6'), ('validation',)]; empty means everything"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    paths = [tuple(part for part in str(field).strip().split('.') if part) for field in value]
+    paths = [path for path in paths if path]
+    return paths or None
+
+
+def parse_flag(value: Any) -> bool:
+    """Query-string / JSON boolean"""
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def top_level_fields(paths: Optional[List[FieldPath]]) -> Optional[Set[str]]:
+    return None if paths is None else {path[0] for path in paths}
+
+
+def required_workflow_steps(paths: Optional[List[FieldPath]]) -> Set[int]:
+    """Steps that must run to produce the requested fields, dependencies included"""
+    if paths is None:
+        return set(WORKFLOW_STEP_DEPENDENCIES)
+
+    wanted = set()
+    for path in paths:
+        if path[0] == 'steps' and len(path) > 1 and path[1].startswith('step_'):
+            try:
+                wanted.add(int(path[1][len('step_'):]))
+            except ValueError:
+                continue
+            continue
+        # Most specific mapping wins: ('final_results', 'layout_design') before ('final_results',)
+        for length in range(len(path), 0, -1):
+            steps = WORKFLOW_FIELD_STEPS.get(path[:length])
+            if steps is not None:
+                wanted.update(steps)
+                break
+
+    required = set()
+    pending = [step for step in wanted if step in WORKFLOW_STEP_DEPENDENCIES]
+    while pending:
+        step = pending.pop()
+        if step not in required:
+            required.add(step)
+            pending.extend(WORKFLOW_STEP_DEPENDENCIES[step])
+    return required
+
+
+def project(payload: Dict[str, Any], paths: Optional[List[FieldPath]]) -> Dict[str, Any]:
+    """Keep only the requested dotted paths; unknown paths are ignored"""
+    if paths is None:
+        return payload
+
+    projected: Dict[str, Any] = {}
+    for path in sorted(paths, key=len):
+        source, target = payload, projected
+        for depth, key in enumerate(path):
+            if not isinstance(source, dict) or key not in source:
+                break
+            if depth == len(path) - 1:
+                target[key] = source[key]
+                break
+            if key in target and not isinstance(target[key], dict):
+                break  # a shorter path already selected the whole subtree
+            target = target.setdefault(key, {})
+            source = source[key]
+    return projected
+
+
+def _ref(*path: str) -> Dict[str, str]:
+    return {'$ref': '#/' + '/'.join(path)}
+
+
+def _has(payload: Dict[str, Any], *path: str) -> bool:
+    node = payload
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return False
+        node = node[key]
+    return True
+
+
+def _shared_row(row: Dict[str, Any], omit: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """A row for a compact top-level table: no bookkeeping columns, no nulls"""
+    return {key: value for key, value in row.items()
+            if value is not None and key not in INTERNAL_ROW_FIELDS and key not in omit}
+
+
+def compact_workflow(payload: Dict[str, Any], clause_index: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deduplicate a (projected) workflow response.
+    Clauses, matched rules and assemblies move to top-level dicts (`clauses`, `rules`,
+    `assemblies`) keyed by their codes, and every step refers to them by code: step_2 matches,
+    step_3 assemblies, step_4 collection log entries, step_6 checklist items (whose
+    why_required / verification_method move onto the clause) and step_7 positions. Sections
+    repeated under final_results / validation become $ref pointers to the step that produced
+    them, when that step is part of the response. Null columns are omitted from the tables.
+    """
+    compact = copy.copy(payload)
+    referenced: Set[str] = set()
+    clause_details: Dict[str, Dict[str, Any]] = {}
+    rules: Dict[str, Dict[str, Any]] = {}
+    assemblies: Dict[str, Dict[str, Any]] = {}
+
+    steps = compact.get('steps')
+    if isinstance(steps, dict):
+        steps = compact['steps'] = dict(steps)
+
+        # Rule name -> code, so log entries can point into `rules`
+        rule_codes: Dict[str, str] = {}
+        if _has(steps, 'step_2', 'data'):
+            step_2 = steps['step_2'] = dict(steps['step_2'])
+            matches = []
+            for match in step_2['data']:
+                rule = match['rule']
+                rules.setdefault(rule['rule_code'], _shared_row(rule, RULE_MATCH_COLUMNS))
+                rule_codes.setdefault(rule['rule_name'], rule['rule_code'])
+                matches.append(dict(match, rule=rule['rule_code']))
+            step_2['data'] = matches
+
+        if _has(steps, 'step_3', 'data', 'required_assemblies'):
+            step_3 = steps['step_3'] = dict(steps['step_3'])
+            data = step_3['data'] = dict(step_3['data'])
+            for assembly in data['required_assemblies']:
+                assemblies.setdefault(assembly['assembly_code'], _shared_row(assembly))
+            data['required_assemblies'] = [assembly['assembly_code'] for assembly in data['required_assemblies']]
+            data['expansion_log'] = [{key: value for key, value in entry.items() if key != 'assembly'}
+                                     for entry in data.get('expansion_log', [])]
+
+        if _has(steps, 'step_4', 'data', 'clauses'):
+            step_4 = steps['step_4'] = dict(steps['step_4'])
+            data = step_4['data'] = dict(step_4['data'])
+            data['clauses'] = [clause['clause_code'] for clause in data['clauses']]
+            referenced.update(data['clauses'])
+            data['collection_log'] = [_compact_log_entry(entry, rule_codes)
+                                      for entry in data.get('collection_log', [])]
+
+        if _has(steps, 'step_6', 'data'):
+            step_6 = steps['step_6'] = dict(steps['step_6'])
+            step_6['data'] = _compact_checklist(step_6['data'], referenced, clause_details,
+                                                validation_ref=_has(steps, 'step_5', 'data'))
+
+        if _has(steps, 'step_7', 'data', 'positioned_assemblies') and assemblies:
+            step_7 = steps['step_7'] = dict(steps['step_7'])
+            data = step_7['data'] = dict(step_7['data'])
+            data['positioned_assemblies'] = [
+                {key: value for key, value in placed.items()
+                 if not (key == 'assembly_name' and placed.get('assembly_code') in assemblies)}
+                for placed in data['positioned_assemblies']]
+
+    final_results = compact.get('final_results')
+    if isinstance(final_results, dict):
+        final_results = compact['final_results'] = dict(final_results)
+        for key, step in (('compliance_checklist', 'step_6'),
+                          ('layout_design', 'step_7'),
+                          ('validation_summary', 'step_5')):
+            if key not in final_results:
+                continue
+            if _has(compact, 'steps', step, 'data'):
+                final_results[key] = _ref('steps', step, 'data')
+            elif key == 'compliance_checklist':
+                final_results[key] = _compact_checklist(final_results[key], referenced, clause_details,
+                                                        validation_ref=False)
+
+    if 'validation' in compact and _has(compact, 'steps', 'step_5', 'data'):
+        compact['validation'] = _ref('steps', 'step_5', 'data')
+
+    compact['clauses'] = {code: dict(_shared_row(clause_index[code]), **clause_details.get(code, {}))
+                          for code in sorted(referenced) if code in clause_index}
+    if rules:
+        compact['rules'] = rules
+    if assemblies:
+        compact['assemblies'] = assemblies
+    compact['compact'] = True
+    return compact
+
+
+def _compact_log_entry(entry: Dict[str, Any], rule_codes: Dict[str, str]) -> Dict[str, Any]:
+    """Collection log entry pointing at `clauses` (and at `rules` for a rule requirement)"""
+    entry = {key: value for key, value in entry.items() if key != 'clause_title'}
+    if entry.get('source') == 'direct_rule_requirement' and entry.get('rule') in rule_codes:
+        # The reason is the rule's match_reason in step_2
+        entry['rule'] = rule_codes[entry['rule']]
+        entry.pop('reason', None)
+    return entry
+
+
+def _compact_checklist(checklist: Dict[str, Any], referenced: Set[str],
+                       clause_details: Dict[str, Dict[str, Any]], validation_ref: bool) -> Dict[str, Any]:
+    """Checklist with clause text replaced by clause ids; per-clause item keys go to clause_details"""
+    checklist = dict(checklist)
+
+    if validation_ref and 'validation_status' in checklist:
+        checklist['validation_status'] = _ref('steps', 'step_5', 'data')
+
+    sections = []
+    for section in checklist.get('sections', []):
+        items = []
+        for item in section.get('items', []):
+            details = clause_details.setdefault(item['clause_id'], {})
+            details.update((key, item[key]) for key in CLAUSE_ITEM_KEYS if key in item)
+            items.append({key: value for key, value in item.items()
+                          if key not in CLAUSE_DERIVED_ITEM_KEYS and key not in CLAUSE_ITEM_KEYS})
+            referenced.add(item['clause_id'])
+        sections.append(dict(section, items=items))
+    checklist['sections'] = sections
+
+    return checklist
+
+
+def wanted(fields: Optional[Set[str]], *keys: str) -> bool:
+    """True when no projection was requested or any of keys was"""
+    return fields is None or any(key in fields for key in keys)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Static Asset Pipeline for the frontend
+Reads frontend/ once at startup: content-hash fingerprints, in-memory gzip/brotli variants,
+immutable caching headers and HTML references rewritten to the fingerprinted names
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from flask import Response, request
+
+from response_cache import choose_encoding, etag_matches
+
+# Brotli is optional - either binding works, gzip is always available
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+logger = logging.getLogger(__name__)
+
+# URL prefix the fingerprinted files are served under
+ASSET_URL_PREFIX = '/frontend/'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Skip compressed variants that would not save at least this fraction
+MIN_COMPRESSION_SAVING = 0.1
+
+ASSET_REFERENCE = re.compile(r'(?P<attr>\b(?:href|src)=)(?P<quote>["\'])(?P<url>[^"\']+)(?P=quote)')
+
+
+class StaticAsset:
+    """One frontend file held in memory with its precompressed variants"""
+
+    def __init__(self, name: str, body: bytes, mimetype: str, mtime: float):
+        self.name = name
+        self.mimetype = mimetype
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.etag = f'"{self.digest[:32]}"'
+        self.fingerprinted_name = self.fingerprint(name, self.digest)
+        self.variants = {None: body}
+        self.etags = {None: self.etag}
+
+        if mimetype.startswith(COMPRESSIBLE_TYPES):
+            self.add_variant('gzip', gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self.add_variant('br', brotli.compress(body))
+
+    @staticmethod
+    def fingerprint(name: str, digest: str) -> str:
+        """styles.css -> styles.3f2a9c1d0b4e.css"""
+        stem, extension = os.path.splitext(name)
+        return f'{stem}.{digest[:12]}{extension}'
+
+    @property
+    def is_html(self) -> bool:
+        return self.mimetype == 'text/html'
+
+    def add_variant(self, encoding: str, body: bytes):
+        if len(body) <= len(self.variants[None]) * (1 - MIN_COMPRESSION_SAVING):
+            self.variants[encoding] = body
+            # Validator must differ per representation
+            self.etags[encoding] = f'"{self.digest[:32]}-{encoding}"'
+
+
+class StaticAssetPipeline:
+    """
+    In-memory view of the frontend directory.
+
+    Non-HTML files are addressable by their logical name (revalidated via ETag) and by
+    their fingerprinted name (cached forever). HTML pages are rewritten to reference
+    the fingerprinted names, so a deploy changes the URLs instead of relying on expiry.
+    """
+
+    def __init__(self, root: str, auto_reload: bool = False):
+        self.root = os.path.abspath(root)
+        self.auto_reload = auto_reload
+        self.assets: Dict[str, StaticAsset] = {}
+        self.fingerprinted: Dict[str, StaticAsset] = {}
+        self.build()
+
+    def build(self):
+        """Read, fingerprint and compress every file under root"""
+        assets = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                with open(path, 'rb') as f:
+                    body = f.read()
+                assets[name] = (body, mimetype, os.path.getmtime(path))
+
+        built = {}
+        # Fingerprint static files first so HTML can reference the final names
+        for name, (body, mimetype, mtime) in assets.items():
+            if mimetype != 'text/html':
+                built[name] = StaticAsset(name, body, mimetype, mtime)
+
+        for name, (body, mimetype, mtime) in assets.items():
+            if mimetype == 'text/html':
+                html = self.rewrite_html(body.decode('utf-8'), name, built)
+                built[name] = StaticAsset(name, html.encode('utf-8'), mimetype, mtime)
+
+        self.assets = built
+        self.fingerprinted = {asset.fingerprinted_name: asset
+                              for asset in built.values() if not asset.is_html}
+
+        logger.info(f"📦 Static assets built: {len(built)} files"
+                    f"{'' if brotli else ' (brotli unavailable, gzip only)'}")
+
+    def rewrite_html(self, html: str, page_name: str, assets: Dict[str, StaticAsset]) -> str:
+        """Point href/src attributes at fingerprinted URLs"""
+        page_directory = os.path.dirname(page_name)
+
+        def replace(match):
+            url = match.group('url')
+            if '://' in url or url.startswith(('#', 'data:', 'mailto:')):
+                return match.group(0)
+
+            path = url.split('?', 1)[0].split('#', 1)[0]
+            if path.startswith(ASSET_URL_PREFIX):
+                name = path[len(ASSET_URL_PREFIX):]
+            elif path.startswith('/'):
+                name = path.lstrip('/')
+            else:
+                name = os.path.normpath(os.path.join(page_directory, path)).replace(os.sep, '/')
+
+            asset = assets.get(name)
+            if asset is None:
+                return match.group(0)
+            quote = match.group('quote')
+            return f"{match.group('attr')}{quote}{ASSET_URL_PREFIX}{asset.fingerprinted_name}{quote}"
+
+        return ASSET_REFERENCE.sub(replace, html)
+
+    def refresh_if_changed(self):
+        """Development only: rebuild when any file on disk is newer than its copy"""
+        for asset in self.assets.values():
+            path = os.path.join(self.root, asset.name)
+            if not os.path.exists(path) or os.path.getmtime(path) != asset.mtime:
+                self.build()
+                return
+
+    def url_for(self, name: str) -> str:
+        asset = self.assets.get(name)
+        return f'{ASSET_URL_PREFIX}{asset.fingerprinted_name}' if asset else f'{ASSET_URL_PREFIX}{name}'
+
+    def lookup(self, name: str):
+        """Resolve a request path to (asset, immutable)"""
+        if self.auto_reload:
+            self.refresh_if_changed()
+
+        asset = self.fingerprinted.get(name)
+        if asset is not None:
+            return asset, True
+        return self.assets.get(name), False
+
+    def serve(self, name: str) -> Optional[Response]:
+        """Response for a logical or fingerprinted name, or None if unknown"""
+        asset, immutable = self.lookup(name)
+        if asset is None:
+            return None
+
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            'ETag': asset.etag
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if etag_matches(request.headers.get('If-None-Match'), asset.etags.values()):
+            return Response(status=304, headers=headers)
+
+        preference = [encoding for encoding in ('br', 'gzip') if encoding in asset.variants]
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), preference)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+            headers['ETag'] = asset.etags[encoding]
+
+        return Response(asset.variants[encoding], mimetype=asset.mimetype, headers=headers)
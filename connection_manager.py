@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+BCode Pro - SQLite Connection Manager
+One place that opens every database connection: WAL journaling, tuned pragmas,
+a pool of query_only reader connections and a single serialized writer
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+
+logger = logging.getLogger(__name__)
+
+# Applied to every connection (journal_mode is set once, by the writer)
+DEFAULT_PRAGMAS = {
+    'synchronous': 'NORMAL',     # Safe with WAL, skips an fsync per commit
+    'cache_size': -16000,        # 16 MB page cache per connection (negative = KiB)
+    'mmap_size': 268435456,      # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000         # ms to wait on another process holding the write lock
+}
+
+DEFAULT_READER_POOL_SIZE = int(os.environ.get('SQLITE_READER_POOL_SIZE', '4'))
+DEFAULT_ACQUIRE_TIMEOUT = float(os.environ.get('SQLITE_ACQUIRE_TIMEOUT', '30'))
+
+
+class ConnectionPoolTimeout(Exception):
+    """Raised when no reader connection frees up within the acquire timeout"""
+    pass
+
+
+class SQLiteConnectionManager:
+    """
+    Reader pool + single writer for one SQLite database file.
+
+    Readers are opened lazily up to reader_pool_size, marked query_only and reused
+    across requests. All writes go through one connection guarded by a lock, so a
+    worker never has two of its own transactions fighting over the write lock.
+    """
+
+    def __init__(self, db_path, reader_pool_size=DEFAULT_READER_POOL_SIZE,
+                 pragmas=None, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        self.db_path = db_path
+        self.reader_pool_size = max(1, reader_pool_size)
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.acquire_timeout = acquire_timeout
+        self.pid = os.getpid()
+
+        # In-memory databases are private to one connection, so readers share the writer
+        self.in_memory = db_path == ':memory:'
+
+        self._readers = LifoQueue()
+        self._readers_open = 0
+        self._pool_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._journal_mode = None
+
+        self._stats = {
+            'reader_checkouts': 0,
+            'reader_wait_ms_total': 0.0,
+            'reader_wait_ms_max': 0.0,
+            'reader_timeouts': 0,
+            'writer_transactions': 0,
+            'writer_rollbacks': 0,
+            'writer_wait_ms_total': 0.0,
+            'writer_wait_ms_max': 0.0
+        }
+        self._stats_lock = threading.Lock()
+
+    def _connect(self, query_only):
+        """Open a connection with the standard pragmas applied"""
+        if not self.in_memory:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+
+        connection = sqlite3.connect(self.db_path, check_same_thread=False,
+                                     timeout=self.pragmas['busy_timeout'] / 1000)
+        connection.row_factory = sqlite3.Row
+
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+
+        if query_only:
+            connection.execute('PRAGMA query_only = ON')
+
+        return connection
+
+    def _get_writer(self):
+        """Writer connection, created on first use; also switches the file to WAL"""
+        if self._writer is None:
+            self._writer = self._connect(query_only=False)
+            if not self.in_memory:
+                row = self._writer.execute('PRAGMA journal_mode = WAL').fetchone()
+                self._journal_mode = row[0]
+            else:
+                self._journal_mode = 'memory'
+        return self._writer
+
+    def _record_wait(self, prefix, waited_ms):
+        with self._stats_lock:
+            self._stats[f'{prefix}_wait_ms_total'] += waited_ms
+            if waited_ms > self._stats[f'{prefix}_wait_ms_max']:
+                self._stats[f'{prefix}_wait_ms_max'] = waited_ms
+
+    @contextmanager
+    def reader(self):
+        """Borrow a query_only connection from the pool"""
+        if self.in_memory:
+            with self.writer(transaction=False) as connection:
+                yield connection
+            return
+
+        started = time.perf_counter()
+        connection = None
+
+        try:
+            connection = self._readers.get_nowait()
+        except Empty:
+            with self._pool_lock:
+                can_open = self._readers_open < self.reader_pool_size
+                if can_open:
+                    self._readers_open += 1
+            if can_open:
+                try:
+                    with self._writer_lock:
+                        self._get_writer()  # WAL must be enabled before readers attach
+                    connection = self._connect(query_only=True)
+                except Exception:
+                    with self._pool_lock:
+                        self._readers_open -= 1
+                    raise
+            else:
+                try:
+                    connection = self._readers.get(timeout=self.acquire_timeout)
+                except Empty:
+                    with self._stats_lock:
+                        self._stats['reader_timeouts'] += 1
+                    raise ConnectionPoolTimeout(
+                        f'No reader connection for {self.db_path} within {self.acquire_timeout}s'
+                    )
+
+        self._record_wait('reader', (time.perf_counter() - started) * 1000)
+        with self._stats_lock:
+            self._stats['reader_checkouts'] += 1
+
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            self._readers.put(connection)
+
+    @contextmanager
+    def writer(self, transaction=True):
+        """
+        Exclusive access to the single writer connection.
+        Opens a BEGIN IMMEDIATE transaction, commits on success and rolls back on error.
+        """
+        started = time.perf_counter()
+        with self._writer_lock:
+            self._record_wait('writer', (time.perf_counter() - started) * 1000)
+            connection = self._get_writer()
+
+            if not transaction or connection.in_transaction:
+                # Nested use (or plain access) joins whatever the outer block started
+                yield connection
+                return
+
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+                if connection.in_transaction:
+                    connection.commit()
+                with self._stats_lock:
+                    self._stats['writer_transactions'] += 1
+            except Exception:
+                if connection.in_transaction:
+                    connection.rollback()
+                with self._stats_lock:
+                    self._stats['writer_rollbacks'] += 1
+                raise
+
+    def metrics(self):
+        """Pool utilisation and wait-time counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        idle = self._readers.qsize()
+        stats['reader_wait_ms_total'] = round(stats['reader_wait_ms_total'], 3)
+        stats['reader_wait_ms_max'] = round(stats['reader_wait_ms_max'], 3)
+        stats['writer_wait_ms_total'] = round(stats['writer_wait_ms_total'], 3)
+        stats['writer_wait_ms_max'] = round(stats['writer_wait_ms_max'], 3)
+
+        stats.update({
+            'database': os.path.basename(self.db_path),
+            'journal_mode': self._journal_mode,
+            'reader_pool_size': self.reader_pool_size,
+            'readers_open': self._readers_open,
+            'readers_idle': idle,
+            'readers_in_use': self._readers_open - idle
+        })
+        return stats
+
+    def close(self):
+        """Close idle readers and the writer (readers in use are closed by GC)"""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except Empty:
+                break
+        with self._pool_lock:
+            self._readers_open = 0
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+# One manager per database file per process
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path, **options):
+    """
+    Shared manager for a database path.
+    Managers inherited through fork (gunicorn workers) are replaced, never reused.
+    """
+    key = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+    pid = os.getpid()
+
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or manager.pid != pid or manager.in_memory:
+            manager = SQLiteConnectionManager(db_path, **options)
+            if not manager.in_memory:
+                _managers[key] = manager
+        return manager
+
+
+def connection_metrics():
+    """Metrics for every connection manager opened by this process"""
+    pid = os.getpid()
+    with _managers_lock:
+        managers = [manager for manager in _managers.values() if manager.pid == pid]
+    return [manager.metrics() for manager in managers]
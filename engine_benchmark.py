@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Engine microbenchmark suite
+Builds synthetic building-code databases (up to 10k rules / 100k clauses, nested assemblies,
+JSON condition trees), times every EnhancedBuildingCodeEngine step and the full workflow at
+each size, and reports scaling curves and peak memory as JSON.
+
+Usage:
+    python engine_benchmark.py                                  # default size ladder
+    python engine_benchmark.py --sizes 1000:10000,10000:100000 --repeats 5 --output bench.json
+    python engine_benchmark.py --backends sqlite,codepack --baseline bench.json
+    python engine_benchmark.py --backends sqlite,memory          # storage-adapter overhead
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from assembly_closure import rebuild_closure
+from code_editions import refresh_validity
+from code_pack import compile_code_pack
+from code_storage import InMemoryCodeRepository
+from connection_manager import SQLiteConnectionManager
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import apply_migrations, latest_version
+
+JURISDICTIONS = ('NBC', 'Alberta', 'Ontario', 'BC')
+BUILDING_TYPES = ('office', 'school', 'retail', 'assembly', 'industrial', 'daycare')
+CATEGORIES = ('toilet', 'sink', 'urinal', 'grab_bar', 'partition', 'dryer')
+TITLE_WORDS = ('Water Closets', 'Lavatories', 'Accessible Stalls', 'Grab Bars', 'Urinals',
+               'Clearances', 'Ventilation', 'Privacy Partitions', 'Universal Washrooms', 'Signage')
+
+# Seeded sample rows in these tables are replaced by the synthetic ones
+SYNTHETIC_TABLES = ('context_logic_rule', 'component_assembly', 'building_code_clause', 'component')
+
+DEFAULT_INPUTS = {
+    'building_type': 'office',
+    'occupancy_load': 120,
+    'jurisdiction': 'NBC',
+    'accessibility_level': 'enhanced',
+    'room_length': 12.0,
+    'room_width': 9.0
+}
+
+STEPS = ('step_1', 'step_2', 'step_3', 'step_4', 'step_5', 'step_6', 'step_7')
+
+
+# =====================================================
+# Synthetic data
+# =====================================================
+
+def condition_tree(rng, depth):
+    """Random trigger condition: AND/OR trees over the keys step 1 produces"""
+    if depth <= 0 or rng.random() < 0.3:
+        leaf = rng.choice((
+            lambda: {'building_type': rng.choice(BUILDING_TYPES)},
+            lambda: {'total_occupants': f'>{rng.randint(1, 150)}'},
+            lambda: {'total_occupants': f'<{rng.randint(50, 500)}'},
+            lambda: {'accessibility_required': rng.random() < 0.5},
+            lambda: {'occupancy_type': rng.choice(BUILDING_TYPES),
+                     'total_occupants': f'>{rng.randint(1, 100)}'}
+        ))
+        return leaf()
+    operator = rng.choice(('AND', 'OR'))
+    return {operator: [condition_tree(rng, depth - 1) for _ in range(rng.randint(2, 3))]}
+
+
+def build_synthetic_database(path, rules, clauses, components=500, assemblies=1000,
+                             assembly_depth=3, condition_depth=3, seed=7):
+    """Create (or reuse) a synthetic database with the given row counts"""
+    if os.path.exists(path):
+        return path
+
+    rng = random.Random(seed)
+    building = f'{path}.building'
+    if os.path.exists(building):
+        os.remove(building)
+    manager = SQLiteConnectionManager(building)
+    try:
+        apply_migrations(manager)
+        with manager.writer() as connection:
+            for table in SYNTHETIC_TABLES:
+                connection.execute(f'DELETE FROM {table}')
+
+        component_codes = [f'COMP_{i:05d}' for i in range(components)]
+        clause_codes = {jurisdiction: [] for jurisdiction in JURISDICTIONS}
+        with manager.writer() as connection:
+            connection.executemany('''
+                INSERT INTO component (component_code, name, category, dimensions, clearance_requirements,
+                                       applicable_jurisdictions, accessibility_level)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', ((code, f'Component {code}', rng.choice(CATEGORIES),
+                   json.dumps({'width': round(rng.uniform(0.3, 1.5), 2), 'depth': round(rng.uniform(0.3, 1.8), 2)}),
+                   json.dumps({'front': round(rng.uniform(0.3, 1.2), 2)}),
+                   json.dumps(list(JURISDICTIONS)), rng.choice(('standard', 'accessible')))
+                  for code in component_codes))
+
+            clause_rows = []
+            for i in range(clauses):
+                jurisdiction = JURISDICTIONS[i % len(JURISDICTIONS)]
+                code = f'{jurisdiction}_BENCH_{i:06d}'
+                clause_codes[jurisdiction].append(code)
+                title = f'{rng.choice(TITLE_WORDS)} {i}'
+                clause_rows.append((
+                    code, f'3.{rng.randint(1, 9)}.{rng.randint(1, 9)}.{i}', jurisdiction, '2020',
+                    title, f'{title}: ' + ' '.join(rng.choice(TITLE_WORDS).lower() for _ in range(40)),
+                    rng.randint(1, 900), json.dumps(rng.sample(BUILDING_TYPES, 2)),
+                    json.dumps(rng.sample(component_codes, rng.randint(1, 4))),
+                    rng.choice(('critical', 'important', 'recommended'))
+                ))
+            connection.executemany('''
+                INSERT INTO building_code_clause (clause_code, clause_number, jurisdiction, code_version,
+                                                  clause_title, clause_text_en, page_number,
+                                                  applies_to_building_types, applies_to_components,
+                                                  enforcement_level)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', clause_rows)
+
+            # Assemblies nest: level n may reference assemblies from level n-1
+            assembly_rows, previous_level = [], []
+            per_level = max(1, assemblies // max(1, assembly_depth))
+            for level in range(max(1, assembly_depth)):
+                level_codes = []
+                for i in range(per_level):
+                    code = f'ASM_L{level}_{i:05d}'
+                    members = rng.sample(component_codes, rng.randint(2, 5))
+                    if previous_level:
+                        members += rng.sample(previous_level, min(len(previous_level), rng.randint(1, 2)))
+                    assembly_rows.append((
+                        code, f'Assembly {code}', json.dumps(members),
+                        json.dumps({'width': round(rng.uniform(0.8, 2.5), 2), 'depth': round(rng.uniform(1.0, 2.5), 2)}),
+                        json.dumps({'approach_space': round(rng.uniform(0.6, 1.5), 2)}),
+                        json.dumps(rng.sample(BUILDING_TYPES, 3))
+                    ))
+                    level_codes.append(code)
+                previous_level = level_codes
+            connection.executemany('''
+                INSERT INTO component_assembly (assembly_code, name, component_ids, total_footprint,
+                                                circulation_space, applicable_building_types)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', assembly_rows)
+            assembly_codes = [row[0] for row in assembly_rows]
+
+            rule_rows = []
+            for i in range(rules):
+                jurisdiction = JURISDICTIONS[i % len(JURISDICTIONS)]
+                rule_rows.append((
+                    f'BENCH_RULE_{i:06d}', f'Benchmark rule {i}', rng.choice(('fixture_count', 'accessibility')),
+                    json.dumps(condition_tree(rng, condition_depth)), rng.randint(1, 100),
+                    json.dumps(rng.sample(component_codes, rng.randint(0, 3))),
+                    json.dumps(rng.sample(assembly_codes, rng.randint(0, 3))),
+                    json.dumps(rng.sample(clause_codes[jurisdiction], min(len(clause_codes[jurisdiction]),
+                                                                          rng.randint(1, 4)))),
+                    jurisdiction
+                ))
+            connection.executemany('''
+                INSERT INTO context_logic_rule (rule_code, rule_name, rule_category, trigger_condition, priority,
+                                                required_component_ids, required_assembly_ids,
+                                                required_clause_ids, jurisdiction)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rule_rows)
+            refresh_validity(connection.cursor())
+            rebuild_closure(connection.cursor())
+    finally:
+        manager.close()
+
+    os.replace(building, path)
+    return path
+
+
+# =====================================================
+# Timing
+# =====================================================
+
+def time_steps(engine, inputs):
+    """Run the workflow step by step; returns ({step: ms}, counts)"""
+    timings = {}
+
+    def timed(step, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        timings[step] = (time.perf_counter() - started) * 1000
+        return result
+
+    normalized = timed('step_1', engine.process_user_inputs, inputs)
+    rules = timed('step_2', engine.match_context_logic_rules, normalized)
+    expansion = timed('step_3', engine.expand_component_assemblies, rules)
+    clauses = timed('step_4', engine.collect_building_code_clauses, expansion, rules, normalized['jurisdiction'],
+                    normalized['as_of'])
+    validation = timed('step_5', engine.validate_logic_completeness, expansion, clauses, rules)
+    timed('step_6', engine.generate_compliance_checklist, clauses, expansion, validation)
+    timed('step_7', engine.generate_2d_layout_with_compliance, expansion, normalized['room_dimensions'], clauses)
+
+    counts = {
+        'rules_matched': len(rules),
+        'assemblies_expanded': len(expansion['required_assemblies']),
+        'components_required': len(expansion['required_components']),
+        'clauses_collected': clauses['total_clauses']
+    }
+    return timings, counts
+
+
+def benchmark(engine, inputs, repeats):
+    """Median per-step and full-workflow times plus tracemalloc peak of one full run"""
+    time_steps(engine, inputs)  # warm the reader pool and page cache
+
+    samples = {step: [] for step in STEPS}
+    workflow = []
+    counts = {}
+    for _ in range(repeats):
+        timings, counts = time_steps(engine, inputs)
+        for step, ms in timings.items():
+            samples[step].append(ms)
+        started = time.perf_counter()
+        engine.process_complete_workflow(inputs)
+        workflow.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    engine.process_complete_workflow(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'steps_ms': {step: round(statistics.median(values), 3) for step, values in samples.items()},
+        'workflow_ms': {
+            'median': round(statistics.median(workflow), 3),
+            'min': round(min(workflow), 3),
+            'max': round(max(workflow), 3)
+        },
+        'peak_memory_kb': round(peak / 1024, 1),
+        'counts': counts
+    }
+
+
+def scaling_curves(results):
+    """
+    Per backend and step: (clauses, ms) points and the empirical exponent between
+    consecutive sizes (1.0 = linear in data size, 2.0 = quadratic)
+    """
+    curves = {}
+    for backend in sorted({result['backend'] for result in results}):
+        points = sorted((r for r in results if r['backend'] == backend), key=lambda r: r['clauses'])
+        curve = {}
+        for step in STEPS + ('workflow',):
+            series = [(p['clauses'], p['workflow_ms']['median'] if step == 'workflow' else p['steps_ms'][step])
+                      for p in points]
+            exponents = []
+            for (n1, t1), (n2, t2) in zip(series, series[1:]):
+                if n2 > n1 and t1 > 0 and t2 > 0:
+                    exponents.append(round(math.log(t2 / t1) / math.log(n2 / n1), 2))
+            curve[step] = {'points': series, 'exponents': exponents}
+        curves[backend] = curve
+    return curves
+
+
+def find_regressions(results, baseline_path, threshold):
+    """Steps that got slower than the baseline report by more than threshold"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['backend'], r['rules'], r['clauses']): r for r in baseline.get('results', [])}
+
+    regressions = []
+    for result in results:
+        before = previous.get((result['backend'], result['rules'], result['clauses']))
+        if not before:
+            continue
+        pairs = [(step, before['steps_ms'][step], result['steps_ms'][step]) for step in STEPS]
+        pairs.append(('workflow', before['workflow_ms']['median'], result['workflow_ms']['median']))
+        for step, old, new in pairs:
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append({'backend': result['backend'], 'rules': result['rules'],
+                                    'clauses': result['clauses'], 'step': step,
+                                    'baseline_ms': old, 'current_ms': new,
+                                    'change': f'{(new - old) / old:+.0%}'})
+    return regressions
+
+
+def parse_sizes(value):
+    """'100:1000,10000:100000' -> [(100, 1000), (10000, 100000)]"""
+    sizes = []
+    for part in value.split(','):
+        rules, _, clauses = part.strip().partition(':')
+        sizes.append((int(rules), int(clauses or rules)))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EnhancedBuildingCodeEngine scaling benchmark')
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('100:1000,1000:10000,10000:100000'),
+                        help='rules:clauses pairs, comma separated')
+    parser.add_argument('--components', type=int, default=500)
+    parser.add_argument('--assemblies', type=int, default=1000)
+    parser.add_argument('--assembly-depth', type=int, default=3, help='nesting levels of assemblies')
+    parser.add_argument('--condition-depth', type=int, default=3, help='max AND/OR depth of trigger conditions')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--backends', default='sqlite', help='sqlite, codepack, memory (comma separated)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'bcode_benchmark'),
+                        help='synthetic databases are cached here between runs')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='earlier report; steps slower by more than --threshold are flagged')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    # Per-step INFO logs would dominate the timings
+    logging.getLogger('enhanced_logic_engine').setLevel(logging.WARNING)
+    logging.getLogger('code_pack').setLevel(logging.WARNING)
+    os.makedirs(args.workdir, exist_ok=True)
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+
+    results = []
+    for rules, clauses in args.sizes:
+        name = (f'bench_r{rules}_c{clauses}_k{args.components}_a{args.assemblies}'
+                f'_d{args.assembly_depth}_t{args.condition_depth}_s{args.seed}_v{latest_version()}')
+        db_path = os.path.join(args.workdir, name + '.db')
+        started = time.perf_counter()
+        build_synthetic_database(db_path, rules, clauses, args.components, args.assemblies,
+                                 args.assembly_depth, args.condition_depth, args.seed)
+        print(f"🧪 {rules} rules / {clauses} clauses ready in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+
+        for backend in backends:
+            pack_path = repository = None
+            if backend == 'codepack':
+                pack_path = os.path.join(args.workdir, name + '.codepack')
+                if not os.path.exists(pack_path):
+                    compile_code_pack(db_path, pack_path)
+            elif backend == 'memory':
+                repository = InMemoryCodeRepository.from_sqlite(db_path)
+            engine = EnhancedBuildingCodeEngine(db_path, code_pack_path=pack_path, repository=repository)
+
+            result = benchmark(engine, DEFAULT_INPUTS, args.repeats)
+            result.update(backend=backend, rules=rules, clauses=clauses)
+            results.append(result)
+            print(f"   {backend:>8}: workflow {result['workflow_ms']['median']} ms, "
+                  f"peak {result['peak_memory_kb']} KB, {result['counts']}", file=sys.stderr)
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'config': {
+            'components': args.components, 'assemblies': args.assemblies,
+            'assembly_depth': args.assembly_depth, 'condition_depth': args.condition_depth,
+            'repeats': args.repeats, 'seed': args.seed, 'inputs': DEFAULT_INPUTS
+        },
+        'results': results,
+        'scaling': scaling_curves(results)
+    }
+    if args.baseline:
+        report['regressions'] = find_regressions(results, args.baseline, args.threshold)
+        for regression in report['regressions']:
+            print(f"⚠️ {regression['backend']} {regression['step']} at {regression['clauses']} clauses: "
+                  f"{regression['baseline_ms']} -> {regression['current_ms']} ms ({regression['change']})",
+                  file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"✅ Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
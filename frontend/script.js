@@ -5,6 +5,7 @@ const API_BASE_URL = window.location.hostname === 'localhost'
     : `${window.location.protocol}//${window.location.host}/api`;
 
 let apiConnected = false;
+let lastReport = null;
 
 // Initialize when page loads
 document.addEventListener('DOMContentLoaded', function() {
@@ -270,6 +271,7 @@ function showLoading(show) {
 
 // Display results
 function displayResults(report) {
+    lastReport = report;
     const resultsDiv = document.getElementById('results');
     const fixtures = report.fixture_requirements;
     const score = report.compliance_score || 0;
@@ -320,6 +322,8 @@ function displayResults(report) {
             <p><strong>Compliance Items:</strong> ${report.compliance_checklist.length} requirements checked</p>
         </div>
         
+        <div id="layout-preview" class="layout-preview"></div>
+        
         ${report.recommendations && report.recommendations.length > 0 ? `
             <div class="recommendations">
                 <h4>💡 Recommendations</h4>
@@ -338,6 +342,32 @@ function displayResults(report) {
     
     resultsDiv.innerHTML = resultsHTML;
     resultsDiv.scrollIntoView({ behavior: 'smooth' });
+    loadLayoutPreview(report);
+}
+
+// Server-rendered layout drawing (cached by layout content, so repeat views are free)
+async function loadLayoutPreview(report) {
+    const preview = document.getElementById('layout-preview');
+    const parameters = report.project_parameters || {};
+    if (!preview || !report.layout_elements || !parameters.room_dimensions) return;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/render/layout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                room_dimensions: parameters.room_dimensions,
+                layout_elements: report.layout_elements
+            })
+        });
+        const result = await response.json();
+        if (result.success) {
+            const apiOrigin = API_BASE_URL.replace(/\/api$/, '');
+            preview.innerHTML = `<h4>📐 Layout</h4><img src="${apiOrigin}${result.svg_url}" alt="Washroom layout" style="max-width: 100%;">`;
+        }
+    } catch (error) {
+        console.warn('Layout preview unavailable:', error.message);
+    }
 }
 
 // Get compliance message based on score
@@ -349,9 +379,53 @@ function getComplianceMessage(score) {
     return '❌ Poor! Major compliance issues detected.';
 }
 
-// Export to CAD (placeholder)
-function exportToCAD() {
-    showNotification('📐 AutoCAD export feature coming soon!', 'info');
+// Export the generated layout as a layered DXF file
+async function exportToCAD() {
+    if (!lastReport || !lastReport.layout_elements) {
+        showNotification('❌ Generate a design before exporting', 'error');
+        return;
+    }
+    
+    const parameters = lastReport.project_parameters || {};
+    const roomDimensions = parameters.room_dimensions || {
+        length: parseFloat(document.getElementById('room-length').value),
+        width: parseFloat(document.getElementById('room-width').value)
+    };
+    
+    try {
+        showNotification('📐 Preparing DXF export...', 'info');
+        const response = await fetch(`${API_BASE_URL}/export/dxf`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                project_name: `Washroom_${parameters.building_type || 'design'}_${parameters.occupancy_load || ''}`,
+                room_dimensions: roomDimensions,
+                layout_elements: lastReport.layout_elements
+            })
+        });
+        
+        if (!response.ok) {
+            const result = await response.json();
+            showNotification(`❌ Export failed: ${result.error}`, 'error');
+            return;
+        }
+        
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="?([^";]+)"?/);
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(await response.blob());
+        link.download = match ? match[1] : 'washroom_layout.dxf';
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        URL.revokeObjectURL(link.href);
+        
+        showNotification(lastReport.watermarked
+            ? '📐 DXF exported (free trial watermark) - upgrade for clean exports'
+            : '📐 DXF exported successfully!', 'success');
+    } catch (error) {
+        showNotification(`❌ Export error: ${error.message}`, 'error');
+    }
 }
 
 // Generate new design
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Authenticated load-generation harness
+Provisions test users on a paid plan, keeps one logged-in requests.Session per worker and
+drives a weighted mix of analyses at a fixed rate or at maximum concurrency.
+Writes p50/p95/p99 latency, throughput and error rates per endpoint as JSON (progress goes to stderr).
+
+Usage:
+    python load_harness.py --users 10 --concurrency 20 --duration 30 > run.json
+    python load_harness.py --rate 50 --duration 60 --mix calculate=2,complete=1,enhanced=1
+    python load_harness.py --concurrency 20 --duration 30 --compare run.json
+
+Users register through the API and are moved onto the plan in the server's user store,
+through the same storage backend the server is configured with (--storage-backend /
+STORAGE_BACKEND: the --users-db file for sqlite, DATABASE_URL for postgres). The plan is then
+read back through the API, so a harness pointed at a different store fails before the run.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from storage_backends import storage_backend
+from user_auth_system import UserAuthSystem
+
+BUILDING_TYPES = ('office', 'school', 'retail', 'assembly', 'industrial')
+JURISDICTIONS = ('NBC', 'Alberta', 'Ontario', 'BC')
+
+# name -> (path, payload builder)
+ENDPOINTS = {
+    'calculate': ('/api/calculate-fixtures', lambda rng: {
+        'occupancy_load': rng.randint(1, 200),
+        'building_type': rng.choice(BUILDING_TYPES),
+        'jurisdiction': rng.choice(JURISDICTIONS)
+    }),
+    'complete': ('/api/complete-analysis', lambda rng: {
+        'occupancy_load': rng.randint(1, 200),
+        'building_type': rng.choice(BUILDING_TYPES),
+        'jurisdiction': rng.choice(JURISDICTIONS),
+        'accessibility_level': rng.choice(('basic', 'enhanced')),
+        'room_dimensions': {'length': rng.uniform(6, 15), 'width': rng.uniform(4, 10), 'height': 3.0}
+    }),
+    'enhanced': ('/api/enhanced-analysis', lambda rng: {
+        'occupancy_load': rng.randint(1, 200),
+        'building_type': rng.choice(BUILDING_TYPES),
+        'jurisdiction': rng.choice(JURISDICTIONS),
+        'room_length': rng.uniform(6, 15),
+        'room_width': rng.uniform(4, 10),
+        'accessibility_level': rng.choice(('basic', 'enhanced'))
+    })
+}
+
+PASSWORD = 'LoadTest-Passw0rd!'
+
+
+def parse_mix(value):
+    """'calculate=2,complete=1' -> {'calculate': 2.0, 'complete': 1.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError('Mix needs at least one positive weight')
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return round(sorted_values[rank - 1], 3)
+
+
+def provision_users(base_url, count, plan, users_db, backend=None):
+    """Register `count` fresh users through the API and move them onto `plan` in the server's store"""
+    backend = storage_backend(backend)
+    if backend == 'memory':
+        raise RuntimeError("The memory backend lives inside the server process; provision through sqlite or postgres")
+    auth_system = UserAuthSystem(users_db, backend=backend)
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+
+    for i in range(count):
+        email = f'load-{run_id}-{i}@loadtest.example.com'
+        response = requests.post(f'{base_url}/api/register', json={
+            'email': email, 'password': PASSWORD, 'first_name': 'Load', 'last_name': f'User {i}',
+            'company': f'Load Test {run_id}'
+        }, timeout=30)
+        result = response.json()
+        if not result.get('success'):
+            raise RuntimeError(f"Could not register {email}: {result.get('error')}")
+
+        activated = auth_system.activate_subscription(result['user_id'], plan)
+        if not activated['success']:
+            raise RuntimeError(f"Could not activate {plan} for {email}: {activated['error']}")
+        users.append(email)
+
+    # The server must see the plan: otherwise this wrote to a store it does not read
+    if users:
+        profile = open_session(base_url, users[0], 1).get(f'{base_url}/api/user/profile', timeout=30).json()
+        served = (profile.get('subscription') or {}).get('plan_type')
+        if served != plan:
+            raise RuntimeError(f"The server reports plan {served!r} for {users[0]}, not {plan!r}: point "
+                               f"--storage-backend / --users-db / DATABASE_URL at the server's user store")
+
+    print(f"👥 Provisioned {count} users on the {plan} plan through the {backend} backend (run {run_id})",
+          file=sys.stderr)
+    return users
+
+
+def open_session(base_url, email, pool_size):
+    """Logged-in session with keep-alive connection reuse"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    response = session.post(f'{base_url}/api/login', json={'email': email, 'password': PASSWORD}, timeout=30)
+    if not response.json().get('success'):
+        raise RuntimeError(f"Login failed for {email}: {response.text[:200]}")
+    return session
+
+
+class Recorder:
+    """Thread-safe per-endpoint samples"""
+
+    def __init__(self, endpoints):
+        self.lock = threading.Lock()
+        self.samples = {name: {'latencies': [], 'errors': 0, 'status_codes': {}, 'replayed': 0}
+                        for name in endpoints}
+
+    def record(self, name, latency_ms, status, ok, replayed):
+        with self.lock:
+            sample = self.samples[name]
+            sample['latencies'].append(latency_ms)
+            sample['status_codes'][str(status)] = sample['status_codes'].get(str(status), 0) + 1
+            if not ok:
+                sample['errors'] += 1
+            if replayed:
+                sample['replayed'] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        all_latencies, total_errors = [], 0
+        for name, sample in self.samples.items():
+            latencies = sorted(sample['latencies'])
+            all_latencies.extend(latencies)
+            total_errors += sample['errors']
+            endpoints[name] = summarize(latencies, sample['errors'], elapsed)
+            endpoints[name].update(status_codes=sample['status_codes'], replayed=sample['replayed'])
+        return summarize(sorted(all_latencies), total_errors, elapsed), endpoints
+
+
+def summarize(latencies, errors, elapsed):
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': round(latencies[-1], 3) if latencies else None,
+            'mean': round(sum(latencies) / count, 3) if count else None
+        }
+    }
+
+
+def send(session, base_url, name, rng, recorder, scheduled_at=None):
+    path, payload = ENDPOINTS[name]
+    body = payload(rng)
+    # Unique project names keep the server's duplicate-payload replay out of the measurement
+    body['project_name'] = f'load-{uuid.uuid4().hex}'
+    started = time.perf_counter()
+    try:
+        response = session.post(base_url + path, json=body, timeout=60)
+        ok = response.status_code < 400 and response.json().get('success', True) is not False
+        status, replayed = response.status_code, response.headers.get('Idempotent-Replayed') == 'true'
+    except (requests.RequestException, ValueError):
+        ok, status, replayed = False, 'exception', False
+    # Fixed-rate latency counts from the scheduled send time (no coordinated omission)
+    origin = scheduled_at if scheduled_at is not None else started
+    recorder.record(name, (time.perf_counter() - origin) * 1000, status, ok, replayed)
+
+
+def run_closed_loop(base_url, users, mix, concurrency, duration, recorder, seed):
+    """`concurrency` workers each send back-to-back requests until the deadline"""
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        session = open_session(base_url, users[index % len(users)], 1)
+        try:
+            while time.perf_counter() < deadline:
+                send(session, base_url, rng.choices(names, weights)[0], rng, recorder)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_fixed_rate(base_url, users, mix, rate, duration, max_in_flight, recorder, seed):
+    """Open loop: requests start on a fixed schedule whether or not earlier ones finished"""
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(seed)
+    local = threading.local()
+    sessions, sessions_lock = [], threading.Lock()
+
+    def session_for_thread():
+        if not hasattr(local, 'session'):
+            with sessions_lock:
+                email = users[len(sessions) % len(users)]
+                local.session = open_session(base_url, email, 1)
+                local.rng = random.Random(seed + len(sessions) + 1)
+                sessions.append(local.session)
+        return local.session
+
+    def job(name, scheduled_at):
+        session = session_for_thread()
+        send(session, base_url, name, local.rng, recorder, scheduled_at)
+
+    total = int(rate * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for i in range(total):
+            scheduled_at = start + i / rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(job, rng.choices(names, weights)[0], scheduled_at)
+
+    for session in sessions:
+        session.close()
+
+
+def compare(report, baseline_path):
+    """Print p95 / throughput / error-rate deltas against an earlier report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {baseline_path}", file=sys.stderr)
+    for name, current in [('overall', report['overall'])] + list(report['endpoints'].items()):
+        before = baseline['overall'] if name == 'overall' else baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        p95_now, p95_before = current['latency_ms']['p95'], before['latency_ms']['p95']
+        change = f"{(p95_now - p95_before) / p95_before * 100:+.1f}%" if p95_now and p95_before else 'n/a'
+        print(f"   {name:>10}: p95 {p95_before} -> {p95_now} ms ({change}), "
+              f"{before['throughput_rps']} -> {current['throughput_rps']} rps, "
+              f"errors {before['error_rate']:.2%} -> {current['error_rate']:.2%}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Authenticated load test for the BCode Pro API')
+    parser.add_argument('--base-url', default=os.environ.get('LOAD_BASE_URL', 'http://localhost:5000'))
+    parser.add_argument('--users', type=int, default=5, help='test users to provision')
+    parser.add_argument('--plan', default='professional', help='plan the test users are moved onto')
+    parser.add_argument('--storage-backend', default=os.environ.get('STORAGE_BACKEND'),
+                        help="the server's storage backend: sqlite (default) or postgres (DATABASE_URL)")
+    parser.add_argument('--users-db', default='database/users.db', help="the server's users database (sqlite)")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('calculate=2,complete=2,enhanced=1'))
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--rate', type=float, help='fixed arrival rate in requests/second (open loop)')
+    mode.add_argument('--concurrency', type=int, default=10, help='closed-loop workers (default mode)')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='worker threads for --rate mode')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    base_url = args.base_url.rstrip('/')
+    users = provision_users(base_url, args.users, args.plan, args.users_db, args.storage_backend)
+    recorder = Recorder(args.mix)
+
+    print(f"🚀 Running {'%.1f rps' % args.rate if args.rate else '%d workers' % args.concurrency} "
+          f"for {args.duration:.0f}s against {base_url}", file=sys.stderr)
+    started = time.perf_counter()
+    if args.rate:
+        run_fixed_rate(base_url, users, args.mix, args.rate, args.duration, args.max_in_flight, recorder, args.seed)
+    else:
+        run_closed_loop(base_url, users, args.mix, args.concurrency, args.duration, recorder, args.seed)
+    elapsed = time.perf_counter() - started
+
+    overall, endpoints = recorder.summary(elapsed)
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'base_url': base_url, 'users': args.users, 'plan': args.plan, 'mix': args.mix,
+            'mode': 'fixed_rate' if args.rate else 'closed_loop',
+            'rate': args.rate, 'concurrency': None if args.rate else args.concurrency,
+            'duration_s': args.duration, 'seed': args.seed
+        },
+        'elapsed_s': round(elapsed, 3),
+        'overall': overall,
+        'endpoints': endpoints
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"✅ Report written to {args.output}: {overall['requests']} requests, "
+              f"p95 {overall['latency_ms']['p95']} ms, {overall['throughput_rps']} rps, "
+              f"{overall['error_rate']:.2%} errors", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        compare(report, args.compare)
+
+    return 0 if overall['requests'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
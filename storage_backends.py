@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+BCode Pro - Storage backends
+Repository interface for user data with three adapters (in-memory, SQLite, PostgreSQL), plus
+the backend selection and PostgreSQL connection pool shared with the code-data repositories in
+backend/code_storage.py.
+
+STORAGE_BACKEND picks the adapter: sqlite (default), memory, or postgres. The PostgreSQL adapter
+connects to DATABASE_URL and needs psycopg2 (pip install psycopg2-binary).
+"""
+
+import itertools
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from connection_manager import ConnectionPoolTimeout, get_connection_manager
+from usage_analytics import ROLLUP_GRANULARITIES, UsageAnalytics, build_report, report_window
+
+try:
+    import psycopg2
+    import psycopg2.extras
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ('memory', 'sqlite', 'postgres')
+
+DEFAULT_POSTGRES_POOL_SIZE = int(os.environ.get('POSTGRES_POOL_SIZE', '8'))
+DEFAULT_POSTGRES_ACQUIRE_TIMEOUT = float(os.environ.get('POSTGRES_ACQUIRE_TIMEOUT', '30'))
+
+FREE_TIER_PROJECTS = 3
+
+# to_char() formats matching the rollup period labels
+POSTGRES_PERIOD_FORMATS = {'day': 'YYYY-MM-DD', 'month': 'YYYY-MM'}
+
+
+class StorageError(Exception):
+    """Backend misconfiguration or an operation the selected backend cannot serve"""
+    pass
+
+
+def storage_backend(backend: Optional[str] = None) -> str:
+    """Explicit choice, else STORAGE_BACKEND, else sqlite"""
+    backend = (backend or os.environ.get('STORAGE_BACKEND') or 'sqlite').strip().lower()
+    if backend not in STORAGE_BACKENDS:
+        raise StorageError(f"Unknown storage backend {backend!r} (expected one of {', '.join(STORAGE_BACKENDS)})")
+    return backend
+
+
+def postgres_dsn(dsn: Optional[str] = None) -> str:
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise StorageError('The postgres storage backend needs DATABASE_URL')
+    return dsn
+
+
+# =====================================================
+# PostgreSQL connection pool
+# =====================================================
+
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections with the same reader()/writer() shape as
+    SQLiteConnectionManager. Rows come back as dicts. Checkout blocks up to acquire_timeout
+    when every connection is in use instead of failing immediately.
+    """
+
+    def __init__(self, dsn: str, pool_size: int = DEFAULT_POSTGRES_POOL_SIZE,
+                 acquire_timeout: float = DEFAULT_POSTGRES_ACQUIRE_TIMEOUT):
+        if psycopg2 is None:
+            raise StorageError('The postgres storage backend needs psycopg2 (pip install psycopg2-binary)')
+        self.dsn = dsn
+        self.pool_size = max(1, pool_size)
+        self.acquire_timeout = acquire_timeout
+        self.pid = os.getpid()
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            1, self.pool_size, dsn, cursor_factory=psycopg2.extras.RealDictCursor
+        )
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._stats = {'checkouts': 0, 'timeouts': 0, 'rollbacks': 0, 'wait_ms_max': 0.0}
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, readonly: bool = False):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._stats_lock:
+                self._stats['timeouts'] += 1
+            raise ConnectionPoolTimeout(f'No PostgreSQL connection within {self.acquire_timeout}s')
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_ms_max'] = max(self._stats['wait_ms_max'], round(waited_ms, 3))
+
+        connection = None
+        try:
+            connection = self._pool.getconn()
+            connection.set_session(readonly=readonly)
+            try:
+                yield connection
+                if readonly:
+                    connection.rollback()
+                else:
+                    connection.commit()
+            except Exception:
+                connection.rollback()
+                with self._stats_lock:
+                    self._stats['rollbacks'] += 1
+                raise
+        finally:
+            if connection is not None:
+                self._pool.putconn(connection)
+            self._slots.release()
+
+    def reader(self):
+        """Read-only transaction on a pooled connection"""
+        return self.connection(readonly=True)
+
+    def writer(self):
+        """Read-write transaction; commits on success and rolls back on error"""
+        return self.connection(readonly=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats, pool_size=self.pool_size)
+
+    def close(self):
+        self._pool.closeall()
+
+
+_postgres_pools: Dict[str, PostgresConnectionPool] = {}
+_postgres_pools_lock = threading.Lock()
+
+
+def get_postgres_pool(dsn: Optional[str] = None, **options) -> PostgresConnectionPool:
+    """Shared pool per DSN per process (pools inherited through fork are replaced)"""
+    dsn = postgres_dsn(dsn)
+    with _postgres_pools_lock:
+        pool = _postgres_pools.get(dsn)
+        if pool is None or pool.pid != os.getpid():
+            pool = _postgres_pools[dsn] = PostgresConnectionPool(dsn, **options)
+        return pool
+
+
+# =====================================================
+# User data
+# =====================================================
+
+class UserRepository(ABC):
+    """
+    Users, subscriptions and project usage.
+    subscription() returns the active subscription with free-tier usage counted, or None.
+    """
+
+    @abstractmethod
+    def init_schema(self):
+        ...
+
+    @abstractmethod
+    def create_user(self, email, password_hash, first_name, last_name, phone=None, company=None,
+                    profession=None, verification_token=None) -> Optional[int]:
+        """New user on the free plan; None when the email is already registered"""
+
+    @abstractmethod
+    def find_login(self, email) -> Optional[Dict[str, Any]]:
+        """id, password_hash, email_verified, is_active, first_name, last_name"""
+
+    @abstractmethod
+    def touch_login(self, user_id):
+        ...
+
+    @abstractmethod
+    def user_field(self, user_id, field) -> Any:
+        """One column of a user row ('email', 'company'); None for unknown users"""
+
+    @abstractmethod
+    def subscription(self, user_id) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def record_usage(self, user_id, project_name, analysis_type, is_free_tier):
+        ...
+
+    @abstractmethod
+    def activate_subscription(self, user_id, plan_type, stripe_subscription_id=None, period_end=None):
+        """Replace the active subscription with plan_type"""
+
+    @abstractmethod
+    def usage_report(self, scope, scope_id, granularity, periods) -> Dict[str, Any]:
+        """usage_analytics.build_report() series for one user; raises ValueError for bad requests"""
+
+
+USER_FIELDS = ('email', 'company', 'first_name', 'last_name', 'phone', 'profession')
+
+
+class InMemoryUserRepository(UserRepository):
+    """Process-local dicts: tests and benchmarks without a database file"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.subscriptions = []
+        self.project_usage = []
+        # (granularity, user id, period) -> {analysis_type: [project_count, free_tier_count]}
+        self.usage_rollup: Dict[Tuple[str, str, str], Dict[str, List[int]]] = {}
+
+    def init_schema(self):
+        pass
+
+    def create_user(self, email, password_hash, first_name, last_name, phone=None, company=None,
+                    profession=None, verification_token=None):
+        with self._lock:
+            if any(user['email'] == email for user in self.users.values()):
+                return None
+            user_id = next(self._ids)
+            self.users[user_id] = {
+                'id': user_id, 'email': email, 'password_hash': password_hash, 'first_name': first_name,
+                'last_name': last_name, 'phone': phone, 'company': company, 'profession': profession,
+                'verification_token': verification_token, 'email_verified': False, 'is_active': True,
+                'created_at': datetime.now().isoformat(sep=' '), 'last_login': None
+            }
+            self.subscriptions.append({'user_id': user_id, 'plan_type': 'free', 'status': 'active',
+                                       'stripe_subscription_id': None, 'current_period_end': None})
+            return user_id
+
+    def find_login(self, email):
+        with self._lock:
+            for user in self.users.values():
+                if user['email'] == email:
+                    return {key: user[key] for key in ('id', 'password_hash', 'email_verified', 'is_active',
+                                                       'first_name', 'last_name')}
+        return None
+
+    def touch_login(self, user_id):
+        with self._lock:
+            if user_id in self.users:
+                self.users[user_id]['last_login'] = datetime.now().isoformat(sep=' ')
+
+    def user_field(self, user_id, field):
+        if field not in USER_FIELDS:
+            raise ValueError(f'Unknown user field {field!r}')
+        with self._lock:
+            user = self.users.get(user_id)
+            return user[field] if user else None
+
+    def subscription(self, user_id):
+        with self._lock:
+            active = [s for s in self.subscriptions if s['user_id'] == user_id and s['status'] == 'active']
+            if not active:
+                return None
+            subscription = dict(active[-1])
+            subscription['free_projects_used'] = sum(
+                1 for usage in self.project_usage if usage['user_id'] == user_id and usage['is_free_tier']
+            ) if subscription['plan_type'] == 'free' else 0
+            return subscription
+
+    def record_usage(self, user_id, project_name, analysis_type, is_free_tier):
+        # UTC, as SQLite's CURRENT_TIMESTAMP, so report periods line up across backends
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self.project_usage.append({'user_id': user_id, 'project_name': project_name,
+                                       'analysis_type': analysis_type, 'is_free_tier': bool(is_free_tier),
+                                       'created_at': created_at})
+            for granularity, prefix_length in ROLLUP_GRANULARITIES.items():
+                period = self.usage_rollup.setdefault((granularity, str(user_id), created_at[:prefix_length]), {})
+                counts = period.setdefault(analysis_type or 'unknown', [0, 0])
+                counts[0] += 1
+                counts[1] += int(bool(is_free_tier))
+
+    def activate_subscription(self, user_id, plan_type, stripe_subscription_id=None, period_end=None):
+        with self._lock:
+            for subscription in self.subscriptions:
+                if subscription['user_id'] == user_id and subscription['status'] == 'active':
+                    subscription['status'] = 'replaced'
+            self.subscriptions.append({'user_id': user_id, 'plan_type': plan_type, 'status': 'active',
+                                       'stripe_subscription_id': stripe_subscription_id,
+                                       'current_period_end': period_end})
+
+    def usage_report(self, scope, scope_id, granularity, periods):
+        """From the rollups only: one dict lookup per period in the window"""
+        period_keys = report_window(scope, granularity, periods)
+        with self._lock:
+            rows = [(period, analysis_type, total, free) for period in period_keys
+                    for analysis_type, (total, free)
+                    in self.usage_rollup.get((granularity, str(scope_id), period), {}).items()]
+        return build_report(scope, scope_id, granularity, period_keys, rows)
+
+
+class SQLiteUserRepository(UserRepository):
+    """The users database file behind the shared connection manager, with usage rollups"""
+
+    def __init__(self, db_path: str = "database/users.db"):
+        self.db_path = db_path
+        self.db = get_connection_manager(db_path)
+        self.analytics = UsageAnalytics(db_path)
+
+    def init_schema(self):
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            # Users table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT UNIQUE NOT NULL,
+                    phone TEXT,
+                    password_hash TEXT NOT NULL,
+                    first_name TEXT,
+                    last_name TEXT,
+                    company TEXT,
+                    profession TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    email_verified BOOLEAN DEFAULT FALSE,
+                    verification_token TEXT,
+                    reset_token TEXT,
+                    reset_token_expires TIMESTAMP,
+                    last_login TIMESTAMP,
+                    is_active BOOLEAN DEFAULT TRUE
+                )
+            ''')
+
+            # Subscriptions table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    plan_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stripe_subscription_id TEXT,
+                    stripe_customer_id TEXT,
+                    current_period_start TIMESTAMP,
+                    current_period_end TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+
+            # Project usage table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS project_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    project_name TEXT,
+                    analysis_type TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_free_tier BOOLEAN DEFAULT FALSE,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+
+            # Payment history table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS payments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    stripe_payment_intent_id TEXT,
+                    amount INTEGER,
+                    currency TEXT DEFAULT 'usd',
+                    status TEXT,
+                    description TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+
+            # Usage analytics rollups (catch up on any history not yet folded)
+            self.analytics.init_rollup_tables(cursor)
+            self.analytics.compact(cursor)
+
+    def create_user(self, email, password_hash, first_name, last_name, phone=None, company=None,
+                    profession=None, verification_token=None):
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            # Check if user already exists
+            cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
+            if cursor.fetchone():
+                return None
+
+            # Create user
+            cursor.execute('''
+                INSERT INTO users (email, password_hash, first_name, last_name, phone,
+                                 company, profession, verification_token)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (email, password_hash, first_name, last_name, phone, company, profession, verification_token))
+
+            user_id = cursor.lastrowid
+
+            # Create free tier subscription
+            cursor.execute('''
+                INSERT INTO subscriptions (user_id, plan_type, status)
+                VALUES (?, 'free', 'active')
+            ''', (user_id,))
+        return user_id
+
+    def find_login(self, email):
+        with self.db.reader() as conn:
+            row = conn.execute('''
+                SELECT id, password_hash, email_verified, is_active, first_name, last_name
+                FROM users WHERE email = ?
+            ''', (email,)).fetchone()
+        return dict(row) if row else None
+
+    def touch_login(self, user_id):
+        with self.db.writer() as conn:
+            conn.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user_id,))
+
+    def user_field(self, user_id, field):
+        if field not in USER_FIELDS:
+            raise ValueError(f'Unknown user field {field!r}')
+        with self.db.reader() as conn:
+            row = conn.execute(f'SELECT {field} FROM users WHERE id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def subscription(self, user_id):
+        with self.db.reader() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT plan_type, status, current_period_end, stripe_subscription_id
+                FROM subscriptions WHERE user_id = ? AND status = 'active'
+                ORDER BY created_at DESC, id DESC LIMIT 1
+            ''', (user_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            subscription = dict(row)
+
+            # Get project usage for free tier
+            subscription['free_projects_used'] = 0
+            if subscription['plan_type'] == 'free':
+                cursor.execute('''
+                    SELECT COUNT(*) FROM project_usage
+                    WHERE user_id = ? AND is_free_tier = TRUE
+                ''', (user_id,))
+                subscription['free_projects_used'] = cursor.fetchone()[0]
+        return subscription
+
+    def record_usage(self, user_id, project_name, analysis_type, is_free_tier):
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                INSERT INTO project_usage (user_id, project_name, analysis_type, is_free_tier)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, project_name, analysis_type, is_free_tier))
+
+            # Fold the new row into the analytics rollups in the same transaction
+            self.analytics.compact(cursor)
+
+    def activate_subscription(self, user_id, plan_type, stripe_subscription_id=None, period_end=None):
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            # Only one active subscription per user
+            cursor.execute('''
+                UPDATE subscriptions SET status = 'replaced', updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND status = 'active'
+            ''', (user_id,))
+
+            cursor.execute('''
+                INSERT INTO subscriptions (user_id, plan_type, status, stripe_subscription_id,
+                                           current_period_start, current_period_end)
+                VALUES (?, ?, 'active', ?, CURRENT_TIMESTAMP, ?)
+            ''', (user_id, plan_type, stripe_subscription_id, period_end))
+
+    def usage_report(self, scope, scope_id, granularity, periods):
+        with self.db.reader() as conn:
+            return self.analytics.get_usage_report(conn.cursor(), scope, scope_id, granularity, periods)
+
+
+class PostgresUserRepository(UserRepository):
+    """The same tables in PostgreSQL behind a pooled connection set"""
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            phone TEXT,
+            password_hash TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            company TEXT,
+            profession TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email_verified BOOLEAN DEFAULT FALSE,
+            verification_token TEXT,
+            reset_token TEXT,
+            reset_token_expires TIMESTAMP,
+            last_login TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE
+        )''',
+        '''CREATE TABLE IF NOT EXISTS subscriptions (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            plan_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stripe_subscription_id TEXT,
+            stripe_customer_id TEXT,
+            current_period_start TIMESTAMP,
+            current_period_end TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        '''CREATE TABLE IF NOT EXISTS project_usage (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            project_name TEXT,
+            analysis_type TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_free_tier BOOLEAN DEFAULT FALSE
+        )''',
+        '''CREATE TABLE IF NOT EXISTS payments (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            stripe_payment_intent_id TEXT,
+            amount INTEGER,
+            currency TEXT DEFAULT 'usd',
+            status TEXT,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        '''CREATE TABLE IF NOT EXISTS usage_rollup (
+            granularity TEXT NOT NULL,
+            period TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            scope_id TEXT NOT NULL,
+            analysis_type TEXT NOT NULL,
+            project_count INTEGER NOT NULL DEFAULT 0,
+            free_tier_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, scope, scope_id, period, analysis_type)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS usage_rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            backfilled_at TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_subscriptions_user_status ON subscriptions (user_id, status)',
+        'CREATE INDEX IF NOT EXISTS idx_project_usage_user ON project_usage (user_id)'
+    )
+
+    # Folds the matching project_usage rows into one granularity of the rollups
+    ROLLUP_UPSERT = '''
+        INSERT INTO usage_rollup
+            (granularity, period, scope, scope_id, analysis_type, project_count, free_tier_count)
+        SELECT %s, to_char(created_at, %s), 'user', user_id::text, COALESCE(analysis_type, 'unknown'),
+               COUNT(*), COUNT(*) FILTER (WHERE is_free_tier)
+        FROM project_usage
+        WHERE {where}
+        GROUP BY 2, 4, 5
+        ON CONFLICT (granularity, scope, scope_id, period, analysis_type) DO UPDATE SET
+            project_count = usage_rollup.project_count + excluded.project_count,
+            free_tier_count = usage_rollup.free_tier_count + excluded.free_tier_count
+    '''
+
+    def __init__(self, dsn: Optional[str] = None, pool: Optional[PostgresConnectionPool] = None):
+        self.db = pool or get_postgres_pool(dsn)
+
+    def init_schema(self):
+        with self.db.writer() as conn:
+            with conn.cursor() as cursor:
+                for statement in self.SCHEMA:
+                    cursor.execute(statement)
+
+                # First start with rollups: fold the existing history once. Other workers wait on the
+                # state row, and SHARE mode holds off usage writes, until this commits.
+                cursor.execute('''
+                    INSERT INTO usage_rollup_state (id, backfilled_at) VALUES (1, CURRENT_TIMESTAMP)
+                    ON CONFLICT (id) DO NOTHING RETURNING id
+                ''')
+                if cursor.fetchone():
+                    cursor.execute('LOCK TABLE project_usage IN SHARE MODE')
+                    for granularity, period_format in POSTGRES_PERIOD_FORMATS.items():
+                        cursor.execute(self.ROLLUP_UPSERT.format(where='TRUE'), (granularity, period_format))
+
+    def create_user(self, email, password_hash, first_name, last_name, phone=None, company=None,
+                    profession=None, verification_token=None):
+        with self.db.writer() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                    INSERT INTO users (email, password_hash, first_name, last_name, phone,
+                                       company, profession, verification_token)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (email) DO NOTHING
+                    RETURNING id
+                ''', (email, password_hash, first_name, last_name, phone, company, profession, verification_token))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                cursor.execute("INSERT INTO subscriptions (user_id, plan_type, status) VALUES (%s, 'free', 'active')",
+                               (row['id'],))
+                return row['id']
+
+    def find_login(self, email):
+        with self.db.reader() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                    SELECT id, password_hash, email_verified, is_active, first_name, last_name
+                    FROM users WHERE email = %s
+                ''', (email,))
+                row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def touch_login(self, user_id):
+        with self.db.writer() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s', (user_id,))
+
+    def user_field(self, user_id, field):
+        if field not in USER_FIELDS:
+            raise ValueError(f'Unknown user field {field!r}')
+        with self.db.reader() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f'SELECT {field} FROM users WHERE id = %s', (user_id,))
+                row = cursor.fetchone()
+        return row[field] if row else None
+
+    def subscription(self, user_id):
+        with self.db.reader() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                    SELECT plan_type, status, current_period_end, stripe_subscription_id
+                    FROM subscriptions WHERE user_id = %s AND status = 'active'
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                ''', (user_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                subscription = dict(row)
+                subscription['free_projects_used'] = 0
+                if subscription['plan_type'] == 'free':
+                    cursor.execute('''
+                        SELECT COUNT(*) AS used FROM project_usage WHERE user_id = %s AND is_free_tier
+                    ''', (user_id,))
+                    subscription['free_projects_used'] = cursor.fetchone()['used']
+        return subscription
+
+    def record_usage(self, user_id, project_name, analysis_type, is_free_tier):
+        with self.db.writer() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                    INSERT INTO project_usage (user_id, project_name, analysis_type, is_free_tier)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id
+                ''', (user_id, project_name, analysis_type, bool(is_free_tier)))
+                usage_id = cursor.fetchone()['id']
+
+                # Fold the new row into the analytics rollups in the same transaction
+                for granularity, period_format in POSTGRES_PERIOD_FORMATS.items():
+                    cursor.execute(self.ROLLUP_UPSERT.format(where='id = %s'), (granularity, period_format, usage_id))
+
+    def activate_subscription(self, user_id, plan_type, stripe_subscription_id=None, period_end=None):
+        with self.db.writer() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                    UPDATE subscriptions SET status = 'replaced', updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND status = 'active'
+                ''', (user_id,))
+                cursor.execute('''
+                    INSERT INTO subscriptions (user_id, plan_type, status, stripe_subscription_id,
+                                               current_period_start, current_period_end)
+                    VALUES (%s, %s, 'active', %s, CURRENT_TIMESTAMP, %s)
+                ''', (user_id, plan_type, stripe_subscription_id, period_end))
+
+    def usage_report(self, scope, scope_id, granularity, periods):
+        """From the rollups only, as on SQLite"""
+        period_keys = report_window(scope, granularity, periods)
+        with self.db.reader() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                    SELECT period, analysis_type, project_count, free_tier_count
+                    FROM usage_rollup
+                    WHERE granularity = %s AND scope = %s AND scope_id = %s AND period BETWEEN %s AND %s
+                ''', (granularity, scope, str(scope_id), period_keys[0], period_keys[-1]))
+                rows = [(row['period'], row['analysis_type'], row['project_count'], row['free_tier_count'])
+                        for row in cursor.fetchall()]
+        return build_report(scope, scope_id, granularity, period_keys, rows)
+
+
+def create_user_repository(db_path: str = "database/users.db", backend: Optional[str] = None) -> UserRepository:
+    """Adapter for the selected backend (db_path is the SQLite file)"""
+    backend = storage_backend(backend)
+    if backend == 'memory':
+        return InMemoryUserRepository()
+    if backend == 'postgres':
+        return PostgresUserRepository()
+    return SQLiteUserRepository(db_path)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the materialized assembly -> component closure
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from assembly_closure import resolve_closures
+from code_importer import ClauseImporter
+from code_pack import compile_code_pack
+from code_storage import InMemoryCodeRepository
+from connection_manager import get_connection_manager
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import migrate
+
+SUITE = {'entity': 'assembly', 'assembly_code': 'ACCESSIBLE_SUITE', 'name': 'Accessible Washroom Suite',
+         'component_ids': ['ACCESSIBLE_STALL', 'ACCESSIBLE_SINK_UNIT', 'CHANGE_TABLE'],
+         'total_footprint': {'width': 3.0, 'depth': 2.6}, 'circulation_space': {'approach_space': 1.5}}
+
+
+def make_database(*records):
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    if records:
+        source = os.path.join(os.path.dirname(db_path), 'assemblies.jsonl')
+        with open(source, 'w') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+        report = ClauseImporter(db_path).import_file(source)
+        assert report['rejected'] == 0, report['errors']
+    return db_path
+
+
+def rule_match(name, assemblies):
+    return {'rule': {'rule_code': name.upper(), 'rule_name': name}, 'required_assemblies': assemblies,
+            'required_components': [], 'required_clauses': [], 'match_reason': ''}
+
+
+def test_resolve_nested_and_cyclic():
+    """Nested members expand depth-first, shared sub-assemblies count once, cycles are cut"""
+    closures = resolve_closures({'SUITE': ['STALL', 'SINK', 'mirror'], 'STALL': ['toilet', 'BAR'],
+                                 'SINK': ['basin', 'BAR'], 'BAR': ['grab_bar'],
+                                 'LOOP_A': ['a', 'LOOP_B'], 'LOOP_B': ['b', 'LOOP_A']})
+    assert closures['SUITE'].components == ('toilet', 'grab_bar', 'basin', 'mirror')
+    assert closures['SUITE'].nested_assemblies == ('STALL', 'BAR', 'SINK')
+    assert closures['LOOP_A'].components == ('a', 'b') and closures['LOOP_A'].nested_assemblies == ('LOOP_B',)
+    print("✅ Nested, shared and cyclic assemblies resolve")
+
+
+def test_closure_rebuilt_on_import():
+    """Importing a nested assembly materializes its transitive components"""
+    db_path = make_database(SUITE)
+    with get_connection_manager(db_path).reader() as connection:
+        rows = connection.execute('''
+            SELECT member_code, member_type FROM assembly_component_closure
+            WHERE assembly_code = 'ACCESSIBLE_SUITE' ORDER BY position
+        ''').fetchall()
+    members = [(row['member_code'], row['member_type']) for row in rows]
+    assert members[:4] == [('TOILET_ACCESSIBLE', 'component'), ('GRAB_BAR_REAR', 'component'),
+                           ('GRAB_BAR_SIDE', 'component'), ('PARTITION_ACCESSIBLE', 'component')]
+    assert ('CHANGE_TABLE', 'component') in members and ('ACCESSIBLE_STALL', 'assembly') in members
+    print(f"✅ {len(members)} closure rows for the imported suite")
+
+
+def test_step_3_dedupes_and_expands():
+    """Shared assemblies expand once; nested assembly codes never leak in as components"""
+    db_path = make_database(SUITE)
+    rules = [rule_match('Suite rule', ['ACCESSIBLE_SUITE', 'STANDARD_SINK_UNIT']),
+             rule_match('Sink rule', ['STANDARD_SINK_UNIT'])]
+    pack_path = os.path.join(os.path.dirname(db_path), 'codes.codepack')
+    compile_code_pack(db_path, pack_path)
+
+    expansions = {
+        'sqlite': EnhancedBuildingCodeEngine(db_path).expand_component_assemblies(rules),
+        'memory': EnhancedBuildingCodeEngine(db_path, repository=InMemoryCodeRepository.from_sqlite(db_path))
+                  .expand_component_assemblies(rules),
+        'codepack': EnhancedBuildingCodeEngine(db_path, code_pack_path=pack_path).expand_component_assemblies(rules)
+    }
+    for backend, expansion in expansions.items():
+        assert [a['assembly_code'] for a in expansion['required_assemblies']] == \
+            ['ACCESSIBLE_SUITE', 'STANDARD_SINK_UNIT'], backend
+        assert 'ACCESSIBLE_STALL' not in expansion['required_components'], backend
+        assert {'GRAB_BAR_REAR', 'SINK_ACCESSIBLE', 'CHANGE_TABLE', 'SINK_STANDARD'} <= \
+            set(expansion['required_components']), backend
+        assert expansion['expansion_log'][1]['reason'] == 'Required by rule: Suite rule, Sink rule', backend
+        assert sorted(expansion['required_components']) == sorted(expansions['sqlite']['required_components'])
+    print(f"✅ Step 3 on {', '.join(expansions)}: "
+          f"{len(expansions['sqlite']['required_components'])} components from 2 distinct assemblies")
+
+
+def test_unbuilt_closure_falls_back():
+    """An assembly written outside the importer still expands to its direct members"""
+    db_path = make_database()
+    engine = EnhancedBuildingCodeEngine(db_path)
+    with engine.get_db_writer() as connection:
+        connection.execute('''
+            INSERT INTO component_assembly (assembly_code, name, component_ids)
+            VALUES ('HAND_DRYER_BAY', 'Hand Dryer Bay', '["HAND_DRYER"]')
+        ''')
+    expansion = engine.expand_component_assemblies([rule_match('Dryer rule', ['HAND_DRYER_BAY'])])
+    assert expansion['required_components'] == ['HAND_DRYER']
+    print("✅ Assemblies without a closure fall back to direct members")
+
+
+if __name__ == "__main__":
+    print("🧩 Assembly Closure Test")
+    print("=" * 50)
+    test_resolve_nested_and_cyclic()
+    test_closure_rebuilt_on_import()
+    test_step_3_dedupes_and_expands()
+    test_unbuilt_closure_falls_back()
+    print("\n🚀 Assembly closure: ALL TESTS PASSED")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for content-hash imports and the code change feed
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+from change_feed import ChangeFeed, changes_since, rehash
+from code_importer import ClauseImporter
+from connection_manager import get_connection_manager
+
+
+def make_importer():
+    return ClauseImporter(os.path.join(tempfile.mkdtemp(), 'codes.db'))
+
+
+def write_jsonl(records):
+    path = os.path.join(tempfile.mkdtemp(), 'edition.jsonl')
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return path
+
+
+def test_migrated_database_starts_at_revision_zero():
+    """Seeded rows are hashed at migration without flooding the log"""
+    importer = make_importer()
+    with get_connection_manager(importer.db_path).reader() as connection:
+        missing = connection.execute(
+            'SELECT COUNT(*) FROM building_code_clause WHERE content_hash IS NULL').fetchone()[0]
+    feed = changes_since(importer.db_path)
+    assert missing == 0
+    assert feed['latest_revision'] == 0 and feed['changes'] == []
+    print("✅ Existing rows hashed, change log empty")
+
+
+def test_reimport_writes_nothing():
+    """Importing the same file twice logs each clause once"""
+    importer = make_importer()
+    path = os.path.join(ROOT, 'EXACT_TEXT_SAMPLE_DATA.json')
+    first = importer.import_file(path)
+    second = importer.import_file(path)
+
+    assert first['inserted'] + first['updated'] > 0
+    assert second['unchanged'] == second['imported'] and second['inserted'] == second['updated'] == 0
+    assert second['revision'] == first['revision']
+    print(f"✅ Re-import: {second['unchanged']} unchanged, revision stays {second['revision']}")
+
+
+def test_edits_are_logged_in_order():
+    """Only the edited clause is rewritten and appears after the consumer's revision"""
+    importer = make_importer()
+    records = [{'identifier': f'3.7.{i}', 'exact_text_en': f'Clause {i} shall be provided.'} for i in range(5)]
+    importer.import_file(write_jsonl(records), jurisdiction='NBC', version='2025')
+    feed = ChangeFeed(importer.db_path, entities=['clause'])
+
+    records[2]['exact_text_en'] = 'Clause 2 shall be provided in every storey.'
+    report = importer.import_file(write_jsonl(records), jurisdiction='NBC', version='2025')
+    assert (report['updated'], report['unchanged']) == (1, 4)
+
+    changes = feed.poll()
+    assert [(c['entity_code'], c['operation']) for c in changes] == [('NBC_3.7.2', 'update')]
+    assert feed.changed_keys(changes) == {'clause': {'NBC_3.7.2'}}
+    assert feed.poll() == []
+    print(f"✅ One edit, one change at revision {changes[0]['revision']}")
+
+
+def test_rules_and_assemblies_import():
+    """Rules and assemblies go through the same hashed upsert and feed"""
+    importer = make_importer()
+    before = changes_since(importer.db_path)['latest_revision']
+    path = write_jsonl([
+        {'entity': 'rule', 'rule_code': 'TEST_RULE', 'rule_name': 'Test rule', 'jurisdiction': 'NBC',
+         'trigger_condition': {'building_type': 'office'}, 'required_clause_ids': ['NBC_3.8.3.12']},
+        {'entity': 'assembly', 'assembly_code': 'TEST_ASM', 'name': 'Test assembly', 'component_ids': ['WC_STD']},
+        {'entity': 'door', 'name': 'not a table'}
+    ])
+    report = importer.import_file(path)
+    assert (report['inserted'], report['rejected']) == (2, 1)
+    assert importer.import_file(path)['unchanged'] == 2
+
+    changes = changes_since(importer.db_path, before, ['rule', 'assembly'])['changes']
+    assert sorted((c['entity'], c['entity_code']) for c in changes) == [('assembly', 'TEST_ASM'), ('rule', 'TEST_RULE')]
+    with get_connection_manager(importer.db_path).reader() as connection:
+        priority = connection.execute("SELECT priority FROM context_logic_rule WHERE rule_code = 'TEST_RULE'").fetchone()[0]
+    assert priority == 50
+    print("✅ Rules and assemblies imported and logged")
+
+
+def test_rehash_logs_out_of_band_edits():
+    """Direct SQL edits enter the feed once rehash runs; deletes are logged by trigger"""
+    importer = make_importer()
+    feed = ChangeFeed(importer.db_path)
+    with get_connection_manager(importer.db_path).writer() as connection:
+        connection.execute("UPDATE building_code_clause SET clause_title = 'Edited' WHERE clause_code = 'NBC_3.8.3.12'")
+        connection.execute("DELETE FROM component_assembly WHERE id = (SELECT MIN(id) FROM component_assembly)")
+
+    result = rehash(importer.db_path)
+    assert result['updated']['building_code_clause'] == 1
+    operations = sorted((c['entity'], c['operation']) for c in feed.poll())
+    assert operations == [('assembly', 'delete'), ('clause', 'update')]
+    assert rehash(importer.db_path)['updated']['building_code_clause'] == 0
+    print("✅ Rehash picks up direct edits")
+
+
+if __name__ == "__main__":
+    print("🔁 Change Feed Test")
+    print("=" * 50)
+    test_migrated_database_starts_at_revision_zero()
+    test_reimport_writes_nothing()
+    test_edits_are_logged_in_order()
+    test_rules_and_assemblies_import()
+    test_rehash_logs_out_of_band_edits()
+    print("\n🚀 Change feed: ALL TESTS PASSED")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for stored clause classification
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from clause_classifier import ClauseClassifier, KeywordMatcher, get_classifier, reclassify, status
+from connection_manager import get_connection_manager
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import migrate
+
+
+def make_database():
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    return db_path
+
+
+def substring_reference(rules, default, text):
+    """The rule-by-rule substring scan the matcher replaces"""
+    text = (text or '').lower()
+    for rule in rules:
+        if any(keyword in text for keyword in rule['keywords']):
+            return rule['value']
+    return default
+
+
+def test_matcher_agrees_with_substring_scan():
+    """Same answers as the ordered substring tests, overlapping keywords included"""
+    rules = [
+        {'value': 'a', 'keywords': ['closet']},
+        {'value': 'b', 'keywords': ['water closet', 'door']},
+        {'value': 'c', 'keywords': ['doorway', 'clear']},
+        {'value': 'd', 'keywords': ['clearance']}
+    ]
+    matcher = KeywordMatcher(rules, 'none')
+    words = ['water', 'closet', 'door', 'doorway', 'clear', 'clearance', 'stall', 'WATER CLOSET', 'x']
+    rng = random.Random(3)
+    for _ in range(2000):
+        text = ''.join(rng.choice(words) + rng.choice((' ', '', '-')) for _ in range(rng.randint(0, 6)))
+        assert matcher.match(text) == substring_reference(rules, 'none', text), text
+    assert matcher.match(None) == 'none'
+
+    table = get_classifier().table
+    for title in ('Accessible Water Closet Stalls', 'Lavatory Height', 'Door Clearances', 'Signage', ''):
+        assert get_classifier().category({'clause_title': title}) == \
+            substring_reference(table['category']['rules'], table['category']['default'], title)
+    print("✅ Multi-pattern matcher agrees with substring scan")
+
+
+def test_migration_stores_classification():
+    """Every clause is classified and indexed by category after migrating"""
+    db_path = make_database()
+    report = status(db_path)
+    with get_connection_manager(db_path).reader() as connection:
+        rows = connection.execute('SELECT * FROM building_code_clause').fetchall()
+        indexes = [row[1] for row in connection.execute("PRAGMA index_list('building_code_clause')")]
+    assert report['stale'] == 0 and sum(report['categories'].values()) == len(rows)
+    classifier = get_classifier()
+    for row in rows:
+        assert (row['clause_category'], row['verification_method']) == classifier.classify(dict(row))
+    assert 'idx_clause_category' in indexes
+    print(f"✅ {len(rows)} clauses classified at migration")
+
+
+def test_reclassify_after_keyword_change():
+    """A changed keyword table marks everything stale until reclassified"""
+    db_path = make_database()
+    table = get_classifier().table
+    changed = dict(table, category=dict(table['category'], rules=[{'value': 'signage', 'keywords': ['sign']}]))
+    classifier = ClauseClassifier(changed)
+
+    assert status(db_path, classifier)['stale'] > 0
+    result = reclassify(db_path, classifier=classifier)
+    assert result['updated'] > 0 and status(db_path, classifier)['stale'] == 0
+    assert reclassify(db_path, classifier=classifier)['updated'] == 0
+    print(f"✅ Reclassified {result['updated']} clauses in {result['duration_ms']} ms")
+
+
+def test_checklist_uses_stored_values():
+    """Checklist sections group by the stored category without rescanning text"""
+    db_path = make_database()
+    with get_connection_manager(db_path).writer() as connection:
+        connection.execute("UPDATE building_code_clause SET clause_category = 'custom_group', "
+                           "verification_method = 'site_visit'")
+    engine = EnhancedBuildingCodeEngine(db_path)
+    result = engine.process_complete_workflow({
+        'building_type': 'office', 'occupancy_load': 50, 'jurisdiction': 'NBC'
+    })
+    sections = result['final_results']['compliance_checklist']['sections']
+    assert [section['category'] for section in sections] == ['custom_group']
+    assert all(item['verification_method'] == 'site_visit' for item in sections[0]['items'])
+    print("✅ Checklist grouped by stored category")
+
+
+if __name__ == "__main__":
+    print("🏷️ Clause Classifier Test")
+    print("=" * 50)
+    test_matcher_agrees_with_substring_scan()
+    test_migration_stores_classification()
+    test_reclassify_after_keyword_change()
+    test_checklist_uses_stored_values()
+    print("\n🚀 Clause classifier: ALL TESTS PASSED")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for FTS5 clause search
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from clause_search import ClauseSearch, build_match_query
+from connection_manager import get_connection_manager
+from migrations import migrate
+
+
+def make_searcher():
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    return ClauseSearch(db_path)
+
+
+def test_match_query_is_sanitized():
+    """User input never reaches FTS5 as raw syntax"""
+    assert build_match_query('grab bars') == '"grab" "bars"'
+    assert build_match_query('"water closet" acc*') == '"water closet" "acc"*'
+    assert build_match_query('NEAR( title:x OR') == '"NEAR" "title" "x" "OR"'
+    try:
+        build_match_query(' ** ')
+        assert False, 'empty query accepted'
+    except ValueError:
+        pass
+    print("✅ Search input sanitized")
+
+
+def test_ranked_results_with_snippets():
+    """Title matches rank first and matches come back highlighted and escaped"""
+    searcher = make_searcher()
+    result = searcher.search('water closet')
+    assert result['results'], 'no results'
+    top = result['results'][0]
+    assert 'water' in top['clause_title'].lower()
+    assert '<mark>' in top['title_highlighted'] and '<mark>' in top['snippet']
+    assert all(r['jurisdiction'] == 'Alberta' for r in searcher.search('water', jurisdiction='Alberta')['results'])
+    assert searcher.search('water', code_version='1999')['results'] == []
+    print(f"✅ Ranked search in {result['took_ms']} ms")
+
+
+def test_keyset_pagination():
+    """Following next_cursor visits every match exactly once, in order"""
+    searcher = make_searcher()
+    everything = [r['clause_code'] for r in searcher.search('shall', limit=100)['results']]
+    assert len(everything) > 3
+
+    seen, cursor = [], None
+    while True:
+        page = searcher.search('shall', limit=2, cursor=cursor)
+        seen += [r['clause_code'] for r in page['results']]
+        cursor = page['next_cursor']
+        if not page['has_more']:
+            break
+    assert seen == everything
+    print(f"✅ {len(seen)} matches paged without gaps or repeats")
+
+
+def test_triggers_keep_index_in_sync():
+    """Inserted, edited and deleted clauses are searchable immediately"""
+    searcher = make_searcher()
+    with get_connection_manager(searcher.db_path).writer() as connection:
+        connection.execute('''
+            INSERT INTO building_code_clause (clause_code, clause_number, jurisdiction, code_version,
+                                              clause_title, clause_text_en)
+            VALUES ('TEST_1', '9.9.9', 'NBC', '2020', 'Baby Change Tables', 'Fold-down <tables> required')
+        ''')
+    hit = searcher.search('fold down tables')['results']
+    assert [r['clause_code'] for r in hit] == ['TEST_1']
+    assert '&lt;<mark>tables</mark>&gt;' in hit[0]['snippet']
+
+    with get_connection_manager(searcher.db_path).writer() as connection:
+        connection.execute("UPDATE building_code_clause SET clause_text_en = 'Wall mounted' WHERE clause_code = 'TEST_1'")
+    assert searcher.search('fold')['results'] == []
+    assert [r['clause_code'] for r in searcher.search('wall mounted')['results']] == ['TEST_1']
+
+    with get_connection_manager(searcher.db_path).writer() as connection:
+        connection.execute("DELETE FROM building_code_clause WHERE clause_code = 'TEST_1'")
+    assert searcher.search('wall mounted')['results'] == []
+    print("✅ Index follows inserts, updates and deletes")
+
+
+if __name__ == "__main__":
+    print("🔎 Clause Search Test")
+    print("=" * 50)
+    test_match_query_is_sanitized()
+    test_ranked_results_with_snippets()
+    test_keyset_pagination()
+    test_triggers_keep_index_in_sync()
+    print("\n🚀 Clause search: ALL TESTS PASSED")
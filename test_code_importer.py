@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the bulk clause importer
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+from clause_search import ClauseSearch
+from code_importer import ClauseImporter, RowValidationError
+from connection_manager import get_connection_manager
+
+
+def make_importer(**options):
+    return ClauseImporter(os.path.join(tempfile.mkdtemp(), 'codes.db'), **options)
+
+
+def clause(importer, code):
+    with get_connection_manager(importer.db_path).reader() as connection:
+        row = connection.execute('SELECT * FROM building_code_clause WHERE clause_code = ?', (code,)).fetchone()
+    return dict(row) if row else None
+
+
+def test_repository_sources_import():
+    """The Chinese-header CSV and both JSON samples load without rejects"""
+    importer = make_importer()
+    csv_report = importer.import_file(os.path.join(ROOT, 'building code related to public washroom.csv'))
+    assert csv_report['imported'] == 20 and csv_report['rejected'] == 0, csv_report['errors']
+
+    exact = importer.import_file(os.path.join(ROOT, 'EXACT_TEXT_SAMPLE_DATA.json'))
+    assert exact['rejected'] == 0, exact['errors']
+    sample = importer.import_file(os.path.join(ROOT, 'SAMPLE_CODE_IMPORT_DATA.json'))
+    assert sample['skipped'] == {'rules': 3, 'jurisdiction_overrides': 1}
+
+    with get_connection_manager(importer.db_path).reader() as connection:
+        ontario = connection.execute(
+            "SELECT * FROM building_code_clause WHERE jurisdiction = 'Ontario' AND clause_number = '(3)'").fetchone()
+    assert ontario['document_title'] == 'Ontario Building Code'
+    assert ontario['source_url'] == 'https://www.ontario.ca/laws/regulation/r13368'
+    assert not ontario['clause_text_en'].endswith(']')
+    print(f"✅ Imported {csv_report['imported']} CSV rows and {exact['imported'] + sample['imported']} JSON sections")
+
+
+def test_upsert_keeps_existing_links():
+    """Re-importing a known clause updates its text but keeps component links and stays searchable"""
+    importer = make_importer()
+    before = clause(importer, 'NBC_3.8.3.12')
+    importer.import_file(os.path.join(ROOT, 'EXACT_TEXT_SAMPLE_DATA.json'))
+    after = clause(importer, 'NBC_3.8.3.12')
+
+    assert after['id'] == before['id']
+    assert after['applies_to_components'] == before['applies_to_components']
+    assert after['clause_text_fr'].startswith('Au moins une cuvette')
+    assert after['clause_category'] == 'fixture_count'
+    hits = ClauseSearch(importer.db_path).search('cuvette obstacles')['results']
+    assert 'NBC_3.8.3.12' in [hit['clause_code'] for hit in hits]
+    print("✅ Upsert preserves links and re-indexes text")
+
+
+def test_invalid_rows_are_reported_or_fatal():
+    """Bad rows are skipped with their location; strict mode stops the import"""
+    path = os.path.join(tempfile.mkdtemp(), 'ontario.jsonl')
+    with open(path, 'w') as f:
+        f.write(json.dumps({'identifier': '3.7.1', 'exact_text_en': 'Washrooms shall be provided.'}) + '\n')
+        f.write('{not json}\n')
+        f.write(json.dumps({'identifier': '3.7.2', 'exact_text_en': ''}) + '\n')
+        f.write(json.dumps({'identifier': '3.7.3', 'exact_text_en': 'Text', 'page_number': 'xii'}) + '\n')
+
+    importer = make_importer()
+    report = importer.import_file(path, jurisdiction='ON', version='2024')
+    assert (report['read'], report['imported'], report['rejected']) == (4, 1, 3)
+    assert report['errors'][0].startswith('ontario.jsonl:2')
+    assert clause(importer, 'Ontario_3.7.1')['code_version'] == '2024'
+
+    try:
+        make_importer().import_file(path, jurisdiction='ON', version='2024', strict=True)
+        assert False, 'strict import accepted a bad row'
+    except RowValidationError as e:
+        assert e.location == 'ontario.jsonl:2'
+    print("✅ Invalid rows reported, strict mode aborts")
+
+
+def test_batches_and_transactions():
+    """Rows are written in batches and committed every commit_every rows"""
+    path = os.path.join(tempfile.mkdtemp(), 'bulk.jsonl')
+    with open(path, 'w') as f:
+        for i in range(250):
+            f.write(json.dumps({'identifier': f'9.{i}', 'exact_text_en': f'Clause {i} shall be provided.'}) + '\n')
+
+    progress = []
+    importer = make_importer(batch_size=40, commit_every=100, progress=progress.append)
+    report = importer.import_file(path, jurisdiction='NBC', version='2025')
+    assert report['imported'] == 250 and report['transactions'] == 3
+    assert [p['imported'] for p in progress] == [40, 80, 120, 160, 200, 240, 250]
+
+    dry = make_importer().import_file(path, jurisdiction='NBC', version='2025', dry_run=True)
+    assert dry['imported'] == 250 and dry['transactions'] == 0
+    print(f"✅ 250 rows in {report['transactions']} transactions ({report['rows_per_second']} rows/s)")
+
+
+if __name__ == "__main__":
+    print("📥 Clause Importer Test")
+    print("=" * 50)
+    test_repository_sources_import()
+    test_upsert_keeps_existing_links()
+    test_invalid_rows_are_reported_or_fatal()
+    test_batches_and_transactions()
+    print("\n🚀 Clause importer: ALL TESTS PASSED")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory-mapped binary code pack
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from code_pack import PACK_TABLES, CodePack, CodePackHandle, compile_code_pack, pack_status
+from code_storage import SQLiteCodeRepository
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import migrate
+
+
+def make_database():
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    return db_path
+
+
+def add_clause(db_path, clause_code, applies_to_components):
+    connection = sqlite3.connect(db_path)
+    connection.execute("""
+        INSERT INTO building_code_clause (clause_code, clause_number, jurisdiction, code_version,
+                                          clause_text_en, applies_to_components)
+        VALUES (?, '9.9.9', 'NBC', '2020', 'Added clause', ?)
+    """, (clause_code, applies_to_components))
+    connection.commit()
+    connection.close()
+
+
+def test_pack_matches_database():
+    """Every packed row decodes to exactly what SQLite returns"""
+    db_path = make_database()
+    pack_path = db_path.replace('.db', '.codepack')
+    compile_code_pack(db_path, pack_path)
+    pack = CodePack(pack_path)
+
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    for name, spec in PACK_TABLES.items():
+        rows = [dict(row) for row in connection.execute(f'SELECT * FROM {name} ORDER BY {spec["order_by"]}')]
+        assert [dict(record) for record in pack.table(name)] == rows, name
+    connection.close()
+    print("✅ Packed tables round-trip exactly")
+
+
+def test_indexed_lookups_and_zero_copy_access():
+    """Sorted indexes answer equality lookups; text cells are views into the mapping"""
+    db_path = make_database()
+    pack_path = db_path.replace('.db', '.codepack')
+    compile_code_pack(db_path, pack_path)
+    clauses = CodePack(pack_path).table('building_code_clause')
+
+    clause = clauses.get('clause_code', 'NBC_3.7.2.1')
+    assert clause['jurisdiction'] == 'NBC'
+    assert clauses.get('clause_code', 'MISSING') is None
+    assert all(record['jurisdiction'] == 'NBC' for record in clauses.find('jurisdiction', 'NBC'))
+
+    raw = clause.raw('clause_text_en')
+    assert isinstance(raw, memoryview) and bytes(raw).decode() == clause['clause_text_en']
+    print("✅ Index lookups and zero-copy text access")
+
+
+def test_republished_pack_is_remapped():
+    """Publishing a new pack file swaps the mapping on the next check"""
+    db_path = make_database()
+    pack_path = db_path.replace('.db', '.codepack')
+    compile_code_pack(db_path, pack_path)
+
+    handle = CodePackHandle(pack_path, check_interval=0)
+    first = handle.get()
+    assert handle.get() is first
+
+    connection = sqlite3.connect(db_path)
+    connection.execute("UPDATE building_code_clause SET clause_title = 'Revised' WHERE clause_code = 'NBC_3.7.2.1'")
+    connection.commit()
+    connection.close()
+    compile_code_pack(db_path, pack_path)
+
+    second = handle.get()
+    assert second is not first and handle.remaps == 2
+    assert second.table('building_code_clause').get('clause_code', 'NBC_3.7.2.1')['clause_title'] == 'Revised'
+    # The old mapping stays readable for requests that still hold it
+    assert first.table('building_code_clause').get('clause_code', 'NBC_3.7.2.1')['clause_title'] != 'Revised'
+    print("✅ Republished pack detected and remapped")
+
+
+def test_component_clauses_match_repository():
+    """The pack's component index matches case-insensitively, like the repository's LIKE"""
+    db_path = make_database()
+    add_clause(db_path, 'NBC_LOWER', '["toilet_standard", "Grab_Bar_Rear"]')
+    pack_path = db_path.replace('.db', '.codepack')
+    compile_code_pack(db_path, pack_path)
+
+    packed = EnhancedBuildingCodeEngine(db_path, code_pack_path=pack_path)
+    assert packed.current_code_pack() is not None
+    repository = SQLiteCodeRepository(db_path)
+    with repository.session() as codes:
+        # Indexed codes, then codes only reachable by the substring scan
+        for component_id in ('TOILET_STANDARD', 'GRAB_BAR_REAR', 'SINK_ACCESSIBLE', 'toilet', 'Bar_R', 'NOTHING'):
+            expected = [row['clause_code'] for row in codes.clauses_for_component(component_id, 'NBC', '2024-01-01')]
+            found = [row['clause_code'] for row in packed.fetch_component_clauses(None, component_id, 'NBC',
+                                                                                   '2024-01-01')]
+            assert sorted(found) == sorted(expected), (component_id, found, expected)
+            assert ('NBC_LOWER' in found) == (component_id not in ('SINK_ACCESSIBLE', 'NOTHING')), component_id
+    assert CodePack(pack_path).component_clause_rows('grab_bar_rear') is not None
+    print("✅ Component clauses match the repository, case-insensitively")
+
+
+def test_stale_pack_falls_back_to_database():
+    """A change_log revision newer than the pack's sends reads to SQLite until it is recompiled"""
+    db_path = make_database()
+    pack_path = db_path.replace('.db', '.codepack')
+    report = compile_code_pack(db_path, pack_path)
+    engine = EnhancedBuildingCodeEngine(db_path, code_pack_path=pack_path)
+    engine.code_pack.check_interval = 0
+    assert engine.current_code_pack().revision == report['revision'] == engine.source_revision()
+
+    add_clause(db_path, 'NBC_NEW', '["TOILET_STANDARD"]')
+    assert engine.current_code_pack() is None and engine.code_pack.stale
+    with engine.repository.session() as codes:
+        found = [row['clause_code'] for row in engine.fetch_component_clauses(codes, 'TOILET_STANDARD', 'NBC')]
+    assert 'NBC_NEW' in found
+    status = pack_status(pack_path, db_path)
+    assert not status['current'] and status['changed'] == {'clause': ['NBC_NEW']}, status
+
+    compile_code_pack(db_path, pack_path)
+    assert pack_status(pack_path, db_path)['current']
+    pack = engine.current_code_pack()
+    assert pack is not None and pack.revision == engine.source_revision() and not engine.code_pack.stale
+    assert 'NBC_NEW' in [row['clause_code'] for row in engine.fetch_component_clauses(None, 'TOILET_STANDARD', 'NBC')]
+    print(f"✅ Stale pack (revision {report['revision']}) bypassed until recompiled")
+
+
+def test_clause_collection_lookups_are_bounded():
+    """Step 4 on the pack: one index probe per component and clause, the jurisdiction set once per pack"""
+    db_path = make_database()
+    for i in range(40):
+        add_clause(db_path, f'NBC_EXTRA_{i}', '["TOILET_STANDARD", "SINK_ACCESSIBLE"]')
+    pack_path = db_path.replace('.db', '.codepack')
+    compile_code_pack(db_path, pack_path)
+    packed = EnhancedBuildingCodeEngine(db_path, code_pack_path=pack_path)
+    plain = EnhancedBuildingCodeEngine(db_path)
+
+    expansion = {'required_components': ['TOILET_STANDARD', 'SINK_ACCESSIBLE', 'GRAB_BAR_REAR'],
+                 'required_assemblies': [], 'expansion_log': []}
+    expected = plain.collect_building_code_clauses(expansion, [], 'NBC', '2024-01-01')
+    clauses = packed.current_code_pack().table('building_code_clause')
+    for _ in range(2):
+        before = clauses.lookups
+        collected = packed.collect_building_code_clauses(expansion, [], 'NBC', '2024-01-01')
+        probes = clauses.lookups - before
+        assert probes <= collected['total_clauses'] + 1, (probes, collected['total_clauses'])
+    assert probes == collected['total_clauses']
+    found = sorted(clause['clause_code'] for clause in collected['clauses'])
+    assert found == sorted(clause['clause_code'] for clause in expected['clauses'])
+    print(f"✅ {collected['total_clauses']} clauses collected with {probes} clause-index probes")
+
+
+if __name__ == "__main__":
+    print("📦 Code Pack Test")
+    print("=" * 50)
+    test_pack_matches_database()
+    test_indexed_lookups_and_zero_copy_access()
+    test_republished_pack_is_remapped()
+    test_component_clauses_match_repository()
+    test_stale_pack_falls_back_to_database()
+    test_clause_collection_lookups_are_bounded()
+    print("\n🚀 Code pack: ALL TESTS PASSED")
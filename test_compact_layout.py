@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the array-backed compact layout
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from compact_layout import CompactLayout, is_columnar
+from dxf_export import normalize_rooms
+from layout_sessions import LayoutSessionStore
+
+ROOM = {'length': 10.0, 'width': 8.0}
+
+
+def sample_layout(rows=3):
+    layout = CompactLayout()
+    for i in range(rows):
+        layout.append('water_closet_male', 1.0 + i, 1.0, 0.8, 1.2, 0.6)
+    layout.append('lavatory', 2.0, 4.0, 0.6, 0.5, 0.8)
+    return layout
+
+
+def test_dict_view_and_encodings():
+    layout = sample_layout()
+    assert layout.types == ['water_closet_male', 'lavatory'] and layout.type_index.tolist() == [0, 0, 0, 1]
+    assert dict(layout[3]) == {'type': 'lavatory', 'x': 2.0, 'y': 4.0, 'width': 0.6, 'height': 0.5,
+                               'clearance': 0.8}
+    assert [element['x'] for element in layout] == [1.0, 2.0, 3.0, 2.0]
+    assert layout.to_dicts() == [dict(view) for view in layout]
+
+    # Views read the arrays, so they follow edits
+    view = layout[0]
+    layout.x[0] = 5.0
+    assert view['x'] == 5.0
+
+    encoded = json.loads(json.dumps(layout.to_columnar()))
+    assert is_columnar(encoded) and encoded['count'] == 4 and encoded['type'] == [0, 0, 0, 1]
+    assert CompactLayout.from_columnar(encoded).to_dicts() == layout.to_dicts()
+    print(f"✅ Dict views and columnar round trip: {encoded['types']}")
+
+
+def test_columnar_validation():
+    good = sample_layout().to_columnar()
+    for bad in (dict(good, type=[0, 0, 0, 2]), dict(good, x=[1.0, 2.0]), dict(good, width=[0.8, 0.8, 0.8, 0]),
+                dict(good, y=[1.0, 1.0, 1.0, float('nan')]), dict(good, types=['a', 'a']),
+                dict(good, rotation=[0, 45, 0, 0]), dict(good, format='rows'), dict(good, type='0')):
+        try:
+            CompactLayout.from_columnar(bad)
+            assert False, f'accepted {bad}'
+        except ValueError:
+            pass
+    print("✅ Malformed columnar layouts rejected")
+
+
+def test_geometry_and_swap_remove():
+    layout = CompactLayout(with_rotation=True)
+    layout.append('urinal', 1.0, 1.0, 0.6, 0.8, 0.6, rotation=90)
+    layout.append('lavatory', 3.0, 1.0, 0.6, 0.5, 0.8, rotation=180)
+    layout.append('lavatory', 5.0, 1.0, 0.6, 0.5, 0.8)
+    assert layout.footprint(0) == (1.0, 1.0, 1.8, 1.6)
+    assert layout.clearance_zone(0) == (0.4, 1.0, 1.0, 1.6)
+    assert [round(v, 9) for v in layout.clearance_zone(1)] == [3.0, 0.2, 3.6, 1.0]
+    assert [round(v, 9) for v in layout.envelope(1)] == [3.0, 0.2, 3.6, 1.5]
+    assert layout.swap_remove(0) == 2 and len(layout) == 2
+    assert layout.row(0) == ('lavatory', 5.0, 1.0, 0.6, 0.5, 0.8, 0)
+    assert layout.swap_remove(1) is None and len(layout) == 1
+    print("✅ Footprints, rotated clearance zones and swap-remove")
+
+
+def test_consumers_read_columnar():
+    """DXF export and layout sessions take the columnar encoding as well as element dicts"""
+    layout = sample_layout()
+    rooms = normalize_rooms({'room_dimensions': ROOM, 'layout_elements': layout.to_dicts()})
+    compact_rooms = normalize_rooms({'room_dimensions': ROOM, 'layout_elements': layout.to_columnar()})
+    assert compact_rooms == rooms, (compact_rooms, rooms)
+
+    store = LayoutSessionStore(tempfile.mkdtemp())
+    from_dicts = store.create(1, ROOM, layout.to_dicts()).state()
+    from_columns = store.create(1, ROOM, layout.to_columnar()).state()
+    assert from_dicts['elements'] == from_columns['elements'] and from_dicts['issues'] == from_columns['issues']
+    print("✅ DXF export and layout sessions accept columnar layouts")
+
+
+def test_columnar_is_smaller():
+    layout = sample_layout(rows=1000)
+    started = time.perf_counter()
+    rows = json.dumps(layout.to_dicts())
+    rows_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    columns = json.dumps(layout.to_columnar())
+    columns_ms = (time.perf_counter() - started) * 1000
+    assert len(columns) * 2 < len(rows), (len(columns), len(rows))
+    print(f"✅ 1001 fixtures: {len(rows)} bytes as dicts ({rows_ms:.2f} ms), "
+          f"{len(columns)} bytes columnar ({columns_ms:.2f} ms)")
+
+
+if __name__ == "__main__":
+    print("🧱 Compact Layout Test")
+    print("=" * 50)
+    test_dict_view_and_encodings()
+    test_columnar_validation()
+    test_geometry_and_swap_remove()
+    test_consumers_read_columnar()
+    test_columnar_is_smaller()
+    print("\n🚀 Compact layout: ALL TESTS PASSED")
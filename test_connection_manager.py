@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the unified SQLite connection manager
+Checks WAL mode, read-only pooled readers, writer serialization and metrics
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from connection_manager import SQLiteConnectionManager, get_connection_manager, connection_metrics
+
+
+def make_manager(**options):
+    db_path = os.path.join(tempfile.mkdtemp(), 'pool.db')
+    manager = SQLiteConnectionManager(db_path, **options)
+    with manager.writer() as conn:
+        conn.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)')
+        conn.execute('INSERT INTO counter (id, value) VALUES (1, 0)')
+    return manager
+
+
+def test_wal_and_pragmas():
+    """Writer switches the file to WAL and every connection gets the tuned pragmas"""
+    manager = make_manager()
+    with manager.reader() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA cache_size').fetchone()[0] == -16000
+        assert conn.execute('PRAGMA query_only').fetchone()[0] == 1
+    print("✅ WAL journaling and pragmas applied")
+
+
+def test_readers_are_read_only():
+    """Pooled readers reject writes"""
+    manager = make_manager()
+    with manager.reader() as conn:
+        try:
+            conn.execute('UPDATE counter SET value = 1')
+            raise AssertionError('reader accepted a write')
+        except sqlite3.OperationalError:
+            pass
+    print("✅ Reader connections are query_only")
+
+
+def test_writer_serializes_and_rolls_back():
+    """Concurrent increments through the writer never lose updates; failures roll back"""
+    manager = make_manager(reader_pool_size=2)
+
+    def increment(_):
+        with manager.writer() as conn:
+            value = conn.execute('SELECT value FROM counter WHERE id = 1').fetchone()[0]
+            conn.execute('UPDATE counter SET value = ? WHERE id = 1', (value + 1,))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(increment, range(50)))
+
+    try:
+        with manager.writer() as conn:
+            conn.execute('UPDATE counter SET value = -1 WHERE id = 1')
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+
+    with manager.reader() as conn:
+        assert conn.execute('SELECT value FROM counter WHERE id = 1').fetchone()[0] == 50
+
+    metrics = manager.metrics()
+    assert metrics['writer_transactions'] >= 51
+    assert metrics['writer_rollbacks'] == 1
+    print("✅ Single writer serializes transactions and rolls back on error")
+
+
+def test_reader_pool_is_bounded():
+    """Never more reader connections than the pool size, even under load"""
+    manager = make_manager(reader_pool_size=3)
+    barrier = threading.Barrier(6)
+
+    def read(_):
+        barrier.wait()
+        with manager.reader() as conn:
+            return conn.execute('SELECT value FROM counter').fetchone()[0]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        assert list(executor.map(read, range(6))) == [0] * 6
+
+    metrics = manager.metrics()
+    assert metrics['readers_open'] <= 3
+    assert metrics['readers_in_use'] == 0
+    assert metrics['reader_checkouts'] == 6
+    print("✅ Reader pool stays bounded and connections are returned")
+
+
+def test_shared_registry():
+    """All classes opening the same path share one manager"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'shared.db')
+    first = get_connection_manager(db_path)
+    second = get_connection_manager(os.path.join(os.path.dirname(db_path), '.', 'shared.db'))
+    assert first is second
+    with first.reader() as conn:
+        conn.execute('SELECT 1')
+    assert any(m['database'] == 'shared.db' for m in connection_metrics())
+    print("✅ Managers are shared per database file")
+
+
+if __name__ == "__main__":
+    print("🗄️ SQLite Connection Manager Test")
+    print("=" * 50)
+    test_wal_and_pragmas()
+    test_readers_are_read_only()
+    test_writer_serializes_and_rolls_back()
+    test_reader_pool_is_bounded()
+    test_shared_registry()
+    print("\n🚀 Connection manager: ALL TESTS PASSED")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming DXF export and the content-addressed export cache
+"""
+
+import os
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from content_cache import ContentCache, content_key
+from dxf_export import WATERMARK_TEXT, iter_dxf, normalize_rooms
+
+LAYOUT = {
+    'room_dimensions': {'length': 10, 'width': 8},
+    'layout_elements': [
+        {'type': 'water_closet_male', 'x': 1.0, 'y': 1.0, 'width': 0.8, 'height': 1.2, 'clearance': 0.6},
+        {'type': 'water_closet_female', 'x': 1.0, 'y': 6.0, 'width': 0.8, 'height': 1.2, 'clearance': 0.6},
+        {'type': 'lavatory', 'x': 2.0, 'y': 4.0, 'width': 0.6, 'height': 0.5, 'clearance': 0.8}
+    ]
+}
+
+STEP_7 = {
+    'room_dimensions': {'length': 12.0, 'width': 9.0},
+    'positioned_assemblies': [
+        {'assembly_code': 'ACCESSIBLE_STALL', 'assembly_name': 'Accessible Stall',
+         'position': {'x': 1.0, 'y': 1.0, 'width': 2.0, 'height': 2.2,
+                      'clearances': {'approach_space': 1.5, 'turning_radius': 1.5}}}
+    ]
+}
+
+
+def group_pairs(data: bytes):
+    lines = data.decode('ascii').split('\n')
+    assert lines[-1] == ''
+    return list(zip(lines[0:-1:2], lines[1:-1:2]))
+
+
+def entities_by_layer(data: bytes):
+    pairs = group_pairs(data)
+    start = pairs.index(('2', 'ENTITIES'))
+    counts, entity = Counter(), None
+    for code, value in pairs[start + 1:]:
+        if code == '0':
+            entity = value
+        elif code == '8' and entity in ('POLYLINE', 'CIRCLE', 'TEXT'):
+            counts[(value, entity)] += 1
+    return counts
+
+
+def test_layered_entities():
+    """Room outline, fixtures, clearance zones and labels land on their own layers"""
+    data = b''.join(iter_dxf(normalize_rooms(LAYOUT)))
+    pairs = group_pairs(data)
+    assert pairs[:2] == [('0', 'SECTION'), ('2', 'HEADER')] and pairs[-1] == ('0', 'EOF')
+    assert ('1', 'AC1009') in pairs
+    counts = entities_by_layer(data)
+    assert counts[('ROOM', 'POLYLINE')] == 1
+    assert counts[('FIXTURES', 'POLYLINE')] == 3 and counts[('CLEARANCES', 'POLYLINE')] == 3
+    assert counts[('LABELS', 'TEXT')] == 4 and not counts[('WATERMARK', 'TEXT')]
+    print(f"✅ {sum(counts.values())} layered entities in {len(data)} bytes")
+
+
+def test_step_7_layout_and_watermark():
+    """Step-7 assemblies draw approach zones and turning circles; free exports are watermarked"""
+    rooms = normalize_rooms({'layout_design': STEP_7})
+    data = b''.join(iter_dxf(rooms, 'Tower', watermark=True))
+    counts = entities_by_layer(data)
+    assert counts[('CLEARANCES', 'CIRCLE')] == 1 and counts[('CLEARANCES', 'POLYLINE')] == 1
+    assert counts[('WATERMARK', 'TEXT')] == 1 and WATERMARK_TEXT.encode() in data
+    print("✅ Step-7 layout exported with watermark")
+
+
+def test_multi_room_streams_in_chunks():
+    """A many-room export comes out incrementally and rooms are placed side by side"""
+    rooms = normalize_rooms({'rooms': [dict(LAYOUT, name=f'Level {level}') for level in range(40)]})
+    chunks = list(iter_dxf(rooms, chunk_size=4096))
+    assert len(chunks) > 10 and max(len(chunk) for chunk in chunks) < 4096 * 2
+    counts = entities_by_layer(b''.join(chunks))
+    assert counts[('ROOM', 'POLYLINE')] == 40 and counts[('FIXTURES', 'POLYLINE')] == 120
+    assert ('10', '432') in group_pairs(b''.join(chunks))  # last room starts at 39 * (10 + 2)
+    print(f"✅ 40 rooms streamed in {len(chunks)} chunks")
+
+
+def test_invalid_layouts_rejected():
+    """Malformed input raises ValueError (HTTP 400)"""
+    bad_inputs = [{}, {'room_dimensions': {'length': 10, 'width': 8}},
+                  {'room_dimensions': {'length': -1, 'width': 8}, 'layout_elements': []},
+                  {'room_dimensions': {'length': 10, 'width': 8}, 'layout_elements': [{'x': 'a'}]},
+                  {'rooms': [LAYOUT] * 51}]
+    for payload in bad_inputs:
+        try:
+            normalize_rooms(payload)
+            assert False, f'accepted {payload}'
+        except ValueError:
+            pass
+    print(f"✅ {len(bad_inputs)} malformed layouts rejected")
+
+
+def test_content_cache():
+    """Streamed files publish on completion, abandoned streams leave nothing, LRU fits the budget"""
+    cache = ContentCache(tempfile.mkdtemp(), max_bytes=10_000)
+    key = content_key('dxf', normalize_rooms(LAYOUT), False)
+    assert key == content_key('dxf', normalize_rooms(dict(reversed(list(LAYOUT.items())))), False)
+    assert cache.get(key, '.dxf') is None
+
+    body = b''.join(cache.stream(key, '.dxf', iter_dxf(normalize_rooms(LAYOUT))))
+    with open(cache.get(key, '.dxf'), 'rb') as f:
+        assert f.read() == body
+
+    partial = cache.stream('abandoned', '.dxf', iter([b'x' * 100, b'y' * 100]))
+    next(partial)
+    partial.close()
+    assert cache.get('abandoned', '.dxf') is None and os.listdir(cache.directory) == [f'{key}.dxf']
+
+    for index in range(5):
+        cache.put(f'filler{index}', '.bin', b'z' * 3000)
+    assert cache.get(key, '.dxf') is None and cache.get('filler4', '.bin')
+    metrics = cache.metrics()
+    assert metrics['abandoned'] == 1 and metrics['evicted'] >= 2
+    print(f"✅ Content cache: {metrics['stored']} stored, {metrics['evicted']} evicted")
+
+
+if __name__ == "__main__":
+    print("📐 DXF Export Test")
+    print("=" * 50)
+    test_layered_entities()
+    test_step_7_layout_and_watermark()
+    test_multi_room_streams_in_chunks()
+    test_invalid_layouts_rejected()
+    test_content_cache()
+    print("\n🚀 DXF export: ALL TESTS PASSED")
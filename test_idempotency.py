@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for idempotent analysis requests
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from flask import Flask, jsonify, session
+
+from idempotency import REPLAY_HEADER, IdempotencyStore, idempotent
+
+app = Flask(__name__)
+app.secret_key = 'test'
+store = IdempotencyStore(window_seconds=30, key_ttl_seconds=300)
+calls = []
+
+
+@app.route('/login/<int:user_id>')
+def login(user_id):
+    session['user_id'] = user_id
+    return jsonify({'success': True})
+
+
+@app.route('/analysis', methods=['POST'])
+@idempotent(store)
+def analysis():
+    calls.append(session['user_id'])
+    time.sleep(0.2)
+    return jsonify({'success': True, 'call': len(calls)})
+
+
+def client_for(user_id):
+    client = app.test_client()
+    client.get(f'/login/{user_id}')
+    return client
+
+
+def test_content_hash_deduplication():
+    """Identical payloads from one user replay; other users and payloads compute"""
+    calls.clear()
+    first, second = client_for(1), client_for(2)
+
+    original = first.post('/analysis', json={'occupancy_load': 40, 'building_type': 'office'})
+    replay = first.post('/analysis', json={'building_type': 'office', 'occupancy_load': 40})
+    assert replay.get_json() == original.get_json() and replay.headers[REPLAY_HEADER] == 'true'
+
+    second.post('/analysis', json={'occupancy_load': 40, 'building_type': 'office'})
+    first.post('/analysis', json={'occupancy_load': 41, 'building_type': 'office'})
+    assert calls == [1, 2, 1]
+    print("✅ Duplicate payloads replayed per user")
+
+
+def test_concurrent_duplicates_wait():
+    """Requests that arrive while the original is running share its result"""
+    calls.clear()
+    results = []
+
+    def submit():
+        client = client_for(3)
+        response = client.post('/analysis', json={'occupancy_load': 99})
+        results.append(response.get_json()['call'])
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [3] and results == [1, 1, 1, 1]
+    print("✅ Concurrent duplicates wait for the in-flight computation")
+
+
+def test_idempotency_key_conflict():
+    """A reused key replays; the same key with a different body is rejected"""
+    calls.clear()
+    client = client_for(4)
+    headers = {'Idempotency-Key': 'order-1'}
+
+    client.post('/analysis', json={'occupancy_load': 10}, headers=headers)
+    assert client.post('/analysis', json={'occupancy_load': 10}, headers=headers).headers[REPLAY_HEADER] == 'true'
+    assert client.post('/analysis', json={'occupancy_load': 11}, headers=headers).status_code == 422
+    assert calls == [4]
+    print("✅ Idempotency-Key replay and conflict detection")
+
+
+if __name__ == "__main__":
+    print("🔁 Idempotent Requests Test")
+    print("=" * 50)
+    test_content_hash_deduplication()
+    test_concurrent_duplicates_wait()
+    test_idempotency_key_conflict()
+    print("\n🚀 Idempotent requests: ALL TESTS PASSED")
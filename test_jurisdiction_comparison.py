@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-jurisdiction comparison engine
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from jurisdiction_comparison import JurisdictionComparison, parse_jurisdictions
+from migrations import migrate
+
+INPUTS = {'building_type': 'office', 'occupancy_load': 120, 'accessibility_level': 'enhanced',
+          'room_length': 12.0, 'room_width': 9.0}
+
+# Stand-in for BuildingCodeAPI.get_fixture_requirements: Alberta asks for one more lavatory
+FIXTURES = {'water_closets_male': 2, 'water_closets_female': 3, 'urinals': 1, 'lavatories': 3,
+            'accessible_stalls': 1, 'total_fixtures': 9}
+
+
+def fixture_calculator(occupancy_load, building_type, jurisdiction, accessibility_level='basic'):
+    fixtures = dict(FIXTURES)
+    if jurisdiction == 'Alberta':
+        fixtures['lavatories'] += 1
+        fixtures['total_fixtures'] += 1
+    return fixtures
+
+
+def make_comparison():
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    engine = EnhancedBuildingCodeEngine(db_path)
+    return engine, JurisdictionComparison(engine, fixture_calculator)
+
+
+def test_matches_single_runs():
+    """Each jurisdiction's rules and clauses equal a standalone workflow run"""
+    engine, comparison = make_comparison()
+    result = comparison.compare(INPUTS, ['NBC', 'Alberta', 'Ontario', 'BC'])
+    for jurisdiction in result['jurisdictions']:
+        single = engine.process_complete_workflow(dict(INPUTS, jurisdiction=jurisdiction))
+        rules = [match['rule']['rule_code'] for match in single['steps']['step_2']['data']]
+        clauses = sorted(c['clause_code'] for c in single['steps']['step_4']['data']['clauses'])
+        compared = result['results'][jurisdiction]
+        assert compared['rules'] == rules, jurisdiction
+        assert [c['clause_code'] for c in compared['clauses']] == clauses, jurisdiction
+    print(f"✅ {len(result['jurisdictions'])} jurisdictions match standalone runs")
+
+
+def test_structured_diff():
+    """Fixture, rule and clause differences are reported per jurisdiction"""
+    _, comparison = make_comparison()
+    diff = comparison.compare(INPUTS, 'NBC,Alberta,NBC')['diff']
+    assert diff['fixtures_differ'] == ['lavatories', 'total_fixtures']
+    assert diff['fixtures']['lavatories']['values'] == {'NBC': 3, 'Alberta': 4}
+    assert diff['fixtures']['lavatories']['strictest'] == ['Alberta']
+    assert set(diff['clauses']['counts']) == {'NBC', 'Alberta'}
+    assert 'only_in' in diff['rules'] and 'common' in diff['assemblies']
+    print(f"✅ Diff: fixtures differ in {diff['fixtures_differ']}, clause counts {diff['clauses']['counts']}")
+
+
+def test_shared_steps_and_latency():
+    """Jurisdictions without their own rules share expansion; wall time stays near one run"""
+    engine, comparison = make_comparison()
+    comparison.compare(INPUTS, ['NBC'])  # warm rule snapshots
+
+    started = time.perf_counter()
+    comparison.compare(INPUTS, ['NBC'])
+    single_ms = (time.perf_counter() - started) * 1000
+    result = comparison.compare(INPUTS, ['NBC', 'Alberta', 'Ontario', 'BC'], include_details=True)
+
+    # Ontario and BC have no rules of their own in the sample data
+    assert result['timing']['shared_step_hits']['step_3'] >= 1
+    assert result['results']['Ontario']['layout_design'] is result['results']['BC']['layout_design']
+    print(f"✅ 1 jurisdiction {single_ms:.1f} ms, 4 jurisdictions {result['timing']['total_ms']:.1f} ms "
+          f"(shared: {result['timing']['shared_step_hits']})")
+
+
+def test_rejects_bad_jurisdiction_lists():
+    """Malformed lists are a ValueError (HTTP 400 in the API)"""
+    assert parse_jurisdictions(None) == ['NBC', 'Alberta', 'Ontario', 'BC']
+    for bad in ([1, 2], ' , ', [f'J{i}' for i in range(9)]):
+        try:
+            parse_jurisdictions(bad)
+            assert False, f'accepted {bad!r}'
+        except ValueError:
+            pass
+    print("✅ Bad jurisdiction lists rejected")
+
+
+if __name__ == "__main__":
+    print("🗺️ Jurisdiction Comparison Test")
+    print("=" * 50)
+    test_matches_single_runs()
+    test_structured_diff()
+    test_shared_steps_and_latency()
+    test_rejects_bad_jurisdiction_lists()
+    print("\n🚀 Jurisdiction comparison: ALL TESTS PASSED")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental layout sessions
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from layout_sessions import LayoutSessionStore, SessionConflict
+
+ROOM = {'length': 6.0, 'width': 4.0}
+# As generate_layout() returns them: a lavatory on the front wall, a stall on the back wall
+ELEMENTS = [
+    {'type': 'lavatory', 'x': 0.5, 'y': 0.2, 'width': 0.6, 'height': 0.5, 'clearance': 0.8},
+    {'type': 'water_closet', 'x': 3.0, 'y': 2.5, 'width': 0.9, 'height': 1.5, 'clearance': 1.0},
+]
+
+
+def full_check(layout_session):
+    """Issues recomputed from scratch, to compare with the incremental result"""
+    return {element_id: issues for element_id in layout_session.elements
+            if (issues := layout_session.check(element_id))}
+
+
+def test_initial_state():
+    store = LayoutSessionStore(tempfile.mkdtemp())
+    layout_session = store.create(1, ROOM, ELEMENTS)
+    state = layout_session.state()
+    assert [e['id'] for e in state['elements']] == ['e1', 'e2']
+    assert [e['rotation'] for e in state['elements']] == [0, 180]
+    assert state['summary'] == {'elements': 2, 'violations': 0, 'compliant': True}, state
+    for bad in ({'length': 0, 'width': 3}, None):
+        try:
+            store.create(1, bad, ELEMENTS)
+            assert False, f'accepted {bad}'
+        except ValueError:
+            pass
+    print("✅ Session created from generated layout, compliant")
+
+
+def test_edits_return_only_changes():
+    store = LayoutSessionStore(tempfile.mkdtemp())
+    layout_session = store.create(1, ROOM, ELEMENTS)
+
+    # Into the water closet's clearance zone (y 1.5..2.5 in front of it)
+    result = store.edit(layout_session, [{'op': 'move', 'id': 'e1', 'x': 3.0, 'y': 1.6}])
+    assert result['version'] == 1 and list(result['elements']) == ['e1']
+    assert result['issues']['e2'][0]['check'] == 'clearance_obstructed'
+    assert result['issues']['e2'][0]['with'] == ['e1']
+    assert not result['summary']['compliant']
+
+    # Turning the closet to face +x clears it; the lavatory's issues are unchanged so not returned
+    result = store.edit(layout_session, [{'op': 'rotate', 'id': 'e2', 'rotation': 270}], expected_version=1)
+    assert result['issues'] == {'e2': []}, result['issues']
+
+    result = store.edit(layout_session, [{'op': 'add', 'element': dict(ELEMENTS[0], x=5.8, y=3.0)},
+                                         {'op': 'remove', 'id': 'e1'}])
+    assert list(result['elements']) == ['e3', 'e1'] and result['elements']['e1'] is None
+    assert [issue['check'] for issue in result['issues']['e3']] == ['outside_room', 'clearance_outside_room']
+    assert layout_session.issues == full_check(layout_session)
+    print(f"✅ Deltas only: {result['summary']}")
+
+
+def test_bad_batch_rolled_back():
+    store = LayoutSessionStore(tempfile.mkdtemp())
+    layout_session = store.create(1, ROOM, ELEMENTS)
+    before = dict(layout_session.elements), dict(layout_session.issues)
+    for operations in ([{'op': 'move', 'id': 'e1', 'x': 2.0, 'y': 2.0}, {'op': 'remove', 'id': 'e9'}],
+                       [{'op': 'add', 'element': ELEMENTS[0]}, {'op': 'rotate', 'id': 'e1', 'rotation': 45}],
+                       [{'op': 'resize', 'id': 'e1'}], []):
+        try:
+            store.edit(layout_session, operations)
+            assert False, f'accepted {operations}'
+        except ValueError:
+            pass
+    assert (layout_session.elements, layout_session.issues) == before and layout_session.version == 0
+    assert layout_session.next_id == 3
+    try:
+        store.edit(layout_session, [{'op': 'move', 'id': 'e1', 'x': 1.0, 'y': 0.2}], expected_version=5)
+        assert False, 'stale version accepted'
+    except SessionConflict:
+        pass
+    print("✅ Invalid batches leave the layout untouched; stale versions conflict")
+
+
+def test_other_worker_and_owner():
+    directory = tempfile.mkdtemp()
+    first, second = LayoutSessionStore(directory), LayoutSessionStore(directory)
+    layout_session = first.create(7, ROOM, ELEMENTS)
+    first.edit(layout_session, [{'op': 'move', 'id': 'e1', 'x': 1.0, 'y': 0.2}])
+    other = second.get(layout_session.session_id, 7)
+    assert other.version == 1 and other.elements['e1']['x'] == 1.0
+    second.edit(other, [{'op': 'move', 'id': 'e1', 'x': 1.5, 'y': 0.2}])
+    again = first.get(layout_session.session_id, 7)
+    assert again.version == 2 and again.elements['e1']['x'] == 1.5
+    assert first.get(layout_session.session_id, 8) is None
+    assert first.get('../etc', 7) is None
+    first.delete(again)
+    assert second.get(layout_session.session_id, 7) is None
+    print("✅ Session shared between workers, private to its owner")
+
+
+def test_oversized_elements_stay_cheap():
+    """Huge or far-away fixtures cost no more grid work than the room has cells"""
+    store = LayoutSessionStore(tempfile.mkdtemp())
+    room = {'length': 5.0, 'width': 5.0}
+    for size in (300.0, 30000.0, 900000.0):
+        started = time.perf_counter()
+        layout_session = store.create(1, room, ELEMENTS + [
+            {'type': 'slab', 'x': -size / 2, 'y': -size / 2, 'width': size, 'height': size, 'clearance': size},
+            {'type': 'far', 'x': size, 'y': size, 'width': 1.0, 'height': 1.0, 'clearance': 1.0}])
+        store.edit(layout_session, [{'op': 'move', 'id': 'e4', 'x': -size, 'y': 2.0}])
+        elapsed = time.perf_counter() - started
+        assert elapsed < 0.5, (size, elapsed)
+        assert layout_session.issues == full_check(layout_session)
+        checks = {issue['check'] for issue in layout_session.issues['e3']}
+        assert {'outside_room', 'overlaps_fixture'} <= checks, checks
+    for bad in ({'x': 1e7}, {'width': 1e9}, {'clearance': float('inf')}):
+        try:
+            store.create(1, room, [dict(ELEMENTS[0], **bad)])
+            assert False, f'accepted {bad}'
+        except ValueError:
+            pass
+
+    # Every fixture covering the whole room: quadratic in the fixture count, but no cell blow-up
+    started = time.perf_counter()
+    big = [{'type': 'slab', 'x': -1000.0 - i, 'y': -1000.0, 'width': 3000.0, 'height': 3000.0,
+            'clearance': 10.0} for i in range(300)]
+    layout_session = store.create(1, room, big)
+    elapsed = time.perf_counter() - started
+    assert elapsed < 2, elapsed
+    print(f"✅ Oversized fixtures bounded by the room grid (300 room-covering fixtures in {elapsed * 1000:.0f} ms)")
+
+
+def test_incremental_matches_full_and_is_fast():
+    """Random edits on a 200-fixture floor: same issues as a full check, a few ms each"""
+    rng = random.Random(4)
+    room = {'length': 60.0, 'width': 40.0}
+    elements = [{'type': 'lavatory', 'x': rng.uniform(0, 59), 'y': rng.uniform(0, 39), 'width': 0.6,
+                 'height': 0.5, 'clearance': 0.8} for _ in range(200)]
+    store = LayoutSessionStore(tempfile.mkdtemp())
+    layout_session = store.create(1, room, elements)
+    durations = []
+    for _ in range(300):
+        element_id = rng.choice(list(layout_session.elements))
+        operation = rng.choice([
+            {'op': 'move', 'id': element_id, 'x': rng.uniform(0, 59), 'y': rng.uniform(0, 39)},
+            {'op': 'rotate', 'id': element_id, 'rotation': rng.choice([0, 90, 180, 270])},
+            {'op': 'add', 'element': {'type': 'urinal', 'x': rng.uniform(0, 59), 'y': rng.uniform(0, 39),
+                                      'width': 0.5, 'height': 0.4, 'clearance': 0.6}},
+            {'op': 'remove', 'id': element_id},
+        ])
+        durations.append(store.edit(layout_session, [operation])['duration_ms'])
+        assert layout_session.issues == full_check(layout_session)
+    durations.sort()
+    median = durations[len(durations) // 2]
+    assert median < 5, durations
+    print(f"✅ 300 edits match a full check, median {median} ms (max {durations[-1]} ms)")
+
+
+if __name__ == "__main__":
+    print("✏️ Layout Sessions Test")
+    print("=" * 50)
+    test_initial_state()
+    test_edits_return_only_changes()
+    test_bad_batch_rolled_back()
+    test_other_worker_and_owner()
+    test_oversized_elements_stay_cheap()
+    test_incremental_matches_full_and_is_fast()
+    print("\n🚀 Layout sessions: ALL TESTS PASSED")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for versioned schema migrations and the prebuilt database artifact
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from connection_manager import SQLiteConnectionManager
+from migrations import apply_migrations, build_artifact, latest_version, migrate, split_sql, status
+
+
+def test_split_sql_keeps_triggers_whole():
+    """Statements are split on completeness, so trigger bodies stay intact"""
+    statements = split_sql("""
+        -- comment
+        CREATE TABLE t (a INTEGER);
+        CREATE TRIGGER tr AFTER INSERT ON t BEGIN
+            UPDATE t SET a = a + 1;
+        END;
+    """)
+    assert len(statements) == 2 and statements[1].endswith('END;')
+    print("✅ SQL scripts split into complete statements")
+
+
+def test_migrate_once_then_fast_path():
+    """A fresh database is migrated and seeded once; later calls do nothing"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+
+    applied = migrate(db_path)
+    assert [m['version'] for m in applied] == list(range(1, latest_version() + 1))
+    assert migrate(db_path) == []
+
+    report = status(db_path)
+    assert report['user_version'] == latest_version() and report['pending'] == []
+
+    connection = sqlite3.connect(db_path)
+    assert connection.execute('SELECT COUNT(*) FROM building_codes').fetchone()[0] > 0
+    assert connection.execute('SELECT COUNT(*) FROM building_code_clause').fetchone()[0] > 0
+    connection.close()
+    print("✅ Migrations applied once, then the fast path")
+
+
+def test_concurrent_workers_migrate_once():
+    """Workers racing at boot serialize on BEGIN IMMEDIATE; only one applies migrations"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    results = []
+
+    def worker():
+        # Separate managers behave like separate gunicorn workers
+        manager = SQLiteConnectionManager(db_path)
+        results.append(len(apply_migrations(manager)))
+        manager.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [0, 0, 0, latest_version()]
+    print("✅ Concurrent workers migrate exactly once")
+
+
+def test_build_artifact():
+    """The prebuilt artifact is a single, fully migrated file"""
+    output = os.path.join(tempfile.mkdtemp(), 'dist', 'building_codes.db')
+    report = build_artifact(output)
+
+    assert report['version'] == latest_version()
+    assert not os.path.exists(output + '-wal')
+    connection = sqlite3.connect(output)
+    assert connection.execute('PRAGMA user_version').fetchone()[0] == latest_version()
+    assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    connection.close()
+    print("✅ Prebuilt database artifact")
+
+
+if __name__ == "__main__":
+    print("🧱 Schema Migrations Test")
+    print("=" * 50)
+    test_split_sql_keeps_triggers_whole()
+    test_migrate_once_then_fast_path()
+    test_concurrent_workers_migrate_once()
+    test_build_artifact()
+    print("\n🚀 Schema migrations: ALL TESTS PASSED")
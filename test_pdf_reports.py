@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for background PDF compliance reports
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from content_cache import ContentCache
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import migrate
+from pdf_reports import ReportService, wrap
+
+INPUTS = {'building_type': 'office', 'occupancy_load': 120, 'accessibility_level': 'enhanced',
+          'jurisdiction': 'NBC', 'room_length': 12.0, 'room_width': 9.0}
+
+
+def make_service(cache_dir=None, engine=None):
+    if engine is None:
+        db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+        migrate(db_path)
+        engine = EnhancedBuildingCodeEngine(db_path)
+    return ReportService(engine, ContentCache(cache_dir or tempfile.mkdtemp()))
+
+
+def wait(service, report_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = service.status(report_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'report {report_id} did not finish')
+
+
+def check_pdf(data: bytes):
+    """Header, trailer and every xref offset pointing at its object"""
+    assert data.startswith(b'%PDF-1.4') and data.rstrip().endswith(b'%%EOF')
+    xref = int(re.search(rb'startxref\n(\d+)', data).group(1))
+    assert data[xref:xref + 4] == b'xref'
+    entries = re.findall(rb'(\d{10}) 00000 n', data[xref:])
+    for number, offset in enumerate(entries, start=1):
+        assert data[int(offset):].startswith(f'{number} 0 obj'.encode()), number
+    return int(re.search(rb'/Count (\d+)', data).group(1))
+
+
+def test_report_built_in_background():
+    """A job is queued, built off the request thread and served from the cache"""
+    service = make_service()
+    job = service.submit(INPUTS, 'Tower A washrooms')
+    assert job['status'] in ('queued', 'running', 'done')
+    job = wait(service, job['report_id'])
+    assert job['status'] == 'done', job
+    with open(service.path(job['report_id']), 'rb') as f:
+        data = f.read()
+    pages = check_pdf(data)
+    assert b'(Tower A washrooms)' in data and b'NBC 3.8.3.7' in data and b'Page 1 of' in data
+    print(f"✅ {pages}-page report ({len(data)} bytes) built in {job['build_ms']} ms")
+
+
+def test_repeat_requests_deduplicated():
+    """Same inputs share one job and one file; different inputs get a new report"""
+    service = make_service()
+    first = service.submit(INPUTS, 'Tower')
+    again = service.submit(dict(INPUTS, unrelated_field='x'), 'Tower')
+    assert again['report_id'] == first['report_id']
+    wait(service, first['report_id'])
+    assert service.submit(INPUTS, 'Tower')['status'] == 'done'
+    other = service.submit(dict(INPUTS, occupancy_load=300), 'Tower')
+    assert other['report_id'] != first['report_id']
+    wait(service, other['report_id'])
+    metrics = service.metrics()
+    assert metrics['built'] == 2 and metrics['deduplicated'] == 2, metrics
+    print(f"✅ Deduplicated: {metrics}")
+
+
+def test_other_worker_picks_up_job():
+    """A worker that never saw the job finds it through the shared cache"""
+    cache_dir = tempfile.mkdtemp()
+    first = make_service(cache_dir)
+    report_id = first.report_id(INPUTS, 'Shared')
+    first.cache.put(report_id, '.request.json', json.dumps({'inputs': INPUTS, 'title': 'Shared'}).encode())
+    second = make_service(cache_dir, engine=first.engine)
+    assert wait(second, report_id)['status'] == 'done'
+    assert first.status(report_id)['status'] == 'done'
+    assert make_service(cache_dir, engine=first.engine).status('0' * 64) is None
+    print("✅ Job visible to every worker through the shared cache")
+
+
+def test_build_marker_shared_between_workers():
+    """A job another worker is building is reported as running, not built twice"""
+    cache_dir = tempfile.mkdtemp()
+    first = make_service(cache_dir)
+    report_id = first.report_id(INPUTS, 'Marked')
+    first.cache.put(report_id, '.request.json', json.dumps({'inputs': INPUTS, 'title': 'Marked'}).encode())
+    assert first.cache.claim(report_id, 600)  # as if a build were in flight on another worker
+    second = make_service(cache_dir, engine=first.engine)
+    assert second.status(report_id) == {'report_id': report_id, 'status': 'running'}
+    assert second.metrics()['submitted'] == 0
+
+    # A marker left by a dead worker is taken over once stale
+    stale = time.time() - 700
+    os.utime(first.cache.path(report_id, '.lock'), (stale, stale))
+    assert wait(second, report_id)['status'] == 'done' and second.metrics()['built'] == 1
+    assert not os.path.exists(first.cache.path(report_id, '.lock'))
+    print("✅ Build marker keeps other workers from rebuilding an in-flight report")
+
+
+def test_failed_job_reported():
+    """Workflow errors end the job as failed with the message"""
+    service = make_service()
+    job = wait(service, service.submit(dict(INPUTS, permit_date='June 2019'), 'Bad')['report_id'])
+    assert job['status'] == 'failed' and 'as-of date' in job['error'], job
+    assert service.path(job['report_id']) is None
+    # Other workers see the failure instead of rebuilding on every poll
+    other = make_service(service.cache.directory, engine=service.engine).status(job['report_id'])
+    assert other['status'] == 'failed' and 'as-of date' in other['error'], other
+    print("✅ Failed job reports its error")
+
+
+def test_wrap():
+    lines = wrap('Lavatories shall be provided in washrooms at the rate of not less than the number', 10, 150)
+    assert len(lines) > 1 and ' '.join(lines).startswith('Lavatories shall')
+    print("✅ Text wrapping")
+
+
+if __name__ == "__main__":
+    print("📄 PDF Reports Test")
+    print("=" * 50)
+    test_wrap()
+    test_report_built_in_background()
+    test_repeat_requests_deduplicated()
+    test_other_worker_picks_up_job()
+    test_build_marker_shared_between_workers()
+    test_failed_job_reported()
+    print("\n🚀 PDF reports: ALL TESTS PASSED")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for precompiled JSON responses (ETag / 304 / gzip)
+"""
+
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from flask import Flask
+
+from response_cache import ResponseCache, choose_encoding, etag_matches
+
+app = Flask(__name__)
+
+
+def test_encoding_negotiation():
+    """q-values and wildcards decide between gzip and identity"""
+    assert choose_encoding('gzip, deflate, br', ('gzip',)) == 'gzip'
+    assert choose_encoding('gzip;q=0', ('gzip',)) is None
+    assert choose_encoding('*', ('br', 'gzip')) == 'br'
+    assert choose_encoding('br;q=0.5, gzip', ('br', 'gzip')) == 'gzip'
+    assert choose_encoding(None, ('gzip',)) is None
+    print("✅ Accept-Encoding negotiation")
+
+
+def test_serialize_once_and_revalidate():
+    """Body is built once per version; matching If-None-Match gets a 304"""
+    cache = ResponseCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {'success': True, 'plans': {'free': {'price': 0}}}
+
+    with app.test_request_context('/api/pricing'):
+        first = cache.respond('pricing', 1, build)
+    with app.test_request_context('/api/pricing', headers={'If-None-Match': first.headers['ETag']}):
+        second = cache.respond('pricing', 1, build)
+    with app.test_request_context('/api/pricing', headers={'Accept-Encoding': 'gzip'}):
+        zipped = cache.respond('pricing', 1, build)
+
+    assert len(builds) == 1
+    assert first.status_code == 200 and json.loads(first.get_data())['success']
+    assert second.status_code == 304 and second.get_data() == b''
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['ETag'] != first.headers['ETag']
+    assert gzip.decompress(zipped.get_data()) == first.get_data()
+    assert etag_matches(f'W/{first.headers["ETag"]}', [first.headers['ETag']])
+    print("✅ Serialized once, 304 on matching ETag, gzip variant precomputed")
+
+
+def test_version_change_rebuilds():
+    """A new source version re-serializes and changes the ETag"""
+    cache = ResponseCache()
+    with app.test_request_context('/api/health'):
+        old = cache.respond('health', 1, lambda: {'status': 'healthy', 'n': 1})
+        new = cache.respond('health', 2, lambda: {'status': 'healthy', 'n': 2})
+    assert old.headers['ETag'] != new.headers['ETag']
+    assert cache.metrics()['builds'] == 2
+    print("✅ Source change triggers re-serialization")
+
+
+if __name__ == "__main__":
+    print("⚡ Precompiled Response Cache Test")
+    print("=" * 50)
+    test_encoding_negotiation()
+    test_serialize_once_and_revalidate()
+    test_version_change_rebuilds()
+    print("\n🚀 Response cache: ALL TESTS PASSED")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for field projection and compact analysis responses
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import migrate
+from response_projection import (CLAUSE_ITEM_KEYS, PUBLIC_CLAUSE_FIELDS, compact_workflow, parse_fields,
+                                 project, required_workflow_steps)
+
+CLAUSE = {'clause_code': 'NBC_3.7.2.1', 'clause_number': '3.7.2.1', 'clause_title': 'Water closets',
+          'clause_text_en': 'Water closets shall be provided...', 'jurisdiction': 'NBC'}
+
+
+def sample_workflow():
+    validation = {'is_complete': True, 'warnings': []}
+    checklist = {
+        'validation_status': validation,
+        'sections': [{'category': 'fixtures', 'items': [{
+            'clause_id': 'NBC_3.7.2.1', 'clause_number': '3.7.2.1', 'title': 'Water closets',
+            'requirement': 'Water closets shall be provided...', 'code_reference': 'NBC 3.7.2.1',
+            'page_reference': 12, 'priority': 'critical', 'status': 'pending',
+            'why_required': 'Required by building code', 'verification_method': 'visual_inspection'
+        }]}]
+    }
+    return {
+        'workflow_id': 'workflow_1',
+        'steps': {
+            'step_4': {'data': {'clauses': [CLAUSE], 'total_clauses': 1}},
+            'step_5': {'data': validation},
+            'step_6': {'data': checklist}
+        },
+        'final_results': {'compliance_checklist': checklist, 'validation_summary': validation,
+                          'traceability_complete': True},
+        'validation': validation
+    }
+
+
+def test_required_steps_follow_dependencies():
+    """Requesting a section runs its producing step and everything it consumes"""
+    assert required_workflow_steps(None) == {1, 2, 3, 4, 5, 6, 7}
+    assert required_workflow_steps(parse_fields('steps.step_2')) == {1, 2}
+    assert required_workflow_steps(parse_fields('final_results.layout_design')) == {1, 2, 3, 4, 7}
+    assert required_workflow_steps(parse_fields('validation')) == {1, 2, 3, 4, 5}
+    assert required_workflow_steps(parse_fields('workflow_id')) == set()
+    print("✅ Only the steps behind the requested fields are scheduled")
+
+
+def test_projection():
+    """Dotted paths keep only the selected subtrees"""
+    workflow = sample_workflow()
+    projected = project(workflow, parse_fields('workflow_id, steps.step_5,missing.path'))
+    assert projected == {'workflow_id': 'workflow_1', 'steps': {'step_5': workflow['steps']['step_5']}}
+    assert project(workflow, None) is workflow
+    print("✅ Field projection")
+
+
+def test_compact_deduplicates_shared_objects():
+    """Clauses appear once at the top level; repeated sections become $ref pointers"""
+    workflow = sample_workflow()
+    compact = compact_workflow(workflow, {CLAUSE['clause_code']: CLAUSE})
+
+    assert compact['clauses'] == {'NBC_3.7.2.1': dict(CLAUSE, why_required='Required by building code',
+                                                      verification_method='visual_inspection')}
+    assert compact['steps']['step_4']['data']['clauses'] == ['NBC_3.7.2.1']
+    item = compact['steps']['step_6']['data']['sections'][0]['items'][0]
+    assert item == {'clause_id': 'NBC_3.7.2.1', 'status': 'pending'}, item
+    assert compact['final_results']['compliance_checklist'] == {'$ref': '#/steps/step_6/data'}
+    assert compact['validation'] == {'$ref': '#/steps/step_5/data'}
+    # The original response is left untouched
+    assert workflow['steps']['step_4']['data']['clauses'] == [CLAUSE]
+
+    # Without the step data in the response, sections stay inline (but still clause-deduplicated)
+    only_checklist = project(workflow, parse_fields('final_results.compliance_checklist'))
+    compact = compact_workflow(only_checklist, {CLAUSE['clause_code']: CLAUSE})
+    assert 'sections' in compact['final_results']['compliance_checklist']
+    assert list(compact['clauses']) == ['NBC_3.7.2.1']
+    print("✅ Compact mode deduplicates clauses and repeated sections")
+
+
+def test_clauses_expose_only_public_fields():
+    """Step 4 and the compact clause table carry no ids, hashes or validity bounds"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    engine = EnhancedBuildingCodeEngine(db_path)
+    inputs = {'building_type': 'office', 'occupancy_load': 60, 'accessibility_level': 'enhanced',
+              'jurisdiction': 'NBC'}
+    full = engine.process_enhanced_workflow(inputs)
+    compact = engine.process_enhanced_workflow(inputs, compact=True)
+
+    clauses = full['steps']['step_4']['data']['clauses']
+    assert clauses and compact['clauses']
+    for clause in clauses + list(compact['clauses'].values()):
+        # Compact clauses also carry the per-clause checklist keys
+        assert set(clause) <= set(PUBLIC_CLAUSE_FIELDS + CLAUSE_ITEM_KEYS), set(clause) - set(PUBLIC_CLAUSE_FIELDS)
+        assert 'clause_text_en' in clause and 'content_hash' not in clause and 'valid_from' not in clause
+    print(f"✅ Public clause fields only: {len(json.dumps(full, default=str))} bytes full, "
+          f"{len(json.dumps(compact, default=str))} compact")
+
+
+def test_compact_refers_to_shared_tables():
+    """Rules, assemblies and clauses appear once; steps point at them by code"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    engine = EnhancedBuildingCodeEngine(db_path)
+    inputs = {'building_type': 'office', 'occupancy_load': 60, 'accessibility_level': 'enhanced',
+              'jurisdiction': 'NBC'}
+    full = engine.process_enhanced_workflow(inputs)
+    compact = engine.process_enhanced_workflow(inputs, compact=True)
+    steps = compact['steps']
+
+    assert all(match['rule'] in compact['rules'] for match in steps['step_2']['data'])
+    assert all('content_hash' not in rule and 'required_clause_ids' not in rule for rule in compact['rules'].values())
+    assert steps['step_3']['data']['required_assemblies'] == list(compact['assemblies'])
+    assert all('assembly_name' not in placed for placed in steps['step_7']['data']['positioned_assemblies'])
+    for entry in steps['step_4']['data']['collection_log']:
+        assert entry['clause_id'] in compact['clauses'] and 'clause_title' not in entry
+        if entry['source'] == 'direct_rule_requirement':
+            assert entry['rule'] in compact['rules'] and 'reason' not in entry
+    for clause in compact['clauses'].values():
+        assert clause['why_required'] and clause['verification_method'] and None not in clause.values()
+
+    full_size, compact_size = len(json.dumps(full, default=str)), len(json.dumps(compact, default=str))
+    assert compact_size * 5 < full_size * 3, (compact_size, full_size)
+    print(f"✅ Compact response refers to shared tables: {full_size} -> {compact_size} bytes")
+
+
+if __name__ == "__main__":
+    print("🧩 Response Projection Test")
+    print("=" * 50)
+    test_required_steps_follow_dependencies()
+    test_projection()
+    test_compact_deduplicates_shared_objects()
+    test_clauses_expose_only_public_fields()
+    test_compact_refers_to_shared_tables()
+    print("\n🚀 Response projection: ALL TESTS PASSED")
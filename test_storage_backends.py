@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script for the pluggable storage backends
+Set TEST_POSTGRES_DSN to also run the contract against a local PostgreSQL server.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from code_storage import (CodeRepository, CodeSession, InMemoryCodeRepository, PostgresCodeRepository,
+                          SQLiteCodeRepository, copy_to_postgres)
+from enhanced_logic_engine import EnhancedBuildingCodeEngine
+from migrations import migrate
+from storage_backends import (InMemoryUserRepository, PostgresConnectionPool, PostgresUserRepository,
+                              SQLiteUserRepository, StorageError, UserRepository, storage_backend)
+from user_auth_system import UserAuthSystem
+
+POSTGRES_DSN = os.environ.get('TEST_POSTGRES_DSN')
+
+INPUTS = {'building_type': 'office', 'occupancy_load': 120, 'accessibility_level': 'enhanced',
+          'jurisdiction': 'NBC', 'room_length': 12.0, 'room_width': 9.0}
+
+
+def make_code_database():
+    db_path = os.path.join(tempfile.mkdtemp(), 'codes.db')
+    migrate(db_path)
+    return db_path
+
+
+def postgres_pool():
+    pool = PostgresConnectionPool(POSTGRES_DSN, pool_size=2)
+    with pool.writer() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS usage_rollup, usage_rollup_state, payments, project_usage, '
+                           'subscriptions, users')
+    return pool
+
+
+def user_repositories():
+    repositories = {'memory': InMemoryUserRepository(),
+                    'sqlite': SQLiteUserRepository(os.path.join(tempfile.mkdtemp(), 'users.db'))}
+    if POSTGRES_DSN:
+        repositories['postgres'] = PostgresUserRepository(pool=postgres_pool())
+    return repositories
+
+
+def test_user_repository_contract():
+    """Every adapter answers the user/subscription contract the same way"""
+    for backend, users in user_repositories().items():
+        users.init_schema()
+        user_id = users.create_user('ada@example.com', 'salt:hash', 'Ada', 'Lovelace', company='Engines Ltd')
+        assert user_id is not None, backend
+        assert users.create_user('ada@example.com', 'x', 'A', 'L') is None, backend
+
+        login = users.find_login('ada@example.com')
+        assert (login['id'], login['password_hash'], login['first_name']) == (user_id, 'salt:hash', 'Ada'), backend
+        assert users.find_login('nobody@example.com') is None, backend
+        users.touch_login(user_id)
+        assert users.user_field(user_id, 'company') == 'Engines Ltd', backend
+
+        users.record_usage(user_id, 'Project A', 'standard', True)
+        users.record_usage(user_id, 'Project B', 'standard', True)
+        subscription = users.subscription(user_id)
+        assert (subscription['plan_type'], subscription['free_projects_used']) == ('free', 2), backend
+        for granularity in ('day', 'month'):
+            report = users.usage_report('user', user_id, granularity, 3)
+            assert len(report['series']) == 3 and report['series'][-1]['total'] == 2, (backend, report)
+            assert report['totals'] == {'total': 2, 'free_tier': 2, 'by_analysis_type': {'standard': 2}}, backend
+        assert users.usage_report('user', user_id + 1, 'day', 7)['totals']['total'] == 0, backend
+
+        users.activate_subscription(user_id, 'professional', 'sub_123')
+        subscription = users.subscription(user_id)
+        assert (subscription['plan_type'], subscription['stripe_subscription_id']) == ('professional', 'sub_123')
+        assert subscription['free_projects_used'] == 0, backend
+        print(f"✅ {backend}: user repository contract")
+    if not POSTGRES_DSN:
+        print("⏭️ postgres: skipped (set TEST_POSTGRES_DSN to run)")
+
+
+def test_auth_system_on_memory_backend():
+    """UserAuthSystem keeps its API on any adapter, usage analytics included"""
+    auth = UserAuthSystem(backend='memory')
+    registered = auth.register_user('grace@example.com', 'password123', 'Grace', 'Hopper')
+    assert registered['success']
+    assert auth.login_user('grace@example.com', 'password123')['success']
+    assert not auth.login_user('grace@example.com', 'wrong-password')['success']
+    assert auth.get_user_subscription(registered['user_id'])['free_projects_remaining'] == 3
+    assert auth.record_project_usage(registered['user_id'], 'Tower', 'standard')['success']
+    assert auth.get_user_subscription(registered['user_id'])['free_projects_remaining'] == 2
+    analytics = auth.get_usage_analytics(registered['user_id'])
+    assert analytics['success'] and analytics['analytics']['totals']['total'] == 1, analytics
+    assert not auth.get_usage_analytics(registered['user_id'], granularity='hour')['success']
+    print("✅ UserAuthSystem works on the memory backend")
+
+
+def test_usage_report_reads_rollups_only():
+    """Reports come from rollups kept on the write path, not from the raw usage history"""
+    users = InMemoryUserRepository()
+    user_id = users.create_user('ada@example.com', 'salt:hash', 'Ada', 'Lovelace')
+    for i in range(500):
+        users.record_usage(user_id, f'Project {i}', 'enhanced' if i % 5 else None, i < 3)
+    users.project_usage.clear()  # the report must not need it
+    report = users.usage_report('user', user_id, 'month', 12)
+    assert report['totals'] == {'total': 500, 'free_tier': 3,
+                                'by_analysis_type': {'enhanced': 400, 'unknown': 100}}, report
+    assert sum(len(types) for types in users.usage_rollup.values()) == 4
+    print("✅ memory: usage report answered from rollups")
+
+
+def workflow_summary(engine, inputs):
+    result = engine.process_complete_workflow(inputs)
+    assert 'error' not in result, result
+    steps = result['steps']
+    return {
+        'rules': [match['rule']['rule_code'] for match in steps['step_2']['data']],
+        'components': sorted(steps['step_3']['data']['required_components']),
+        'clauses': sorted(clause['clause_code'] for clause in steps['step_4']['data']['clauses']),
+        'layout': steps['step_7']['data']['positioned_assemblies']
+    }
+
+
+def test_code_repositories_match():
+    """The engine produces the same workflow on the memory and SQLite adapters"""
+    db_path = make_code_database()
+    repositories = {'sqlite': SQLiteCodeRepository(db_path), 'memory': InMemoryCodeRepository.from_sqlite(db_path)}
+    if POSTGRES_DSN:
+        pool = PostgresConnectionPool(POSTGRES_DSN, pool_size=2)
+        copy_to_postgres(db_path, pool=pool)
+        repositories['postgres'] = PostgresCodeRepository(pool=pool)
+
+    expected = None
+    for backend, repository in repositories.items():
+        engine = EnhancedBuildingCodeEngine(db_path, repository=repository)
+        for inputs in (INPUTS, dict(INPUTS, jurisdiction='Alberta'), dict(INPUTS, permit_date='2019-06-01')):
+            summary = workflow_summary(engine, inputs)
+            with repository.session() as codes:
+                summary['fixtures'] = [row['code_reference'] for row in
+                                       codes.fixture_requirements(inputs['jurisdiction'], 'office', 'basic')]
+            key = (inputs['jurisdiction'], inputs.get('permit_date'))
+            if backend == 'sqlite':
+                expected = expected or {}
+                expected[key] = summary
+            else:
+                assert summary == expected[key], (backend, key)
+        print(f"✅ {backend}: {len(expected[('NBC', None)]['clauses'])} NBC clauses, identical workflow results")
+
+
+def test_interfaces_are_abstract():
+    """An adapter missing part of the interface fails when constructed, not on first use"""
+    class Partial(UserRepository):
+        def init_schema(self):
+            pass
+
+    for interface in (Partial, CodeSession, CodeRepository):
+        try:
+            interface()
+            assert False, f'{interface.__name__} instantiated'
+        except TypeError:
+            pass
+    print("✅ Repository interfaces are abstract")
+
+
+def test_backend_selection():
+    """STORAGE_BACKEND picks the adapter; unknown names are rejected"""
+    assert storage_backend() == os.environ.get('STORAGE_BACKEND', 'sqlite')
+    assert storage_backend('Memory') == 'memory'
+    try:
+        storage_backend('mysql')
+        assert False, 'accepted an unknown backend'
+    except StorageError:
+        pass
+    print("✅ Backend selection")
+
+
+if __name__ == "__main__":
+    print("🗄️ Storage Backends Test")
+    print("=" * 50)
+    test_user_repository_contract()
+    test_auth_system_on_memory_backend()
+    test_usage_report_reads_rollups_only()
+    test_code_repositories_match()
+    test_interfaces_are_abstract()
+    test_backend_selection()
+    print("\n🚀 Storage backends: ALL TESTS PASSED")
@@ -12,7 +12,8 @@ import re
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime
-import sqlite3
+
+from connection_manager import get_connection_manager
 
 
 @dataclass
@@ -118,49 +119,47 @@ class BuildingCodeExtractor:
     
     def __init__(self, db_path: str = 'building_codes.db'):
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
         self.validator = TextExtractionValidator()
         self._init_database()
     
     def _init_database(self):
         """Initialize SQLite database for storing extracted text"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS extracted_sections (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                section_identifier TEXT UNIQUE NOT NULL,
-                jurisdiction TEXT NOT NULL,
-                exact_text_en TEXT NOT NULL,
-                exact_text_fr TEXT,
-                source_document TEXT,
-                page_number INTEGER,
-                extraction_method TEXT,
-                extracted_by TEXT,
-                extraction_date TEXT,
-                verified_by TEXT,
-                verification_date TEXT,
-                text_hash TEXT,
-                validation_results TEXT,
-                legal_status TEXT DEFAULT 'draft'
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS verification_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                section_identifier TEXT,
-                verifier_name TEXT,
-                verification_method TEXT,
-                verification_result TEXT,
-                issues_found TEXT,
-                confidence_score REAL,
-                timestamp TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS extracted_sections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    section_identifier TEXT UNIQUE NOT NULL,
+                    jurisdiction TEXT NOT NULL,
+                    exact_text_en TEXT NOT NULL,
+                    exact_text_fr TEXT,
+                    source_document TEXT,
+                    page_number INTEGER,
+                    extraction_method TEXT,
+                    extracted_by TEXT,
+                    extraction_date TEXT,
+                    verified_by TEXT,
+                    verification_date TEXT,
+                    text_hash TEXT,
+                    validation_results TEXT,
+                    legal_status TEXT DEFAULT 'draft'
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS verification_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    section_identifier TEXT,
+                    verifier_name TEXT,
+                    verification_method TEXT,
+                    verification_result TEXT,
+                    issues_found TEXT,
+                    confidence_score REAL,
+                    timestamp TEXT
+                )
+            ''')
     
     def extract_manual_text(self, 
                            section_identifier: str,
@@ -171,41 +170,53 @@ class BuildingCodeExtractor:
                            extracted_by: str) -> Dict:
         """
         Process manually extracted text with validation
+        Re-submitting identical text for the same source is a no-op that keeps any verification.
         """
+        # Generate text hash for integrity verification
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+        with self.db.reader() as conn:
+            existing = conn.execute('''
+                SELECT text_hash, jurisdiction, source_document, page_number, legal_status
+                FROM extracted_sections WHERE section_identifier = ?
+            ''', (section_identifier,)).fetchone()
+        if existing and (existing['text_hash'], existing['jurisdiction'], existing['source_document'],
+                         existing['page_number']) == (text_hash, jurisdiction, source_document, page_number):
+            return {
+                'success': True,
+                'section_id': section_identifier,
+                'text_hash': text_hash,
+                'unchanged': True,
+                'legal_status': existing['legal_status']
+            }
+
         # Validate the extracted text
         validation_results = self.validator.validate_extracted_text(
             f"{jurisdiction}_{section_identifier}", text
         )
-        
-        # Generate text hash for integrity verification
-        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
-        
+
         # Store in database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO extracted_sections 
-                (section_identifier, jurisdiction, exact_text_en, source_document, 
-                 page_number, extraction_method, extracted_by, extraction_date, 
-                 text_hash, validation_results, legal_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                section_identifier,
-                jurisdiction,
-                text,
-                source_document,
-                page_number,
-                'manual_copy_paste',
-                extracted_by,
-                datetime.now().isoformat(),
-                text_hash,
-                json.dumps(validation_results),
-                'pending_verification' if validation_results['valid'] else 'requires_correction'
-            ))
-            
-            conn.commit()
+            with self.db.writer() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO extracted_sections 
+                    (section_identifier, jurisdiction, exact_text_en, source_document, 
+                     page_number, extraction_method, extracted_by, extraction_date, 
+                     text_hash, validation_results, legal_status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    section_identifier,
+                    jurisdiction,
+                    text,
+                    source_document,
+                    page_number,
+                    'manual_copy_paste',
+                    extracted_by,
+                    datetime.now().isoformat(),
+                    text_hash,
+                    json.dumps(validation_results),
+                    'pending_verification' if validation_results['valid'] else 'requires_correction'
+                ))
             
             return {
                 'success': True,
@@ -220,8 +231,6 @@ class BuildingCodeExtractor:
                 'success': False,
                 'error': str(e)
             }
-        finally:
-            conn.close()
     
     def verify_extracted_text(self, 
                               section_identifier: str,
@@ -230,48 +239,45 @@ class BuildingCodeExtractor:
         """
         Professional verification of extracted text
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get the extracted section
-        cursor.execute('''
-            SELECT exact_text_en, validation_results 
-            FROM extracted_sections 
-            WHERE section_identifier = ?
-        ''', (section_identifier,))
-        
-        result = cursor.fetchone()
-        if not result:
-            return {'success': False, 'error': 'Section not found'}
-        
-        text, validation_json = result
-        validation_results = json.loads(validation_json)
-        
-        # Record verification
-        cursor.execute('''
-            INSERT INTO verification_log 
-            (section_identifier, verifier_name, verification_method, 
-             verification_result, confidence_score, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            section_identifier,
-            verifier_name,
-            'manual_professional_review',
-            'approved' if validation_results['valid'] else 'requires_correction',
-            validation_results['confidence_score'],
-            datetime.now().isoformat()
-        ))
-        
-        # Update section status
-        new_status = 'verified' if validation_results['valid'] else 'requires_correction'
-        cursor.execute('''
-            UPDATE extracted_sections 
-            SET verified_by = ?, verification_date = ?, legal_status = ?
-            WHERE section_identifier = ?
-        ''', (verifier_name, datetime.now().isoformat(), new_status, section_identifier))
-        
-        conn.commit()
-        conn.close()
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+            
+            # Get the extracted section
+            cursor.execute('''
+                SELECT exact_text_en, validation_results 
+                FROM extracted_sections 
+                WHERE section_identifier = ?
+            ''', (section_identifier,))
+            
+            result = cursor.fetchone()
+            if not result:
+                return {'success': False, 'error': 'Section not found'}
+            
+            text, validation_json = result
+            validation_results = json.loads(validation_json)
+            
+            # Record verification
+            cursor.execute('''
+                INSERT INTO verification_log 
+                (section_identifier, verifier_name, verification_method, 
+                 verification_result, confidence_score, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                section_identifier,
+                verifier_name,
+                'manual_professional_review',
+                'approved' if validation_results['valid'] else 'requires_correction',
+                validation_results['confidence_score'],
+                datetime.now().isoformat()
+            ))
+            
+            # Update section status
+            new_status = 'verified' if validation_results['valid'] else 'requires_correction'
+            cursor.execute('''
+                UPDATE extracted_sections 
+                SET verified_by = ?, verification_date = ?, legal_status = ?
+                WHERE section_identifier = ?
+            ''', (verifier_name, datetime.now().isoformat(), new_status, section_identifier))
         
         return {
             'success': True,
@@ -287,16 +293,11 @@ class BuildingCodeExtractor:
         """
         Compare extracted text with reference source
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT exact_text_en FROM extracted_sections 
-            WHERE section_identifier = ?
-        ''', (section_identifier,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.reader() as conn:
+            result = conn.execute('''
+                SELECT exact_text_en FROM extracted_sections 
+                WHERE section_identifier = ?
+            ''', (section_identifier,)).fetchone()
         
         if not result:
             return {'success': False, 'error': 'Section not found'}
@@ -335,18 +336,13 @@ class BuildingCodeExtractor:
         """
         Export verified sections for database import
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT section_identifier, exact_text_en, source_document, 
-                   page_number, verified_by, verification_date
-            FROM extracted_sections 
-            WHERE jurisdiction = ? AND legal_status = 'verified'
-        ''', (jurisdiction,))
-        
-        sections = cursor.fetchall()
-        conn.close()
+        with self.db.reader() as conn:
+            sections = conn.execute('''
+                SELECT section_identifier, exact_text_en, source_document, 
+                       page_number, verified_by, verification_date
+                FROM extracted_sections 
+                WHERE jurisdiction = ? AND legal_status = 'verified'
+            ''', (jurisdiction,)).fetchall()
         
         export_data = {
             'jurisdiction': jurisdiction,
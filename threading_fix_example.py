@@ -2,6 +2,8 @@
 """
 SQLite Threading Fix - Example Implementation
 Shows how to fix the threading issue in the enhanced logic engine
+
+The production implementation of the pooled approach lives in connection_manager.py
 """
 
 import sqlite3
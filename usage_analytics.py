@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+BCode Pro - Usage Analytics Rollups
+Maintains incremental daily and monthly usage aggregates per user and analysis type
+"""
+
+import sys
+from datetime import datetime, timezone
+
+from connection_manager import get_connection_manager
+
+ROLLUP_GRANULARITIES = {
+    'day': 10,    # 'YYYY-MM-DD' prefix of project_usage.created_at
+    'month': 7    # 'YYYY-MM' prefix of project_usage.created_at
+}
+
+# Only per-user rollups: users.company is free text the user types in, so grouping on it would let
+# anyone read another firm's usage. Organization rollups need a real organization id first.
+ROLLUP_SCOPES = ('user',)
+
+# Longest window a dashboard may request, keeps every query bounded
+MAX_PERIODS = {
+    'day': 366,
+    'month': 60
+}
+
+
+class UsageAnalytics:
+    """
+    Incremental rollups over the project_usage table.
+
+    Raw usage rows are folded into usage_rollup once, tracked by a high-water mark on
+    project_usage.id. The usage write path folds its own row inside the same transaction,
+    and compact() catches up on rows written by anything else. Dashboards only ever read
+    usage_rollup, so their cost depends on the window size and not on the usage history.
+    """
+
+    def __init__(self, db_path="database/users.db"):
+        self.db_path = db_path
+
+    def init_rollup_tables(self, cursor):
+        """Create rollup tables (project_usage and users must already exist)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_rollup (
+                granularity TEXT NOT NULL,
+                period TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                scope_id TEXT NOT NULL,
+                analysis_type TEXT NOT NULL,
+                project_count INTEGER NOT NULL DEFAULT 0,
+                free_tier_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, scope, scope_id, period, analysis_type)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_rollup_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_usage_id INTEGER NOT NULL DEFAULT 0,
+                compacted_at TIMESTAMP
+            )
+        ''')
+
+        cursor.execute('INSERT OR IGNORE INTO usage_rollup_state (id, last_usage_id) VALUES (1, 0)')
+
+        # Rows from the retired company-name scope
+        cursor.execute("DELETE FROM usage_rollup WHERE scope != 'user'")
+
+    def compact(self, cursor):
+        """
+        Fold every project_usage row above the high-water mark into the rollups.
+        Runs inside the caller's transaction; on the write path this is exactly one row.
+        Returns the number of usage rows folded.
+        """
+        cursor.execute('SELECT last_usage_id FROM usage_rollup_state WHERE id = 1')
+        last_usage_id = cursor.fetchone()[0]
+
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM project_usage')
+        max_usage_id = cursor.fetchone()[0]
+
+        if max_usage_id <= last_usage_id:
+            return 0
+
+        # Ids can have gaps (deleted rows), so count rather than subtract
+        cursor.execute('SELECT COUNT(*) FROM project_usage WHERE id > ? AND id <= ?',
+                       (last_usage_id, max_usage_id))
+        folded = cursor.fetchone()[0]
+
+        for granularity, prefix_length in ROLLUP_GRANULARITIES.items():
+            cursor.execute(f'''
+                INSERT INTO usage_rollup
+                    (granularity, period, scope, scope_id, analysis_type, project_count, free_tier_count)
+                SELECT ?, SUBSTR(pu.created_at, 1, {prefix_length}), 'user', CAST(pu.user_id AS TEXT),
+                       COALESCE(pu.analysis_type, 'unknown'), COUNT(*), SUM(COALESCE(pu.is_free_tier, 0))
+                FROM project_usage pu
+                WHERE pu.id > ? AND pu.id <= ? AND pu.user_id IS NOT NULL
+                GROUP BY 2, 4, 5
+                ON CONFLICT (granularity, scope, scope_id, period, analysis_type) DO UPDATE SET
+                    project_count = project_count + excluded.project_count,
+                    free_tier_count = free_tier_count + excluded.free_tier_count
+            ''', (granularity, last_usage_id, max_usage_id))
+
+        cursor.execute('''
+            UPDATE usage_rollup_state SET last_usage_id = ?, compacted_at = CURRENT_TIMESTAMP
+            WHERE id = 1
+        ''', (max_usage_id,))
+
+        return folded
+
+    def run_compactor(self):
+        """Periodic compactor entry point - folds rows written outside the usage write path"""
+        with get_connection_manager(self.db_path).writer() as conn:
+            return self.compact(conn.cursor())
+
+    def get_usage_report(self, cursor, scope, scope_id, granularity='day', periods=30, end=None):
+        """
+        Build a dashboard series from the rollups only.
+        Reads at most periods x analysis_types primary-key rows regardless of history size.
+        """
+        period_keys = report_window(scope, granularity, periods, end)
+
+        cursor.execute('''
+            SELECT period, analysis_type, project_count, free_tier_count
+            FROM usage_rollup
+            WHERE granularity = ? AND scope = ? AND scope_id = ? AND period BETWEEN ? AND ?
+        ''', (granularity, scope, str(scope_id), period_keys[0], period_keys[-1]))
+
+        return build_report(scope, scope_id, granularity, period_keys, cursor.fetchall())
+
+    def period_keys(self, granularity, periods, end=None):
+        return period_keys(granularity, periods, end)
+
+
+def report_window(scope, granularity, periods, end=None):
+    """Validated period labels for a report request; raises ValueError"""
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f'Invalid granularity: {granularity}')
+    if scope not in ROLLUP_SCOPES:
+        raise ValueError(f'Invalid scope: {scope}')
+    periods = max(1, min(int(periods), MAX_PERIODS[granularity]))
+    return period_keys(granularity, periods, end)
+
+
+def period_keys(granularity, periods, end=None):
+    """Period labels for the window ending at `end` (UTC now by default), oldest first"""
+    end = end or datetime.now(timezone.utc)
+    keys = []
+
+    if granularity == 'day':
+        ordinal = end.toordinal()
+        for offset in range(periods - 1, -1, -1):
+            keys.append(datetime.fromordinal(ordinal - offset).strftime('%Y-%m-%d'))
+    else:
+        month_index = end.year * 12 + end.month - 1
+        for offset in range(periods - 1, -1, -1):
+            year, month = divmod(month_index - offset, 12)
+            keys.append(f'{year:04d}-{month + 1:02d}')
+
+    return keys
+
+
+def build_report(scope, scope_id, granularity, period_keys, rows):
+    """Dashboard series from (period, analysis_type, project_count, free_tier_count) rows"""
+    series = {key: {'period': key, 'total': 0, 'free_tier': 0, 'by_analysis_type': {}}
+              for key in period_keys}
+    totals = {'total': 0, 'free_tier': 0, 'by_analysis_type': {}}
+
+    for period, analysis_type, project_count, free_tier_count in rows:
+        point = series.get(period)
+        if point is None:
+            continue
+        point['total'] += project_count
+        point['free_tier'] += free_tier_count
+        point['by_analysis_type'][analysis_type] = (
+            point['by_analysis_type'].get(analysis_type, 0) + project_count
+        )
+
+        totals['total'] += project_count
+        totals['free_tier'] += free_tier_count
+        totals['by_analysis_type'][analysis_type] = (
+            totals['by_analysis_type'].get(analysis_type, 0) + project_count
+        )
+
+    return {
+        'scope': scope,
+        'scope_id': str(scope_id),
+        'granularity': granularity,
+        'periods': len(period_keys),
+        'series': [series[key] for key in period_keys],
+        'totals': totals
+    }
+
+if __name__ == "__main__":
+    # Periodic compactor, e.g. from cron: python usage_analytics.py [database/users.db]
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "database/users.db"
+    folded = UsageAnalytics(db_path).run_compactor()
+    print(f"✅ Folded {folded} usage rows into rollups")
@@ -4,7 +4,6 @@ BCode Pro - User Authentication and Subscription System
 Handles user registration, login, subscription management, and payment processing
 """
 
-import sqlite3
 import hashlib
 import secrets
 import smtplib
@@ -15,10 +14,13 @@ import stripe
 import os
 from flask import session, request, jsonify
 import re
+from storage_backends import StorageError, create_user_repository
 
 class UserAuthSystem:
-    def __init__(self, db_path="database/users.db"):
+    def __init__(self, db_path="database/users.db", backend=None):
         self.db_path = db_path
+        # User data lives behind a storage adapter (STORAGE_BACKEND: sqlite, memory, postgres)
+        self.users = create_user_repository(db_path, backend)
         self.init_user_database()
         
         # Stripe configuration (you'll need to set these environment variables)
@@ -27,77 +29,7 @@ class UserAuthSystem:
         
     def init_user_database(self):
         """Initialize user database with all necessary tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT,
-                password_hash TEXT NOT NULL,
-                first_name TEXT,
-                last_name TEXT,
-                company TEXT,
-                profession TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                email_verified BOOLEAN DEFAULT FALSE,
-                verification_token TEXT,
-                reset_token TEXT,
-                reset_token_expires TIMESTAMP,
-                last_login TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE
-            )
-        ''')
-        
-        # Subscriptions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS subscriptions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                plan_type TEXT NOT NULL,
-                status TEXT NOT NULL,
-                stripe_subscription_id TEXT,
-                stripe_customer_id TEXT,
-                current_period_start TIMESTAMP,
-                current_period_end TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Project usage table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS project_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                project_name TEXT,
-                analysis_type TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_free_tier BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Payment history table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                stripe_payment_intent_id TEXT,
-                amount INTEGER,
-                currency TEXT DEFAULT 'usd',
-                status TEXT,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self.users.init_schema()
     
     def hash_password(self, password):
         """Hash password with salt"""
@@ -139,34 +71,14 @@ class UserAuthSystem:
             if len(password) < 8:
                 return {'success': False, 'error': 'Password must be at least 8 characters'}
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if user already exists
-            cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-            if cursor.fetchone():
-                return {'success': False, 'error': 'Email already registered'}
-            
-            # Create user
+            # Hash outside the write lock - PBKDF2 is deliberately slow
             password_hash = self.hash_password(password)
             verification_token = secrets.token_urlsafe(32)
             
-            cursor.execute('''
-                INSERT INTO users (email, password_hash, first_name, last_name, phone, 
-                                 company, profession, verification_token)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (email, password_hash, first_name, last_name, phone, company, profession, verification_token))
-            
-            user_id = cursor.lastrowid
-            
-            # Create free tier subscription
-            cursor.execute('''
-                INSERT INTO subscriptions (user_id, plan_type, status)
-                VALUES (?, 'free', 'active')
-            ''', (user_id,))
-            
-            conn.commit()
-            conn.close()
+            user_id = self.users.create_user(email, password_hash, first_name, last_name, phone,
+                                             company, profession, verification_token)
+            if user_id is None:
+                return {'success': False, 'error': 'Email already registered'}
             
             # Send verification email
             self.send_verification_email(email, verification_token)
@@ -183,19 +95,14 @@ class UserAuthSystem:
     def login_user(self, email, password):
         """Authenticate user login"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, password_hash, email_verified, is_active, first_name, last_name
-                FROM users WHERE email = ?
-            ''', (email,))
+            user = self.users.find_login(email)
             
-            user = cursor.fetchone()
             if not user:
                 return {'success': False, 'error': 'Invalid email or password'}
             
-            user_id, password_hash, email_verified, is_active, first_name, last_name = user
+            user_id, password_hash, email_verified, is_active, first_name, last_name = (
+                user['id'], user['password_hash'], user['email_verified'], user['is_active'],
+                user['first_name'], user['last_name'])
             
             if not self.verify_password(password, password_hash):
                 return {'success': False, 'error': 'Invalid email or password'}
@@ -204,9 +111,7 @@ class UserAuthSystem:
                 return {'success': False, 'error': 'Account is deactivated'}
             
             # Update last login
-            cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user_id,))
-            conn.commit()
-            conn.close()
+            self.users.touch_login(user_id)
             
             return {
                 'success': True,
@@ -223,32 +128,13 @@ class UserAuthSystem:
     def get_user_subscription(self, user_id):
         """Get user's current subscription details"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT plan_type, status, current_period_end, stripe_subscription_id
-                FROM subscriptions WHERE user_id = ? AND status = 'active'
-                ORDER BY created_at DESC LIMIT 1
-            ''', (user_id,))
-            
-            subscription = cursor.fetchone()
+            subscription = self.users.subscription(user_id)
             if not subscription:
                 return {'plan_type': 'none', 'status': 'inactive'}
             
-            plan_type, status, period_end, stripe_id = subscription
-            
-            # Get project usage for free tier
-            if plan_type == 'free':
-                cursor.execute('''
-                    SELECT COUNT(*) FROM project_usage 
-                    WHERE user_id = ? AND is_free_tier = TRUE
-                ''', (user_id,))
-                projects_used = cursor.fetchone()[0]
-            else:
-                projects_used = 0
-            
-            conn.close()
+            plan_type, status, period_end = (subscription['plan_type'], subscription['status'],
+                                             subscription['current_period_end'])
+            projects_used = subscription['free_projects_used']
             
             return {
                 'plan_type': plan_type,
@@ -267,7 +153,7 @@ class UserAuthSystem:
         
         if subscription['plan_type'] == 'free':
             return subscription['free_projects_remaining'] > 0
-        elif subscription['plan_type'] in ['professional', 'project', 'team', 'enterprise']:
+        elif subscription['plan_type'] in ['professional', 'project', 'firm', 'team', 'enterprise']:
             return subscription['status'] == 'active'
         else:
             return False
@@ -278,22 +164,28 @@ class UserAuthSystem:
             subscription = self.get_user_subscription(user_id)
             is_free_tier = subscription['plan_type'] == 'free'
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO project_usage (user_id, project_name, analysis_type, is_free_tier)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, project_name, analysis_type, is_free_tier))
-            
-            conn.commit()
-            conn.close()
+            self.users.record_usage(user_id, project_name, analysis_type, is_free_tier)
             
             return {'success': True}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def get_usage_analytics(self, user_id, scope='user', granularity='day', periods=30):
+        """Usage dashboard data for a user, answered from rollups only"""
+        try:
+            if scope != 'user':
+                return {'success': False, 'error': f'Invalid scope: {scope}'}
+            
+            report = self.users.usage_report(scope, user_id, granularity, periods)
+            
+            return {'success': True, 'analytics': report}
+            
+        except (ValueError, StorageError) as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            return {'success': False, 'error': f'Analytics unavailable: {str(e)}'}
+    
     def create_stripe_checkout_session(self, user_id, plan_type):
         """Create Stripe checkout session for subscription"""
         try:
@@ -309,11 +201,7 @@ class UserAuthSystem:
                 return {'success': False, 'error': 'Invalid plan type'}
             
             # Get user email
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT email FROM users WHERE id = ?', (user_id,))
-            user_email = cursor.fetchone()[0]
-            conn.close()
+            user_email = self.users.user_field(user_id, 'email')
             
             # Create Stripe checkout session
             checkout_session = stripe.checkout.Session.create(
@@ -341,6 +229,19 @@ class UserAuthSystem:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def activate_subscription(self, user_id, plan_type, stripe_subscription_id=None, period_end=None):
+        """Make plan_type the user's active subscription (checkout completion, admin, load tests)"""
+        try:
+            if plan_type not in PRICING_PLANS:
+                return {'success': False, 'error': f'Unknown plan: {plan_type}'}
+            
+            self.users.activate_subscription(user_id, plan_type, stripe_subscription_id, period_end)
+            
+            return {'success': True, 'plan_type': plan_type}
+        
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
     def send_verification_email(self, email, token):
         """Send email verification"""
         try: